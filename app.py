@@ -50,15 +50,35 @@ async def lifespan(app: FastAPI):
     from src.dao.db_config import db_config
     from src.dao.base import BaseDAO
     
-    db_initialized = await init_database()
-    
-    if db_initialized:
+    if db_config.backend != "sqlite" and await init_database():
         # 初始化连接池
         await BaseDAO.init_pool(
             dsn=db_config.get_dsn(),
             min_size=db_config.min_pool_size,
-            max_size=db_config.max_pool_size
+            max_size=db_config.max_pool_size,
+            statement_cache_size=db_config.statement_cache_size,
+            slow_query_ms=db_config.slow_query_ms,
+            session_cache_size=db_config.session_cache_size,
+            session_cache_ttl=db_config.session_cache_ttl
+        )
+
+    if not BaseDAO.is_database_enabled() and db_config.backend in ("sqlite", "auto"):
+        # 嵌入式 SQLite 存储（WAL 模式）
+        await BaseDAO.init_sqlite(
+            path=db_config.sqlite_path,
+            pool_size=db_config.sqlite_pool_size,
+            slow_query_ms=db_config.slow_query_ms,
+            session_cache_size=db_config.session_cache_size,
+            session_cache_ttl=db_config.session_cache_ttl
         )
+    
+    if BaseDAO.is_database_enabled():
+        # 补齐研究统计汇总（汇总表上线前已完成的会话）
+        from src.dao.research_dao import ResearchDAO
+        try:
+            await ResearchDAO().rollup_session_statistics()
+        except Exception as e:
+            logger.warning(f"⚠ Research statistics rollup failed: {e}")
         logger.info("✓ Database initialized successfully")
     else:
         logger.warning("⚠ Database not available, running in memory mode")
@@ -80,6 +100,11 @@ async def lifespan(app: FastAPI):
     else:
         logger.info("All LLM provider configurations validated successfully")
     
+    # Start background memory extraction and retention (need the database)
+    from src.api.chat import chat_service
+    chat_service.start_memory_worker()
+    chat_service.start_memory_compaction()
+    
     logger.info("Deep Research API started successfully")
     
     yield
@@ -87,6 +112,14 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down Deep Research API...")
     
+    # Stop background memory extraction, then flush pending vector store writes
+    await chat_service.stop_memory_worker()
+    await chat_service.stop_memory_compaction()
+    if chat_service.memory_manager:
+        await chat_service.memory_manager.close()
+    if chat_service.memory_agent:
+        await chat_service.memory_agent.memory_manager.close()
+    
     # Close Redis connection
     await redis_client.close()
     
@@ -110,6 +143,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Mount API routers
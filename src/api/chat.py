@@ -6,7 +6,7 @@
 """
 
 import logging
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query, Response
 from fastapi.responses import StreamingResponse
 from typing import List, Optional
 
@@ -48,14 +48,23 @@ async def create_session(
 
 @router.get("/sessions", response_model=List[ChatSessionResponse], summary="获取会话列表")
 async def get_sessions(
-    limit: int = 50,
-    offset: int = 0,
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 中的游标"),
     user_id: str = Depends(get_current_user_id)
 ):
-    """获取当前用户的对话会话列表"""
+    """
+    获取当前用户的对话会话列表（按最近更新从新到旧）
+
+    还有下一页时，响应头 X-Next-Cursor 给出下一页的游标
+    """
     try:
-        sessions = await chat_service.get_user_sessions(user_id, limit, offset)
-        return sessions
+        page = await chat_service.get_user_sessions(user_id, limit, cursor)
+        if page["next_cursor"]:
+            response.headers["X-Next-Cursor"] = page["next_cursor"]
+        return page["sessions"]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"获取会话列表失败: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -122,10 +131,17 @@ async def delete_session(
 @router.get("/sessions/{session_id}/messages", response_model=List[ChatMessage], summary="获取会话消息")
 async def get_messages(
     session_id: str,
-    limit: Optional[int] = None,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 中的游标"),
     user_id: str = Depends(get_current_user_id)
 ):
-    """获取指定会话的消息列表"""
+    """
+    获取指定会话的消息列表（按时间从旧到新）
+
+    指定 limit 或 cursor 时分页（只带 cursor 时使用默认页大小），
+    还有下一页时响应头 X-Next-Cursor 给出下一页的游标；游标无效返回 400
+    """
     # 验证会话所有权
     session = await chat_service.get_session(session_id)
     if not session:
@@ -133,8 +149,14 @@ async def get_messages(
     if session['user_id'] != user_id:
         raise HTTPException(status_code=403, detail="无权访问此会话")
     
-    messages = await chat_service.get_session_messages(session_id, limit)
-    return messages
+    try:
+        page = await chat_service.get_session_messages(session_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return page["messages"]
 
 
 @router.delete("/sessions/{session_id}/messages", summary="清空会话消息")
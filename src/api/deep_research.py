@@ -5,7 +5,7 @@
 提供AgentScope深度研究功能的REST API
 """
 
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query, Request, Response
 from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Any, Dict, List, Optional
@@ -13,6 +13,7 @@ from datetime import datetime
 import asyncio
 import json
 
+from src.dao.base import BaseDAO
 from src.services.agentscope_research_service import AgentScopeResearchService
 from src.middleware.auth import get_current_user, get_optional_user
 from src.schemas.research import (
@@ -192,6 +193,7 @@ async def resume_research(
 async def get_user_sessions(
     status: Optional[str] = None,
     limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
     user_id: Optional[str] = Query(None, description="用户ID（可选，用于过滤特定用户的会话）"),
     current_user: Optional[Dict[str, Any]] = Depends(get_optional_user)
 ):
@@ -209,21 +211,25 @@ async def get_user_sessions(
             user_id = None  # 返回所有会话
 
         # 获取会话列表
-        sessions = await research_service.get_user_sessions(
+        page = await research_service.get_user_sessions(
             user_id=user_id,
             status=status,
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
 
         return ResearchListResponse(
             success=True,
-            sessions=sessions,
-            total=len(sessions),
+            sessions=page["sessions"],
+            total=len(page["sessions"]),
+            next_cursor=page["next_cursor"],
             message="获取会话列表成功"
         )
 
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取会话列表时出错: {str(e)}")
 
@@ -231,10 +237,14 @@ async def get_user_sessions(
 @router.get("/export/{session_id}", response_model=ResearchExportResponse)
 async def export_session_data(
     session_id: str,
+    request: Request,
+    response: Response,
     current_user: Optional[Dict[str, Any]] = Depends(get_optional_user)
 ):
     """
     导出会话数据（不需要认证，但会验证会话访问权限）
+
+    已完成的会话带 ETag 返回，If-None-Match 命中时返回 304。
     """
     try:
         # 如果提供了用户信息，验证访问权限
@@ -244,8 +254,16 @@ async def export_session_data(
             if not has_access:
                 raise HTTPException(status_code=403, detail="无权访问此研究会话")
 
-        # 导出数据
-        data = await research_service.export_session_data(session_id)
+        # 已完成的会话直接使用报告制品
+        artifact = await research_service.get_report_artifact(session_id)
+        if artifact:
+            if _etag_matches(request, artifact["etag"]):
+                return Response(status_code=304, headers={"ETag": artifact["etag"]})
+            response.headers["ETag"] = artifact["etag"]
+            data = artifact["export_data"]
+        else:
+            # 导出数据
+            data = await research_service.export_session_data(session_id)
 
         if not data:
             raise HTTPException(status_code=404, detail="会话数据不存在")
@@ -265,6 +283,133 @@ async def export_session_data(
         raise HTTPException(status_code=500, detail=f"导出会话数据时出错: {str(e)}")
 
 
+@router.get("/export/{session_id}/stream")
+async def stream_session_export(
+    session_id: str,
+    current_user: Optional[Dict[str, Any]] = Depends(get_optional_user)
+):
+    """
+    流式导出会话数据（NDJSON，每行一条记录，最后一行 type 为 end）
+
+    数据库中的会话按游标分批读取并立即写出，适合记录很多的大会话。
+    """
+    if current_user:
+        has_access = await research_service.validate_session_access(session_id, current_user["user_id"])
+        if not has_access:
+            raise HTTPException(status_code=403, detail="无权访问此研究会话")
+
+    lines = research_service.stream_session_export(session_id)
+    try:
+        # 先取第一行：会话不存在时仍可返回 404
+        first_line = await lines.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=404, detail="会话数据不存在")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"导出会话数据时出错: {str(e)}")
+
+    async def body():
+        try:
+            yield first_line
+            async for line in lines:
+                yield line
+        finally:
+            await lines.aclose()
+
+    return StreamingResponse(
+        body(),
+        media_type="application/x-ndjson",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # 禁用 nginx 缓冲
+        }
+    )
+
+
+@router.get("/report/{session_id}")
+async def get_research_report(
+    session_id: str,
+    request: Request,
+    response: Response,
+    current_user: Optional[Dict[str, Any]] = Depends(get_optional_user)
+):
+    """
+    获取已完成研究的最终报告（格式化报告、完整文本和证据链）
+
+    支持 ETag / If-None-Match，报告未变化时返回 304。
+    """
+    try:
+        if current_user:
+            user_id = current_user["user_id"]
+            has_access = await research_service.validate_session_access(session_id, user_id)
+            if not has_access:
+                raise HTTPException(status_code=403, detail="无权访问此研究会话")
+
+        artifact = await research_service.get_report_artifact(session_id)
+        if not artifact:
+            raise HTTPException(status_code=404, detail="报告不存在或研究尚未完成")
+
+        if _etag_matches(request, artifact["etag"]):
+            return Response(status_code=304, headers={"ETag": artifact["etag"]})
+
+        response.headers["ETag"] = artifact["etag"]
+        return {
+            "success": True,
+            "session_id": session_id,
+            "etag": artifact["etag"],
+            "formatted_report": artifact["formatted_report"],
+            "report_text": artifact["report_text"],
+            "evidence": artifact["evidence"],
+            "created_at": artifact.get("created_at")
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取研究报告时出错: {str(e)}")
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """检查请求的 If-None-Match 是否命中当前 ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+@router.get("/memory/{session_id}")
+async def get_research_memory(
+    session_id: str,
+    before_id: Optional[int] = Query(None, ge=1),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    分页获取研究会话写入长期记忆的消息（从新到旧）
+
+    下一页请求传入上一页返回的 next_before_id，为 null 时表示没有更多消息。
+    """
+    try:
+        user_id = current_user["user_id"]
+        has_access = await research_service.validate_session_access(session_id, user_id)
+        if not has_access:
+            raise HTTPException(status_code=403, detail="无权访问此研究会话")
+
+        page = await research_service.get_memory_page(session_id, before_id=before_id, limit=limit)
+
+        return {
+            "success": True,
+            "session_id": session_id,
+            "messages": page["messages"],
+            "next_before_id": page["next_before_id"]
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取研究记忆时出错: {str(e)}")
+
+
 @router.delete("/{session_id}")
 async def delete_session(
     session_id: str,
@@ -355,13 +500,19 @@ async def get_research_statistics(
             user_id=user_id if not is_admin else None
         )
 
-        return {
+        response = {
             "success": True,
             "statistics": stats,
             "scope": "user" if not is_admin else "global",
             "message": "获取统计信息成功"
         }
 
+        # 管理员额外返回总耗时最高的数据库语句
+        if is_admin:
+            response["database"] = BaseDAO.get_query_metrics(top=20)
+
+        return response
+
     except HTTPException:
         raise
     except Exception as e:
@@ -395,11 +546,17 @@ async def cleanup_inactive_sessions(
 @router.get("/stream/{session_id}")
 async def stream_research_progress(
     session_id: str,
+    request: Request,
     current_user: Optional[Dict[str, Any]] = Depends(get_optional_user)
 ):
     """
     ✅ SSE 端点：后端主动推送研究进度，前端只需监听
+
+    完成事件带有 `id: <ETag>`，重连时浏览器会回传 Last-Event-ID；
+    与当前报告 ETag 一致时只推送不含正文的完成事件。
     """
+    client_etag = request.headers.get("last-event-id") or request.headers.get("if-none-match")
+
     async def event_generator():
         """生成 SSE 事件流 - 分段推送避免 payload 过大"""
         try:
@@ -407,6 +564,7 @@ async def stream_research_progress(
             yield f"data: {json.dumps({'type': 'connected', 'session_id': session_id}, ensure_ascii=False)}\n\n"
             
             last_status = None
+            report_streamed = False
             
             while True:
                 # 获取研究状态
@@ -428,77 +586,47 @@ async def stream_research_progress(
                     except Exception as e:
                         print(f"✗ SSE: 状态更新序列化失败: {str(e)}")
                 
-                # 研究完成，推送最终报告
+                # 研究完成，推送最终报告（报告制品在完成时已生成一次，这里直接复用）
                 if current_status == "completed":
-                    print(f"✓ SSE: 研究完成，准备生成最终报告...")
-                    export_data = await research_service.export_session_data(session_id)
+                    artifact = await research_service.get_report_artifact(session_id)
                     
-                    if export_data:
-                        try:
-                            # 生成格式化报告
-                            formatted_report = await research_service.format_final_report(
-                                session_id,
-                                export_data
-                            )
-                            
-                            # 生成完整的报告文本
-                            full_report_text = research_service.generate_full_report_text(formatted_report)
-                            
-                            print(f"✓ SSE: 报告已生成，长度: {len(full_report_text)} 字符")
-                            
-                            # ✅ 转换引用数据为前端证据链格式
-                            citations = export_data.get("citations", [])
-                            evidence_list = []
-                            for idx, citation in enumerate(citations):
-                                source_url = citation.get("source_url", "")
-                                # 判断来源类型
-                                if "wikipedia" in source_url.lower():
-                                    source_type = "web"
-                                elif "arxiv" in source_url.lower():
-                                    source_type = "document"
-                                else:
-                                    source_type = "web"
-                                
-                                evidence_list.append({
-                                    "id": idx + 1,
-                                    "source_type": source_type,
-                                    "source_title": citation.get("title", "未知来源"),
-                                    "source_url": source_url,
-                                    "content": f"引用自: {citation.get('title', '')}",
-                                    "snippet": citation.get("title", ""),
-                                    "relevance_score": 0.95,
-                                    "confidence_score": 0.90
-                                })
-                            
-                            print(f"✓ SSE: 证据链数量: {len(evidence_list)}")
-                            
+                    if artifact:
+                        etag = artifact["etag"]
+                        export_data = artifact.get("export_data", {})
+                        
+                        if client_etag == etag:
+                            # 客户端已持有同一份报告（重连），只发送轻量完成事件
+                            final_event = {
+                                "type": "completed",
+                                "status": "completed",
+                                "data": {
+                                    "session_id": session_id,
+                                    "etag": etag,
+                                    "not_modified": True
+                                }
+                            }
+                            print(f"✓ SSE: 报告未变化，跳过重复推送 (ETag: {etag})")
+                        else:
                             # 推送完成事件（包含报告文本和证据链）
                             final_event = {
                                 "type": "completed",
                                 "status": "completed",
                                 "data": {
-                                    "report_text": full_report_text,  # ✅ 完整的报告文本
+                                    "report_text": artifact["report_text"],  # ✅ 完整的报告文本
                                     "session_id": session_id,
+                                    "etag": etag,
                                     "metadata": {
                                         "type": "research",
                                         "session_id": session_id,
-                                        "evidence": evidence_list,  # ✅ 证据链数据
-                                        "citations": citations
+                                        "evidence": artifact["evidence"],  # ✅ 证据链数据
+                                        "citations": export_data.get("citations", []),
+                                        "report_metrics": export_data.get("report_metrics", {})
                                     }
                                 }
                             }
-                            yield f"data: {json.dumps(final_event, ensure_ascii=False, default=str)}\n\n"
-                            print(f"✓ SSE: 完整报告和证据链已推送")
-                            
-                        except Exception as e:
-                            print(f"✗ SSE: 生成报告失败: {str(e)}")
-                            import traceback
-                            traceback.print_exc()
-                            error_event = {
-                                "type": "error",
-                                "error": f"生成报告失败: {str(e)}"
-                            }
-                            yield f"data: {json.dumps(error_event, ensure_ascii=False)}\n\n"
+                            print(f"✓ SSE: 推送缓存报告，长度: {len(artifact['report_text'])} 字符")
+                        
+                        yield f"id: {etag}\ndata: {json.dumps(final_event, ensure_ascii=False, default=str)}\n\n"
                     else:
                         print(f"⚠️ SSE: 报告数据为空")
                         error_event = {
@@ -525,6 +653,27 @@ async def stream_research_progress(
                     yield f"data: {json.dumps(not_found_event, ensure_ascii=False)}\n\n"
                     break
                 
+                # 报告开始生成后，逐段推送 report_delta，不必等待整篇报告
+                if current_status == "in_progress" and not report_streamed:
+                    if await research_service.wait_for_report_stream(session_id, timeout=3):
+                        report_streamed = True
+                        print(f"✓ SSE: 开始推送报告增量")
+                        async for delta in research_service.stream_report_deltas(session_id):
+                            delta_event = {
+                                "type": "report_delta",
+                                "session_id": session_id,
+                                "delta": delta
+                            }
+                            yield f"data: {json.dumps(delta_event, ensure_ascii=False)}\n\n"
+                        
+                        metrics_event = {
+                            "type": "report_metrics",
+                            "session_id": session_id,
+                            "metrics": research_service.get_report_metrics(session_id)
+                        }
+                        yield f"data: {json.dumps(metrics_event, ensure_ascii=False, default=str)}\n\n"
+                    continue
+                
                 # 等待3秒再检查
                 await asyncio.sleep(3)
                 
@@ -28,10 +28,19 @@ class MemoryConfig:
     chroma_persist_dir: str = "./data/chroma"
     chroma_collection_name: str = "user_memories"
     
+    # 向量索引配置
+    vector_backend: str = "auto"  # auto / chroma / numpy
+    vector_index_dir: str = "./data/vector_index"
+    vector_index_quantize: bool = False  # NumPy 索引大分片 int8 预筛选
+    
     # HyDE 配置
     hyde_enabled: bool = True
     hyde_temperature: float = 0.7
     hyde_max_tokens: int = 150
+    hyde_budget_ms: int = 800  # HyDE 生成超过该预算时返回原始查询的检索结果
+    hyde_skip_score: float = 0.85  # 原始查询最高相似度达到该值时跳过 HyDE
+    hyde_cache_size: int = 1024
+    hyde_cache_ttl: int = 3600
     
     # 检索配置
     retrieval_top_k: int = 5
@@ -41,11 +50,40 @@ class MemoryConfig:
     cache_enabled: bool = True
     cache_ttl: int = 3600  # 1小时
     query_cache_ttl: int = 300  # 5分钟
+    retrieval_near_cache_size: int = 512  # 进程内近端缓存条目数
+    retrieval_near_cache_ttl: float = 2.0  # 近端缓存有效期（秒），即跨进程失效的最大延迟
+    
+    # 嵌入缓存配置
+    embedding_cache_enabled: bool = True
+    embedding_cache_dir: str = "./data/embedding_cache"
+    embedding_cache_size: int = 2048  # 进程内 LRU 条目数
+    embedding_cache_capacity: int = 100000  # 磁盘槽位数
+    embedding_cache_dtype: str = "float32"  # float32 / float16
     
     # 提取配置
     extraction_temperature: float = 0.3
     extraction_max_tokens: int = 500
     
+    # 后台提取任务配置
+    worker_enabled: bool = True
+    worker_poll_interval: float = 5.0  # 队列为空时的轮询间隔（秒）
+    worker_batch_size: int = 50  # 每次领取的消息数
+    worker_turns_per_prompt: int = 6  # 每次LLM调用合并的对话轮数
+    worker_calls_per_minute: int = 12  # LLM 调用限速
+    worker_settle_seconds: int = 10  # 只处理创建超过该秒数的消息
+    
+    # 保留与压缩配置
+    max_memory_age_days: int = 30  # 研究长期记忆和低有效性事实的保留天数
+    memory_cleanup_interval: int = 3600  # 压缩任务运行间隔（秒）
+    compression_enabled: bool = True  # 过期消息先以 gzip 归档再删除
+    memory_archive_dir: str = "./data/archive"
+    
+    # 跨会话研究知识复用
+    research_reuse_enabled: bool = True
+    research_reuse_max_age_days: int = 30  # 只复用该天数内的历史发现
+    research_reuse_top_k: int = 8
+    research_reuse_min_similarity: float = 0.75
+    
     # 性能配置
     batch_size: int = 10
     max_fact_length: int = 500
@@ -64,9 +102,17 @@ class MemoryConfig:
             chroma_persist_dir=os.getenv("CHROMA_PERSIST_DIR", "./data/chroma"),
             chroma_collection_name=os.getenv("CHROMA_COLLECTION_NAME", "user_memories"),
             
+            vector_backend=os.getenv("VECTOR_BACKEND", "auto").lower(),
+            vector_index_dir=os.getenv("VECTOR_INDEX_DIR", "./data/vector_index"),
+            vector_index_quantize=os.getenv("VECTOR_INDEX_QUANTIZE", "false").lower() == "true",
+            
             hyde_enabled=os.getenv("HYDE_ENABLED", "true").lower() == "true",
             hyde_temperature=float(os.getenv("HYDE_TEMPERATURE", "0.7")),
             hyde_max_tokens=int(os.getenv("HYDE_MAX_TOKENS", "150")),
+            hyde_budget_ms=int(os.getenv("HYDE_BUDGET_MS", "800")),
+            hyde_skip_score=float(os.getenv("HYDE_SKIP_SCORE", "0.85")),
+            hyde_cache_size=int(os.getenv("HYDE_CACHE_SIZE", "1024")),
+            hyde_cache_ttl=int(os.getenv("HYDE_CACHE_TTL", "3600")),
             
             retrieval_top_k=int(os.getenv("MEMORY_TOP_K", "5")),
             min_validity_score=float(os.getenv("MEMORY_MIN_VALIDITY", "0.7")),
@@ -74,10 +120,35 @@ class MemoryConfig:
             cache_enabled=os.getenv("MEMORY_CACHE_ENABLED", "true").lower() == "true",
             cache_ttl=int(os.getenv("MEMORY_CACHE_TTL", "3600")),
             query_cache_ttl=int(os.getenv("MEMORY_QUERY_CACHE_TTL", "300")),
+            retrieval_near_cache_size=int(os.getenv("MEMORY_NEAR_CACHE_SIZE", "512")),
+            retrieval_near_cache_ttl=float(os.getenv("MEMORY_NEAR_CACHE_TTL", "2.0")),
+            
+            embedding_cache_enabled=os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true",
+            embedding_cache_dir=os.getenv("EMBEDDING_CACHE_DIR", "./data/embedding_cache"),
+            embedding_cache_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "2048")),
+            embedding_cache_capacity=int(os.getenv("EMBEDDING_CACHE_CAPACITY", "100000")),
+            embedding_cache_dtype=os.getenv("EMBEDDING_CACHE_DTYPE", "float32"),
             
             extraction_temperature=float(os.getenv("MEMORY_EXTRACTION_TEMP", "0.3")),
             extraction_max_tokens=int(os.getenv("MEMORY_EXTRACTION_MAX_TOKENS", "500")),
             
+            worker_enabled=os.getenv("MEMORY_WORKER_ENABLED", "true").lower() == "true",
+            worker_poll_interval=float(os.getenv("MEMORY_WORKER_POLL_INTERVAL", "5.0")),
+            worker_batch_size=int(os.getenv("MEMORY_WORKER_BATCH_SIZE", "50")),
+            worker_turns_per_prompt=int(os.getenv("MEMORY_WORKER_TURNS_PER_PROMPT", "6")),
+            worker_calls_per_minute=int(os.getenv("MEMORY_WORKER_CALLS_PER_MINUTE", "12")),
+            worker_settle_seconds=int(os.getenv("MEMORY_WORKER_SETTLE_SECONDS", "10")),
+            
+            max_memory_age_days=int(os.getenv("MEMORY_MAX_AGE_DAYS", "30")),
+            memory_cleanup_interval=int(os.getenv("MEMORY_CLEANUP_INTERVAL", "3600")),
+            compression_enabled=os.getenv("MEMORY_COMPRESSION_ENABLED", "true").lower() == "true",
+            memory_archive_dir=os.getenv("MEMORY_ARCHIVE_DIR", "./data/archive"),
+            
+            research_reuse_enabled=os.getenv("RESEARCH_REUSE_ENABLED", "true").lower() == "true",
+            research_reuse_max_age_days=int(os.getenv("RESEARCH_REUSE_MAX_AGE_DAYS", "30")),
+            research_reuse_top_k=int(os.getenv("RESEARCH_REUSE_TOP_K", "8")),
+            research_reuse_min_similarity=float(os.getenv("RESEARCH_REUSE_MIN_SIMILARITY", "0.75")),
+            
             batch_size=int(os.getenv("MEMORY_BATCH_SIZE", "10")),
             max_fact_length=int(os.getenv("MEMORY_MAX_FACT_LENGTH", "500")),
             min_fact_length=int(os.getenv("MEMORY_MIN_FACT_LENGTH", "5"))
@@ -105,12 +176,39 @@ class MemoryConfig:
         if not self.chroma_persist_dir:
             return False, "CHROMA_PERSIST_DIR is required"
         
+        if self.vector_backend not in ("auto", "chroma", "numpy"):
+            return False, "VECTOR_BACKEND must be auto, chroma or numpy"
+        
         if self.retrieval_top_k < 1:
             return False, "MEMORY_TOP_K must be >= 1"
         
         if not (0.0 <= self.min_validity_score <= 1.0):
             return False, "MEMORY_MIN_VALIDITY must be between 0.0 and 1.0"
         
+        if self.hyde_budget_ms < 0:
+            return False, "HYDE_BUDGET_MS must be >= 0"
+        
+        if not (0.0 <= self.hyde_skip_score <= 1.0):
+            return False, "HYDE_SKIP_SCORE must be between 0.0 and 1.0"
+        
+        if self.worker_batch_size < 1:
+            return False, "MEMORY_WORKER_BATCH_SIZE must be >= 1"
+        
+        if self.max_memory_age_days < 1:
+            return False, "MEMORY_MAX_AGE_DAYS must be >= 1"
+        
+        if self.memory_cleanup_interval < 60:
+            return False, "MEMORY_CLEANUP_INTERVAL must be >= 60"
+        
+        if self.research_reuse_top_k < 1:
+            return False, "RESEARCH_REUSE_TOP_K must be >= 1"
+        
+        if not (0.0 <= self.research_reuse_min_similarity <= 1.0):
+            return False, "RESEARCH_REUSE_MIN_SIMILARITY must be between 0.0 and 1.0"
+        
+        if self.embedding_cache_dtype not in ("float32", "float16"):
+            return False, "EMBEDDING_CACHE_DTYPE must be float32 or float16"
+        
         return True, None
     
     def to_dict(self) -> dict:
@@ -121,10 +219,22 @@ class MemoryConfig:
             "embedding_model": self.embedding_model,
             "generation_model": self.generation_model,
             "chroma_persist_dir": self.chroma_persist_dir,
+            "vector_backend": self.vector_backend,
             "hyde_enabled": self.hyde_enabled,
+            "hyde_budget_ms": self.hyde_budget_ms,
+            "hyde_skip_score": self.hyde_skip_score,
             "retrieval_top_k": self.retrieval_top_k,
             "min_validity_score": self.min_validity_score,
-            "cache_enabled": self.cache_enabled
+            "cache_enabled": self.cache_enabled,
+            "embedding_cache_enabled": self.embedding_cache_enabled,
+            "worker_enabled": self.worker_enabled,
+            "worker_calls_per_minute": self.worker_calls_per_minute,
+            "max_memory_age_days": self.max_memory_age_days,
+            "memory_cleanup_interval": self.memory_cleanup_interval,
+            "compression_enabled": self.compression_enabled,
+            "research_reuse_enabled": self.research_reuse_enabled,
+            "research_reuse_max_age_days": self.research_reuse_max_age_days,
+            "embedding_cache_dtype": self.embedding_cache_dtype
         }
 
 
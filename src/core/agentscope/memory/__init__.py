@@ -6,8 +6,21 @@ AgentScope研究记忆模块
 """
 
 from .research_memory import ResearchSessionMemory, ResearchMemoryManager
+from .finding_dedup import FindingDeduplicator
+from .relevance_scorer import FindingRelevanceScorer
+from .ring_buffer import RingBufferMemory
+from .write_buffer import SessionWriteBuffer
+from .knowledge_index import ResearchKnowledgeIndex
+from .evidence_graph import EvidenceGraphBuilder, build_evidence_graph
 
 __all__ = [
     "ResearchSessionMemory",
-    "ResearchMemoryManager"
+    "ResearchMemoryManager",
+    "FindingDeduplicator",
+    "FindingRelevanceScorer",
+    "RingBufferMemory",
+    "SessionWriteBuffer",
+    "ResearchKnowledgeIndex",
+    "EvidenceGraphBuilder",
+    "build_evidence_graph"
 ]
\ No newline at end of file
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+证据图构建
+对全部研究发现做一次矩阵乘法得到两两相似度，按阈值生成 supports / overlaps 边，
+并用并查集把相互关联的发现聚成证据簇
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning("NumPy not installed. Evidence graph will not be available.")
+
+
+# 不同向量来源的相似度分布不同，阈值分别设置: (supports, overlaps)
+_THRESHOLDS = {
+    "embedding": (0.75, 0.92),
+    "hashed": (0.5, 0.85),
+}
+
+
+class _UnionFind:
+    """并查集（路径压缩 + 按秩合并）"""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.rank = [0] * size
+
+    def find(self, x: int) -> int:
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if self.rank[ra] < self.rank[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        if self.rank[ra] == self.rank[rb]:
+            self.rank[ra] += 1
+
+
+class EvidenceGraphBuilder:
+    """
+    证据图构建器
+
+    - 有发现嵌入时直接使用嵌入向量
+    - 否则使用字符 n-gram 的特征哈希向量，无需调用嵌入服务
+    """
+
+    def __init__(
+        self,
+        hash_dim: int = 2048,
+        ngram_size: int = 3,
+        max_edges: int = 50,
+        max_chars: int = 2000
+    ):
+        """
+        初始化证据图构建器
+
+        Args:
+            hash_dim: 特征哈希向量维度
+            ngram_size: 字符 n-gram 长度
+            max_edges: 返回的最大边数（按相似度降序）
+            max_chars: 每条发现参与向量化的最大字符数
+        """
+        self.hash_dim = hash_dim
+        self.ngram_size = ngram_size
+        self.max_edges = max_edges
+        self.max_chars = max_chars
+
+    @property
+    def available(self) -> bool:
+        """NumPy 是否可用"""
+        return NUMPY_AVAILABLE
+
+    def _hashed_vectors(self, texts: List[str]):
+        """将文本转换为 L2 归一化的特征哈希向量"""
+        matrix = np.zeros((len(texts), self.hash_dim), dtype=np.float32)
+        mask = self.hash_dim - 1
+        n = self.ngram_size
+
+        for row, text in enumerate(texts):
+            text = " ".join(text.lower()[:self.max_chars].split())
+            if len(text) < n:
+                continue
+            # 以 Unicode 码点做滚动多项式哈希，整段文本一次向量化完成
+            codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+            grams = np.zeros(len(codes) - n + 1, dtype=np.int64)
+            for offset in range(n):
+                grams = grams * 1000003 + codes[offset:len(codes) - n + 1 + offset]
+            matrix[row] = np.bincount(grams & mask, minlength=self.hash_dim)
+
+        return self._normalize(matrix)
+
+    @staticmethod
+    def _normalize(matrix):
+        """按行 L2 归一化"""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def build(
+        self,
+        findings: List[Dict[str, Any]],
+        embeddings: Any = None
+    ) -> Dict[str, Any]:
+        """
+        构建证据图
+
+        Args:
+            findings: 研究发现列表
+            embeddings: 与 findings 逐行对应的嵌入矩阵（可选）
+
+        Returns:
+            证据图字典（edges、clusters、stats）
+        """
+        started = time.perf_counter()
+        count = len(findings)
+
+        if count < 2 or not NUMPY_AVAILABLE:
+            return self._empty_graph(count)
+
+        if embeddings is not None and len(embeddings) == count:
+            vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+            vector_source = "embedding"
+        else:
+            vectors = self._hashed_vectors([str(f.get("content", "")) for f in findings])
+            vector_source = "hashed"
+
+        supports_threshold, overlaps_threshold = _THRESHOLDS[vector_source]
+
+        # 一次矩阵乘法得到所有发现的两两余弦相似度，只取上三角
+        similarity = vectors @ vectors.T
+        rows, cols = np.nonzero(np.triu(similarity >= supports_threshold, k=1))
+        weights = similarity[rows, cols]
+        order = np.argsort(-weights, kind="stable")
+
+        union_find = _UnionFind(count)
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            union_find.union(i, j)
+
+        edges = []
+        for k in order[:self.max_edges].tolist():
+            i, j, weight = int(rows[k]), int(cols[k]), float(weights[k])
+            source_i, source_j = findings[i], findings[j]
+            edges.append({
+                "type": "overlaps" if weight >= overlaps_threshold else "supports",
+                "from": source_i.get("id", i),
+                "to": source_j.get("id", j),
+                "from_source": source_i.get("source_type"),
+                "to_source": source_j.get("source_type"),
+                "similarity": round(weight, 4),
+                "strength": min(
+                    source_i.get("relevance_score", 0),
+                    source_j.get("relevance_score", 0)
+                )
+            })
+
+        clusters = self._collect_clusters(findings, union_find)
+
+        return {
+            "edges": edges,
+            "clusters": clusters,
+            "stats": {
+                "nodes": count,
+                "edges_total": int(len(rows)),
+                "overlaps_total": int(np.count_nonzero(weights >= overlaps_threshold)),
+                "clusters": len(clusters),
+                "vector_source": vector_source,
+                "build_ms": round((time.perf_counter() - started) * 1000, 2)
+            }
+        }
+
+    def _collect_clusters(
+        self,
+        findings: List[Dict[str, Any]],
+        union_find: _UnionFind
+    ) -> List[Dict[str, Any]]:
+        """汇总包含两个及以上发现的证据簇"""
+        groups: Dict[int, List[int]] = {}
+        for index in range(len(findings)):
+            groups.setdefault(union_find.find(index), []).append(index)
+
+        clusters = []
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+            scores = [findings[i].get("relevance_score", 0) for i in members]
+            clusters.append({
+                "members": [findings[i].get("id", i) for i in members],
+                "sources": sorted({str(findings[i].get("source_type", "other")) for i in members}),
+                "size": len(members),
+                "avg_relevance": round(sum(scores) / len(scores), 4)
+            })
+
+        clusters.sort(key=lambda c: (c["size"], c["avg_relevance"]), reverse=True)
+        for cluster_id, cluster in enumerate(clusters, 1):
+            cluster["id"] = cluster_id
+
+        return clusters
+
+    def _empty_graph(self, count: int) -> Dict[str, Any]:
+        """发现不足或 NumPy 不可用时的空图"""
+        return {
+            "edges": [],
+            "clusters": [],
+            "stats": {
+                "nodes": count,
+                "edges_total": 0,
+                "overlaps_total": 0,
+                "clusters": 0,
+                "vector_source": None,
+                "build_ms": 0.0
+            }
+        }
+
+
+def build_evidence_graph(
+    findings: List[Dict[str, Any]],
+    embeddings: Optional[Any] = None,
+    max_edges: int = 50
+) -> Dict[str, Any]:
+    """
+    构建证据图的便捷函数
+
+    Args:
+        findings: 研究发现列表
+        embeddings: 与 findings 逐行对应的嵌入矩阵（可选）
+        max_edges: 返回的最大边数
+
+    Returns:
+        证据图字典
+    """
+    return EvidenceGraphBuilder(max_edges=max_edges).build(findings, embeddings)
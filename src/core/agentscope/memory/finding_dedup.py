@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+研究发现近重复检测
+基于字符 shingle 的 MinHash 签名 + LSH 分桶，在会话内识别近似重复的研究发现
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# MinHash 的哈希族为 multiply-add-shift：((a * x + b) mod 2^64) >> 32，
+# a、b 为 64 位随机数，x 为 32 位 shingle 哈希；uint64 运算自然回绕，NumPy 可整体计算
+_MAX_HASH = (1 << 32) - 1
+
+# shingle 多项式哈希的基数与混合常数（64 位回绕运算）
+_GRAM_BASE = 1000003
+_GRAM_MIX = 0xBF58476D1CE4E5B9
+_MASK64 = (1 << 64) - 1
+
+
+@dataclass
+class FindingEntry:
+    """
+    已索引的研究发现
+
+    relevance_score 可能被相关性评分器改写为嵌入相似度，heuristic_score 始终是
+    调用方给出的启发式评分；合并近重复发现时只比较启发式评分，两者量纲不同
+    """
+    finding_id: Any
+    source_type: str
+    source_url: str
+    content: str
+    relevance_score: float
+    signature: Tuple[int, ...]
+    support_count: int = 1
+    sources: Set[str] = field(default_factory=set)
+    heuristic_score: Optional[float] = None
+
+    def __post_init__(self):
+        if self.heuristic_score is None:
+            self.heuristic_score = self.relevance_score
+
+
+class FindingDeduplicator:
+    """
+    会话内研究发现的近重复索引
+
+    - 文本归一化后切分为字符 n-gram（对中英文都适用）
+    - 每条发现计算固定长度的 MinHash 签名，按 band 分桶
+    - 插入时只比较落入相同桶的候选项，单次插入开销与已有发现数量无关
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 5,
+        threshold: float = 0.8,
+        max_shingle_chars: int = 4000
+    ):
+        """
+        初始化近重复索引
+
+        Args:
+            num_perm: MinHash 排列数（签名长度）
+            bands: LSH band 数量，必须整除 num_perm
+            shingle_size: 字符 shingle 长度
+            threshold: 判定为近重复的估计 Jaccard 相似度阈值
+            max_shingle_chars: 参与签名计算的最大字符数
+        """
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.max_shingle_chars = max_shingle_chars
+
+        # 由固定种子生成的哈希参数，保证跨进程签名一致
+        self._perms: List[Tuple[int, int]] = []
+        for i in range(num_perm):
+            seed = hashlib.blake2b(f"minhash-{i}".encode("utf-8"), digest_size=16).digest()
+            a = int.from_bytes(seed[:8], "little") | 1
+            b = int.from_bytes(seed[8:], "little")
+            self._perms.append((a, b))
+
+        if NUMPY_AVAILABLE:
+            self._a = np.array([a for a, _ in self._perms], dtype=np.uint64)
+            self._b = np.array([b for _, b in self._perms], dtype=np.uint64)
+
+        self._entries: List[FindingEntry] = []
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(bands)]
+
+        # 统计信息
+        self.duplicates_suppressed = 0
+
+    def _normalize(self, text: str) -> str:
+        """归一化文本：小写、合并空白、去除标点"""
+        text = text.lower()[:self.max_shingle_chars]
+        text = re.sub(r"[^\w]+", " ", text)
+        return re.sub(r"\s+", " ", text).strip()
+
+    @staticmethod
+    def _hash_gram(gram: str) -> int:
+        """shingle 的 32 位哈希：64 位多项式哈希后做一次混合，取高 32 位"""
+        h = 0
+        for ch in gram:
+            h = (h * _GRAM_BASE + ord(ch)) & _MASK64
+        h = ((h ^ (h >> 29)) * _GRAM_MIX) & _MASK64
+        return h >> 32
+
+    def _shingles(self, normalized: str) -> Set[int]:
+        """将归一化文本切分为字符 shingle 并哈希为 32 位整数"""
+        if len(normalized) <= self.shingle_size:
+            return {self._hash_gram(normalized)}
+
+        return {
+            self._hash_gram(normalized[i:i + self.shingle_size])
+            for i in range(len(normalized) - self.shingle_size + 1)
+        }
+
+    def _shingle_array(self, normalized: str) -> "np.ndarray":
+        """_shingles 的 NumPy 版本：对所有窗口同时计算多项式哈希，结果与 _shingles 相同"""
+        if len(normalized) <= self.shingle_size:
+            return np.array([self._hash_gram(normalized)], dtype=np.uint64)
+
+        codes = np.frombuffer(normalized.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        count = len(codes) - self.shingle_size + 1
+        h = np.zeros(count, dtype=np.uint64)
+        for offset in range(self.shingle_size):
+            # uint64 数组运算按 2^64 回绕，等价于 Python 版本的 & _MASK64
+            h = h * np.uint64(_GRAM_BASE) + codes[offset:offset + count]
+        h = (h ^ (h >> np.uint64(29))) * np.uint64(_GRAM_MIX)
+        return np.unique(h >> np.uint64(32))
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        """
+        计算文本的 MinHash 签名
+
+        Args:
+            text: 文本内容
+
+        Returns:
+            长度为 num_perm 的签名
+        """
+        normalized = self._normalize(text)
+        if not normalized:
+            return tuple([_MAX_HASH] * self.num_perm)
+
+        if NUMPY_AVAILABLE:
+            # (shingle 数, num_perm) 矩阵原地计算，按列取最小值
+            hashed = np.multiply(self._shingle_array(normalized)[:, None], self._a)
+            hashed += self._b
+            hashed >>= np.uint64(32)
+            return tuple(int(v) for v in hashed.min(axis=0))
+
+        shingles = self._shingles(normalized)
+        return tuple(
+            min(((a * h + b) & _MASK64) >> 32 for h in shingles)
+            for a, b in self._perms
+        )
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+        """将签名切分为 LSH band 键"""
+        return [
+            signature[i * self.rows:(i + 1) * self.rows]
+            for i in range(self.bands)
+        ]
+
+    @staticmethod
+    def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+        """根据两个签名估计 Jaccard 相似度"""
+        if not sig_a:
+            return 0.0
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+    def find_duplicate(self, signature: Tuple[int, ...]) -> Optional[FindingEntry]:
+        """
+        查找与签名近似重复的已索引发现
+
+        Args:
+            signature: MinHash 签名
+
+        Returns:
+            最相似的已索引发现，未找到返回None
+        """
+        candidates: Set[int] = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets[band].get(key, ()))
+
+        best_entry = None
+        best_similarity = self.threshold
+        for index in candidates:
+            entry = self._entries[index]
+            score = self.similarity(signature, entry.signature)
+            if score >= best_similarity:
+                best_entry = entry
+                best_similarity = score
+
+        return best_entry
+
+    def add(
+        self,
+        finding_id: Any,
+        source_type: str,
+        source_url: str,
+        content: str,
+        relevance_score: float,
+        signature: Tuple[int, ...]
+    ) -> FindingEntry:
+        """
+        将新发现加入索引
+
+        Args:
+            finding_id: 发现ID（数据库未启用时可能为None）
+            source_type: 来源类型
+            source_url: 来源URL
+            content: 发现内容
+            relevance_score: 相关性评分
+            signature: MinHash 签名
+
+        Returns:
+            索引条目
+        """
+        entry = FindingEntry(
+            finding_id=finding_id,
+            source_type=source_type,
+            source_url=source_url,
+            content=content,
+            relevance_score=relevance_score,
+            signature=signature,
+            sources={source_type}
+        )
+
+        index = len(self._entries)
+        self._entries.append(entry)
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(key, []).append(index)
+
+        return entry
+
+    def merge(
+        self,
+        entry: FindingEntry,
+        source_type: str,
+        source_url: str,
+        content: str,
+        relevance_score: float
+    ) -> bool:
+        """
+        将近重复发现合并到已有条目：保留相关性更高的版本并增加支持计数
+
+        签名与分桶保持不变，近重复内容的签名足够接近，仍能命中同一组桶。
+        新发现还没有嵌入评分，因此与已有条目的启发式评分比较；替换内容后
+        relevance_score 重置为启发式评分，由调用方重新提交给评分器。
+
+        Args:
+            entry: 已有索引条目
+            source_type: 新发现的来源类型
+            source_url: 新发现的来源URL
+            content: 新发现内容
+            relevance_score: 新发现的启发式相关性评分
+
+        Returns:
+            是否用新发现替换了保留的内容
+        """
+        entry.support_count += 1
+        entry.sources.add(source_type)
+        self.duplicates_suppressed += 1
+
+        if relevance_score > entry.heuristic_score:
+            entry.source_type = source_type
+            entry.source_url = source_url
+            entry.content = content
+            entry.heuristic_score = relevance_score
+            entry.relevance_score = relevance_score
+            return True
+
+        return False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[FindingEntry]:
+        return iter(list(self._entries))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取索引统计信息
+
+        Returns:
+            统计信息字典
+        """
+        return {
+            "unique_findings": len(self._entries),
+            "duplicates_suppressed": self.duplicates_suppressed,
+            "threshold": self.threshold,
+            "num_perm": self.num_perm,
+            "bands": self.bands
+        }
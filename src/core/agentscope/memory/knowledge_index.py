@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨会话研究知识索引
+已完成研究的发现和引用写入全局向量索引，新研究启动时检索相似的历史发现作为先验知识
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from src.core.agentscope.memory.finding_dedup import FindingEntry
+
+logger = logging.getLogger(__name__)
+
+
+class ResearchKnowledgeIndex:
+    """
+    研究知识索引
+
+    - 每个已完成会话的发现/引用批量嵌入后写入独立集合（与用户记忆分开）
+    - 元数据记录来源会话、原始查询、写入时间以及该会话的工具调用次数和耗时
+    - 检索按用户隔离（无用户的公共会话进入共享分片），
+      超过 max_age_days 或相似度低于 min_similarity 的结果丢弃
+    - 来源会话的工具调用次数和耗时用于估算复用节省的开销
+    """
+
+    def __init__(
+        self,
+        collection_name: str = "research_knowledge",
+        max_age_days: int = 30,
+        min_similarity: float = 0.75,
+        top_k: int = 8,
+        vector_index: Any = None,
+        embedder: Any = None
+    ):
+        """
+        初始化研究知识索引
+
+        Args:
+            collection_name: 向量集合名称
+            max_age_days: 只复用该天数内的历史发现
+            min_similarity: 最低相似度（1 - L2平方距离/2）
+            top_k: 每次检索返回的最大条数
+            vector_index: 异步向量索引，None 时按记忆配置创建
+            embedder: 提供 embed_text / batch_embed_texts 的嵌入器，None 时按记忆配置创建
+        """
+        self.collection_name = collection_name
+        self.max_age_days = max_age_days
+        self.min_similarity = min_similarity
+        self.top_k = top_k
+        self._vector_index = vector_index
+        self._embedder = embedder
+
+        # 统计信息
+        self.indexed_sessions = 0
+        self.indexed_items = 0
+        self.lookups = 0
+        self.lookup_hits = 0
+
+    def _get_embedder(self):
+        """按记忆系统配置延迟创建嵌入器"""
+        if self._embedder is None:
+            from src.config.memory_config import get_memory_config
+            from src.core.memory.hyde_retriever import HyDERetriever
+
+            config = get_memory_config()
+            self._embedder = HyDERetriever(
+                ollama_base_url=config.ollama_base_url,
+                embedding_model=config.embedding_model,
+                generation_model=config.generation_model
+            )
+        return self._embedder
+
+    def _get_vector_index(self):
+        """按记忆系统配置延迟创建向量索引"""
+        if self._vector_index is None:
+            from src.config.memory_config import get_memory_config
+            from src.core.memory.async_vector_store import AsyncVectorStore
+            from src.core.memory.vector_index import create_vector_index
+
+            config = get_memory_config()
+            self._vector_index = AsyncVectorStore(create_vector_index(
+                backend=config.vector_backend,
+                chroma_persist_dir=config.chroma_persist_dir,
+                collection_name=self.collection_name,
+                index_dir=config.vector_index_dir,
+                quantize=config.vector_index_quantize
+            ))
+        return self._vector_index
+
+    async def index_session(
+        self,
+        session_id: str,
+        query: str,
+        findings: List[FindingEntry],
+        citations: List[Dict[str, Any]],
+        user_id: Optional[str] = None,
+        tool_calls: int = 0,
+        duration_seconds: float = 0.0
+    ) -> int:
+        """
+        将已完成会话的发现和引用写入索引
+
+        Args:
+            session_id: 会话ID
+            query: 研究查询
+            findings: 会话的研究发现（近重复索引条目）
+            citations: 会话的引用列表
+            user_id: 用户ID
+            tool_calls: 该会话的工具调用次数
+            duration_seconds: 该会话的研究耗时（秒）
+
+        Returns:
+            写入的条目数
+        """
+        items = []
+        for entry in findings:
+            if entry.finding_id is None or not entry.content:
+                continue
+            items.append({
+                "id": f"{session_id}:finding:{entry.finding_id}",
+                "content": entry.content,
+                "kind": "finding",
+                "source_type": entry.source_type or "",
+                "source_url": entry.source_url or "",
+                "relevance_score": float(entry.relevance_score)
+            })
+
+        for citation in citations:
+            title = citation.get("title")
+            if not title:
+                continue
+            authors = citation.get("authors") or []
+            if isinstance(authors, list):
+                authors = ", ".join(str(author) for author in authors)
+            items.append({
+                "id": f"{session_id}:citation:{citation.get('id')}",
+                "content": f"{title} - {authors}" if authors else title,
+                "kind": "citation",
+                "source_type": citation.get("citation_type") or "citation",
+                "source_url": citation.get("source_url") or "",
+                "relevance_score": 1.0
+            })
+
+        if not items:
+            return 0
+
+        embeddings = await self._get_embedder().batch_embed_texts([item["content"] for item in items])
+
+        indexed_at = time.time()
+        ids, contents, vectors, metadatas = [], [], [], []
+        for item, embedding in zip(items, embeddings):
+            if not embedding:
+                continue
+            ids.append(item["id"])
+            contents.append(item["content"])
+            vectors.append(embedding)
+            # ChromaDB 元数据不接受 None
+            metadata = {
+                "session_id": session_id,
+                "query": query[:500],
+                "kind": item["kind"],
+                "source_type": item["source_type"],
+                "source_url": item["source_url"],
+                "relevance_score": item["relevance_score"],
+                "indexed_at": indexed_at,
+                "tool_calls": int(tool_calls),
+                "duration_seconds": float(duration_seconds)
+            }
+            if user_id:
+                metadata["user_id"] = user_id
+            metadatas.append(metadata)
+
+        if not ids:
+            return 0
+
+        vector_index = self._get_vector_index()
+        await vector_index.batch_add_memories(ids, contents, vectors, metadatas)
+        await vector_index.flush()
+
+        self.indexed_sessions += 1
+        self.indexed_items += len(ids)
+        logger.info(f"Indexed {len(ids)} knowledge items from research session {session_id}")
+        return len(ids)
+
+    async def search(
+        self,
+        query: str,
+        user_id: Optional[str] = None,
+        top_k: Optional[int] = None,
+        exclude_session_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        检索与查询相似的历史发现
+
+        Args:
+            query: 研究查询
+            user_id: 用户ID（只检索该用户的历史会话）
+            top_k: 返回的最大条数
+            exclude_session_id: 排除的会话ID（当前会话）
+
+        Returns:
+            发现列表，包含 content / similarity / session_id / age_days 等字段
+        """
+        top_k = top_k or self.top_k
+        self.lookups += 1
+
+        query_embedding = await self._get_embedder().embed_text(query)
+        if not query_embedding:
+            return []
+
+        # 新鲜度和相似度在检索后过滤，多取一些候选
+        hits = await self._get_vector_index().search_memories(
+            query_embedding=query_embedding,
+            user_id=user_id,
+            top_k=top_k * 3
+        )
+
+        now = time.time()
+        max_age_seconds = self.max_age_days * 86400
+        results = []
+        seen_contents = set()
+
+        for hit in hits:
+            metadata = hit.get("metadata") or {}
+            if not user_id and metadata.get("user_id"):
+                continue
+            if exclude_session_id and metadata.get("session_id") == exclude_session_id:
+                continue
+
+            age_seconds = now - float(metadata.get("indexed_at", 0.0))
+            if age_seconds > max_age_seconds:
+                continue
+
+            similarity = 1.0 - float(hit.get("distance", 2.0)) / 2.0
+            if similarity < self.min_similarity:
+                continue
+
+            if hit["content"] in seen_contents:
+                continue
+            seen_contents.add(hit["content"])
+
+            results.append({
+                "content": hit["content"],
+                "similarity": round(similarity, 4),
+                "kind": metadata.get("kind", "finding"),
+                "source_type": metadata.get("source_type", ""),
+                "source_url": metadata.get("source_url", ""),
+                "relevance_score": metadata.get("relevance_score", 0.8),
+                "session_id": metadata.get("session_id"),
+                "query": metadata.get("query", ""),
+                "age_days": round(age_seconds / 86400, 1),
+                "tool_calls": metadata.get("tool_calls", 0),
+                "duration_seconds": metadata.get("duration_seconds", 0.0)
+            })
+            if len(results) >= top_k:
+                break
+
+        if results:
+            self.lookup_hits += 1
+        return results
+
+    @staticmethod
+    def estimate_savings(
+        prior_knowledge: List[Dict[str, Any]],
+        tool_calls: int,
+        duration_seconds: float
+    ) -> Dict[str, Any]:
+        """
+        估算复用历史发现节省的工具调用和时间
+
+        以被复用的来源会话的平均工具调用次数/耗时为基线，与本次会话的实际值相比较。
+
+        Args:
+            prior_knowledge: 注入的历史发现
+            tool_calls: 本次会话的工具调用次数
+            duration_seconds: 本次会话的研究耗时（秒）
+
+        Returns:
+            节省估算字典
+        """
+        sessions: Dict[str, Dict[str, Any]] = {}
+        for item in prior_knowledge:
+            if item.get("session_id"):
+                sessions[item["session_id"]] = item
+
+        if not sessions:
+            return {
+                "seeded_items": len(prior_knowledge),
+                "source_sessions": 0,
+                "tool_calls_saved": 0,
+                "seconds_saved": 0.0
+            }
+
+        baseline_calls = sum(s.get("tool_calls", 0) for s in sessions.values()) / len(sessions)
+        baseline_seconds = sum(s.get("duration_seconds", 0.0) for s in sessions.values()) / len(sessions)
+
+        return {
+            "seeded_items": len(prior_knowledge),
+            "source_sessions": len(sessions),
+            "baseline_tool_calls": round(baseline_calls, 1),
+            "baseline_seconds": round(baseline_seconds, 1),
+            "tool_calls_saved": max(0, round(baseline_calls - tool_calls)),
+            "seconds_saved": round(max(0.0, baseline_seconds - duration_seconds), 1)
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取索引统计信息
+
+        Returns:
+            统计信息字典
+        """
+        return {
+            "indexed_sessions": self.indexed_sessions,
+            "indexed_items": self.indexed_items,
+            "lookups": self.lookups,
+            "lookup_hits": self.lookup_hits,
+            "max_age_days": self.max_age_days,
+            "min_similarity": self.min_similarity
+        }
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+研究发现相关性评分
+批量嵌入研究发现，用与研究查询向量的余弦相似度作为相关性评分
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.agentscope.memory.finding_dedup import FindingEntry
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning("NumPy not installed. Embedding-based relevance scoring will not be available.")
+
+
+class FindingRelevanceScorer:
+    """
+    研究发现相关性评分器
+
+    - 新发现进入待评分队列，后台任务按批次嵌入
+    - 每批用一次矩阵乘法计算与查询向量的余弦相似度
+    - 评分为截断到 [0, 1] 的余弦相似度：relevance = max(cos, 0)。不做 (cos + 1) / 2
+      映射，那样相关与无关发现都挤在 0.5 以上，min_relevance 阈值失去区分度；
+      阈值直接表示与查询的最低余弦相似度（常见嵌入模型中相关文本约 0.4 以上）
+    - 嵌入矩阵按容量倍增预分配，追加均摊 O(1)
+    - 嵌入失败时保留原有的启发式评分；查询嵌入失败后本会话不再重试，直到查询变化
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        research_dao: Any,
+        embedder: Any = None,
+        batch_size: int = 16
+    ):
+        """
+        初始化评分器
+
+        Args:
+            session_id: 研究会话ID
+            research_dao: 研究数据访问对象
+            embedder: 提供 embed_text / batch_embed_texts 的嵌入器，None 时按记忆配置创建
+            batch_size: 每批嵌入的发现数量
+        """
+        self.session_id = session_id
+        self.research_dao = research_dao
+        self.batch_size = batch_size
+        self._embedder = embedder
+
+        self._query: Optional[str] = None
+        self._query_vector = None
+        self._query_failed = False
+
+        self._pending: List[FindingEntry] = []
+        self._worker: Optional[asyncio.Task] = None
+
+        # 已嵌入的发现（行号与矩阵行对应），矩阵只有前 len(_entries) 行有效
+        self._entries: List[FindingEntry] = []
+        self._rows: Dict[int, int] = {}
+        self._matrix = None
+
+        # 统计信息
+        self.scored_count = 0
+        self.failed_count = 0
+
+    @property
+    def enabled(self) -> bool:
+        """评分器是否可用"""
+        return NUMPY_AVAILABLE
+
+    def _get_embedder(self):
+        """按记忆系统配置延迟创建嵌入器"""
+        if self._embedder is None:
+            from src.config.memory_config import get_memory_config
+            from src.core.memory.hyde_retriever import HyDERetriever
+
+            config = get_memory_config()
+            self._embedder = HyDERetriever(
+                ollama_base_url=config.ollama_base_url,
+                embedding_model=config.embedding_model,
+                generation_model=config.generation_model
+            )
+        return self._embedder
+
+    @staticmethod
+    def _normalize_rows(matrix):
+        """按行 L2 归一化，零向量保持为零"""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def set_query(self, query: str) -> None:
+        """
+        设置研究查询，查询变化后已有发现会在下一批中重新评分
+
+        Args:
+            query: 研究查询
+        """
+        if query == self._query:
+            return
+
+        self._query = query
+        self._query_vector = None
+        self._query_failed = False
+
+        # 查询变化后重新评分已嵌入的发现
+        if self._entries:
+            self._pending.extend(self._entries)
+            self._entries = []
+            self._rows = {}
+            self._matrix = None
+            self._ensure_worker()
+
+    def submit(self, entry: FindingEntry) -> None:
+        """
+        提交发现等待评分（内容被替换的发现需要重新提交）
+
+        Args:
+            entry: 近重复索引中的发现条目
+        """
+        if not self.enabled:
+            return
+
+        self._pending.append(entry)
+        self._ensure_worker()
+
+    def _ensure_worker(self) -> None:
+        """确保后台评分任务正在运行"""
+        if self._query is None or not self._pending:
+            return
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._drain())
+
+    async def flush(self) -> None:
+        """等待所有待评分发现处理完成（生成报告前调用）"""
+        while self._worker is not None and not self._worker.done():
+            await asyncio.shield(self._worker)
+        if self._pending and self._query is not None:
+            await self._drain()
+
+    async def _drain(self) -> None:
+        """按批次处理待评分队列"""
+        try:
+            if self._query_vector is None:
+                query_embedding = None
+                if not self._query_failed:
+                    query_embedding = await self._get_embedder().embed_text(self._query)
+                    if not query_embedding:
+                        self._query_failed = True
+                        logger.warning("Query embedding unavailable, keeping heuristic relevance scores")
+                if not query_embedding:
+                    self.failed_count += len(self._pending)
+                    self._pending = []
+                    return
+                self._query_vector = self._normalize_rows(
+                    np.asarray([query_embedding], dtype=np.float32)
+                )[0]
+
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                self._pending = self._pending[self.batch_size:]
+                await self._score_batch(batch)
+
+        except Exception as e:
+            logger.error(f"Error scoring research findings: {e}")
+
+    async def _score_batch(self, batch: List[FindingEntry]) -> None:
+        """
+        嵌入一批发现并计算相关性评分
+
+        Args:
+            batch: 待评分的发现条目
+        """
+        embeddings = await self._get_embedder().batch_embed_texts([e.content for e in batch])
+
+        dim = self._query_vector.shape[0]
+        valid: List[Tuple[FindingEntry, List[float]]] = [
+            (entry, emb) for entry, emb in zip(batch, embeddings)
+            if emb and len(emb) == dim
+        ]
+        self.failed_count += len(batch) - len(valid)
+        if not valid:
+            return
+
+        vectors = self._normalize_rows(np.asarray([emb for _, emb in valid], dtype=np.float32))
+        cosine = vectors @ self._query_vector
+        scores = np.clip(cosine, 0.0, 1.0)
+
+        updates = []
+        for (entry, _), vector, score in zip(valid, vectors, scores):
+            entry.relevance_score = round(float(score), 4)
+            self._store_vector(entry, vector)
+            if entry.finding_id is not None:
+                updates.append((entry.finding_id, entry.relevance_score))
+
+        self.scored_count += len(valid)
+
+        if updates:
+            try:
+                await self.research_dao.update_finding_relevance_scores(updates)
+            except Exception as e:
+                logger.error(f"Error saving relevance scores: {e}")
+
+    def _store_vector(self, entry: FindingEntry, vector) -> None:
+        """保存发现的归一化嵌入向量，已存在的行原地替换，容量不足时倍增"""
+        row = self._rows.get(id(entry))
+        if row is not None:
+            self._matrix[row] = vector
+            return
+
+        row = len(self._entries)
+        if self._matrix is None:
+            self._matrix = np.empty((max(self.batch_size, 1), vector.shape[0]), dtype=np.float32)
+        elif row == self._matrix.shape[0]:
+            grown = np.empty((row * 2, self._matrix.shape[1]), dtype=np.float32)
+            grown[:row] = self._matrix
+            self._matrix = grown
+
+        self._matrix[row] = vector
+        self._rows[id(entry)] = row
+        self._entries.append(entry)
+
+    def get_embeddings(self) -> Tuple[List[FindingEntry], Any]:
+        """
+        获取已嵌入的发现及其归一化向量矩阵
+
+        Returns:
+            (发现条目列表, 形状为 [n, dim] 的矩阵；无数据时为None)
+        """
+        if self._matrix is None:
+            return [], None
+        return list(self._entries), self._matrix[:len(self._entries)]
+
+    def get_embeddings_for(self, finding_ids: List[Any]):
+        """
+        按发现ID顺序取出嵌入矩阵
+
+        Args:
+            finding_ids: 发现ID列表
+
+        Returns:
+            形状为 [len(finding_ids), dim] 的矩阵，任一发现缺少嵌入时返回None
+        """
+        if self._matrix is None or not finding_ids:
+            return None
+
+        rows_by_id = {
+            str(entry.finding_id): row
+            for row, entry in enumerate(self._entries)
+            if entry.finding_id is not None
+        }
+
+        rows = []
+        for finding_id in finding_ids:
+            row = rows_by_id.get(str(finding_id))
+            if row is None:
+                return None
+            rows.append(row)
+
+        return self._matrix[rows]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取评分统计信息
+
+        Returns:
+            统计信息字典
+        """
+        return {
+            "enabled": self.enabled,
+            "scored": self.scored_count,
+            "failed": self.failed_count,
+            "pending": len(self._pending),
+            "query_failed": self._query_failed
+        }
@@ -9,11 +9,15 @@ import json
 import asyncio
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Union
-from agentscope.memory import InMemoryMemory, LongTermMemoryBase
+from agentscope.memory import LongTermMemoryBase
 from agentscope.message import Msg
 
 from src.dao.base import BaseDAO
 from src.dao.research_dao import ResearchDAO
+from src.core.agentscope.memory.finding_dedup import FindingDeduplicator
+from src.core.agentscope.memory.relevance_scorer import FindingRelevanceScorer
+from src.core.agentscope.memory.ring_buffer import RingBufferMemory
+from src.core.agentscope.memory.write_buffer import SessionWriteBuffer
 
 
 class ResearchSessionMemory:
@@ -26,7 +30,9 @@ class ResearchSessionMemory:
         self,
         session_id: str,
         research_dao: ResearchDAO,
-        max_short_term_size: int = 100
+        max_short_term_size: int = 100,
+        write_batch_size: int = 50,
+        flush_interval: float = 2.0
     ):
         """
         初始化研究会话记忆
@@ -34,14 +40,33 @@ class ResearchSessionMemory:
         Args:
             session_id: 研究会话ID
             research_dao: 研究数据访问对象
-            max_short_term_size: 短期记忆最大消息数量
+            max_short_term_size: 短期记忆保留的消息数量
+            write_batch_size: 写缓冲达到该行数时立即写入数据库
+            flush_interval: 写缓冲最多等待的秒数
         """
         self.session_id = session_id
         self.research_dao = research_dao
         self.max_short_term_size = max_short_term_size
 
-        # 短期记忆 - 存储当前会话的对话和推理过程
-        self.short_memory = InMemoryMemory()
+        # 写缓冲 - 发现、引用和淘汰的消息批量写入数据库
+        self.write_buffer = SessionWriteBuffer(
+            session_id,
+            research_dao,
+            max_pending=write_batch_size,
+            flush_interval=flush_interval
+        )
+
+        # 短期记忆 - 存储当前会话的对话和推理过程，淘汰的旧消息进入写缓冲
+        self.short_memory = RingBufferMemory(
+            capacity=max_short_term_size,
+            on_evict=self._on_evict
+        )
+
+        # 研究发现近重复索引 - 同一段维基百科简介、arXiv 摘要只保留一条
+        self.finding_index = FindingDeduplicator()
+
+        # 相关性评分器 - 后台批量嵌入发现，按与研究查询的余弦相似度评分
+        self.relevance_scorer = FindingRelevanceScorer(session_id, research_dao)
 
         # 记忆状态
         self.is_active = True
@@ -55,13 +80,10 @@ class ResearchSessionMemory:
         Args:
             message: 要添加的消息
         """
+        # 超出容量的旧消息由短期记忆自动淘汰并进入后台写入队列
         await self.short_memory.add(message)
         self.last_updated = datetime.now()
 
-        # 如果短期记忆过大，将旧消息转移到长期记忆
-        if len(await self.short_memory.get_memory()) > self.max_short_term_size:
-            await self._transfer_to_long_term_memory()
-
     async def get_memory(self, limit: Optional[int] = None) -> List[Msg]:
         """
         获取短期记忆
@@ -107,10 +129,16 @@ class ResearchSessionMemory:
         source_url: str,
         content: str,
         relevance_score: float = 0.8
-    ) -> str:
+    ) -> Optional[str]:
         """
         添加研究发现到长期记忆
 
+        与本会话已有发现近似重复时不再插入新记录，而是合并到已有发现：
+        保留相关性更高的版本，并增加其支持计数。
+
+        发现经写缓冲批量写入，数据库ID在写入后才分配；需要ID的调用方应先
+        await flush_writes()，再读取 finding_index 中条目的 finding_id。
+
         Args:
             source_type: 来源类型 (web, wiki, arxiv, image等)
             source_url: 来源URL
@@ -118,16 +146,39 @@ class ResearchSessionMemory:
             relevance_score: 相关性评分
 
         Returns:
-            查找ID
-        """
-        finding_id = await self.research_dao.add_research_finding(
-            session_id=self.session_id,
+            发现ID，所属发现尚未写入数据库时为None
+        """
+        signature = self.finding_index.signature(content)
+        duplicate = self.finding_index.find_duplicate(signature)
+
+        if duplicate is not None:
+            replaced = self.finding_index.merge(
+                duplicate,
+                source_type=source_type,
+                source_url=source_url,
+                content=content,
+                relevance_score=relevance_score
+            )
+
+            if replaced:
+                self.relevance_scorer.submit(duplicate)
+
+            # 已写入的发现随下一批更新，尚未写入的发现直接以合并后的状态插入
+            self.write_buffer.mark_dirty(duplicate)
+
+            self.last_updated = datetime.now()
+            return duplicate.finding_id
+
+        entry = self.finding_index.add(
+            None,
             source_type=source_type,
             source_url=source_url,
             content=content,
             relevance_score=relevance_score,
-            created_at=datetime.now()
+            signature=signature
         )
+        self.write_buffer.add_finding(entry)
+        self.relevance_scorer.submit(entry)
 
         # 添加到短期记忆作为助手消息
         await self.add_message(Msg(
@@ -137,23 +188,24 @@ class ResearchSessionMemory:
             timestamp=datetime.now().isoformat()
         ))
 
-        return finding_id
+        return entry.finding_id
 
     async def get_research_findings(
         self,
         source_type: Optional[str] = None,
-        min_relevance: float = 0.5
+        min_relevance: float = 0.0
     ) -> List[Dict[str, Any]]:
         """
         获取研究发现
 
         Args:
             source_type: 过滤来源类型
-            min_relevance: 最低相关性评分
+            min_relevance: 最低相关性评分（嵌入评分后为与查询的余弦相似度，默认不过滤）
 
         Returns:
             研究发现列表
         """
+        await self.flush_writes()
         return await self.research_dao.get_research_findings(
             session_id=self.session_id,
             source_type=source_type,
@@ -167,10 +219,13 @@ class ResearchSessionMemory:
         source_url: str,
         publication_year: Optional[int] = None,
         doi: Optional[str] = None
-    ) -> str:
+    ) -> Optional[str]:
         """
         添加引用到研究记录
 
+        引用经写缓冲批量写入，数据库ID在写入后才分配；需要ID的调用方应通过
+        get_citations() 读取（读取前会先写入缓冲）。
+
         Args:
             title: 文献标题
             authors: 作者列表
@@ -179,19 +234,20 @@ class ResearchSessionMemory:
             doi: DOI标识符
 
         Returns:
-            引用ID
-        """
-        citation_id = await self.research_dao.add_citation(
-            session_id=self.session_id,
-            title=title,
-            authors=authors,
-            source_url=source_url,
-            publication_year=publication_year,
-            doi=doi,
-            created_at=datetime.now()
-        )
+            引用ID，写缓冲尚未写入时为None
+        """
+        citation = {
+            "title": title,
+            "authors": list(authors or []),
+            "source_url": source_url,
+            "publication_year": publication_year,
+            "doi": doi,
+            "created_at": datetime.now()
+        }
+        self.write_buffer.add_citation(citation)
+        self.last_updated = datetime.now()
 
-        return citation_id
+        return citation.get("id")
 
     async def get_citations(self) -> List[Dict[str, Any]]:
         """
@@ -200,38 +256,66 @@ class ResearchSessionMemory:
         Returns:
             引用列表
         """
+        await self.flush_writes()
         return await self.research_dao.get_session_citations(self.session_id)
 
-    async def _transfer_to_long_term_memory(self) -> None:
+    def _on_evict(self, messages: List[Msg]) -> None:
         """
-        将短期记忆中的旧消息转移到长期记忆
+        短期记忆淘汰回调：消息转为长期记忆行并交给写缓冲批量写入
+
+        Args:
+            messages: 被淘汰的消息（按时间顺序）
         """
-        try:
-            memory = await self.short_memory.get_memory()
-            if len(memory) <= self.max_short_term_size:
-                return
+        rows = []
+        for msg in messages:
+            content = msg.content
+            if not isinstance(content, str):
+                content = json.dumps(content, ensure_ascii=False, default=str)
+
+            rows.append({
+                "role": msg.role,
+                "name": msg.name,
+                "content": content,
+                "timestamp": getattr(msg, "timestamp", None) or datetime.now().isoformat()
+            })
 
-            # 保留最新的消息，将旧消息保存到数据库
-            messages_to_transfer = memory[:-self.max_short_term_size]
+        self.write_buffer.add_messages(rows)
 
-            for msg in messages_to_transfer:
-                await self.research_dao.save_message_to_long_term(
-                    session_id=self.session_id,
-                    role=msg.role,
-                    name=msg.name,
-                    content=msg.content,
-                    timestamp=msg.timestamp if hasattr(msg, 'timestamp') else datetime.now().isoformat()
-                )
+    @property
+    def spilled_count(self) -> int:
+        """已写入长期记忆的消息数量"""
+        return self.write_buffer.messages_written
 
-            # 清空短期记忆并重新添加最新消息
-            self.short_memory = InMemoryMemory()
-            recent_messages = memory[-self.max_short_term_size:]
+    async def flush_writes(self) -> bool:
+        """
+        将写缓冲中的发现、引用和消息写入数据库（读取前和关闭会话前调用）
 
-            for msg in recent_messages:
-                await self.short_memory.add(msg)
+        Returns:
+            是否写入成功
+        """
+        return await self.write_buffer.flush()
 
-        except Exception as e:
-            print(f"转移长期记忆时出错: {str(e)}")
+    async def page_long_term_memory(
+        self,
+        before_id: Optional[int] = None,
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """
+        分页读取长期记忆（从新到旧）
+
+        Args:
+            before_id: 只返回ID小于该值的消息，None 表示从最新的消息开始
+            limit: 每页消息数量
+
+        Returns:
+            包含 messages 和 next_before_id（没有更多时为None）的字典
+        """
+        await self.flush_writes()
+        return await self.research_dao.get_long_term_memory_page(
+            session_id=self.session_id,
+            before_id=before_id,
+            limit=limit
+        )
 
     async def export_session_data(self) -> Dict[str, Any]:
         """
@@ -261,7 +345,8 @@ class ResearchSessionMemory:
         """
         清空会话记忆
         """
-        self.short_memory = InMemoryMemory()
+        # 原地清空，Agent 持有的短期记忆引用保持有效
+        await self.short_memory.clear()
         # 不删除长期记忆，只清空短期记忆
         self.last_updated = datetime.now()
 
@@ -345,8 +430,8 @@ class ResearchMemoryManager:
             session_memory = self.active_sessions[session_id]
             session_memory.is_active = False
 
-            # 将短期记忆转移到长期记忆
-            await session_memory._transfer_to_long_term_memory()
+            # 写入缓冲中剩余的发现、引用和消息
+            await session_memory.write_buffer.close()
 
             # 更新数据库中的会话状态
             await self.research_dao.update_session_status(
@@ -357,6 +442,33 @@ class ResearchMemoryManager:
 
             del self.active_sessions[session_id]
 
+    async def page_long_term_memory(
+        self,
+        session_id: str,
+        before_id: Optional[int] = None,
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """
+        分页读取会话的长期记忆，活跃会话先写入待保存的消息
+
+        Args:
+            session_id: 会话ID
+            before_id: 只返回ID小于该值的消息
+            limit: 每页消息数量
+
+        Returns:
+            包含 messages 和 next_before_id 的字典
+        """
+        session_memory = self.active_sessions.get(session_id)
+        if session_memory is not None:
+            return await session_memory.page_long_term_memory(before_id, limit)
+
+        return await self.research_dao.get_long_term_memory_page(
+            session_id=session_id,
+            before_id=before_id,
+            limit=limit
+        )
+
     async def get_all_sessions(self) -> List[str]:
         """
         获取所有会话ID
@@ -406,6 +518,9 @@ class ResearchMemoryManager:
         """
         total_findings = 0
         total_citations = 0
+        duplicates_suppressed = 0
+        messages_spilled = 0
+        write_flushes = 0
         active_sessions = len(self.active_sessions)
 
         for session_memory in self.active_sessions.values():
@@ -413,10 +528,16 @@ class ResearchMemoryManager:
             citations = await session_memory.get_citations()
             total_findings += len(findings)
             total_citations += len(citations)
+            duplicates_suppressed += session_memory.finding_index.duplicates_suppressed
+            messages_spilled += session_memory.spilled_count
+            write_flushes += session_memory.write_buffer.flush_count
 
         return {
             "active_sessions": active_sessions,
             "total_findings": total_findings,
             "total_citations": total_citations,
+            "duplicates_suppressed": duplicates_suppressed,
+            "messages_spilled": messages_spilled,
+            "write_flushes": write_flushes,
             "timestamp": datetime.now().isoformat()
         }
\ No newline at end of file
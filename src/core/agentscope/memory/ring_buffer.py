@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+有界短期记忆
+容量固定的短期记忆缓冲区，超出容量的旧消息按完整轮次整块淘汰并交给回调（写入长期记忆）
+"""
+
+from typing import Any, Callable, List, Optional, Set, Union
+from agentscope.memory import InMemoryMemory
+from agentscope.message import Msg
+
+
+def _block_ids(msg: Msg, block_type: str) -> Set[str]:
+    """消息中指定类型内容块（tool_use / tool_result）的调用ID"""
+    if isinstance(msg.content, str):
+        return set()
+    return {block.get("id") for block in msg.get_content_blocks(block_type)}
+
+
+def _find_pinned(messages: List[Msg]) -> Optional[int]:
+    """第一条用户/系统消息（原始研究任务）的位置，工具结果消息不算"""
+    for index, msg in enumerate(messages):
+        if msg.role in ("user", "system") and not _block_ids(msg, "tool_result"):
+            return index
+    return None
+
+
+def _find_eviction_boundary(messages: List[Msg], target: int) -> int:
+    """
+    查找不早于 target 的淘汰边界：messages[:boundary] 淘汰，其余保留
+
+    边界必须落在完整轮次之间：被淘汰部分的每个 tool_use 都已有对应的 tool_result，
+    且保留部分的第一条消息不是工具结果，否则 OpenAI 兼容接口（如 DeepSeek）会拒绝
+    不成对的工具消息。不早于 target 的位置都不合法时向前查找，仍找不到返回0（不淘汰）
+
+    Args:
+        messages: 按时间顺序的消息
+        target: 期望的最小淘汰条数
+
+    Returns:
+        淘汰边界（淘汰的消息条数）
+    """
+    valid = []
+    open_calls: Set[str] = set()
+    for index, msg in enumerate(messages):
+        if index > 0 and not open_calls and not _block_ids(msg, "tool_result"):
+            valid.append(index)
+            if index >= target:
+                return index
+        open_calls |= _block_ids(msg, "tool_use")
+        open_calls -= _block_ids(msg, "tool_result")
+
+    return valid[-1] if valid else 0
+
+
+class RingBufferMemory(InMemoryMemory):
+    """
+    有界短期记忆
+
+    - 继承 InMemoryMemory，只通过其公开接口（size/get_memory/delete）淘汰消息，
+      不依赖 content 的内部存储结构（1.0.x 中为 (Msg, marks) 元组）
+    - 消息数超过 capacity + evict_batch 时，一次切掉最旧的 evict_batch 条以上的消息，
+      追加均摊 O(1)，不会在每次添加后重建整个记忆
+    - 只在完整轮次的边界淘汰（助手的 tool_use 与其全部 tool_result 一起淘汰），
+      第一条用户/系统消息（原始研究任务）始终保留；当前轮次过长时可暂时超出容量
+    - 被淘汰的消息按原顺序交给 on_evict 回调（同步调用，回调只负责入队）
+    - 对象本身始终不变，Agent 持有的引用不会失效
+    """
+
+    def __init__(
+        self,
+        capacity: int = 100,
+        on_evict: Optional[Callable[[List[Msg]], None]] = None,
+        evict_batch: Optional[int] = None
+    ):
+        """
+        初始化有界短期记忆
+
+        Args:
+            capacity: 淘汰后保留的消息数量（含保留的任务消息）
+            on_evict: 接收被淘汰消息列表的回调
+            evict_batch: 允许超出容量的消息数，达到后整块淘汰（默认容量的1/4）
+        """
+        super().__init__()
+        self.capacity = max(2, capacity)
+        self.evict_batch = max(1, evict_batch if evict_batch is not None else self.capacity // 4)
+        self.on_evict = on_evict
+        self.evicted_count = 0
+
+    async def add(
+        self,
+        memories: Union[List[Msg], Msg, None],
+        *args: Any,
+        **kwargs: Any
+    ) -> None:
+        """
+        添加消息，超出上限时按完整轮次整块淘汰最旧的消息
+
+        Args:
+            memories: 单条消息或消息列表
+            *args: 透传给 InMemoryMemory.add 的位置参数（如 marks）
+            **kwargs: 透传给 InMemoryMemory.add 的关键字参数（如 allow_duplicates）
+        """
+        await super().add(memories, *args, **kwargs)
+
+        if await self.size() <= self.capacity + self.evict_batch:
+            return
+
+        messages = await self.get_memory(prepend_summary=False)
+        pinned = _find_pinned(messages)
+        candidates = [msg for index, msg in enumerate(messages) if index != pinned]
+
+        # 保留任务消息和边界之后的完整轮次，共不超过 capacity 条
+        reserved = 1 if pinned is not None else 0
+        boundary = _find_eviction_boundary(candidates, len(candidates) + reserved - self.capacity)
+        evicted = candidates[:boundary]
+        if not evicted:
+            return
+
+        await self.delete([msg.id for msg in evicted])
+        self.evicted_count += len(evicted)
+
+        if self.on_evict is not None:
+            self.on_evict(evicted)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+研究会话写缓冲
+研究过程中产生的发现、引用和长期记忆消息先进入缓冲，按数量、时间或会话结束批量写入数据库
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Set
+
+from src.core.agentscope.memory.finding_dedup import FindingEntry
+
+
+class SessionWriteBuffer:
+    """
+    研究会话写缓冲
+
+    - 新发现（近重复索引条目）、已保存发现的合并更新、新引用、长期记忆消息进入缓冲
+    - 缓冲行数达到 max_pending、首条写入后 flush_interval 秒，或显式 flush（读取前、会话结束）时，
+      通过 ResearchDAO.write_session_batch 在一个事务内写入
+    - 发现在写入前被合并时直接写入合并后的状态，不产生额外的 UPDATE；
+      写入过程中被修改的发现在下一批中补写
+    - 写入失败（或写入中被取消）时数据放回缓冲，下次刷新重试
+    - 后台刷新任务全部登记，close() 等待它们结束；close() 自身被取消时一并取消这些任务
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        research_dao: Any,
+        max_pending: int = 50,
+        flush_interval: float = 2.0
+    ):
+        """
+        初始化写缓冲
+
+        Args:
+            session_id: 研究会话ID
+            research_dao: 研究数据访问对象
+            max_pending: 缓冲行数达到该值时立即写入
+            flush_interval: 首条写入后最多等待的秒数
+        """
+        self.session_id = session_id
+        self.research_dao = research_dao
+        self.max_pending = max(1, max_pending)
+        self.flush_interval = flush_interval
+
+        self._findings: List[FindingEntry] = []
+        self._dirty: Dict[int, FindingEntry] = {}
+        self._citations: List[Dict[str, Any]] = []
+        self._messages: List[Dict[str, Any]] = []
+
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        # 统计信息
+        self.flush_count = 0
+        self.failed_flushes = 0
+        self.rows_written = 0
+        self.messages_written = 0
+
+    @property
+    def pending_count(self) -> int:
+        """缓冲中待写入的行数"""
+        return len(self._findings) + len(self._dirty) + len(self._citations) + len(self._messages)
+
+    def add_finding(self, entry: FindingEntry) -> None:
+        """
+        缓冲新发现，写入后 entry.finding_id 被赋值
+
+        Args:
+            entry: 近重复索引中的发现条目
+        """
+        self._findings.append(entry)
+        self._schedule()
+
+    def mark_dirty(self, entry: FindingEntry) -> None:
+        """
+        标记已保存的发现需要更新（合并近重复发现后调用）
+
+        尚未写入的发现会以最新状态插入，无需标记。
+
+        Args:
+            entry: 近重复索引中的发现条目
+        """
+        if entry.finding_id is None:
+            return
+        self._dirty[id(entry)] = entry
+        self._schedule()
+
+    def add_citation(self, citation: Dict[str, Any]) -> None:
+        """
+        缓冲新引用，写入后 citation["id"] 被赋值
+
+        Args:
+            citation: 引用字典（title / authors / source_url / publication_year / doi / created_at）
+        """
+        self._citations.append(citation)
+        self._schedule()
+
+    def add_messages(self, messages: List[Dict[str, Any]]) -> None:
+        """
+        缓冲长期记忆消息
+
+        Args:
+            messages: 消息列表，每项包含 role / name / content / timestamp
+        """
+        self._messages.extend(messages)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        """达到数量阈值时唤醒后台任务，否则确保定时刷新任务在运行"""
+        if self.pending_count >= self.max_pending:
+            self._wake.set()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+            self._tasks.add(self._worker)
+            self._worker.add_done_callback(self._tasks.discard)
+
+    async def _run(self) -> None:
+        """后台刷新：等待数量阈值或超时后写入，写入失败时退出等待下次添加"""
+        while self.pending_count:
+            if self.pending_count < self.max_pending:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wake.clear()
+
+            if not await self.flush():
+                return
+
+    @staticmethod
+    def _finding_row(entry: FindingEntry) -> Dict[str, Any]:
+        """发现条目当前状态对应的数据库行"""
+        return {
+            "source_type": entry.source_type,
+            "source_url": entry.source_url,
+            "content": entry.content,
+            "relevance_score": float(entry.relevance_score),
+            "support_count": entry.support_count
+        }
+
+    async def flush(self) -> bool:
+        """
+        将缓冲中的所有数据在一个事务内写入
+
+        Returns:
+            是否写入成功（缓冲为空时返回True）
+        """
+        async with self._lock:
+            if not self.pending_count:
+                return True
+
+            findings, self._findings = self._findings, []
+            dirty, self._dirty = list(self._dirty.values()), {}
+            citations, self._citations = self._citations, []
+            messages, self._messages = self._messages, []
+
+            finding_rows = [self._finding_row(entry) for entry in findings]
+            update_rows = [{"id": entry.finding_id, **self._finding_row(entry)} for entry in dirty]
+
+            try:
+                result = await self.research_dao.write_session_batch(
+                    self.session_id,
+                    findings=finding_rows,
+                    finding_updates=update_rows,
+                    citations=citations,
+                    messages=messages
+                )
+            except BaseException as e:
+                # 放回缓冲头部，保持写入顺序；被取消时事务已回滚，放回后继续传播取消
+                self._findings = findings + self._findings
+                for entry in dirty:
+                    self._dirty.setdefault(id(entry), entry)
+                self._citations = citations + self._citations
+                self._messages = messages + self._messages
+                if not isinstance(e, Exception):
+                    raise
+                self.failed_flushes += 1
+                print(f"⚠️ 写入研究会话数据时出错: {str(e)}")
+                return False
+
+            for entry, row, finding_id in zip(findings, finding_rows, result["finding_ids"]):
+                entry.finding_id = finding_id
+                # 写入期间被合并或重新评分的发现在下一批中补写
+                if finding_id is not None and self._finding_row(entry) != row:
+                    self._dirty[id(entry)] = entry
+
+            for citation, citation_id in zip(citations, result["citation_ids"]):
+                citation["id"] = citation_id
+
+            self.flush_count += 1
+            self.rows_written += len(findings) + len(dirty) + len(citations) + len(messages)
+            self.messages_written += len(messages)
+            return True
+
+    async def close(self) -> bool:
+        """
+        唤醒后台任务写入剩余数据并等待其结束（会话结束时调用）
+
+        close() 被取消时取消仍在运行的后台任务，未写入的数据留在缓冲中。
+
+        Returns:
+            是否写入成功
+        """
+        self._wake.set()
+        tasks = list(self._tasks)
+        if tasks:
+            try:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            except asyncio.CancelledError:
+                for task in tasks:
+                    task.cancel()
+                raise
+        return await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取写缓冲统计信息
+
+        Returns:
+            统计信息字典
+        """
+        return {
+            "pending": self.pending_count,
+            "flushes": self.flush_count,
+            "failed_flushes": self.failed_flushes,
+            "rows_written": self.rows_written,
+            "messages_written": self.messages_written
+        }
@@ -7,8 +7,9 @@ AgentScope深度研究代理
 
 import asyncio
 import json
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncGenerator, Dict, List, Optional, Union
 from agentscope.agent import ReActAgent
 from agentscope.message import Msg
 from agentscope.tool import Toolkit
@@ -18,6 +19,7 @@ from agentscope.formatter import DashScopeChatFormatter
 # 导入自定义组件
 from src.core.agentscope.llm_adapter import DualLLMManager
 from src.core.agentscope.memory.research_memory import ResearchMemoryManager
+from src.core.agentscope.memory.knowledge_index import ResearchKnowledgeIndex
 from src.core.agentscope.tools import (
     register_web_search_tools,
     register_wikipedia_tools,
@@ -121,6 +123,13 @@ class DeepResearchAgent(ReActAgent):
         self.research_progress = 0.0
         self.current_tools_used = []
         self.findings_count = 0
+        self.tool_call_count = 0
+        self.research_duration_seconds = 0.0
+
+        # 跨会话复用：注入的历史发现及节省估算
+        self.prior_knowledge: List[Dict[str, Any]] = []
+        self.seeded_contents = set()
+        self.knowledge_reuse: Dict[str, Any] = {}
 
         # 工具调用失败跟踪
         self.tool_failure_tracker = {}  # {tool_name: failure_count}
@@ -133,6 +142,13 @@ class DeepResearchAgent(ReActAgent):
         self.max_stagnation_check = 3  # 检查最近3次操作（降低阈值以更快检测循环）
         self.tool_call_history = {}  # {tool_name: {args_hash: call_count}} 跟踪相同参数的重复调用
 
+        # 报告流式输出状态（供 SSE 逐段推送 report_delta）
+        self.report_chunks: List[str] = []
+        self.report_condition = asyncio.Condition()
+        self.report_started = asyncio.Event()
+        self.report_finished = False
+        self.report_metrics: Dict[str, Any] = {}
+
         # 注册所有研究工具
         self._register_research_tools()
 
@@ -298,6 +314,38 @@ class DeepResearchAgent(ReActAgent):
         
         return result
     
+    async def _acting(self, tool_call):
+        """
+        统计实际执行的工具调用次数（用于估算跨会话复用节省的调用）
+        """
+        self.tool_call_count += 1
+        return await super()._acting(tool_call)
+
+    async def _seed_prior_knowledge(self, prior_knowledge: List[Dict[str, Any]]) -> None:
+        """
+        将历史研究中的相关发现写入本次会话的研究记录
+
+        Args:
+            prior_knowledge: 知识索引返回的历史发现
+        """
+        self.prior_knowledge = prior_knowledge
+
+        for item in prior_knowledge:
+            if item.get("kind") != "finding":
+                continue
+            try:
+                await self.session_memory.add_research_finding(
+                    source_type=item.get("source_type") or "prior_research",
+                    source_url=item.get("source_url", ""),
+                    content=item["content"],
+                    relevance_score=float(item.get("relevance_score", 0.8))
+                )
+                self.seeded_contents.add(item["content"])
+            except Exception as e:
+                print(f"⚠️ 注入历史发现时出错: {str(e)}")
+
+        print(f"✓ 已注入 {len(self.seeded_contents)} 条历史研究发现")
+
     async def _extract_tools_and_findings_from_memory(self):
         """
         从内存中提取工具使用记录和研究发现
@@ -432,8 +480,8 @@ class DeepResearchAgent(ReActAgent):
                 relevance_score=relevance_score
             )
             
-            # 更新发现计数
-            self.findings_count += 1
+            # 更新发现计数（近重复发现会被合并，不重复计数）
+            self.findings_count = len(self.session_memory.finding_index)
             
             print(f"  ✓ 已记录研究发现 [{source_type}]: {content[:80]}...")
             
@@ -533,7 +581,8 @@ class DeepResearchAgent(ReActAgent):
         query: str,
         research_type: str = "comprehensive",
         sources: Optional[List[str]] = None,
-        include_images: bool = False
+        include_images: bool = False,
+        prior_knowledge: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
         """
         执行深度研究
@@ -543,10 +592,12 @@ class DeepResearchAgent(ReActAgent):
             research_type: 研究类型 (comprehensive, academic, news, analysis)
             sources: 指定的信息源类型
             include_images: 是否包含图像分析
+            prior_knowledge: 历史研究中的相关发现，注入上下文以跳过重复搜索
 
         Returns:
             研究结果字典
         """
+        started = time.perf_counter()
         try:
             print(f"\n{'='*60}")
             print(f"开始研究: {query}")
@@ -558,9 +609,16 @@ class DeepResearchAgent(ReActAgent):
             self.research_phase = "research"
             self.research_progress = 0.1
 
+            # 研究发现按与查询的嵌入相似度评分（后台批量进行）
+            self.session_memory.relevance_scorer.set_query(query)
+
+            # 注入历史研究发现
+            if prior_knowledge:
+                await self._seed_prior_knowledge(prior_knowledge)
+
             # 创建研究消息
             research_query = self._format_research_query(
-                query, research_type, sources, include_images
+                query, research_type, sources, include_images, prior_knowledge
             )
             
             print(f"研究提示词:\n{research_query}\n")
@@ -592,19 +650,36 @@ class DeepResearchAgent(ReActAgent):
             # 更新进度
             self.research_progress = 0.8
 
-            # 生成研究报告
+            # 等待剩余发现完成相关性评分，报告按最新评分排序
+            await self.session_memory.relevance_scorer.flush()
+
+            # 生成研究报告（流式推送给订阅者）
             print("生成研究报告...")
+            self.research_phase = "reporting"
             report = await self._generate_research_report(query)
             print(f"报告生成完成\n")
 
             # 完成研究
             self.research_phase = "completed"
             self.research_progress = 1.0
+            self.research_duration_seconds = time.perf_counter() - started
+
+            if self.prior_knowledge:
+                self.knowledge_reuse = ResearchKnowledgeIndex.estimate_savings(
+                    self.prior_knowledge,
+                    self.tool_call_count,
+                    self.research_duration_seconds
+                )
             
             print(f"{'='*60}")
             print(f"研究完成!")
             print(f"使用的工具: {self.current_tools_used}")
+            print(f"工具调用次数: {self.tool_call_count}")
             print(f"发现数量: {self.findings_count}")
+            if self.knowledge_reuse:
+                print(f"复用历史发现: {self.knowledge_reuse['seeded_items']} 条，"
+                      f"估计节省 {self.knowledge_reuse['tool_calls_saved']} 次工具调用、"
+                      f"{self.knowledge_reuse['seconds_saved']} 秒")
             print(f"{'='*60}\n")
 
             # 将 Msg 对象转换为可序列化的格式
@@ -619,6 +694,10 @@ class DeepResearchAgent(ReActAgent):
                 "report": report,
                 "tools_used": self.current_tools_used,
                 "findings_count": self.findings_count,
+                "tool_calls": self.tool_call_count,
+                "duration_seconds": round(self.research_duration_seconds, 1),
+                "knowledge_reuse": self.knowledge_reuse,
+                "report_metrics": self.get_report_metrics(),
                 "completed_at": datetime.now().isoformat()
             }
             
@@ -630,6 +709,10 @@ class DeepResearchAgent(ReActAgent):
             print(f"{'='*60}\n")
             import traceback
             traceback.print_exc()
+
+            # 确保报告订阅者不会一直等待
+            if self.report_started.is_set() and not self.report_finished:
+                await self._complete_report_stream(f"# 研究报告生成失败\n\n错误: {str(e)}")
             
             return {
                 "session_id": self.session_id,
@@ -643,7 +726,8 @@ class DeepResearchAgent(ReActAgent):
         query: str,
         research_type: str,
         sources: Optional[List[str]],
-        include_images: bool
+        include_images: bool,
+        prior_knowledge: Optional[List[Dict[str, Any]]] = None
     ) -> str:
         """
         格式化研究查询
@@ -653,6 +737,7 @@ class DeepResearchAgent(ReActAgent):
             research_type: 研究类型
             sources: 指定的信息源
             include_images: 是否包含图像
+            prior_knowledge: 历史研究中的相关发现
 
         Returns:
             格式化的查询字符串
@@ -667,6 +752,13 @@ class DeepResearchAgent(ReActAgent):
         if include_images:
             formatted_query += "包含图像分析功能\n"
 
+        if prior_knowledge:
+            formatted_query += "\n近期历史研究中已获得以下相关信息（已加入本次研究记录）:\n"
+            for i, item in enumerate(prior_knowledge, 1):
+                source = f"来源: {item['source_url']}, " if item.get("source_url") else ""
+                formatted_query += f"{i}. [{item.get('source_type', '')}] {item['content'][:300]} ({source}{item.get('age_days', 0)}天前)\n"
+            formatted_query += "以上信息已覆盖的方面无需重复搜索，请重点补充缺失或需要更新的内容。\n"
+
         formatted_query += """
 请按照以下步骤进行研究:
 1. 首先使用网络搜索获取最新信息
@@ -681,7 +773,7 @@ class DeepResearchAgent(ReActAgent):
 
     async def _generate_research_report(self, query: str) -> str:
         """
-        使用 LLM 生成研究报告总结
+        使用 LLM 流式生成研究报告总结，片段实时推送给报告订阅者
 
         Args:
             query: 研究查询
@@ -689,6 +781,8 @@ class DeepResearchAgent(ReActAgent):
         Returns:
             AI 生成的研究报告字符串
         """
+        self._begin_report_stream()
+
         try:
             # 获取所有研究发现
             findings = await self.session_memory.get_research_findings()
@@ -750,53 +844,39 @@ class DeepResearchAgent(ReActAgent):
 - 突出重点和关键信息
 - 总字数控制在 2000-3000 字"""
 
-            # 调用 LLM 生成报告
-            print("✓ 调用 LLM 生成报告...")
-            
-            # 使用 LLM 生成报告
-            from agentscope.message import Msg
-            
-            report_msg = Msg(
-                name="user",
-                role="user",
-                content=prompt
-            )
-            
-            # 调用 LLM
-            response = await self.llm_manager(report_msg)
-            
-            if response and hasattr(response, 'content'):
-                report_content = response.content
-                
-                # ✅ 处理 content 可能是列表的情况（AgentScope 的 Msg.content 可能是 list[ContentBlock]）
-                if isinstance(report_content, list):
-                    # 提取所有文本内容
-                    text_parts = []
-                    for item in report_content:
-                        if isinstance(item, dict) and 'text' in item:
-                            text_parts.append(str(item['text']))
-                        elif hasattr(item, 'text'):
-                            text_parts.append(str(item.text))
-                        else:
-                            text_parts.append(str(item))
-                    report_content = '\n'.join(text_parts)
-                elif not isinstance(report_content, str):
-                    report_content = str(report_content)
-                
+            # 报告头部（在第一个 token 到达时随正文一起推送）
+            report_header = f"# 深度研究报告\n\n"
+            report_header += f"**研究主题**: {query}\n\n"
+            report_header += f"**生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+            report_header += f"**数据来源**: {len(findings)} 个发现，{len(citations)} 个引用\n\n"
+            report_header += "---\n\n"
+
+            # 流式调用 LLM 生成报告，逐段推送给订阅者
+            print("✓ 流式调用 LLM 生成报告...")
+
+            report_parts = []
+            async for chunk in self.llm_instance.chat_completion_stream(
+                messages=[{"role": "user", "content": prompt}],
+                model=self.llm_manager.model_name
+            ):
+                if not chunk:
+                    continue
+                if not report_parts:
+                    self._mark_first_report_token()
+                    await self._emit_report_chunk(report_header)
+                report_parts.append(chunk)
+                await self._emit_report_chunk(chunk)
+
+            report_content = "".join(report_parts)
+
+            if report_content.strip():
                 print(f"✓ LLM 报告生成完成，长度: {len(report_content)} 字符")
-                
-                # 添加元数据
-                final_report = f"# 深度研究报告\n\n"
-                final_report += f"**研究主题**: {query}\n\n"
-                final_report += f"**生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-                final_report += f"**数据来源**: {len(findings)} 个发现，{len(citations)} 个引用\n\n"
-                final_report += "---\n\n"
-                final_report += report_content
-                
-                return final_report
+                return await self._complete_report_stream(report_header + report_content)
             else:
                 print("⚠️ LLM 未返回有效内容，使用备用报告格式")
-                return self._generate_fallback_report(query, findings, citations)
+                return await self._complete_report_stream(
+                    self._generate_fallback_report(query, findings, citations)
+                )
 
         except Exception as e:
             error_msg = str(e)
@@ -806,7 +886,7 @@ class DeepResearchAgent(ReActAgent):
             
             # ✅ 检查是否是内容敏感错误
             if "contentFilter" in error_msg or "1301" in error_msg or "敏感内容" in error_msg:
-                return f"""# 研究报告生成受限
+                return await self._complete_report_stream(f"""# 研究报告生成受限
 
 ## 提示
 
@@ -821,15 +901,117 @@ class DeepResearchAgent(ReActAgent):
 
 本次研究已成功收集了 {self.findings_count} 条相关信息，但由于内容安全限制，无法生成综合报告。
 
-感谢您的理解与配合。"""
+感谢您的理解与配合。""")
             
             # 尝试使用备用方法
             try:
                 findings = await self.session_memory.get_research_findings()
                 citations = await self.session_memory.get_citations()
-                return self._generate_fallback_report(query, findings, citations)
+                return await self._complete_report_stream(
+                    self._generate_fallback_report(query, findings, citations)
+                )
             except:
-                return f"# 研究报告生成失败\n\n错误: {error_msg}"
+                return await self._complete_report_stream(f"# 研究报告生成失败\n\n错误: {error_msg}")
+
+    def _begin_report_stream(self) -> None:
+        """
+        开始新的报告流，重置缓冲区并通知等待中的订阅者
+        """
+        self.report_chunks = []
+        self.report_finished = False
+        self.report_metrics = {
+            "started_at": datetime.now().isoformat(),
+            "_started_monotonic": time.monotonic()
+        }
+        self.report_started.set()
+
+    def _mark_first_report_token(self) -> None:
+        """
+        记录首个报告 token 到达的时间（time-to-first-report-byte）
+        """
+        if "first_token_ms" in self.report_metrics:
+            return
+        started = self.report_metrics.get("_started_monotonic", time.monotonic())
+        self.report_metrics["first_token_ms"] = round((time.monotonic() - started) * 1000, 1)
+        print(f"✓ 报告首个 token 到达，耗时 {self.report_metrics['first_token_ms']} ms")
+
+    async def _emit_report_chunk(self, chunk: str) -> None:
+        """
+        追加报告片段并唤醒所有订阅者
+
+        Args:
+            chunk: 报告文本片段
+        """
+        if not chunk:
+            return
+        async with self.report_condition:
+            self.report_chunks.append(chunk)
+            self.report_condition.notify_all()
+
+    async def _complete_report_stream(self, final_report: str) -> str:
+        """
+        结束报告流，保证已推送的片段拼接后是最终报告的前缀
+
+        Args:
+            final_report: 最终报告文本
+
+        Returns:
+            实际缓存的最终报告文本
+        """
+        streamed = "".join(self.report_chunks)
+        if streamed and not final_report.startswith(streamed):
+            # 流式输出中途失败：保留已推送内容，在其后追加备用内容
+            final_report = streamed + "\n\n---\n\n" + final_report
+
+        remainder = final_report[len(streamed):]
+        if remainder:
+            self._mark_first_report_token()
+
+        async with self.report_condition:
+            if remainder:
+                self.report_chunks.append(remainder)
+            self.report_finished = True
+            self.report_condition.notify_all()
+
+        started = self.report_metrics.pop("_started_monotonic", None)
+        if started is not None:
+            self.report_metrics["total_ms"] = round((time.monotonic() - started) * 1000, 1)
+        self.report_metrics["chunks"] = len(self.report_chunks)
+        self.report_metrics["report_length"] = len(final_report)
+        self.report_metrics["completed_at"] = datetime.now().isoformat()
+
+        return final_report
+
+    async def iter_report_chunks(self) -> AsyncGenerator[str, None]:
+        """
+        按顺序产出报告片段，每个订阅者独立维护读取位置
+
+        Yields:
+            自上次读取以来新增的报告文本
+        """
+        offset = 0
+        while True:
+            async with self.report_condition:
+                await self.report_condition.wait_for(
+                    lambda: len(self.report_chunks) > offset or self.report_finished
+                )
+                new_chunks = self.report_chunks[offset:]
+                finished = self.report_finished
+
+            offset += len(new_chunks)
+            if new_chunks:
+                yield "".join(new_chunks)
+            if finished:
+                return
+
+    def get_report_metrics(self) -> Dict[str, Any]:
+        """
+        获取报告生成指标（不含内部计时字段）
+
+        Returns:
+            报告指标字典
+        """
+        return {k: v for k, v in self.report_metrics.items() if not k.startswith("_")}
 
     def _generate_fallback_report(self, query: str, findings: List[Dict], citations: List[Dict]) -> str:
         """
@@ -990,6 +1172,9 @@ class DeepResearchAgent(ReActAgent):
                 "progress": self.research_progress,
                 "tools_used": self.current_tools_used,
                 "findings_count": self.findings_count,
+                "tool_calls": self.tool_call_count,
+                "knowledge_reuse": self.knowledge_reuse,
+                "report_metrics": self.get_report_metrics(),
                 "memory_stats": memory_stats,
                 "last_updated": datetime.now().isoformat()
             }
@@ -1046,6 +1231,7 @@ class DeepResearchAgent(ReActAgent):
             result_data["report"] = self.research_result.get("report", "")
             result_data["result"] = self.research_result.get("result", "")
             result_data["query"] = self.research_result.get("query", "")
+            result_data["report_metrics"] = self.research_result.get("report_metrics", {})
         
         return result_data
 
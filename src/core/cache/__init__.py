@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内缓存模块
+"""
+
+from src.core.cache.lru_cache import LRUCache
+
+__all__ = [
+    'LRUCache'
+]
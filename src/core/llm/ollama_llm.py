@@ -446,4 +446,42 @@ class OllamaLLM(BaseLLM):
             return []
         except Exception as e:
             logger.error(f"Failed to generate embeddings: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    async def batch_embeddings(
+        self,
+        input_texts: List[str],
+        model: str,
+        truncate: bool = True,
+        **kwargs
+    ) -> List[List[float]]:
+        """
+        Generate embeddings for several inputs in a single /api/embed request.
+
+        Returns:
+            One embedding per input, in input order; empty list on failure.
+        """
+        if not input_texts:
+            return []
+
+        data = {
+            "model": model,
+            "input": input_texts,
+            "truncate": truncate
+        }
+
+        if "options" in kwargs:
+            data["options"] = kwargs["options"]
+        if "keep_alive" in kwargs:
+            data["keep_alive"] = kwargs["keep_alive"]
+
+        try:
+            response = await self._make_request("embed", data)
+            embeddings = response.get("embeddings", [])
+            if len(embeddings) != len(input_texts):
+                logger.error(f"Expected {len(input_texts)} embeddings, got {len(embeddings)}")
+                return []
+            return embeddings
+        except Exception as e:
+            logger.error(f"Failed to generate batch embeddings: {e}")
+            return []
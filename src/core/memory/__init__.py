@@ -7,11 +7,20 @@ Mem0 记忆系统模块
 from src.core.memory.memory_manager import Mem0MemoryManager
 from src.core.memory.memory_agent import MemoryAgent
 from src.core.memory.hyde_retriever import HyDERetriever
+from src.core.memory.vector_index import BaseVectorIndex, create_vector_index
 from src.core.memory.vector_store import VectorStore
+from src.core.memory.numpy_vector_index import NumpyVectorIndex
+from src.core.memory.async_vector_store import AsyncVectorStore
+from src.core.memory.retrieval_cache import RetrievalCache
 
 __all__ = [
     'Mem0MemoryManager',
     'MemoryAgent',
     'HyDERetriever',
-    'VectorStore'
+    'BaseVectorIndex',
+    'create_vector_index',
+    'VectorStore',
+    'NumpyVectorIndex',
+    'AsyncVectorStore',
+    'RetrievalCache'
 ]
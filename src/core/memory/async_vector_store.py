@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步向量存储门面
+将 ChromaDB 的同步调用放到专用工作线程执行，写入按批合并，避免阻塞事件循环
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+from src.core.memory.vector_index import BaseVectorIndex
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncVectorStore:
+    """
+    异步向量存储
+
+    - 所有向量索引操作在单个专用线程中串行执行（Chroma 客户端不保证线程安全）
+    - add_memory 只入队，后台按时间间隔或批量大小合并为一次 collection.add
+    - 检索前若同一用户仍有未落盘的写入，先刷新，保证读到自己的写入
+    - 删除/更新前先刷新，保证与之前的写入顺序一致
+    - 写入失败的批次放回队列头部，后台按指数退避重试；同一条目失败 max_attempts 次后
+      才丢弃并记入 dropped_items（此时 SQL 中的记忆没有向量，需要重新嵌入）
+    """
+
+    def __init__(
+        self,
+        vector_store: BaseVectorIndex,
+        flush_interval: float = 0.2,
+        max_batch_size: int = 64,
+        max_attempts: int = 5,
+        max_retry_delay: float = 30.0
+    ):
+        """
+        初始化异步向量存储
+
+        Args:
+            vector_store: 同步向量索引（ChromaDB 或 NumPy 实现）
+            flush_interval: 后台刷新间隔（秒）
+            max_batch_size: 队列达到该长度时立即刷新
+            max_attempts: 每条写入最多尝试的次数
+            max_retry_delay: 写入失败后重试的最长等待时间（秒）
+        """
+        self.vector_store = vector_store
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.max_attempts = max(1, max_attempts)
+        self.max_retry_delay = max_retry_delay
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chroma-worker")
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_users: Set[str] = set()
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._closed = False
+        self._consecutive_failures = 0
+
+        # 指标
+        self._metrics = {
+            "enqueued": 0,
+            "flushes": 0,
+            "flushed_items": 0,
+            "failed_items": 0,
+            "dropped_items": 0,
+            "read_flushes": 0,
+            "max_queue_depth": 0,
+            "last_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    async def _run(self, func, *args, **kwargs):
+        """在专用工作线程中执行同步调用"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    def _ensure_flusher(self) -> None:
+        """确保后台刷新任务在当前事件循环中运行"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+            self._wakeup = asyncio.Event()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        """后台刷新循环（连续写入失败时按指数退避）"""
+        while not self._closed:
+            if self._consecutive_failures:
+                delay = min(self.flush_interval * 2 ** self._consecutive_failures, self.max_retry_delay)
+                await asyncio.sleep(delay)
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+
+            if self._pending:
+                await self.flush()
+
+    async def add_memory(
+        self,
+        memory_id: str,
+        content: str,
+        embedding: List[float],
+        metadata: Dict[str, Any]
+    ) -> bool:
+        """
+        添加记忆（入队，稍后批量写入）
+
+        Args:
+            memory_id: 记忆唯一ID
+            content: 记忆内容
+            embedding: 向量表示
+            metadata: 元数据
+
+        Returns:
+            是否成功入队
+        """
+        if self._closed:
+            logger.error("Vector store is closed, dropping memory write")
+            return False
+
+        self._ensure_flusher()
+        self._pending.append({
+            "id": memory_id,
+            "content": content,
+            "embedding": embedding,
+            "metadata": metadata,
+            "attempts": 0
+        })
+        user_id = metadata.get("user_id")
+        if user_id:
+            self._pending_users.add(user_id)
+
+        self._metrics["enqueued"] += 1
+        self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], len(self._pending))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._wakeup.set()
+
+        return True
+
+    async def batch_add_memories(
+        self,
+        memory_ids: List[str],
+        contents: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]]
+    ) -> bool:
+        """
+        批量添加记忆（入队，与其他写入合并）
+
+        Args:
+            memory_ids: 记忆ID列表
+            contents: 内容列表
+            embeddings: 向量列表
+            metadatas: 元数据列表
+
+        Returns:
+            是否成功入队
+        """
+        for memory_id, content, embedding, metadata in zip(memory_ids, contents, embeddings, metadatas):
+            await self.add_memory(memory_id, content, embedding, metadata)
+        return True
+
+    async def flush(self) -> int:
+        """
+        将队列中的写入合并为一次 collection.add，失败时放回队列头部等待重试
+
+        Returns:
+            本次写入的条目数
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+            self._wakeup = asyncio.Event()
+
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch = self._pending
+            self._pending = []
+            self._pending_users = set()
+
+            started = time.perf_counter()
+            try:
+                success = await self._run(
+                    self.vector_store.batch_add_memories,
+                    [item["id"] for item in batch],
+                    [item["content"] for item in batch],
+                    [item["embedding"] for item in batch],
+                    [item["metadata"] for item in batch]
+                )
+            except Exception as e:
+                logger.error(f"Vector store batch add raised: {e}")
+                success = False
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            self._metrics["flushes"] += 1
+            self._metrics["last_flush_ms"] = round(elapsed_ms, 2)
+            self._metrics["total_flush_ms"] += elapsed_ms
+            if success:
+                self._metrics["flushed_items"] += len(batch)
+                self._consecutive_failures = 0
+                return len(batch)
+
+            self._metrics["failed_items"] += len(batch)
+            self._consecutive_failures += 1
+            self._requeue(batch)
+            return 0
+
+    def _requeue(self, batch: List[Dict[str, Any]]) -> None:
+        """失败的批次放回队列头部（保持写入顺序），超过重试次数的条目丢弃"""
+        retry = []
+        for item in batch:
+            item["attempts"] += 1
+            if item["attempts"] < self.max_attempts:
+                retry.append(item)
+            else:
+                self._metrics["dropped_items"] += 1
+                logger.error(
+                    f"Dropping memory {item['id']} after {item['attempts']} failed vector store writes"
+                )
+
+        if retry:
+            logger.warning(f"Failed to flush {len(batch)} memories to vector store, requeued {len(retry)}")
+        self._pending = retry + self._pending
+        self._pending_users.update(
+            item["metadata"].get("user_id") for item in retry if item["metadata"].get("user_id")
+        )
+
+    async def _wait_in_flight(self) -> None:
+        """等待正在进行的刷新结束（失败的批次此时已放回队列）"""
+        if self._flush_lock is not None:
+            async with self._flush_lock:
+                pass
+
+    def _drop_pending(self, doomed: Set[str]) -> Set[str]:
+        """从队列中移除指定ID的写入，返回实际移除的ID"""
+        dropped = {item["id"] for item in self._pending if item["id"] in doomed}
+        if dropped:
+            self._pending = [item for item in self._pending if item["id"] not in dropped]
+        return dropped
+
+    async def _flush_for_user(self, user_id: Optional[str]) -> None:
+        """读取前刷新：该用户（或不限用户时任何用户）有待写入数据时先落盘"""
+        if not self._pending:
+            return
+        if user_id is None or user_id in self._pending_users:
+            self._metrics["read_flushes"] += 1
+            await self.flush()
+
+    async def search_memories(
+        self,
+        query_embedding: List[float],
+        user_id: Optional[str] = None,
+        top_k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        搜索相关记忆
+
+        Args:
+            query_embedding: 查询向量
+            user_id: 用户ID（用于过滤）
+            top_k: 返回结果数量
+            filter_metadata: 额外的元数据过滤条件
+
+        Returns:
+            相关记忆列表
+        """
+        await self._flush_for_user(user_id)
+        return await self._run(
+            self.vector_store.search_memories,
+            query_embedding=query_embedding,
+            user_id=user_id,
+            top_k=top_k,
+            filter_metadata=filter_metadata
+        )
+
+    async def delete_memory(self, memory_id: str) -> bool:
+        """
+        删除记忆（尚未落盘的直接从队列移除）
+
+        Args:
+            memory_id: 记忆ID
+
+        Returns:
+            是否成功
+        """
+        if self._drop_pending({memory_id}):
+            return True
+
+        # 正在写入的批次失败后会放回队列，等它结束后再从队列中移除
+        await self._wait_in_flight()
+        if self._drop_pending({memory_id}):
+            return True
+
+        await self.flush()
+        return await self._run(self.vector_store.delete_memory, memory_id)
+
+    async def delete_memories(self, memory_ids: List[str]) -> int:
+        """
+        批量删除记忆（尚未落盘的直接从队列移除）
+
+        Args:
+            memory_ids: 记忆ID列表
+
+        Returns:
+            删除的数量
+        """
+        doomed = set(memory_ids)
+        dropped = self._drop_pending(doomed)
+        await self._wait_in_flight()
+        dropped |= self._drop_pending(doomed - dropped)
+
+        remaining = [memory_id for memory_id in memory_ids if memory_id not in dropped]
+        if not remaining:
+            return len(dropped)
+
+        await self.flush()
+        return len(dropped) + await self._run(self.vector_store.delete_memories, remaining)
+
+    async def compact(self) -> Dict[str, Any]:
+        """
+        写入队列落盘后压缩向量索引
+
+        Returns:
+            压缩报告
+        """
+        await self.flush()
+        return await self._run(self.vector_store.compact)
+
+    async def delete_user_memories(self, user_id: str) -> bool:
+        """
+        删除用户的所有记忆
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            是否成功
+        """
+        await self._wait_in_flight()
+        self._pending = [
+            item for item in self._pending
+            if item["metadata"].get("user_id") != user_id
+        ]
+        self._pending_users.discard(user_id)
+        return await self._run(self.vector_store.delete_user_memories, user_id)
+
+    async def update_memory(
+        self,
+        memory_id: str,
+        content: Optional[str] = None,
+        embedding: Optional[List[float]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        更新记忆
+
+        Args:
+            memory_id: 记忆ID
+            content: 新内容
+            embedding: 新向量
+            metadata: 新元数据
+
+        Returns:
+            是否成功
+        """
+        await self.flush()
+        return await self._run(
+            self.vector_store.update_memory,
+            memory_id,
+            content=content,
+            embedding=embedding,
+            metadata=metadata
+        )
+
+    async def get_collection_stats(self) -> Dict[str, Any]:
+        """
+        获取集合统计信息（含写入队列指标）
+
+        Returns:
+            统计信息字典
+        """
+        stats = await self._run(self.vector_store.get_collection_stats)
+        stats.update(self.get_metrics())
+        return stats
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        获取写入队列指标
+
+        Returns:
+            指标字典
+        """
+        flushes = self._metrics["flushes"]
+        return {
+            "queue_depth": len(self._pending),
+            "max_queue_depth": self._metrics["max_queue_depth"],
+            "enqueued": self._metrics["enqueued"],
+            "flushes": flushes,
+            "flushed_items": self._metrics["flushed_items"],
+            "failed_items": self._metrics["failed_items"],
+            "dropped_items": self._metrics["dropped_items"],
+            "read_flushes": self._metrics["read_flushes"],
+            "last_flush_ms": self._metrics["last_flush_ms"],
+            "avg_flush_ms": round(self._metrics["total_flush_ms"] / flushes, 2) if flushes else 0.0,
+            "avg_batch_size": round(self._metrics["flushed_items"] / flushes, 2) if flushes else 0.0,
+        }
+
+    async def close(self) -> None:
+        """刷新剩余写入并停止后台任务"""
+        self._closed = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._flusher is not None:
+            try:
+                await self._flusher
+            except Exception as e:
+                logger.error(f"Vector store flusher stopped with error: {e}")
+        await self.flush()
+        if self._pending:
+            logger.error(f"Vector store closed with {len(self._pending)} unflushed memories")
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+记忆保留与压缩任务
+定期清理过期的研究长期记忆、合并重复/低有效性的用户事实并压缩向量索引，
+每批只删除少量行，不长时间持有锁
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from src.dao.memory_dao import MemoryDAO
+from src.dao.research_dao import ResearchDAO
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCompactionJob:
+    """
+    记忆保留与压缩任务
+
+    - research_memory：创建超过 max_age_days 的消息分批删除；
+      compression_enabled 时先以 gzip JSONL 归档，归档与删除在同一事务内
+    - user_facts：同一用户的重复事实只保留有效性最高的一条；
+      超过 max_age_days 且有效性低于 min_validity 的事实过期
+    - 向量索引：删除对应向量，最后收缩索引段
+    - 每批最多 batch_size 行（FOR UPDATE SKIP LOCKED），批次之间让出事件循环
+    """
+
+    def __init__(
+        self,
+        memory_manager: Any = None,
+        research_dao: Optional[ResearchDAO] = None,
+        max_age_days: int = 30,
+        interval: float = 3600.0,
+        compression_enabled: bool = True,
+        archive_dir: str = "./data/archive",
+        min_validity: float = 0.7,
+        batch_size: int = 500,
+        batch_pause: float = 0.05
+    ):
+        """
+        初始化压缩任务
+
+        Args:
+            memory_manager: Mem0MemoryManager（None 时只清理研究长期记忆）
+            research_dao: 研究数据访问对象
+            max_age_days: 保留天数
+            interval: 两次运行的间隔（秒）
+            compression_enabled: 过期消息是否压缩归档后再删除
+            archive_dir: 归档目录
+            min_validity: 低于该有效性的过期事实会被删除
+            batch_size: 每批删除的最大行数
+            batch_pause: 批次之间的暂停（秒）
+        """
+        self.memory_manager = memory_manager
+        self.memory_dao: Optional[MemoryDAO] = memory_manager.memory_dao if memory_manager else None
+        self.research_dao = research_dao or ResearchDAO()
+        self.max_age_days = max_age_days
+        self.interval = interval
+        self.compression_enabled = compression_enabled
+        self.archive_dir = archive_dir
+        self.min_validity = min_validity
+        self.batch_size = max(1, batch_size)
+        self.batch_pause = batch_pause
+
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.last_report: Dict[str, Any] = {}
+
+        self._metrics = {
+            "runs": 0,
+            "failed_runs": 0,
+            "rows_reclaimed": 0,
+            "bytes_reclaimed": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        """后台任务是否在运行"""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """启动定时任务"""
+        if self.running:
+            return
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Memory compaction job started (every {self.interval}s, keep {self.max_age_days} days)")
+
+    async def stop(self) -> None:
+        """停止定时任务（进行中的批次随事务回滚）"""
+        self._stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        logger.info("Memory compaction job stopped")
+
+    async def _run(self) -> None:
+        """主循环：运行一次后休眠 interval 秒"""
+        while not self._stopping:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._metrics["failed_runs"] += 1
+                logger.error(f"Memory compaction failed: {e}")
+
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> Dict[str, Any]:
+        """
+        执行一次保留与压缩
+
+        Returns:
+            本次回收的行数和字节数报告
+        """
+        started = time.perf_counter()
+        cutoff = datetime.now() - timedelta(days=self.max_age_days)
+
+        report: Dict[str, Any] = {
+            "research_memory": await self._expire_research_memory(cutoff),
+            "user_facts": await self._compact_user_facts(cutoff),
+        }
+        report["vector_index"] = await self._compact_vector_index(report["user_facts"].pop("vector_ids"))
+
+        report["rows_reclaimed"] = report["research_memory"]["rows"] + report["user_facts"]["rows"]
+        report["bytes_reclaimed"] = (
+            report["research_memory"]["bytes"]
+            + report["user_facts"]["bytes"]
+            + report["vector_index"]["bytes_reclaimed"]
+        )
+        report["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        report["completed_at"] = datetime.now().isoformat()
+
+        self._metrics["runs"] += 1
+        self._metrics["rows_reclaimed"] += report["rows_reclaimed"]
+        self._metrics["bytes_reclaimed"] += report["bytes_reclaimed"]
+        self.last_report = report
+
+        logger.info(
+            f"Memory compaction reclaimed {report['rows_reclaimed']} rows, "
+            f"{report['bytes_reclaimed']} bytes in {report['duration_ms']} ms"
+        )
+        return report
+
+    async def _expire_research_memory(self, cutoff: datetime) -> Dict[str, Any]:
+        """分批删除（可选归档）过期的研究长期记忆"""
+        rows = 0
+        size = 0
+        archive = self._archive_rows if self.compression_enabled else None
+
+        while not self._stopping:
+            batch = await self.research_dao.expire_long_term_memory(cutoff, self.batch_size, archive=archive)
+            rows += len(batch)
+            size += sum(row.get("row_bytes") or 0 for row in batch)
+            if len(batch) < self.batch_size:
+                break
+            await asyncio.sleep(self.batch_pause)
+
+        return {"rows": rows, "bytes": size, "archived": self.compression_enabled and rows > 0}
+
+    async def _archive_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """将被删除的消息追加到当天的 gzip JSONL 归档"""
+        path = os.path.join(
+            self.archive_dir,
+            f"research_memory-{datetime.now().strftime('%Y%m%d')}.jsonl.gz"
+        )
+        lines = "".join(
+            json.dumps(
+                {k: v for k, v in row.items() if k != "row_bytes"},
+                ensure_ascii=False,
+                default=str
+            ) + "\n"
+            for row in rows
+        )
+
+        def write():
+            os.makedirs(self.archive_dir, exist_ok=True)
+            # gzip 支持多成员追加，每批一个成员
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                f.write(lines)
+
+        await asyncio.to_thread(write)
+
+    async def _compact_user_facts(self, cutoff: datetime) -> Dict[str, Any]:
+        """分批合并重复事实、删除过期的低有效性事实"""
+        result = {"rows": 0, "bytes": 0, "duplicates_merged": 0, "expired": 0, "vector_ids": []}
+        if self.memory_dao is None:
+            return result
+
+        users = set()
+        for key, fetch in (
+            ("duplicates_merged", lambda: self.memory_dao.delete_duplicate_facts(self.batch_size)),
+            ("expired", lambda: self.memory_dao.expire_low_validity_facts(cutoff, self.min_validity, self.batch_size)),
+        ):
+            while not self._stopping:
+                batch = await fetch()
+                result[key] += len(batch)
+                result["rows"] += len(batch)
+                result["bytes"] += sum(row.get("row_bytes") or 0 for row in batch)
+                result["vector_ids"].extend(row["embedding_id"] for row in batch if row.get("embedding_id"))
+                users.update(row["user_id"] for row in batch)
+                if len(batch) < self.batch_size:
+                    break
+                await asyncio.sleep(self.batch_pause)
+
+        # 删除事实后让这些用户的检索缓存失效
+        for user_id in users:
+            await self.memory_manager._invalidate_user_cache(user_id)
+
+        return result
+
+    async def _compact_vector_index(self, vector_ids: List[str]) -> Dict[str, Any]:
+        """删除已清理事实的向量并收缩索引段"""
+        result = {"vectors_removed": 0, "segments_rebuilt": 0, "segments_removed": 0, "bytes_reclaimed": 0}
+        vector_store = self.memory_manager.vector_store if self.memory_manager else None
+        if vector_store is None:
+            return result
+
+        for start in range(0, len(vector_ids), self.batch_size):
+            result["vectors_removed"] += await vector_store.delete_memories(vector_ids[start:start + self.batch_size])
+
+        result.update(await vector_store.compact())
+        return result
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        获取任务指标
+
+        Returns:
+            指标字典（含最近一次报告）
+        """
+        return {"running": self.running, **self._metrics, "last_report": self.last_report}
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+嵌入向量缓存
+按 (嵌入模型, 归一化文本哈希) 缓存向量：进程内 LRU + 内存映射的磁盘存储，重启后仍可命中
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import unicodedata
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.core.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning("NumPy not installed. Embedding cache will be in-process only.")
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+
+_DIGEST_SIZE = 16
+
+
+def normalize_text(text: str) -> str:
+    """归一化文本：Unicode NFC + 合并空白"""
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _model_dirname(model: str) -> str:
+    """将模型名转换为安全的目录名"""
+    safe = re.sub(r"[^A-Za-z0-9._-]+", "_", model)
+    suffix = hashlib.blake2b(model.encode("utf-8"), digest_size=4).hexdigest()
+    return f"{safe}-{suffix}"
+
+
+class _MemmapStore:
+    """
+    单个嵌入模型的磁盘存储（多个工作进程可共享同一目录）
+
+    - vectors.bin: [capacity, dim] 向量矩阵（float32 / float16）
+    - keys.bin: [capacity, 16] 每个槽位对应的文本摘要
+    - count.bin: 所有进程共享的写入计数，决定下一个写入的槽位
+    - meta.json: 模型、维度、容量等元数据
+    - lock: 文件锁，写入时独占、读取时共享（需要 fcntl；不可用时每个进程使用独立目录）
+
+    写满后按环形缓冲覆盖最早写入的槽位。各进程的摘要索引只是提示：其他进程写入的槽位
+    在下次查找未命中时增量索引，读取时核对槽位中的摘要，不一致（槽位已被覆盖）按未命中处理。
+    向量写入共享内存映射，进程崩溃不会丢失；每 32 次写入才 flush 落盘，
+    操作系统崩溃或断电时可能丢失最近未落盘的条目（缓存可重新计算，不影响正确性）。
+    """
+
+    def __init__(self, directory: str, model: str, capacity: int, dtype: str):
+        self.directory = directory
+        self.model = model
+        self.capacity = capacity
+        self.dtype = dtype
+        self.dim: Optional[int] = None
+        self.count = 0
+
+        self._vectors = None
+        self._keys = None
+        self._counter = None
+        self._slots: Dict[bytes, int] = {}
+        self._slot_keys: Dict[int, bytes] = {}
+        self._dirty = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock_fd = os.open(os.path.join(self.directory, "lock"), os.O_RDWR | os.O_CREAT, 0o644)
+
+        with self._locked(exclusive=True):
+            self._load()
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        """跨进程文件锁"""
+        if not FCNTL_AVAILABLE:
+            yield
+            return
+
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _load(self) -> None:
+        """加载已有存储；元数据与当前配置不一致时丢弃（调用方持有独占锁）"""
+        if not os.path.exists(self._meta_path):
+            return
+
+        try:
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Embedding cache metadata unreadable, resetting: {e}")
+            return
+
+        if (meta.get("model") != self.model
+                or meta.get("dtype") != self.dtype
+                or meta.get("capacity") != self.capacity):
+            logger.info(f"Embedding cache for {self.model} has different settings, resetting")
+            return
+
+        try:
+            self._open(int(meta["dim"]), mode="r+", count=int(meta.get("count", 0)))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Embedding cache files unreadable, resetting: {e}")
+            self._vectors = self._keys = self._counter = None
+            return
+
+        self._sync()
+        logger.info(f"Loaded {len(self._slots)} cached embeddings for {self.model}")
+
+    def _open(self, dim: int, mode: str, count: int = 0) -> None:
+        """打开（或创建）内存映射文件（调用方持有独占锁）"""
+        self.dim = dim
+        self._vectors = np.memmap(
+            os.path.join(self.directory, "vectors.bin"),
+            dtype=self.dtype,
+            mode=mode,
+            shape=(self.capacity, dim)
+        )
+        self._keys = np.memmap(
+            os.path.join(self.directory, "keys.bin"),
+            dtype=np.uint8,
+            mode=mode,
+            shape=(self.capacity, _DIGEST_SIZE)
+        )
+
+        # 旧版本的存储没有 count.bin，按 meta.json 中的计数创建
+        counter_path = os.path.join(self.directory, "count.bin")
+        exists = mode == "r+" and os.path.exists(counter_path)
+        self._counter = np.memmap(counter_path, dtype=np.uint64, mode="r+" if exists else "w+", shape=(1,))
+        if not exists:
+            self._counter[0] = count
+
+    def _create(self, dim: int) -> None:
+        """首次写入时创建存储；其他进程可能已抢先创建，此时直接加载（调用方持有独占锁）"""
+        self._load()
+        if self._vectors is not None:
+            return
+
+        self._open(dim, mode="w+")
+        self._dirty = 1
+        self.flush_locked()
+
+    def _sync(self) -> None:
+        """增量索引其他进程写入的槽位（调用方持有锁）"""
+        shared = int(self._counter[0])
+        for n in range(max(self.count, shared - self.capacity), shared):
+            slot = n % self.capacity
+            old = self._slot_keys.get(slot)
+            if old is not None and self._slots.get(old) == slot:
+                del self._slots[old]
+
+            digest = bytes(self._keys[slot])
+            self._slots[digest] = slot
+            self._slot_keys[slot] = digest
+        self.count = shared
+
+    def _stale(self) -> bool:
+        return self._counter is not None and int(self._counter[0]) != self.count
+
+    def get(self, digest: bytes) -> Optional[List[float]]:
+        if self._vectors is None:
+            return None
+
+        with self._locked(exclusive=False):
+            if digest not in self._slots and self._stale():
+                self._sync()
+
+            slot = self._slots.get(digest)
+            if slot is None:
+                return None
+
+            # 槽位可能已被其他进程覆盖为另一段文本的向量
+            if bytes(self._keys[slot]) != digest:
+                del self._slots[digest]
+                return None
+            return self._vectors[slot].astype(np.float32).tolist()
+
+    def put(self, digest: bytes, vector: List[float]) -> None:
+        with self._locked(exclusive=True):
+            if self._vectors is None:
+                self._create(len(vector))
+            if len(vector) != self.dim:
+                return
+
+            self._sync()
+            slot = self._slots.get(digest)
+            if slot is not None and bytes(self._keys[slot]) == digest:
+                return
+
+            slot = self.count % self.capacity
+            old = self._slot_keys.get(slot)
+            if old is not None and self._slots.get(old) == slot:
+                del self._slots[old]
+
+            self._vectors[slot] = np.asarray(vector, dtype=self.dtype)
+            self._keys[slot] = np.frombuffer(digest, dtype=np.uint8)
+            self._slots[digest] = slot
+            self._slot_keys[slot] = digest
+            self.count += 1
+            self._counter[0] = self.count
+
+            self._dirty += 1
+            if self._dirty >= 32:
+                self.flush_locked()
+
+    def flush(self) -> None:
+        """将数据与元数据写回磁盘"""
+        with self._locked(exclusive=True):
+            self.flush_locked()
+
+    def flush_locked(self) -> None:
+        """flush 的实现（调用方持有独占锁）"""
+        if self._vectors is None or not self._dirty:
+            return
+
+        self._vectors.flush()
+        self._keys.flush()
+        self._counter.flush()
+
+        tmp_path = f"{self._meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "model": self.model,
+                "dim": self.dim,
+                "dtype": self.dtype,
+                "capacity": self.capacity,
+                "count": int(self._counter[0])
+            }, f)
+        os.replace(tmp_path, self._meta_path)
+        self._dirty = 0
+
+    def close(self) -> None:
+        """落盘并释放文件锁"""
+        self.flush()
+        os.close(self._lock_fd)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+
+class EmbeddingCache:
+    """
+    嵌入向量缓存
+
+    - 键：(嵌入模型, 归一化文本的 blake2b 摘要)
+    - 第一层：进程内 LRU
+    - 第二层：按模型分目录的内存映射存储（需要 NumPy），工作进程之间用文件锁共享
+    - 嵌入模型变化时自动切换到新模型的存储，并清空进程内 LRU
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "./data/embedding_cache",
+        memory_size: int = 2048,
+        disk_capacity: int = 100000,
+        dtype: str = "float32"
+    ):
+        """
+        初始化嵌入缓存
+
+        Args:
+            cache_dir: 磁盘存储根目录
+            memory_size: 进程内 LRU 条目数
+            disk_capacity: 每个模型的磁盘存储槽位数
+            dtype: 磁盘向量精度（float32 或 float16）
+        """
+        if dtype not in ("float32", "float16"):
+            raise ValueError("dtype must be 'float32' or 'float16'")
+
+        self.cache_dir = cache_dir
+        self.disk_capacity = disk_capacity
+        self.dtype = dtype
+        self._memory = LRUCache(max_size=memory_size)
+        self._model: Optional[str] = None
+        self._store: Optional[_MemmapStore] = None
+
+        self.disk_hits = 0
+
+    def _digest(self, text: str) -> bytes:
+        return hashlib.blake2b(
+            normalize_text(text).encode("utf-8"),
+            digest_size=_DIGEST_SIZE
+        ).digest()
+
+    def _bind_model(self, model: str) -> None:
+        """切换到指定模型的存储（模型变化即失效旧缓存）"""
+        if model == self._model:
+            return
+
+        if self._store is not None:
+            self._store.close()
+            logger.info(f"Embedding model changed from {self._model} to {model}, invalidating cache")
+
+        self._memory.clear()
+        self._model = model
+        self._store = None
+
+        if NUMPY_AVAILABLE:
+            directory = os.path.join(self.cache_dir, _model_dirname(model))
+            if not FCNTL_AVAILABLE:
+                # 没有文件锁时多个进程不能安全共享同一目录
+                directory = os.path.join(directory, f"pid-{os.getpid()}")
+
+            try:
+                self._store = _MemmapStore(
+                    directory,
+                    model=model,
+                    capacity=self.disk_capacity,
+                    dtype=self.dtype
+                )
+            except Exception as e:
+                logger.error(f"Failed to open embedding cache store: {e}")
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """
+        查找缓存的嵌入向量
+
+        Args:
+            model: 嵌入模型名称
+            text: 原始文本
+
+        Returns:
+            向量，未命中返回None
+        """
+        self._bind_model(model)
+        digest = self._digest(text)
+
+        vector = self._memory.get(digest)
+        if vector is not None:
+            return vector
+
+        if self._store is not None:
+            vector = self._store.get(digest)
+            if vector is not None:
+                self.disk_hits += 1
+                self._memory.set(digest, vector)
+                return vector
+
+        return None
+
+    def put(self, model: str, text: str, vector: List[float]) -> None:
+        """
+        写入嵌入向量
+
+        Args:
+            model: 嵌入模型名称
+            text: 原始文本
+            vector: 嵌入向量
+        """
+        if not vector:
+            return
+
+        self._bind_model(model)
+        digest = self._digest(text)
+        self._memory.set(digest, vector)
+
+        if self._store is not None:
+            try:
+                self._store.put(digest, vector)
+            except Exception as e:
+                logger.error(f"Failed to persist embedding: {e}")
+
+    def flush(self) -> None:
+        """将磁盘存储的未写回数据落盘"""
+        if self._store is not None:
+            self._store.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            统计信息字典
+        """
+        stats = self._memory.get_stats()
+        stats.update({
+            "model": self._model,
+            "disk_entries": len(self._store) if self._store is not None else 0,
+            "disk_hits": self.disk_hits,
+            "dtype": self.dtype
+        })
+        return stats
+
+
+# 全局缓存实例
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """获取全局嵌入缓存实例（单例模式），配置关闭时返回None"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        from src.config.memory_config import get_memory_config
+
+        config = get_memory_config()
+        if not config.embedding_cache_enabled:
+            return None
+
+        _embedding_cache = EmbeddingCache(
+            cache_dir=config.embedding_cache_dir,
+            memory_size=config.embedding_cache_size,
+            disk_capacity=config.embedding_cache_capacity,
+            dtype=config.embedding_cache_dtype
+        )
+    return _embedding_cache
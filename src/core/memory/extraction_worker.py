@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台记忆提取任务
+持续领取所有会话中未处理的聊天消息，多轮对话合并为一次提取调用，
+以低优先级、限速运行，不占用交互式对话的延迟
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from src.core.memory.memory_agent import MemoryAgent
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryExtractionWorker:
+    """
+    记忆提取后台任务
+
+    - 用 FOR UPDATE SKIP LOCKED 跨会话领取消息，多实例部署时互不重复
+    - 同一会话的消息按 用户/助手 配对成轮次，每 turns_per_prompt 轮调用一次LLM
+    - LLM 调用按 calls_per_minute 限速
+    - 有交互式请求进行中时暂缓提取（最多 max_defer_seconds）
+    - 处理失败的消息放回队列
+    """
+
+    def __init__(
+        self,
+        memory_agent: MemoryAgent,
+        poll_interval: float = 5.0,
+        batch_size: int = 50,
+        turns_per_prompt: int = 6,
+        calls_per_minute: int = 12,
+        settle_seconds: int = 10,
+        max_defer_seconds: float = 30.0,
+        activity_probe: Optional[Callable[[], int]] = None
+    ):
+        """
+        初始化后台提取任务
+
+        Args:
+            memory_agent: 记忆提取Agent
+            poll_interval: 队列为空时的轮询间隔（秒）
+            batch_size: 每次领取的最大消息数
+            turns_per_prompt: 每次LLM调用合并的对话轮数
+            calls_per_minute: 每分钟最多的LLM调用次数
+            settle_seconds: 只处理创建超过该秒数的消息（等待助手回复写入）
+            max_defer_seconds: 交互请求繁忙时最长暂缓时间
+            activity_probe: 返回当前进行中的交互式请求数量
+        """
+        self.memory_agent = memory_agent
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.turns_per_prompt = max(1, turns_per_prompt)
+        self.min_call_interval = 60.0 / calls_per_minute if calls_per_minute > 0 else 0.0
+        self.settle_seconds = settle_seconds
+        self.max_defer_seconds = max_defer_seconds
+        self.activity_probe = activity_probe
+
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._last_call = 0.0
+
+        self._metrics = {
+            "batches": 0,
+            "messages_claimed": 0,
+            "llm_calls": 0,
+            "facts_stored": 0,
+            "messages_released": 0,
+            "deferrals": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        """后台任务是否在运行"""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """启动后台任务"""
+        if self.running:
+            return
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+        logger.info("Memory extraction worker started")
+
+    async def stop(self) -> None:
+        """停止后台任务（已领取但未处理的消息放回队列）"""
+        self._stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        logger.info("Memory extraction worker stopped")
+
+    async def _run(self) -> None:
+        """主循环：领取 -> 分组 -> 提取；队列为空时休眠"""
+        while not self._stopping:
+            try:
+                processed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Memory extraction worker error: {e}")
+                processed = 0
+
+            if processed == 0:
+                await asyncio.sleep(self.poll_interval)
+
+    async def run_once(self) -> int:
+        """
+        领取并处理一批消息
+
+        Returns:
+            领取的消息数量
+        """
+        messages = await self.memory_agent.memory_dao.claim_unprocessed_messages(
+            limit=self.batch_size,
+            min_age_seconds=self.settle_seconds
+        )
+        if not messages:
+            return 0
+
+        self._metrics["batches"] += 1
+        self._metrics["messages_claimed"] += len(messages)
+
+        sessions: Dict[str, List[Dict[str, Any]]] = {}
+        for message in messages:
+            sessions.setdefault(message["session_id"], []).append(message)
+
+        # (会话ID, 用户ID, 轮次块)，每块一次LLM调用
+        chunks = []
+        for session_id, session_messages in sessions.items():
+            user_id = session_messages[0].get("user_id")
+            if not user_id:
+                continue
+            turns = self._pair_turns(session_messages)
+            for start in range(0, len(turns), self.turns_per_prompt):
+                chunks.append((session_id, user_id, turns[start:start + self.turns_per_prompt]))
+
+        for index, (session_id, user_id, chunk) in enumerate(chunks):
+            message_ids = [mid for turn in chunk for mid in turn["message_ids"]]
+            try:
+                await self._wait_for_slot()
+                stored = await self.memory_agent.process_turns(
+                    session_id=session_id,
+                    user_id=user_id,
+                    turns=chunk,
+                    source_message_id=message_ids[-1]
+                )
+                self._metrics["llm_calls"] += 1
+                self._metrics["facts_stored"] += stored
+            except asyncio.CancelledError:
+                # 停止时把本批次尚未处理的消息全部放回
+                await self.memory_agent.memory_dao.release_messages([
+                    mid for _, _, rest in chunks[index:]
+                    for turn in rest for mid in turn["message_ids"]
+                ])
+                raise
+            except Exception as e:
+                logger.error(f"Failed to extract memories for session {session_id}: {e}")
+                await self.memory_agent.memory_dao.release_messages(message_ids)
+                self._metrics["messages_released"] += len(message_ids)
+
+        return len(messages)
+
+    @staticmethod
+    def _pair_turns(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """将同一会话的消息配对为 用户/助手 轮次（缺一方的消息单独成轮）"""
+        turns: List[Dict[str, Any]] = []
+        current: Optional[Dict[str, Any]] = None
+
+        for message in messages:
+            role = message.get("role")
+            if role == "user":
+                current = {"user": message["content"], "assistant": "", "message_ids": [message["id"]]}
+                turns.append(current)
+            elif role == "assistant":
+                if current is not None and not current["assistant"]:
+                    current["assistant"] = message["content"]
+                    current["message_ids"].append(message["id"])
+                else:
+                    turns.append({"user": "", "assistant": message["content"], "message_ids": [message["id"]]})
+                current = None
+
+        return turns
+
+    async def _wait_for_slot(self) -> None:
+        """限速并让位于交互式请求"""
+        if self.activity_probe is not None:
+            deferred = 0.0
+            while self.activity_probe() > 0 and deferred < self.max_defer_seconds:
+                if deferred == 0.0:
+                    self._metrics["deferrals"] += 1
+                await asyncio.sleep(0.5)
+                deferred += 0.5
+
+        wait = self._last_call + self.min_call_interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._last_call = time.monotonic()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        获取后台任务指标
+
+        Returns:
+            指标字典
+        """
+        return {"running": self.running, **self._metrics}
@@ -9,7 +9,9 @@ import logging
 from typing import List, Dict, Any, Optional
 import asyncio
 
+from src.core.cache import LRUCache
 from src.core.llm.ollama_llm import OllamaLLM
+from src.core.memory.embedding_cache import EmbeddingCache, get_embedding_cache, normalize_text
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +31,10 @@ class HyDERetriever:
         self,
         ollama_base_url: str = "http://localhost:11434",
         embedding_model: str = "embeddinggemma",
-        generation_model: str = "gemma3:4b"
+        generation_model: str = "gemma3:4b",
+        embedding_cache: Optional[EmbeddingCache] = None,
+        hypothesis_cache_size: int = 1024,
+        hypothesis_cache_ttl: int = 3600
     ):
         """
         初始化HyDE检索器
@@ -38,10 +43,16 @@ class HyDERetriever:
             ollama_base_url: Ollama服务地址
             embedding_model: 嵌入模型名称
             generation_model: 用于生成假设文档的模型
+            embedding_cache: 嵌入缓存（None 则使用全局缓存）
+            hypothesis_cache_size: 假设文档缓存条目数
+            hypothesis_cache_ttl: 假设文档缓存过期时间（秒）
         """
         self.ollama = OllamaLLM(base_url=ollama_base_url)
         self.embedding_model = embedding_model
         self.generation_model = generation_model
+        self.embedding_cache = embedding_cache or get_embedding_cache()
+        # 假设文档缓存：同一问题（归一化后）不重复调用生成模型
+        self.hypothesis_cache = LRUCache(max_size=hypothesis_cache_size, ttl=hypothesis_cache_ttl)
         
         logger.info(f"HyDE Retriever initialized with embedding: {embedding_model}, generation: {generation_model}")
     
@@ -60,6 +71,11 @@ class HyDERetriever:
         Returns:
             假设文档内容
         """
+        cache_key = (self.generation_model, normalize_text(query).lower(), user_context or "")
+        cached = self.hypothesis_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         # 构建提示词
         system_prompt = """你是一个知识助手。用户会提出一个问题，请你生成一个简短的、假设性的答案。
 这个答案不需要完全准确，但应该包含可能相关的关键信息和概念。
@@ -89,6 +105,7 @@ class HyDERetriever:
                 return query
             
             logger.debug(f"Generated hypothetical document: {hypothetical_doc[:100]}...")
+            self.hypothesis_cache.set(cache_key, hypothetical_doc)
             return hypothetical_doc
             
         except Exception as e:
@@ -97,7 +114,7 @@ class HyDERetriever:
     
     async def embed_text(self, text: str) -> List[float]:
         """
-        将文本转换为向量
+        将文本转换为向量（命中嵌入缓存时不调用 Ollama）
         
         Args:
             text: 输入文本
@@ -105,6 +122,11 @@ class HyDERetriever:
         Returns:
             向量表示
         """
+        if self.embedding_cache is not None:
+            cached = self.embedding_cache.get(self.embedding_model, text)
+            if cached is not None:
+                return cached
+        
         try:
             embedding = await self.ollama.embeddings(
                 input_text=text,
@@ -116,6 +138,9 @@ class HyDERetriever:
                 logger.error("Empty embedding returned")
                 return []
             
+            if self.embedding_cache is not None:
+                self.embedding_cache.put(self.embedding_model, text, embedding)
+            
             return embedding
             
         except Exception as e:
@@ -150,24 +175,50 @@ class HyDERetriever:
     
     async def batch_embed_texts(self, texts: List[str]) -> List[List[float]]:
         """
-        批量嵌入文本
+        批量嵌入文本（缓存未命中的文本合并为一次 Ollama 请求）
         
         Args:
             texts: 文本列表
             
         Returns:
-            向量列表
+            向量列表（与输入一一对应，失败的为空列表）
         """
-        tasks = [self.embed_text(text) for text in texts]
-        embeddings = await asyncio.gather(*tasks, return_exceptions=True)
+        results: List[List[float]] = [[] for _ in texts]
+        missing: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            cached = None
+            if self.embedding_cache is not None:
+                cached = self.embedding_cache.get(self.embedding_model, text)
+            if cached is not None:
+                results[i] = cached
+            else:
+                missing.setdefault(text, []).append(i)
         
-        # 过滤掉失败的嵌入
-        valid_embeddings = []
-        for i, emb in enumerate(embeddings):
+        if not missing:
+            return results
+        
+        pending = list(missing)
+        embeddings = await self.ollama.batch_embeddings(
+            input_texts=pending,
+            model=self.embedding_model,
+            truncate=True
+        )
+        
+        if not embeddings:
+            # 批量请求失败时逐条重试
+            logger.warning("Batch embedding failed, falling back to per-text requests")
+            tasks = [self.embed_text(text) for text in pending]
+            embeddings = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        for text, emb in zip(pending, embeddings):
             if isinstance(emb, Exception):
-                logger.error(f"Failed to embed text {i}: {emb}")
-                valid_embeddings.append([])
-            else:
-                valid_embeddings.append(emb)
+                logger.error(f"Failed to embed text: {emb}")
+                continue
+            if not emb:
+                continue
+            if self.embedding_cache is not None:
+                self.embedding_cache.put(self.embedding_model, text, emb)
+            for i in missing[text]:
+                results[i] = emb
         
-        return valid_embeddings
+        return results
@@ -37,6 +37,36 @@ class MemoryAgent:
         "general": "一般信息"
     }
     
+    EXTRACTION_SYSTEM_PROMPT = """你是一个记忆提取助手。分析用户和助手的对话，提取值得长期记忆的信息。
+
+重点关注：
+1. 用户的偏好和习惯
+2. 用户的技能水平和背景
+3. 用户的目标和意图
+4. 重要的约束条件
+5. 需要记住的关键信息
+
+输出格式为JSON数组，每个事实包含：
+- fact_content: 事实内容（简洁明确）
+- fact_type: 类型（preference/skill/background/goal/constraint/general）
+- validity_score: 可信度（0.0-1.0）
+
+如果没有值得记忆的信息，返回空数组 []。
+
+示例输出：
+[
+  {
+    "fact_content": "用户是Python初学者",
+    "fact_type": "skill",
+    "validity_score": 0.9
+  },
+  {
+    "fact_content": "用户偏好简洁的代码示例",
+    "fact_type": "preference",
+    "validity_score": 0.8
+  }
+]"""
+    
     def __init__(
         self,
         ollama_base_url: str = "http://localhost:11434",
@@ -73,37 +103,6 @@ class MemoryAgent:
         Returns:
             提取的事实列表
         """
-        # 构建提示词
-        system_prompt = """你是一个记忆提取助手。分析用户和助手的对话，提取值得长期记忆的信息。
-
-重点关注：
-1. 用户的偏好和习惯
-2. 用户的技能水平和背景
-3. 用户的目标和意图
-4. 重要的约束条件
-5. 需要记住的关键信息
-
-输出格式为JSON数组，每个事实包含：
-- fact_content: 事实内容（简洁明确）
-- fact_type: 类型（preference/skill/background/goal/constraint/general）
-- validity_score: 可信度（0.0-1.0）
-
-如果没有值得记忆的信息，返回空数组 []。
-
-示例输出：
-[
-  {
-    "fact_content": "用户是Python初学者",
-    "fact_type": "skill",
-    "validity_score": 0.9
-  },
-  {
-    "fact_content": "用户偏好简洁的代码示例",
-    "fact_type": "preference",
-    "validity_score": 0.8
-  }
-]"""
-        
         # 构建上下文
         context_str = ""
         if conversation_context:
@@ -130,45 +129,102 @@ class MemoryAgent:
                 model=self.extraction_model,
                 temperature=0.3,  # 低温度保证稳定性
                 max_tokens=500,
-                system=system_prompt,
+                system=self.EXTRACTION_SYSTEM_PROMPT,
                 format="json"  # 要求JSON输出
             )
             
             content = response.get("choices", [{}])[0].get("text", "").strip()
+            return self._parse_facts(content)
             
-            if not content:
-                logger.debug("No facts extracted from conversation")
-                return []
+        except Exception as e:
+            logger.error(f"Failed to extract facts: {e}")
+            return []
+    
+    async def extract_facts_from_turns(
+        self,
+        turns: List[Dict[str, str]],
+        max_chars_per_message: int = 500
+    ) -> List[Dict[str, Any]]:
+        """
+        从多轮对话中一次性提取事实（多轮合并为一个提示词，一次LLM调用）
+        
+        Args:
+            turns: 对话轮次列表，每项包含 user / assistant（任一可为空）
+            max_chars_per_message: 每条消息截断长度
             
-            # 解析JSON
-            try:
-                facts = json.loads(content)
-                
-                # 如果返回的是单个字典，转换为列表
-                if isinstance(facts, dict):
-                    logger.debug("LLM returned single fact as dict, converting to list")
-                    facts = [facts]
-                elif not isinstance(facts, list):
-                    logger.warning(f"Invalid facts format: {type(facts)}")
-                    return []
-                
-                # 验证和过滤事实
-                valid_facts = []
-                for fact in facts:
-                    if self._validate_fact(fact):
-                        valid_facts.append(fact)
-                
-                logger.info(f"Extracted {len(valid_facts)} valid facts")
-                return valid_facts
-                
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse facts JSON: {e}")
-                logger.debug(f"Raw content: {content}")
-                return []
+        Returns:
+            提取的事实列表
+        """
+        if not turns:
+            return []
+        
+        turn_blocks = []
+        for index, turn in enumerate(turns, 1):
+            lines = [f"第{index}轮："]
+            if turn.get("user"):
+                lines.append(f"用户: {turn['user'][:max_chars_per_message]}")
+            if turn.get("assistant"):
+                lines.append(f"助手: {turn['assistant'][:max_chars_per_message]}")
+            turn_blocks.append("\n".join(lines))
+        conversation = "\n\n".join(turn_blocks)
+        
+        prompt = f"""以下是同一用户的{len(turns)}轮对话：
+
+{conversation}
+
+请综合所有轮次，提取值得记忆的事实（JSON格式，不要重复）："""
+        
+        try:
+            response = await self.ollama.generate_completion(
+                prompt=prompt,
+                model=self.extraction_model,
+                temperature=0.3,
+                max_tokens=500,
+                system=self.EXTRACTION_SYSTEM_PROMPT,
+                format="json"
+            )
+            
+            content = response.get("choices", [{}])[0].get("text", "").strip()
+            return self._parse_facts(content)
             
         except Exception as e:
-            logger.error(f"Failed to extract facts: {e}")
+            logger.error(f"Failed to extract facts from turns: {e}")
+            return []
+    
+    def _parse_facts(self, content: str) -> List[Dict[str, Any]]:
+        """
+        解析并验证LLM返回的事实JSON
+        
+        Args:
+            content: LLM输出文本
+            
+        Returns:
+            有效的事实列表
+        """
+        if not content:
+            logger.debug("No facts extracted from conversation")
             return []
+        
+        try:
+            facts = json.loads(content)
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse facts JSON: {e}")
+            logger.debug(f"Raw content: {content}")
+            return []
+        
+        # 如果返回的是单个字典，转换为列表
+        if isinstance(facts, dict):
+            logger.debug("LLM returned single fact as dict, converting to list")
+            facts = [facts]
+        elif not isinstance(facts, list):
+            logger.warning(f"Invalid facts format: {type(facts)}")
+            return []
+        
+        # 验证和过滤事实
+        valid_facts = [fact for fact in facts if self._validate_fact(fact)]
+        
+        logger.info(f"Extracted {len(valid_facts)} valid facts")
+        return valid_facts
     
     def _validate_fact(self, fact: Dict[str, Any]) -> bool:
         """
@@ -253,21 +309,14 @@ class MemoryAgent:
                     await self.memory_dao.mark_message_processed(message_id)
                 return 0
             
-            # 3. 存储事实
-            stored_count = 0
-            for fact in facts:
-                memory_id = await self.memory_manager.add_memory(
-                    user_id=user_id,
-                    fact_content=fact["fact_content"],
-                    fact_type=fact["fact_type"],
-                    source_session_id=session_id,
-                    source_message_id=message_id,
-                    validity_score=fact["validity_score"]
-                )
-                
-                if memory_id:
-                    stored_count += 1
-                    logger.debug(f"Stored fact: {fact['fact_content'][:50]}...")
+            # 3. 批量存储事实（一次嵌入、一次向量写入、一条 INSERT）
+            memory_ids = await self.memory_manager.add_memories_batch(
+                user_id=user_id,
+                facts=facts,
+                source_session_id=session_id,
+                source_message_id=message_id
+            )
+            stored_count = len(memory_ids)
             
             # 4. 标记消息已处理
             if message_id:
@@ -280,6 +329,39 @@ class MemoryAgent:
             logger.error(f"Failed to process conversation: {e}")
             return 0
     
+    async def process_turns(
+        self,
+        session_id: str,
+        user_id: str,
+        turns: List[Dict[str, str]],
+        source_message_id: Optional[int] = None
+    ) -> int:
+        """
+        从多轮对话中提取并批量存储记忆（后台提取任务使用）
+        
+        Args:
+            session_id: 会话ID
+            user_id: 用户ID
+            turns: 对话轮次列表
+            source_message_id: 来源消息ID（通常为最后一条消息）
+            
+        Returns:
+            存储的事实数量
+        """
+        facts = await self.extract_facts_from_turns(turns)
+        if not facts:
+            return 0
+        
+        memory_ids = await self.memory_manager.add_memories_batch(
+            user_id=user_id,
+            facts=facts,
+            source_session_id=session_id,
+            source_message_id=source_message_id
+        )
+        
+        logger.info(f"Processed {len(turns)} turns: stored {len(memory_ids)}/{len(facts)} facts")
+        return len(memory_ids)
+    
     async def batch_process_unprocessed_messages(
         self,
         session_id: str,
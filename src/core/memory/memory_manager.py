@@ -5,13 +5,18 @@ Mem0 记忆管理器
 整合向量存储、HyDE检索和数据库持久化
 """
 
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Optional, Set
 import uuid
 from datetime import datetime
 
-from src.core.memory.vector_store import VectorStore
+from src.config.memory_config import get_memory_config
+from src.core.memory.vector_index import create_vector_index
+from src.core.memory.async_vector_store import AsyncVectorStore
 from src.core.memory.hyde_retriever import HyDERetriever
+from src.core.memory.retrieval_cache import RetrievalCache
 from src.dao.memory_dao import MemoryDAO
 from src.core.security.redis_client import redis_client
 
@@ -44,20 +49,50 @@ class Mem0MemoryManager:
             generation_model: 生成模型
             chroma_persist_dir: ChromaDB持久化目录
         """
+        config = get_memory_config()
+        self.hyde_enabled = config.hyde_enabled
+        self.hyde_budget = config.hyde_budget_ms / 1000
+        self.hyde_skip_score = config.hyde_skip_score
+        
         self.hyde_retriever = HyDERetriever(
             ollama_base_url=ollama_base_url,
             embedding_model=embedding_model,
-            generation_model=generation_model
+            generation_model=generation_model,
+            hypothesis_cache_size=config.hyde_cache_size,
+            hypothesis_cache_ttl=config.hyde_cache_ttl
         )
         
+        # 超出预算仍在生成的假设文档任务（完成后写入假设文档缓存，供下次命中）
+        self._hyde_tasks: Set[asyncio.Task] = set()
+        self._hyde_metrics = {
+            "raw_only": 0,
+            "skipped_confident": 0,
+            "over_budget": 0,
+            "hyde_used": 0,
+        }
+        
         try:
-            self.vector_store = VectorStore(persist_directory=chroma_persist_dir)
+            # 向量索引调用放到专用线程，写入批量合并，不阻塞事件循环
+            self.vector_store = AsyncVectorStore(
+                create_vector_index(
+                    backend=config.vector_backend,
+                    chroma_persist_dir=chroma_persist_dir,
+                    collection_name=config.chroma_collection_name,
+                    index_dir=config.vector_index_dir,
+                    quantize=config.vector_index_quantize
+                )
+            )
         except Exception as e:
             logger.error(f"Failed to initialize vector store: {e}")
             self.vector_store = None
         
         self.memory_dao = MemoryDAO()
         self.cache_ttl = 3600  # 缓存1小时
+        self.retrieval_cache = RetrievalCache(
+            ttl=config.query_cache_ttl,
+            near_size=config.retrieval_near_cache_size,
+            near_ttl=config.retrieval_near_cache_ttl
+        )
         
         logger.info("Mem0 Memory Manager initialized")
     
@@ -107,7 +142,7 @@ class Mem0MemoryManager:
                 "created_at": datetime.utcnow().isoformat()
             }
             
-            success = self.vector_store.add_memory(
+            success = await self.vector_store.add_memory(
                 memory_id=memory_id,
                 content=fact_content,
                 embedding=embedding,
@@ -132,7 +167,7 @@ class Mem0MemoryManager:
             if not db_result:
                 logger.error("Failed to save memory to database")
                 # 尝试清理向量库中的记忆
-                self.vector_store.delete_memory(memory_id)
+                await self.vector_store.delete_memory(memory_id)
                 return None
             
             # 5. 清除用户缓存
@@ -145,6 +180,112 @@ class Mem0MemoryManager:
             logger.error(f"Failed to add memory: {e}")
             return None
     
+    async def add_memories_batch(
+        self,
+        user_id: str,
+        facts: List[Dict[str, Any]],
+        source_session_id: Optional[str] = None,
+        source_message_id: Optional[int] = None
+    ) -> List[str]:
+        """
+        批量添加记忆
+        
+        一次批量嵌入、一次向量库批量写入、一条多行 INSERT，最后只清除一次用户缓存。
+        SQL 写入失败时删除已入队或已写入向量库的记忆，不会留下没有 SQL 记录的向量。
+        向量写入由 AsyncVectorStore 在后台批量落盘，失败的批次会重试；重试耗尽时该条
+        记忆只存在于SQL中（记入 dropped_items），检索时查不到，需要重新嵌入。
+        
+        Args:
+            user_id: 用户ID
+            facts: 事实列表，每项包含 fact_content, fact_type, validity_score
+            source_session_id: 来源会话
+            source_message_id: 来源消息
+            
+        Returns:
+            成功写入的记忆ID列表
+        """
+        if not self.vector_store:
+            logger.error("Vector store not available")
+            return []
+        
+        if not facts:
+            return []
+        
+        memory_ids: List[str] = []
+        try:
+            # 1. 批量生成向量，嵌入失败的事实不写入
+            embeddings = await self.hyde_retriever.batch_embed_texts(
+                [fact["fact_content"] for fact in facts]
+            )
+            embedded = [
+                (fact, embedding) for fact, embedding in zip(facts, embeddings)
+                if embedding
+            ]
+            if len(embedded) < len(facts):
+                logger.warning(f"Failed to embed {len(facts) - len(embedded)}/{len(facts)} facts")
+            if not embedded:
+                return []
+            
+            # 2. 批量写入向量库
+            created_at = datetime.utcnow().isoformat()
+            memory_ids = [str(uuid.uuid4()) for _ in embedded]
+            metadatas = [
+                {
+                    "user_id": user_id,
+                    "fact_type": fact.get("fact_type", "general"),
+                    "source_session_id": source_session_id or "",
+                    "validity_score": fact.get("validity_score", 1.0),
+                    "created_at": created_at
+                }
+                for fact, _ in embedded
+            ]
+            
+            success = await self.vector_store.batch_add_memories(
+                memory_ids=memory_ids,
+                contents=[fact["fact_content"] for fact, _ in embedded],
+                embeddings=[embedding for _, embedding in embedded],
+                metadatas=metadatas
+            )
+            if not success:
+                logger.error("Failed to add memories to vector store")
+                await self._compensate_vector_writes(memory_ids)
+                return []
+            
+            # 3. 单条多行 INSERT 写入SQL数据库
+            db_rows = await self.memory_dao.create_user_facts_batch(
+                user_id=user_id,
+                facts=[
+                    {**fact, "embedding_id": memory_id}
+                    for (fact, _), memory_id in zip(embedded, memory_ids)
+                ],
+                source_session_id=source_session_id,
+                source_message_id=source_message_id
+            )
+            if db_rows is None:
+                logger.error("Failed to save memories to database")
+                await self._compensate_vector_writes(memory_ids)
+                return []
+            
+            # 4. 每个用户只清除一次缓存
+            await self._invalidate_user_cache(user_id)
+            
+            logger.info(f"Added {len(memory_ids)} memories for user {user_id}")
+            return memory_ids
+            
+        except Exception as e:
+            logger.error(f"Failed to batch add memories: {e}")
+            if memory_ids:
+                await self._compensate_vector_writes(memory_ids)
+            return []
+    
+    async def _compensate_vector_writes(self, memory_ids: List[str]) -> None:
+        """回滚已写入（或仍在写入队列中）的向量记忆"""
+        for memory_id in memory_ids:
+            try:
+                await self.vector_store.delete_memory(memory_id)
+            except Exception as e:
+                logger.error(f"Failed to roll back vector memory {memory_id}: {e}")
+    
     async def retrieve_memories(
         self,
         query: str,
@@ -171,38 +312,32 @@ class Mem0MemoryManager:
             return []
         
         try:
-            # 1. 检查缓存
-            cache_key = f"memory:query:{user_id}:{hash(query)}"
-            cached = await redis_client.get_json(cache_key)
-            if cached:
+            # 1. 检查缓存（稳定摘要 + 用户代数，跨进程共享）
+            use_hyde = use_hyde and self.hyde_enabled
+            cache_params = {"top_k": top_k, "use_hyde": use_hyde, "fact_type": fact_type}
+            cached = await self.retrieval_cache.get(user_id, query, cache_params)
+            if cached is not None:
                 logger.debug(f"Cache hit for query: {query[:50]}")
                 return cached
             
-            # 2. 使用HyDE生成查询向量
-            query_embedding = await self.hyde_retriever.embed_query_with_hyde(
-                query=query,
-                user_context=None,  # 可以传入用户上下文
-                use_hyde=use_hyde
-            )
-            
-            if not query_embedding:
-                logger.error("Failed to generate query embedding")
-                return []
-            
-            # 3. 向量检索
+            # 2. 向量检索（HyDE 与原始查询检索并发，受延迟预算约束）
             filter_metadata = {}
             if fact_type:
                 filter_metadata["fact_type"] = fact_type
             
-            memories = self.vector_store.search_memories(
-                query_embedding=query_embedding,
+            memories = await self._search_with_budget(
+                query=query,
                 user_id=user_id,
                 top_k=top_k,
-                filter_metadata=filter_metadata
+                filter_metadata=filter_metadata,
+                use_hyde=use_hyde
             )
+            if memories is None:
+                logger.error("Failed to generate query embedding")
+                return []
             
-            # 4. 缓存结果
-            await redis_client.set_json(cache_key, memories, expire=300)  # 缓存5分钟
+            # 3. 缓存结果
+            await self.retrieval_cache.set(user_id, query, cache_params, memories)
             
             logger.info(f"Retrieved {len(memories)} memories for user {user_id}")
             return memories
@@ -211,6 +346,106 @@ class Mem0MemoryManager:
             logger.error(f"Failed to retrieve memories: {e}")
             return []
     
+    async def _search_with_budget(
+        self,
+        query: str,
+        user_id: str,
+        top_k: int,
+        filter_metadata: Dict[str, Any],
+        use_hyde: bool
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        延迟预算内的 HyDE 检索
+        
+        1. 假设文档生成在后台启动，同时用原始查询嵌入检索
+        2. 原始检索的最高相似度达到 hyde_skip_score 时直接返回，不等待 HyDE
+        3. 否则在剩余预算内等待假设文档，超时则返回原始检索结果
+        
+        Args:
+            query: 查询文本
+            user_id: 用户ID
+            top_k: 返回数量
+            filter_metadata: 元数据过滤条件
+            use_hyde: 是否使用HyDE
+            
+        Returns:
+            记忆列表，查询向量生成失败时返回None
+        """
+        started = time.perf_counter()
+        
+        hyde_task = None
+        if use_hyde:
+            hyde_task = asyncio.create_task(
+                self.hyde_retriever.generate_hypothetical_document(query)
+            )
+        
+        raw_embedding = await self.hyde_retriever.embed_text(query)
+        raw_memories = None
+        if raw_embedding:
+            raw_memories = await self.vector_store.search_memories(
+                query_embedding=raw_embedding,
+                user_id=user_id,
+                top_k=top_k,
+                filter_metadata=filter_metadata
+            )
+        
+        if hyde_task is None:
+            self._hyde_metrics["raw_only"] += 1
+            return raw_memories
+        
+        if raw_memories and self._best_similarity(raw_memories) >= self.hyde_skip_score:
+            # 原始查询已经足够好，不再等待生成（已启动的生成在后台完成并缓存）
+            self._hyde_metrics["skipped_confident"] += 1
+            self._detach_hyde_task(hyde_task)
+            return raw_memories
+        
+        remaining = self.hyde_budget - (time.perf_counter() - started)
+        done, _ = await asyncio.wait({hyde_task}, timeout=max(remaining, 0))
+        if not done:
+            self._hyde_metrics["over_budget"] += 1
+            self._detach_hyde_task(hyde_task)
+            if raw_memories is not None:
+                logger.debug(f"HyDE exceeded {self.hyde_budget * 1000:.0f}ms budget, using raw query results")
+                return raw_memories
+            # 原始查询嵌入失败时只能等待 HyDE
+            await hyde_task
+        
+        hypothetical_doc = hyde_task.result()
+        if hypothetical_doc == query and raw_memories is not None:
+            # 生成失败时 HyDE 退化为原始查询，结果与原始检索相同
+            return raw_memories
+        
+        hyde_embedding = await self.hyde_retriever.embed_text(hypothetical_doc)
+        if not hyde_embedding:
+            return raw_memories
+        
+        self._hyde_metrics["hyde_used"] += 1
+        return await self.vector_store.search_memories(
+            query_embedding=hyde_embedding,
+            user_id=user_id,
+            top_k=top_k,
+            filter_metadata=filter_metadata
+        )
+    
+    @staticmethod
+    def _best_similarity(memories: List[Dict[str, Any]]) -> float:
+        """
+        检索结果的最高相似度
+        
+        ChromaDB 默认使用 L2 平方距离，对归一化嵌入有 cos = 1 - d / 2
+        """
+        distances = [m["distance"] for m in memories if m.get("distance") is not None]
+        if not distances:
+            return 0.0
+        return 1.0 - min(distances) / 2.0
+    
+    def _detach_hyde_task(self, task: asyncio.Task) -> None:
+        """让未完成的假设文档生成在后台继续，完成后结果进入缓存"""
+        if task.done():
+            return
+        self._hyde_tasks.add(task)
+        task.add_done_callback(self._hyde_tasks.discard)
+    
     async def get_user_context(
         self,
         user_id: str,
@@ -275,7 +510,7 @@ class Mem0MemoryManager:
         try:
             # 1. 从向量库删除
             if self.vector_store:
-                self.vector_store.delete_memory(memory_id)
+                await self.vector_store.delete_memory(memory_id)
             
             # 2. 从数据库删除
             await self.memory_dao.delete_fact(memory_id)
@@ -303,7 +538,7 @@ class Mem0MemoryManager:
         try:
             # 1. 从向量库删除
             if self.vector_store:
-                self.vector_store.delete_user_memories(user_id)
+                await self.vector_store.delete_user_memories(user_id)
             
             # 2. 从数据库删除
             await self.memory_dao.delete_user_facts(user_id)
@@ -323,13 +558,13 @@ class Mem0MemoryManager:
         try:
             # 清除上下文缓存
             await redis_client.delete(f"memory:context:{user_id}")
-            # 清除查询缓存（使用模式匹配）
-            # 注意：这需要Redis支持SCAN命令
-            logger.debug(f"Invalidated cache for user {user_id}")
+            # 递增用户代数，旧的查询缓存键不再命中
+            generation = await self.retrieval_cache.invalidate(user_id)
+            logger.debug(f"Invalidated cache for user {user_id} (generation {generation})")
         except Exception as e:
             logger.error(f"Failed to invalidate cache: {e}")
     
-    def get_stats(self) -> Dict[str, Any]:
+    async def get_stats(self) -> Dict[str, Any]:
         """
         获取记忆系统统计信息
         
@@ -341,6 +576,23 @@ class Mem0MemoryManager:
         }
         
         if self.vector_store:
-            stats.update(self.vector_store.get_collection_stats())
+            stats.update(await self.vector_store.get_collection_stats())
+        
+        stats["retrieval_cache"] = self.retrieval_cache.get_stats()
+        stats["hyde"] = {
+            **self._hyde_metrics,
+            "budget_ms": int(self.hyde_budget * 1000),
+            "pending_generations": len(self._hyde_tasks),
+            "hypothesis_cache": self.hyde_retriever.hypothesis_cache.get_stats()
+        }
         
         return stats
+    
+    async def close(self):
+        """刷新向量库中尚未落盘的写入并释放工作线程"""
+        for task in list(self._hyde_tasks):
+            task.cancel()
+        if self.vector_store:
+            await self.vector_store.close()
+        if self.hyde_retriever.embedding_cache is not None:
+            self.hyde_retriever.embedding_cache.flush()
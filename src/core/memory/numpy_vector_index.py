@@ -0,0 +1,674 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NumPy 向量索引
+无需 ChromaDB 的进程内实现：每个用户一个连续的 float32 矩阵分片，暴力 top-k 检索，
+向量以内存映射文件持久化，启动时无需加载全部数据
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import List, Dict, Any, Optional
+
+from src.core.memory.vector_index import BaseVectorIndex
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning("NumPy not installed. NumPy vector index will not be available.")
+
+
+# 没有 user_id 的记忆放入共享分片
+_SHARED_SHARD = "__shared__"
+# 分片行数达到该值后才使用 int8 预筛选，小分片直接精确计算更快
+_QUANTIZE_MIN_ROWS = 1024
+# int8 预筛选的候选倍数（候选再用 float32 精确重排）
+_QUANTIZE_OVERSAMPLE = 4
+_INITIAL_CAPACITY = 64
+
+
+def _shard_dirname(shard_key: str) -> str:
+    """将分片键转换为安全的目录名"""
+    safe = re.sub(r"[^A-Za-z0-9._-]+", "_", shard_key)[:48]
+    suffix = hashlib.blake2b(shard_key.encode("utf-8"), digest_size=6).hexdigest()
+    return f"{safe}-{suffix}"
+
+
+class _Shard:
+    """
+    单个用户的向量分片
+
+    - vectors.bin: [capacity, dim] float32 内存映射矩阵，前 count 行有效
+    - records.json: 与矩阵行对应的 id / content / metadata
+    删除时用最后一行填补空位，保持矩阵连续。
+    """
+
+    def __init__(self, directory: str, key: str):
+        self.directory = directory
+        self.key = key
+        self.dim: Optional[int] = None
+        self.capacity = 0
+        self.count = 0
+
+        self.ids: List[str] = []
+        self.contents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.rows: Dict[str, int] = {}
+
+        self._vectors = None
+        self._sq_norms = None
+        self._codes = None
+        self._scales = None
+
+        self._load()
+
+    @property
+    def _records_path(self) -> str:
+        return os.path.join(self.directory, "records.json")
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, "vectors.bin")
+
+    def _load(self) -> None:
+        """加载已持久化的分片"""
+        if not os.path.exists(self._records_path):
+            return
+
+        with open(self._records_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+
+        self.key = records.get("key", self.key)
+        self.dim = records["dim"]
+        self.capacity = records["capacity"]
+        self.ids = records["ids"]
+        self.contents = records["contents"]
+        self.metadatas = records["metadatas"]
+        self.count = len(self.ids)
+        self.rows = {memory_id: row for row, memory_id in enumerate(self.ids)}
+
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                  shape=(self.capacity, self.dim))
+        self._refresh_norms()
+
+    def _refresh_norms(self) -> None:
+        valid = self._vectors[:self.count]
+        self._sq_norms = np.einsum("ij,ij->i", valid, valid).astype(np.float32)
+        self._codes = None
+
+    def _reserve(self, rows_needed: int) -> None:
+        """确保矩阵容量足够，不足时按倍数扩展映射文件"""
+        if self.count + rows_needed <= self.capacity:
+            return
+
+        new_capacity = max(_INITIAL_CAPACITY, self.capacity)
+        while new_capacity < self.count + rows_needed:
+            new_capacity *= 2
+
+        os.makedirs(self.directory, exist_ok=True)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+
+        self.capacity = new_capacity
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                  shape=(self.capacity, self.dim))
+
+    def add(
+        self,
+        memory_ids: List[str],
+        contents: List[str],
+        vectors,
+        metadatas: List[Dict[str, Any]]
+    ) -> int:
+        """追加记忆（已存在的ID跳过，与 ChromaDB 行为一致），返回新增数量"""
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+
+        keep = []
+        seen = set()
+        for i, memory_id in enumerate(memory_ids):
+            if memory_id in self.rows or memory_id in seen:
+                logger.warning(f"Memory {memory_id} already exists, skipping")
+                continue
+            seen.add(memory_id)
+            keep.append(i)
+        if not keep:
+            return 0
+
+        self._reserve(len(keep))
+        start = self.count
+        block = vectors[keep]
+        self._vectors[start:start + len(keep)] = block
+
+        for offset, i in enumerate(keep):
+            self.ids.append(memory_ids[i])
+            self.contents.append(contents[i])
+            self.metadatas.append(dict(metadatas[i]))
+            self.rows[memory_ids[i]] = start + offset
+
+        self.count += len(keep)
+        self._sq_norms = np.concatenate([self._sq_norms if self._sq_norms is not None else np.zeros(0, np.float32),
+                                         np.einsum("ij,ij->i", block, block).astype(np.float32)])
+        self._codes = None
+        return len(keep)
+
+    def remove(self, memory_id: str) -> bool:
+        """删除记忆，用最后一行填补空位"""
+        row = self.rows.pop(memory_id, None)
+        if row is None:
+            return False
+
+        last = self.count - 1
+        if row != last:
+            self._vectors[row] = self._vectors[last]
+            self._sq_norms[row] = self._sq_norms[last]
+            self.ids[row] = self.ids[last]
+            self.contents[row] = self.contents[last]
+            self.metadatas[row] = self.metadatas[last]
+            self.rows[self.ids[row]] = row
+
+        self.ids.pop()
+        self.contents.pop()
+        self.metadatas.pop()
+        self._sq_norms = self._sq_norms[:last]
+        self.count = last
+        self._codes = None
+        return True
+
+    def shrink(self) -> int:
+        """
+        将映射文件收缩到有效行数（不低于初始容量）
+
+        Returns:
+            回收的字节数
+        """
+        if self.dim is None or self._vectors is None:
+            return 0
+
+        target = max(_INITIAL_CAPACITY, self.count)
+        if target >= self.capacity:
+            return 0
+
+        self._vectors.flush()
+        self._vectors = None
+        with open(self._vectors_path, "r+b") as f:
+            f.truncate(target * self.dim * 4)
+
+        reclaimed = (self.capacity - target) * self.dim * 4
+        self.capacity = target
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                  shape=(self.capacity, self.dim))
+        self._refresh_norms()
+        self.persist()
+        return reclaimed
+
+    def update(self, memory_id: str, content, vector, metadata) -> bool:
+        """原地更新记忆"""
+        row = self.rows.get(memory_id)
+        if row is None:
+            return False
+
+        if content is not None:
+            self.contents[row] = content
+        if metadata is not None:
+            self.metadatas[row] = dict(metadata)
+        if vector is not None:
+            if vector.shape[0] != self.dim:
+                raise ValueError(f"Embedding dimension {vector.shape[0]} does not match index dimension {self.dim}")
+            self._vectors[row] = vector
+            self._sq_norms[row] = float(vector @ vector)
+            self._codes = None
+        return True
+
+    def _quantized(self):
+        """按行对称 int8 量化（懒构建，写入后失效）"""
+        if self._codes is None:
+            valid = self._vectors[:self.count]
+            scales = np.abs(valid).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self._codes = np.round(valid / scales[:, None]).astype(np.int8)
+            self._scales = scales.astype(np.float32)
+        return self._codes, self._scales
+
+    def search(self, query, top_k: int, where: Dict[str, Any], quantize: bool) -> List[tuple]:
+        """
+        暴力 top-k 检索
+
+        Returns:
+            (distance, row) 列表，按距离升序
+        """
+        if self.count == 0 or query.shape[0] != self.dim:
+            return []
+
+        mask = None
+        if where:
+            mask = np.fromiter(
+                (all(meta.get(k) == v for k, v in where.items()) for meta in self.metadatas),
+                dtype=bool,
+                count=self.count
+            )
+            if not mask.any():
+                return []
+
+        query_sq = float(query @ query)
+        candidates = None
+
+        if quantize and self.count >= _QUANTIZE_MIN_ROWS:
+            # int8 码本常驻内存（仅 float32 的 1/4），预筛选出候选后
+            # 只读取候选行的映射向量做 float32 精确重排
+            codes, scales = self._quantized()
+            approx = self._sq_norms - 2.0 * (codes @ query) * scales
+            if mask is not None:
+                approx = np.where(mask, approx, np.inf)
+            n_candidates = min(self.count, top_k * _QUANTIZE_OVERSAMPLE)
+            candidates = np.argpartition(approx, n_candidates - 1)[:n_candidates]
+            distances = self._sq_norms[candidates] - 2.0 * (self._vectors[candidates] @ query) + query_sq
+            if mask is not None:
+                distances = np.where(mask[candidates], distances, np.inf)
+        else:
+            distances = self._sq_norms - 2.0 * (self._vectors[:self.count] @ query) + query_sq
+            if mask is not None:
+                distances = np.where(mask, distances, np.inf)
+
+        k = min(top_k, len(distances))
+        if k <= 0:
+            return []
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind="stable")]
+
+        results = []
+        for index in top.tolist():
+            distance = float(distances[index])
+            if not np.isfinite(distance):
+                break
+            row = int(candidates[index]) if candidates is not None else index
+            results.append((max(distance, 0.0), row))
+        return results
+
+    def persist(self) -> None:
+        """落盘：先刷新向量，再原子替换记录文件"""
+        if self.dim is None:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        if self._vectors is not None:
+            self._vectors.flush()
+
+        tmp_path = self._records_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "key": self.key,
+                "dim": self.dim,
+                "capacity": self.capacity,
+                "ids": self.ids,
+                "contents": self.contents,
+                "metadatas": self.metadatas
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self._records_path)
+
+    def destroy(self) -> None:
+        """删除分片文件"""
+        self._vectors = None
+        for path in (self._records_path, self._vectors_path):
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.isdir(self.directory) and not os.listdir(self.directory):
+            os.rmdir(self.directory)
+
+
+class NumpyVectorIndex(BaseVectorIndex):
+    """
+    NumPy 向量索引
+
+    - 每个用户一个分片，分片内向量为连续的 float32 矩阵
+    - 检索为一次矩阵向量乘法 + argpartition，分片较大时可选 int8 预筛选
+    - 分片在首次访问时才打开，内存映射按需读取，启动不加载数据
+    - distance 为 L2 平方距离，与 ChromaDB 默认度量一致
+    """
+
+    def __init__(
+        self,
+        persist_directory: str = "./data/vector_index",
+        collection_name: str = "user_memories",
+        quantize: bool = False
+    ):
+        """
+        初始化 NumPy 向量索引
+
+        Args:
+            persist_directory: 持久化目录
+            collection_name: 集合名称
+            quantize: 是否对大分片启用 int8 量化预筛选
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NumPy is not installed. Install with: pip install numpy")
+
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        self.quantize = quantize
+        self.root = os.path.join(persist_directory, collection_name)
+        os.makedirs(self.root, exist_ok=True)
+
+        self._shards: Dict[str, _Shard] = {}
+        self._lock = threading.RLock()
+
+        logger.info(f"NumPy vector index initialized at {self.root}")
+
+    def _shard(self, shard_key: str) -> _Shard:
+        """获取（必要时打开）分片"""
+        shard = self._shards.get(shard_key)
+        if shard is None:
+            shard = _Shard(os.path.join(self.root, _shard_dirname(shard_key)), shard_key)
+            self._shards[shard_key] = shard
+        return shard
+
+    def _load_all_shards(self) -> List[_Shard]:
+        """打开磁盘上所有分片（跨用户操作时使用）"""
+        loaded_dirs = {shard.directory for shard in self._shards.values()}
+        for name in os.listdir(self.root):
+            directory = os.path.join(self.root, name)
+            if directory in loaded_dirs or not os.path.isdir(directory):
+                continue
+            try:
+                shard = _Shard(directory, name)
+            except Exception as e:
+                logger.error(f"Failed to open vector index shard {name}: {e}")
+                continue
+            self._shards[shard.key] = shard
+        return list(self._shards.values())
+
+    def _find(self, memory_id: str) -> Optional[_Shard]:
+        """查找包含指定记忆的分片，优先查已打开的分片"""
+        for shard in self._shards.values():
+            if memory_id in shard.rows:
+                return shard
+        for shard in self._load_all_shards():
+            if memory_id in shard.rows:
+                return shard
+        return None
+
+    def add_memory(
+        self,
+        memory_id: str,
+        content: str,
+        embedding: List[float],
+        metadata: Dict[str, Any]
+    ) -> bool:
+        """
+        添加记忆到向量库
+
+        Args:
+            memory_id: 记忆唯一ID
+            content: 记忆内容
+            embedding: 向量表示
+            metadata: 元数据（user_id, session_id, fact_type等）
+
+        Returns:
+            是否成功
+        """
+        return self.batch_add_memories([memory_id], [content], [embedding], [metadata])
+
+    def batch_add_memories(
+        self,
+        memory_ids: List[str],
+        contents: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]]
+    ) -> bool:
+        """
+        批量添加记忆（按用户分组后每个分片一次写入）
+
+        Args:
+            memory_ids: 记忆ID列表
+            contents: 内容列表
+            embeddings: 向量列表
+            metadatas: 元数据列表
+
+        Returns:
+            是否成功
+        """
+        try:
+            groups: Dict[str, List[int]] = {}
+            for i, metadata in enumerate(metadatas):
+                groups.setdefault(metadata.get("user_id") or _SHARED_SHARD, []).append(i)
+
+            with self._lock:
+                for shard_key, indexes in groups.items():
+                    shard = self._shard(shard_key)
+                    shard.add(
+                        [memory_ids[i] for i in indexes],
+                        [contents[i] for i in indexes],
+                        np.asarray([embeddings[i] for i in indexes], dtype=np.float32),
+                        [metadatas[i] for i in indexes]
+                    )
+                    shard.persist()
+
+            logger.debug(f"Batch added {len(memory_ids)} memories to NumPy vector index")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to batch add memories: {e}")
+            return False
+
+    def search_memories(
+        self,
+        query_embedding: List[float],
+        user_id: Optional[str] = None,
+        top_k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        搜索相关记忆
+
+        Args:
+            query_embedding: 查询向量
+            user_id: 用户ID（用于过滤）
+            top_k: 返回结果数量
+            filter_metadata: 额外的元数据过滤条件
+
+        Returns:
+            相关记忆列表
+        """
+        try:
+            query = np.asarray(query_embedding, dtype=np.float32)
+            where = dict(filter_metadata or {})
+
+            with self._lock:
+                if user_id:
+                    shards = [self._shard(user_id)]
+                else:
+                    shards = self._load_all_shards()
+
+                hits = []
+                for shard in shards:
+                    for distance, row in shard.search(query, top_k, where, self.quantize):
+                        hits.append((distance, shard, row))
+
+                hits.sort(key=lambda hit: hit[0])
+                memories = [
+                    {
+                        'id': shard.ids[row],
+                        'content': shard.contents[row],
+                        'distance': distance,
+                        'metadata': dict(shard.metadatas[row])
+                    }
+                    for distance, shard, row in hits[:top_k]
+                ]
+
+            logger.debug(f"Found {len(memories)} relevant memories")
+            return memories
+
+        except Exception as e:
+            logger.error(f"Failed to search memories: {e}")
+            return []
+
+    def delete_memory(self, memory_id: str) -> bool:
+        """
+        删除记忆
+
+        Args:
+            memory_id: 记忆ID
+
+        Returns:
+            是否成功
+        """
+        try:
+            with self._lock:
+                shard = self._find(memory_id)
+                if shard is not None:
+                    shard.remove(memory_id)
+                    shard.persist()
+            logger.debug(f"Deleted memory {memory_id}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to delete memory: {e}")
+            return False
+
+    def delete_memories(self, memory_ids: List[str]) -> int:
+        """
+        批量删除记忆（每个分片只落盘一次）
+
+        Args:
+            memory_ids: 记忆ID列表
+
+        Returns:
+            删除的数量
+        """
+        try:
+            deleted = 0
+            with self._lock:
+                touched = {}
+                for memory_id in memory_ids:
+                    shard = self._find(memory_id)
+                    if shard is not None and shard.remove(memory_id):
+                        touched[shard.directory] = shard
+                        deleted += 1
+                for shard in touched.values():
+                    shard.persist()
+            logger.debug(f"Deleted {deleted} memories")
+            return deleted
+
+        except Exception as e:
+            logger.error(f"Failed to delete memories: {e}")
+            return 0
+
+    def delete_user_memories(self, user_id: str) -> bool:
+        """
+        删除用户的所有记忆
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            是否成功
+        """
+        try:
+            with self._lock:
+                self._shard(user_id).destroy()
+                self._shards.pop(user_id, None)
+            logger.info(f"Deleted all memories for user {user_id}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to delete user memories: {e}")
+            return False
+
+    def update_memory(
+        self,
+        memory_id: str,
+        content: Optional[str] = None,
+        embedding: Optional[List[float]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        更新记忆
+
+        Args:
+            memory_id: 记忆ID
+            content: 新内容
+            embedding: 新向量
+            metadata: 新元数据
+
+        Returns:
+            是否成功
+        """
+        try:
+            vector = np.asarray(embedding, dtype=np.float32) if embedding is not None else None
+            with self._lock:
+                shard = self._find(memory_id)
+                if shard is None:
+                    logger.error(f"Memory {memory_id} not found")
+                    return False
+                shard.update(memory_id, content, vector, metadata)
+                shard.persist()
+            logger.debug(f"Updated memory {memory_id}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to update memory: {e}")
+            return False
+
+    def compact(self) -> Dict[str, Any]:
+        """
+        收缩各分片的映射文件，删除空分片
+
+        Returns:
+            重建/删除的分片数和回收的字节数
+        """
+        report = {"segments_rebuilt": 0, "segments_removed": 0, "bytes_reclaimed": 0}
+        try:
+            with self._lock:
+                for shard in self._load_all_shards():
+                    if shard.count == 0 and shard.dim is not None:
+                        report["bytes_reclaimed"] += shard.capacity * shard.dim * 4
+                        report["segments_removed"] += 1
+                        shard.destroy()
+                        self._shards.pop(shard.key, None)
+                        continue
+
+                    reclaimed = shard.shrink()
+                    if reclaimed:
+                        report["segments_rebuilt"] += 1
+                        report["bytes_reclaimed"] += reclaimed
+
+            logger.info(f"Compacted vector index {self.collection_name}: {report}")
+        except Exception as e:
+            logger.error(f"Failed to compact vector index: {e}")
+        return report
+
+    def get_collection_stats(self) -> Dict[str, Any]:
+        """
+        获取集合统计信息
+
+        Returns:
+            统计信息字典
+        """
+        try:
+            with self._lock:
+                shards = self._load_all_shards()
+                return {
+                    "total_memories": sum(shard.count for shard in shards),
+                    "collection_name": self.collection_name,
+                    "persist_directory": self.persist_directory,
+                    "backend": "numpy",
+                    "shards": len([shard for shard in shards if shard.count]),
+                    "quantize": self.quantize
+                }
+        except Exception as e:
+            logger.error(f"Failed to get collection stats: {e}")
+            return {}
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+记忆检索缓存
+跨进程共享的检索结果缓存：键为归一化查询的稳定摘要 + 用户代数（generation），
+写入记忆时递增代数即可让该用户的所有旧缓存失效；进程内近端缓存挡在 Redis 前面
+"""
+
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.cache import LRUCache
+from src.core.memory.embedding_cache import normalize_text
+from src.core.security.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalCache:
+    """
+    记忆检索缓存
+
+    - 键：memory:query:{user_id}:g{generation}:{digest}，digest 为 blake2b 稳定摘要，
+      不受 Python hash() 随机盐影响，多个工作进程和重启后都能命中
+    - 失效：INCR memory:gen:{user_id}，O(1)，旧键随 TTL 自然过期
+    - 近端缓存：进程内 LRU 保存热点结果和用户代数，near_ttl 秒内不访问 Redis
+      （即跨进程失效最多延迟 near_ttl 秒；本进程写入立即生效）
+    - Redis 不可用时退化为纯进程内缓存
+    """
+
+    def __init__(
+        self,
+        ttl: int = 300,
+        near_size: int = 512,
+        near_ttl: float = 2.0
+    ):
+        """
+        初始化检索缓存
+
+        Args:
+            ttl: Redis 中检索结果的过期时间（秒）
+            near_size: 进程内近端缓存条目数
+            near_ttl: 近端缓存（结果和代数）的有效期（秒）
+        """
+        self.ttl = ttl
+        self.near_ttl = near_ttl
+        self._near = LRUCache(max_size=near_size, ttl=near_ttl)
+        # user_id -> (generation, 读取时间)
+        self._generations: Dict[str, Tuple[int, float]] = {}
+
+        self.redis_hits = 0
+
+    @staticmethod
+    def _digest(query: str, params: Dict[str, Any]) -> str:
+        """归一化查询 + 检索参数的稳定摘要"""
+        payload = json.dumps(
+            {"q": normalize_text(query).lower(), **params},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _generation_key(user_id: str) -> str:
+        return f"memory:gen:{user_id}"
+
+    async def _generation(self, user_id: str) -> int:
+        """获取用户当前代数（近端缓存 near_ttl 秒）"""
+        cached = self._generations.get(user_id)
+        now = time.monotonic()
+        if cached is not None and (now - cached[1] < self.near_ttl or not redis_client.is_available()):
+            return cached[0]
+
+        generation = 0
+        if redis_client.is_available():
+            value = await redis_client.get(self._generation_key(user_id))
+            if value is not None:
+                try:
+                    generation = int(value)
+                except ValueError:
+                    generation = 0
+        elif cached is not None:
+            generation = cached[0]
+
+        self._generations[user_id] = (generation, now)
+        return generation
+
+    async def _key(self, user_id: str, query: str, params: Dict[str, Any]) -> str:
+        generation = await self._generation(user_id)
+        return f"memory:query:{user_id}:g{generation}:{self._digest(query, params)}"
+
+    async def get(
+        self,
+        user_id: str,
+        query: str,
+        params: Dict[str, Any]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        查找缓存的检索结果
+
+        Args:
+            user_id: 用户ID
+            query: 查询文本
+            params: 影响结果的检索参数（top_k、fact_type 等）
+
+        Returns:
+            记忆列表，未命中返回None
+        """
+        key = await self._key(user_id, query, params)
+
+        memories = self._near.get(key)
+        if memories is not None:
+            return memories
+
+        memories = await redis_client.get_json(key)
+        if memories is not None:
+            self.redis_hits += 1
+            self._near.set(key, memories)
+        return memories
+
+    async def set(
+        self,
+        user_id: str,
+        query: str,
+        params: Dict[str, Any],
+        memories: List[Dict[str, Any]]
+    ) -> None:
+        """
+        写入检索结果
+
+        Args:
+            user_id: 用户ID
+            query: 查询文本
+            params: 检索参数
+            memories: 记忆列表
+        """
+        key = await self._key(user_id, query, params)
+        self._near.set(key, memories)
+        await redis_client.set_json(key, memories, expire=self.ttl)
+
+    async def invalidate(self, user_id: str) -> int:
+        """
+        使用户的所有检索缓存失效（递增代数）
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            新的代数
+        """
+        generation = await redis_client.incr(self._generation_key(user_id))
+        if generation is None:
+            cached = self._generations.get(user_id)
+            generation = (cached[0] if cached else 0) + 1
+
+        self._generations[user_id] = (generation, time.monotonic())
+        return generation
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            统计信息字典
+        """
+        stats = self._near.get_stats()
+        stats.update({
+            "redis_hits": self.redis_hits,
+            "tracked_users": len(self._generations)
+        })
+        return stats
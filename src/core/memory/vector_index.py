@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+向量索引接口
+定义记忆向量存储的统一接口，并按配置创建具体实现（ChromaDB / NumPy）
+"""
+
+import logging
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+SUPPORTED_BACKENDS = ("auto", "chroma", "numpy")
+
+
+class BaseVectorIndex(ABC):
+    """
+    向量索引抽象基类
+
+    所有方法均为同步调用，由 AsyncVectorStore 放到专用线程执行。
+    search_memories 返回的 distance 与 ChromaDB 默认一致：L2 平方距离，越小越相似。
+    """
+
+    @abstractmethod
+    def add_memory(
+        self,
+        memory_id: str,
+        content: str,
+        embedding: List[float],
+        metadata: Dict[str, Any]
+    ) -> bool:
+        """添加单条记忆"""
+        pass
+
+    @abstractmethod
+    def batch_add_memories(
+        self,
+        memory_ids: List[str],
+        contents: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]]
+    ) -> bool:
+        """批量添加记忆"""
+        pass
+
+    @abstractmethod
+    def search_memories(
+        self,
+        query_embedding: List[float],
+        user_id: Optional[str] = None,
+        top_k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """搜索相关记忆，返回 id / content / distance / metadata"""
+        pass
+
+    @abstractmethod
+    def delete_memory(self, memory_id: str) -> bool:
+        """删除单条记忆"""
+        pass
+
+    def delete_memories(self, memory_ids: List[str]) -> int:
+        """批量删除记忆，返回删除的数量（默认逐条删除，实现可覆盖为单次操作）"""
+        return sum(1 for memory_id in memory_ids if self.delete_memory(memory_id))
+
+    @abstractmethod
+    def delete_user_memories(self, user_id: str) -> bool:
+        """删除用户的所有记忆"""
+        pass
+
+    @abstractmethod
+    def update_memory(
+        self,
+        memory_id: str,
+        content: Optional[str] = None,
+        embedding: Optional[List[float]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """更新记忆"""
+        pass
+
+    @abstractmethod
+    def get_collection_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        pass
+
+    def compact(self) -> Dict[str, Any]:
+        """重建索引段、回收已删除记忆占用的空间（默认无操作，由后端自行管理）"""
+        return {"segments_rebuilt": 0, "segments_removed": 0, "bytes_reclaimed": 0}
+
+
+def create_vector_index(
+    backend: str = "auto",
+    chroma_persist_dir: str = "./data/chroma",
+    collection_name: str = "user_memories",
+    index_dir: str = "./data/vector_index",
+    quantize: bool = False
+) -> BaseVectorIndex:
+    """
+    按配置创建向量索引
+
+    Args:
+        backend: auto（优先 ChromaDB，未安装时使用 NumPy）/ chroma / numpy
+        chroma_persist_dir: ChromaDB 持久化目录
+        collection_name: 集合名称
+        index_dir: NumPy 索引持久化目录
+        quantize: NumPy 索引是否启用 int8 量化预筛选
+
+    Returns:
+        向量索引实例
+
+    Raises:
+        ValueError: 后端名称无效
+        RuntimeError: 所选后端依赖未安装
+    """
+    backend = backend.lower()
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(
+            f"Unsupported vector backend: {backend}. "
+            f"Supported backends: {', '.join(SUPPORTED_BACKENDS)}"
+        )
+
+    # 延迟导入，避免与具体实现循环引用
+    from src.core.memory.vector_store import VectorStore, CHROMADB_AVAILABLE
+    from src.core.memory.numpy_vector_index import NumpyVectorIndex
+
+    if backend == "auto":
+        backend = "chroma" if CHROMADB_AVAILABLE else "numpy"
+        logger.info(f"Vector backend auto-selected: {backend}")
+
+    if backend == "chroma":
+        return VectorStore(
+            persist_directory=chroma_persist_dir,
+            collection_name=collection_name
+        )
+
+    return NumpyVectorIndex(
+        persist_directory=index_dir,
+        collection_name=collection_name,
+        quantize=quantize
+    )
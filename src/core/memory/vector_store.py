@@ -10,6 +10,8 @@ from typing import List, Dict, Any, Optional
 import uuid
 from datetime import datetime
 
+from src.core.memory.vector_index import BaseVectorIndex
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -21,7 +23,7 @@ except ImportError:
     logger.warning("ChromaDB not installed. Vector store will not be available.")
 
 
-class VectorStore:
+class VectorStore(BaseVectorIndex):
     """
     向量存储管理器
     使用ChromaDB的嵌入式模式，适合低算力CPU环境
@@ -198,6 +200,28 @@ class VectorStore:
             logger.error(f"Failed to delete memory: {e}")
             return False
     
+    def delete_memories(self, memory_ids: List[str]) -> int:
+        """
+        批量删除记忆
+        
+        Args:
+            memory_ids: 记忆ID列表
+            
+        Returns:
+            删除的数量
+        """
+        if not memory_ids:
+            return 0
+        
+        try:
+            self.collection.delete(ids=list(memory_ids))
+            logger.debug(f"Deleted {len(memory_ids)} memories")
+            return len(memory_ids)
+            
+        except Exception as e:
+            logger.error(f"Failed to delete memories: {e}")
+            return 0
+    
     def delete_user_memories(self, user_id: str) -> bool:
         """
         删除用户的所有记忆
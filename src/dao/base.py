@@ -6,29 +6,85 @@ Provides common database operations for all DAOs
 """
 
 from abc import ABC
-from typing import Any, Dict, List, Optional, Tuple
+from contextlib import AsyncExitStack, asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
 import asyncpg
+import json
 import logging
+import sys
+import time
+
+from src.dao.query_metrics import QueryMetrics
+from src.dao.session_cache import SessionCache
 
 logger = logging.getLogger(__name__)
 
 
+class UnitOfWork:
+    """
+    工作单元：一次服务调用内的所有 DAO 查询共用一个连接（可选地在一个事务内）
+
+    - 连接在第一次查询时才从连接池获取，全部命中缓存的调用不占用连接
+    - 只有开启工作单元的任务使用该连接；作用域内派生的任务（asyncio.gather、
+      create_task，如写缓冲刷新、相关性评分、记忆提取）虽然继承上下文，
+      但各自从连接池获取连接，不参与工作单元的事务
+    - 退出作用域后工作单元关闭，之后仍在运行的派生任务不会再拿到已归还的连接
+    - 事务内有语句失败（即使 DAO 方法吞掉了异常，如 fetch_one 返回 None）时，
+      退出工作单元会回滚并抛出 RuntimeError
+    """
+
+    def __init__(self, transactional: bool = False):
+        self.transactional = transactional
+        self.conn: Optional[Any] = None
+        self.failed = False
+        self.closed = False
+        self.queries = 0
+        self._stack = AsyncExitStack()
+        self._owner: Optional[asyncio.Task] = asyncio.current_task()
+
+    def is_active(self) -> bool:
+        """当前任务能否使用该工作单元（未关闭且由当前任务开启）"""
+        return not self.closed and self._owner is asyncio.current_task()
+
+
+# 当前上下文的工作单元（由 BaseDAO.unit_of_work 设置；随 asyncio 任务继承，但只对开启它的任务生效）
+_current_unit: ContextVar[Optional[UnitOfWork]] = ContextVar("dao_unit_of_work", default=None)
+
+
 class BaseDAO(ABC):
     """
     Base Data Access Object class
     Provides common database operations and utilities
     """
     
-    # 全局连接池
+    # 全局连接池（PostgreSQL 为 asyncpg.Pool，SQLite 为接口兼容的 SQLitePool）
     _pool: Optional[asyncpg.Pool] = None
     _use_database: bool = False
+    _dialect: str = "postgres"
+
+    # 查询耗时指标与慢查询日志
+    _query_metrics: QueryMetrics = QueryMetrics()
+
+    # 会话行与最近消息的读穿缓存（所有 DAO 实例共享）
+    _session_cache: SessionCache = SessionCache()
 
     def __init__(self):
         """Initialize the base DAO"""
         pass
     
     @classmethod
-    async def init_pool(cls, dsn: str, min_size: int = 5, max_size: int = 20):
+    async def init_pool(
+        cls,
+        dsn: str,
+        min_size: int = 5,
+        max_size: int = 20,
+        statement_cache_size: int = 256,
+        slow_query_ms: float = 200.0,
+        session_cache_size: int = 1024,
+        session_cache_ttl: int = 300
+    ):
         """
         初始化数据库连接池
         
@@ -36,19 +92,161 @@ class BaseDAO(ABC):
             dsn: 数据库连接字符串
             min_size: 最小连接数
             max_size: 最大连接数
+            statement_cache_size: 每个连接缓存的预备语句数量
+            slow_query_ms: 慢查询日志阈值（毫秒），<= 0 关闭
+            session_cache_size: 会话缓存的进程内条目数
+            session_cache_ttl: 会话缓存在 Redis 中的过期时间（秒），<= 0 关闭
         """
         if cls._pool is None:
+            cls._configure(slow_query_ms, session_cache_size, session_cache_ttl)
             try:
+                # asyncpg 按 SQL 文本在每个连接上缓存预备语句，DAO 的 SQL 均为常量字符串，
+                # 同一语句只在每个连接上解析和规划一次
                 cls._pool = await asyncpg.create_pool(
                     dsn,
                     min_size=min_size,
-                    max_size=max_size
+                    max_size=max_size,
+                    statement_cache_size=statement_cache_size,
+                    init=cls._init_connection
                 )
                 cls._use_database = True
+                cls._dialect = "postgres"
                 logger.info("✓ 数据库连接池初始化成功")
             except Exception as e:
                 logger.error(f"数据库连接池初始化失败: {e}")
                 cls._use_database = False
+
+    @classmethod
+    async def init_sqlite(
+        cls,
+        path: str,
+        pool_size: int = 4,
+        busy_timeout_ms: int = 5000,
+        slow_query_ms: float = 200.0,
+        session_cache_size: int = 1024,
+        session_cache_ttl: int = 300
+    ):
+        """
+        初始化 SQLite 嵌入式存储（WAL 模式），并创建缺失的表
+
+        Args:
+            path: 数据库文件路径
+            pool_size: 连接数
+            busy_timeout_ms: 等待写锁的超时时间（毫秒）
+            slow_query_ms: 慢查询日志阈值（毫秒），<= 0 关闭
+            session_cache_size: 会话缓存的进程内条目数
+            session_cache_ttl: 会话缓存在 Redis 中的过期时间（秒），<= 0 关闭
+        """
+        if cls._pool is not None:
+            return
+
+        from src.dao.sqlite_backend import SQLitePool
+        from src.dao.sqlite_schema import ALL_TABLES, TEST_USERS
+
+        cls._configure(slow_query_ms, session_cache_size, session_cache_ttl)
+        pool = SQLitePool(path, size=pool_size, busy_timeout_ms=busy_timeout_ms)
+        try:
+            await pool.open()
+            await pool.executescript("".join(ALL_TABLES.values()) + TEST_USERS)
+            cls._pool = pool
+            cls._use_database = True
+            cls._dialect = "sqlite"
+            logger.info(f"✓ SQLite 存储初始化成功: {path}")
+        except Exception as e:
+            logger.error(f"SQLite 存储初始化失败: {e}")
+            await pool.close()
+            cls._use_database = False
+
+    @classmethod
+    @asynccontextmanager
+    async def unit_of_work(cls, transaction: bool = False) -> AsyncIterator[UnitOfWork]:
+        """
+        工作单元：作用域内所有 DAO 方法透明地共用一个连接
+
+        用法：
+            async with BaseDAO.unit_of_work(transaction=True):
+                session = await chat_dao.create_session(...)
+                await chat_dao.add_message(session["id"], ...)
+
+        - transaction=True 时作用域内的写入一起提交，作用域内抛出异常则全部回滚；
+          DAO 方法自身的事务成为保存点
+        - 嵌套使用时沿用外层的连接，内层 transaction=True 开启保存点（外层无事务时为独立事务）
+        - 作用域内派生的任务（如 asyncio.gather 的并发 DAO 调用）使用各自的连接，不在事务内
+        - 写入缓存的会话数据在回滚时被丢弃
+        - 作用域内不要等待 LLM 调用等慢操作，连接在整个作用域内被占用
+
+        Args:
+            transaction: 是否在一个事务内执行
+
+        Yields:
+            工作单元
+        """
+        outer = _current_unit.get()
+        if outer is not None and outer.is_active():
+            if not transaction:
+                yield outer
+                return
+            async with cls._acquire() as conn:
+                async with conn.transaction():
+                    yield outer
+            return
+
+        unit = UnitOfWork(transactional=transaction)
+        token = _current_unit.set(unit)
+        cache_seq = cls._session_cache.write_seq
+        try:
+            async with unit._stack:
+                yield unit
+                if unit.failed and unit.transactional:
+                    raise RuntimeError("工作单元内有语句执行失败，事务已回滚")
+        except BaseException:
+            if unit.transactional:
+                await cls._session_cache.discard_writes_since(cache_seq)
+            raise
+        finally:
+            # 连接已归还连接池，派生任务此后改从连接池获取连接
+            unit.closed = True
+            unit.conn = None
+            _current_unit.reset(token)
+
+    @classmethod
+    @asynccontextmanager
+    async def _acquire(cls) -> AsyncIterator[Any]:
+        """
+        获取连接：在开启工作单元的任务内返回其固定的连接，否则从连接池获取（记录等待时间）
+        """
+        unit = _current_unit.get()
+        if unit is None or not unit.is_active():
+            async with cls._acquire_from_pool() as conn:
+                yield conn
+            return
+
+        try:
+            if unit.conn is None:
+                unit.conn = await unit._stack.enter_async_context(cls._acquire_from_pool())
+                if unit.transactional:
+                    await unit._stack.enter_async_context(unit.conn.transaction())
+            unit.queries += 1
+            yield unit.conn
+        except Exception:
+            unit.failed = True
+            raise
+
+    @classmethod
+    @asynccontextmanager
+    async def _acquire_from_pool(cls) -> AsyncIterator[Any]:
+        """从连接池获取连接，记录等待时间"""
+        started = time.perf_counter()
+        async with cls._pool.acquire() as conn:
+            cls._query_metrics.record_pool_wait((time.perf_counter() - started) * 1000)
+            yield conn
+
+    @classmethod
+    def _configure(cls, slow_query_ms: float, session_cache_size: int, session_cache_ttl: int) -> None:
+        """配置慢查询阈值和会话缓存"""
+        cls._query_metrics.slow_query_ms = slow_query_ms
+        cls._session_cache.resize(session_cache_size)
+        cls._session_cache.ttl = session_cache_ttl
     
     @classmethod
     async def close_pool(cls):
@@ -57,6 +255,7 @@ class BaseDAO(ABC):
             await cls._pool.close()
             cls._pool = None
             cls._use_database = False
+            cls._dialect = "postgres"
             logger.info("数据库连接池已关闭")
     
     @classmethod
@@ -64,6 +263,82 @@ class BaseDAO(ABC):
         """检查数据库是否启用"""
         return cls._use_database and cls._pool is not None
 
+    @classmethod
+    def is_sqlite(cls) -> bool:
+        """当前是否使用 SQLite 存储（PostgreSQL 专有的语句需要走 SQLite 分支）"""
+        return cls._dialect == "sqlite"
+
+    @staticmethod
+    async def _init_connection(conn: asyncpg.Connection) -> None:
+        """新连接初始化：JSON/JSONB 列与 Python 字典/列表自动互相转换"""
+        for type_name in ("json", "jsonb"):
+            await conn.set_type_codec(
+                type_name,
+                encoder=lambda value: json.dumps(value, ensure_ascii=False, default=str),
+                decoder=json.loads,
+                schema="pg_catalog"
+            )
+
+    @classmethod
+    def get_query_metrics(cls, top: Optional[int] = None) -> Dict[str, Any]:
+        """
+        获取查询指标
+
+        Args:
+            top: 只返回总耗时最高的前 top 条语句
+
+        Returns:
+            包含慢查询阈值、慢查询次数、各语句统计、连接池（连接数、空闲数、获取连接等待时间）
+            和会话缓存统计的字典
+        """
+        pool = None
+        if cls._pool is not None:
+            pool = {
+                "size": cls._pool.get_size(),
+                "idle": cls._pool.get_idle_size(),
+                "wait": cls._query_metrics.pool_wait.to_dict()
+            }
+
+        return {
+            "slow_query_ms": cls._query_metrics.slow_query_ms,
+            "slow_queries": cls._query_metrics.slow_queries,
+            "statements": cls._query_metrics.snapshot(top),
+            "pool": pool,
+            "session_cache": cls._session_cache.get_stats()
+        }
+
+    def _record_query(
+        self,
+        query: str,
+        started: float,
+        rows: int = 0,
+        failed: bool = False,
+        label: Optional[str] = None
+    ) -> None:
+        """
+        记录一次查询的耗时和行数
+
+        Args:
+            query: SQL
+            started: time.perf_counter() 开始时间
+            rows: 返回或影响的行数
+            failed: 是否失败
+            label: 语句标签，默认取调用 execute_query / fetch_* 的 DAO 方法名
+        """
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if label is None:
+            label = f"{type(self).__name__}.{sys._getframe(2).f_code.co_name}"
+        self._query_metrics.record(label, query, elapsed_ms, rows, failed)
+
+    @staticmethod
+    def _status_rows(status: Any) -> int:
+        """从命令状态（如 "UPDATE 3"）中取出影响的行数"""
+        if isinstance(status, str):
+            tail = status.rsplit(" ", 1)[-1]
+            if tail.isdigit():
+                return int(tail)
+        return 0
+
     async def execute_query(
         self, 
         query: str, 
@@ -83,13 +358,17 @@ class BaseDAO(ABC):
             logger.debug("数据库未启用，跳过查询")
             return None
         
+        started = time.perf_counter()
         try:
-            async with self._pool.acquire() as conn:
+            async with self._acquire() as conn:
                 if params:
-                    return await conn.execute(query, *params)
+                    status = await conn.execute(query, *params)
                 else:
-                    return await conn.execute(query)
+                    status = await conn.execute(query)
+            self._record_query(query, started, rows=self._status_rows(status))
+            return status
         except Exception as e:
+            self._record_query(query, started, failed=True)
             logger.error(f"执行查询失败: {e}")
             logger.debug(f"查询: {query}")
             logger.debug(f"参数: {params}")
@@ -114,17 +393,20 @@ class BaseDAO(ABC):
             logger.debug("数据库未启用，返回 None")
             return None
         
+        started = time.perf_counter()
         try:
-            async with self._pool.acquire() as conn:
+            async with self._acquire() as conn:
                 if params:
                     row = await conn.fetchrow(query, *params)
                 else:
                     row = await conn.fetchrow(query)
-                
-                if row:
-                    return dict(row)
-                return None
+            self._record_query(query, started, rows=1 if row else 0)
+
+            if row:
+                return dict(row)
+            return None
         except Exception as e:
+            self._record_query(query, started, failed=True)
             logger.error(f"查询单行失败: {e}")
             logger.debug(f"查询: {query}")
             logger.debug(f"参数: {params}")
@@ -149,15 +431,18 @@ class BaseDAO(ABC):
             logger.debug("数据库未启用，返回空列表")
             return []
         
+        started = time.perf_counter()
         try:
-            async with self._pool.acquire() as conn:
+            async with self._acquire() as conn:
                 if params:
                     rows = await conn.fetch(query, *params)
                 else:
                     rows = await conn.fetch(query)
-                
-                return [dict(row) for row in rows]
+            self._record_query(query, started, rows=len(rows))
+
+            return [dict(row) for row in rows]
         except Exception as e:
+            self._record_query(query, started, failed=True)
             logger.error(f"查询多行失败: {e}")
             logger.debug(f"查询: {query}")
             logger.debug(f"参数: {params}")
@@ -6,12 +6,12 @@
 """
 
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 import uuid
-import json
 
 from src.dao.base import BaseDAO
+from src.dao.pagination import DEFAULT_PAGE_SIZE, decode_cursor, paginate
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +19,18 @@ logger = logging.getLogger(__name__)
 class ChatDAO(BaseDAO):
     """对话数据访问对象"""
 
+    _INSERT_SESSION_QUERY = """
+        INSERT INTO chat_sessions (id, user_id, title, llm_provider, model_name, system_prompt, created_at, updated_at)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+        RETURNING id, user_id, title, llm_provider, model_name, system_prompt, status, message_count, created_at, updated_at
+    """
+
+    _INSERT_MESSAGE_QUERY = """
+        INSERT INTO chat_messages (session_id, role, content, model_name, tokens_used, metadata, created_at)
+        VALUES ($1, $2, $3, $4, $5, $6, $7)
+        RETURNING id, session_id, role, content, model_name, tokens_used, metadata, created_at
+    """
+
     async def create_session(
         self,
         user_id: str,
@@ -41,48 +53,82 @@ class ChatDAO(BaseDAO):
             创建的会话信息
         """
         session_id = str(uuid.uuid4())
-        query = """
-            INSERT INTO chat_sessions (id, user_id, title, llm_provider, model_name, system_prompt, created_at, updated_at)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-            RETURNING id, user_id, title, llm_provider, model_name, system_prompt, status, message_count, created_at, updated_at
-        """
         now = datetime.utcnow()
         
         try:
             result = await self.fetch_one(
-                query,
+                self._INSERT_SESSION_QUERY,
                 (session_id, user_id, title, llm_provider, model_name, system_prompt, now, now)
             )
+            if result:
+                # 新会话直接写入缓存，首轮对话无需再读库
+                await self._session_cache.set_row("chat_session", session_id, result)
+                await self._session_cache.set_recent_messages(session_id, [])
             return result
         except Exception as e:
             logger.error(f"创建对话会话失败: {e}")
             return None
 
     async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """获取对话会话"""
+        """获取对话会话（读穿缓存）"""
         query = """
             SELECT id, user_id, title, llm_provider, model_name, system_prompt, 
                    status, message_count, created_at, updated_at
             FROM chat_sessions
             WHERE id = $1
         """
-        return await self.fetch_one(query, (session_id,))
+        return await self._session_cache.get_row(
+            "chat_session",
+            session_id,
+            lambda: self.fetch_one(query, (session_id,))
+        )
 
     async def get_user_sessions(
         self,
         user_id: str,
         limit: int = 50,
-        offset: int = 0
-    ) -> List[Dict[str, Any]]:
-        """获取用户的对话会话列表"""
-        query = """
-            SELECT id, user_id, title, llm_provider, model_name, status, message_count, created_at, updated_at
-            FROM chat_sessions
-            WHERE user_id = $1
-            ORDER BY updated_at DESC
-            LIMIT $2 OFFSET $3
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
-        return await self.fetch_all(query, (user_id, limit, offset))
+        分页获取用户的对话会话列表（按最近更新从新到旧）
+
+        键集为 (updated_at, id)。翻页期间有新消息的会话会移到前面，可能不在后续页中出现
+
+        Args:
+            user_id: 用户ID
+            limit: 每页数量
+            cursor: 上一页返回的游标，None 表示第一页
+
+        Returns:
+            包含 sessions 和 next_cursor（没有更多时为None）的字典
+
+        Raises:
+            ValueError: 游标无效
+        """
+        updated_at, session_id = decode_cursor(cursor)
+
+        if updated_at is None:
+            query = """
+                SELECT id, user_id, title, llm_provider, model_name, status, message_count, created_at, updated_at
+                FROM chat_sessions
+                WHERE user_id = $1
+                ORDER BY updated_at DESC, id DESC
+                LIMIT $2
+            """
+            params = (user_id, limit + 1)
+        else:
+            query = """
+                SELECT id, user_id, title, llm_provider, model_name, status, message_count, created_at, updated_at
+                FROM chat_sessions
+                WHERE user_id = $1
+                  AND (updated_at, id) < ($2, $3)
+                ORDER BY updated_at DESC, id DESC
+                LIMIT $4
+            """
+            params = (user_id, updated_at, session_id, limit + 1)
+
+        sessions, next_cursor = paginate(await self.fetch_all(query, params), limit, sort_key="updated_at")
+        return {"sessions": sessions, "next_cursor": next_cursor}
 
     async def update_session(
         self,
@@ -94,52 +140,33 @@ class ChatDAO(BaseDAO):
         status: Optional[str] = None
     ) -> bool:
         """更新对话会话"""
-        updates = []
-        params = []
-        param_count = 1
-        
-        if title is not None:
-            updates.append(f"title = ${param_count}")
-            params.append(title)
-            param_count += 1
-            
-        if llm_provider is not None:
-            updates.append(f"llm_provider = ${param_count}")
-            params.append(llm_provider)
-            param_count += 1
-            
-        if model_name is not None:
-            updates.append(f"model_name = ${param_count}")
-            params.append(model_name)
-            param_count += 1
-            
-        if system_prompt is not None:
-            updates.append(f"system_prompt = ${param_count}")
-            params.append(system_prompt)
-            param_count += 1
-            
-        if status is not None:
-            updates.append(f"status = ${param_count}")
-            params.append(status)
-            param_count += 1
-        
-        if not updates:
+        changes = {
+            "title": title,
+            "llm_provider": llm_provider,
+            "model_name": model_name,
+            "system_prompt": system_prompt,
+            "status": status
+        }
+        changes = {column: value for column, value in changes.items() if value is not None}
+
+        if not changes:
             return True
-        
-        updates.append(f"updated_at = ${param_count}")
-        params.append(datetime.utcnow())
-        param_count += 1
-        
+
+        changes["updated_at"] = datetime.utcnow()
+
+        updates = [f"{column} = ${index}" for index, column in enumerate(changes, start=1)]
+        params = list(changes.values())
         params.append(session_id)
-        
+
         query = f"""
             UPDATE chat_sessions
             SET {', '.join(updates)}
-            WHERE id = ${param_count}
+            WHERE id = ${len(params)}
         """
         
         try:
             await self.execute_query(query, tuple(params))
+            await self._session_cache.update_row("chat_session", session_id, changes)
             return True
         except Exception as e:
             logger.error(f"更新对话会话失败: {e}")
@@ -150,6 +177,8 @@ class ChatDAO(BaseDAO):
         query = "DELETE FROM chat_sessions WHERE id = $1"
         try:
             await self.execute_query(query, (session_id,))
+            await self._session_cache.invalidate_row("chat_session", session_id)
+            await self._session_cache.invalidate_messages(session_id)
             return True
         except Exception as e:
             logger.error(f"删除对话会话失败: {e}")
@@ -166,6 +195,8 @@ class ChatDAO(BaseDAO):
     ) -> Optional[int]:
         """
         添加对话消息
+
+        插入消息和更新会话计数在一条语句内完成，随后同步更新会话缓存和最近消息窗口
         
         Args:
             session_id: 会话ID
@@ -179,78 +210,242 @@ class ChatDAO(BaseDAO):
             消息ID
         """
         query = """
-            INSERT INTO chat_messages (session_id, role, content, model_name, tokens_used, metadata, created_at)
-            VALUES ($1, $2, $3, $4, $5, $6, $7)
-            RETURNING id
+            WITH new_message AS (
+                INSERT INTO chat_messages (session_id, role, content, model_name, tokens_used, metadata, created_at)
+                VALUES ($1, $2, $3, $4, $5, $6, $7)
+                RETURNING id, session_id, role, content, model_name, tokens_used, metadata, created_at
+            ), counted AS (
+                UPDATE chat_sessions
+                SET message_count = message_count + 1, updated_at = $7
+                WHERE id = $1
+                RETURNING message_count
+            )
+            SELECT new_message.*, (SELECT message_count FROM counted) AS message_count
+            FROM new_message
         """
+        now = datetime.utcnow()
+        params = (session_id, role, content, model_name, tokens_used, metadata or None, now)
         
         try:
-            result = await self.fetch_one(
-                query,
-                (session_id, role, content, model_name, tokens_used, 
-                 json.dumps(metadata) if metadata else None, datetime.utcnow())
-            )
+            if self.is_sqlite():
+                result = await self._add_message_sqlite(params)
+            else:
+                result = await self.fetch_one(query, params)
             
             if result:
-                # 更新会话的消息计数和更新时间
-                await self.execute_query(
-                    """
-                    UPDATE chat_sessions 
-                    SET message_count = message_count + 1, updated_at = $1
-                    WHERE id = $2
-                    """,
-                    (datetime.utcnow(), session_id)
-                )
+                message_count = result.pop("message_count")
+                if message_count is not None:
+                    await self._session_cache.update_row(
+                        "chat_session",
+                        session_id,
+                        {"message_count": message_count, "updated_at": now}
+                    )
+                await self._session_cache.append_message(session_id, result)
                 return result['id']
             return None
         except Exception as e:
             logger.error(f"添加对话消息失败: {e}")
             return None
 
+    async def _add_message_sqlite(self, params: tuple) -> Optional[Dict[str, Any]]:
+        """SQLite 不支持带写操作的 CTE：同一事务内依次插入消息、更新会话计数"""
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                message = await conn.fetchrow(self._INSERT_MESSAGE_QUERY, *params)
+                message_count = await conn.fetchval(
+                    """
+                    UPDATE chat_sessions
+                    SET message_count = message_count + 1, updated_at = $2
+                    WHERE id = $1
+                    RETURNING message_count
+                    """,
+                    params[0],
+                    params[-1]
+                )
+
+        result = dict(message)
+        result["message_count"] = message_count
+        return result
+
+    @classmethod
+    async def _insert_session(
+        cls,
+        conn: Any,
+        user_id: str,
+        title: str,
+        llm_provider: str,
+        model_name: str,
+        now: datetime,
+        system_prompt: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """在给定连接（事务）上创建对话会话，缓存由调用方在提交后更新"""
+        row = await conn.fetchrow(
+            cls._INSERT_SESSION_QUERY,
+            str(uuid.uuid4()), user_id, title, llm_provider, model_name, system_prompt, now, now
+        )
+        return dict(row)
+
+    @classmethod
+    async def _insert_messages(
+        cls,
+        conn: Any,
+        session_id: str,
+        messages: List[Dict[str, Any]],
+        now: datetime
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        在给定连接（事务）上按顺序写入多条消息并更新会话计数，缓存由调用方在提交后更新
+
+        Args:
+            conn: 数据库连接
+            session_id: 会话ID
+            messages: 消息列表，每项包含 role / content，可选 model_name / tokens_used / metadata
+            now: 写入时间
+
+        Returns:
+            (写入的消息行, 更新后的消息数)
+        """
+        rows = []
+        for message in messages:
+            row = await conn.fetchrow(
+                cls._INSERT_MESSAGE_QUERY,
+                session_id,
+                message["role"],
+                message["content"],
+                message.get("model_name"),
+                message.get("tokens_used"),
+                message.get("metadata") or None,
+                now
+            )
+            rows.append(dict(row))
+
+        message_count = await conn.fetchval(
+            """
+            UPDATE chat_sessions
+            SET message_count = message_count + $2, updated_at = $3
+            WHERE id = $1
+            RETURNING message_count
+            """,
+            session_id,
+            len(rows),
+            now
+        )
+        return rows, message_count
+
+    @classmethod
+    async def _cache_written(
+        cls,
+        session_id: str,
+        session: Optional[Dict[str, Any]],
+        messages: List[Dict[str, Any]],
+        message_count: Optional[int],
+        now: datetime
+    ) -> None:
+        """
+        事务提交后同步会话缓存
+
+        Args:
+            session_id: 会话ID
+            session: 新建的会话行（写入已有会话时为None）
+            messages: 写入的消息行
+            message_count: 更新后的消息数
+            now: 写入时间
+        """
+        if session is not None:
+            await cls._session_cache.set_row("chat_session", session_id, {
+                **session, "message_count": message_count, "updated_at": now
+            })
+            await cls._session_cache.set_recent_messages(session_id, messages)
+            return
+
+        if message_count is not None:
+            await cls._session_cache.update_row(
+                "chat_session", session_id, {"message_count": message_count, "updated_at": now}
+            )
+        for message in messages:
+            await cls._session_cache.append_message(session_id, message)
+
     async def get_session_messages(
         self,
         session_id: str,
-        limit: Optional[int] = None
-    ) -> List[Dict[str, Any]]:
-        """获取会话的消息列表"""
-        if limit:
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        获取会话的消息列表（按时间从旧到新），指定 limit 或 cursor 时分页
+
+        Args:
+            session_id: 会话ID
+            limit: 每页数量，None 且没有游标时返回全部消息，有游标时使用默认页大小
+            cursor: 上一页返回的游标，None 表示第一页
+
+        Returns:
+            包含 messages 和 next_cursor（没有更多时为None）的字典
+
+        Raises:
+            ValueError: 游标无效
+        """
+        created_at, message_id = decode_cursor(cursor, id_type=int)
+        if not limit and created_at is not None:
+            limit = DEFAULT_PAGE_SIZE
+
+        if not limit:
+            query = """
+                SELECT id, session_id, role, content, model_name, tokens_used, metadata, created_at
+                FROM chat_messages
+                WHERE session_id = $1
+                ORDER BY created_at ASC, id ASC
+            """
+            return {"messages": await self.fetch_all(query, (session_id,)), "next_cursor": None}
+
+        if created_at is None:
             query = """
                 SELECT id, session_id, role, content, model_name, tokens_used, metadata, created_at
                 FROM chat_messages
                 WHERE session_id = $1
-                ORDER BY created_at ASC
+                ORDER BY created_at ASC, id ASC
                 LIMIT $2
             """
-            return await self.fetch_all(query, (session_id, limit))
+            params = (session_id, limit + 1)
         else:
             query = """
                 SELECT id, session_id, role, content, model_name, tokens_used, metadata, created_at
                 FROM chat_messages
                 WHERE session_id = $1
-                ORDER BY created_at ASC
+                  AND (created_at, id) > ($2, $3)
+                ORDER BY created_at ASC, id ASC
+                LIMIT $4
             """
-            return await self.fetch_all(query, (session_id,))
+            params = (session_id, created_at, message_id, limit + 1)
+
+        messages, next_cursor = paginate(await self.fetch_all(query, params), limit)
+        return {"messages": messages, "next_cursor": next_cursor}
 
     async def get_recent_messages(
         self,
         session_id: str,
         count: int = 10
     ) -> List[Dict[str, Any]]:
-        """获取最近的N条消息"""
+        """获取最近的N条消息（N 不超过缓存窗口时读穿缓存）"""
         query = """
             SELECT id, session_id, role, content, model_name, tokens_used, metadata, created_at
             FROM (
                 SELECT * FROM chat_messages
                 WHERE session_id = $1
-                ORDER BY created_at DESC
+                ORDER BY created_at DESC, id DESC
                 LIMIT $2
             ) AS recent
-            ORDER BY created_at ASC
+            ORDER BY created_at ASC, id ASC
         """
-        return await self.fetch_all(query, (session_id, count))
+        return await self._session_cache.get_recent_messages(
+            session_id,
+            count,
+            lambda n: self.fetch_all(query, (session_id, n))
+        )
 
     async def clear_session_messages(self, session_id: str) -> bool:
         """清空会话的所有消息"""
+        now = datetime.utcnow()
         try:
             await self.execute_query(
                 "DELETE FROM chat_messages WHERE session_id = $1",
@@ -258,8 +453,14 @@ class ChatDAO(BaseDAO):
             )
             await self.execute_query(
                 "UPDATE chat_sessions SET message_count = 0, updated_at = $1 WHERE id = $2",
-                (datetime.utcnow(), session_id)
+                (now, session_id)
+            )
+            await self._session_cache.update_row(
+                "chat_session",
+                session_id,
+                {"message_count": 0, "updated_at": now}
             )
+            await self._session_cache.set_recent_messages(session_id, [])
             return True
         except Exception as e:
             logger.error(f"清空会话消息失败: {e}")
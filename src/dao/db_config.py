@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 """
 数据库配置
-PostgreSQL 连接配置和管理
+PostgreSQL 连接配置和管理，以及 SQLite 嵌入式存储的配置
 """
 
 import os
@@ -16,6 +16,10 @@ class DatabaseConfig:
     """数据库配置类"""
     
     def __init__(self):
+        # 存储后端：postgres / sqlite / auto（PostgreSQL 不可用时使用 SQLite）
+        self.backend = os.getenv("DB_BACKEND", "postgres").lower()
+        self.sqlite_path = os.getenv("DB_SQLITE_PATH", "data/deep_research.db")
+        self.sqlite_pool_size = int(os.getenv("DB_SQLITE_POOL_SIZE", "4"))
         self.host = os.getenv("DB_HOST", "localhost")
         self.port = int(os.getenv("DB_PORT", "5432"))
         self.user = os.getenv("DB_USER", "postgres")
@@ -23,6 +27,10 @@ class DatabaseConfig:
         self.database = os.getenv("DB_NAME", "deep_research")
         self.min_pool_size = int(os.getenv("DB_MIN_POOL_SIZE", "5"))
         self.max_pool_size = int(os.getenv("DB_MAX_POOL_SIZE", "20"))
+        self.statement_cache_size = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+        self.slow_query_ms = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+        self.session_cache_size = int(os.getenv("DB_SESSION_CACHE_SIZE", "1024"))
+        self.session_cache_ttl = int(os.getenv("DB_SESSION_CACHE_TTL", "300"))
     
     def get_dsn(self) -> str:
         """获取数据库连接字符串"""
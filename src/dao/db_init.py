@@ -9,7 +9,7 @@ import asyncpg
 import logging
 from typing import Dict, List, Optional
 from src.dao.db_config import db_config
-from src.dao.db_schema import ALL_TABLES, TABLE_SCHEMAS
+from src.dao.db_schema import ALL_TABLES, TABLE_MIGRATIONS, TABLE_SCHEMAS, TRIGRAM_EXTENSION, TRIGRAM_INDEXES
 
 logger = logging.getLogger(__name__)
 
@@ -122,6 +122,10 @@ class DatabaseInitializer:
                 table_exists = await self._table_exists(conn, table_name)
                 
                 if table_exists:
+                    # 增量迁移（补充新增列），避免结构验证时重建表
+                    if table_name in TABLE_MIGRATIONS:
+                        await conn.execute(TABLE_MIGRATIONS[table_name])
+
                     # 验证表结构
                     is_valid = await self._validate_table_schema(conn, table_name)
                     
@@ -130,11 +134,16 @@ class DatabaseInitializer:
                         await self._drop_table(conn, table_name)
                         await self._create_table(conn, table_name, create_sql)
                     else:
+                        # 建表脚本是幂等的，重新执行以补建新增的索引
+                        await conn.execute(create_sql)
                         logger.info(f"✓ 表 '{table_name}' 结构正确")
                 else:
                     logger.info(f"表 '{table_name}' 不存在，创建中...")
                     await self._create_table(conn, table_name, create_sql)
             
+            # 中文检索的三元组索引（可选）
+            await self._create_trigram_indexes(conn)
+            
             # 创建测试用户（如果不存在）
             await self._create_test_users(conn)
                     
@@ -243,6 +252,21 @@ class DatabaseInitializer:
         await conn.execute(create_sql)
         logger.info(f"✓ 表 '{table_name}' 创建成功")
     
+    async def _create_trigram_indexes(self, conn: asyncpg.Connection):
+        """创建 pg_trgm 扩展和三元组索引，失败时仅告警（检索退化为顺序扫描）"""
+        try:
+            await conn.execute(TRIGRAM_EXTENSION)
+        except Exception as e:
+            logger.warning(f"无法启用 pg_trgm 扩展，中文检索将不使用索引: {e}")
+            return
+        
+        for index_sql in TRIGRAM_INDEXES:
+            try:
+                await conn.execute(index_sql)
+            except Exception as e:
+                logger.warning(f"创建三元组索引失败: {e}")
+        logger.info("✓ 中文检索三元组索引已就绪")
+    
     async def _create_test_users(self, conn: asyncpg.Connection):
         """创建测试用户（用于开发和测试）"""
         from datetime import datetime
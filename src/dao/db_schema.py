@@ -63,6 +63,8 @@ CREATE TABLE IF NOT EXISTS chat_sessions (
 CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_id ON chat_sessions(user_id);
 CREATE INDEX IF NOT EXISTS idx_chat_sessions_status ON chat_sessions(status);
 CREATE INDEX IF NOT EXISTS idx_chat_sessions_created_at ON chat_sessions(created_at DESC);
+DROP INDEX IF EXISTS idx_chat_sessions_user_page;
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_recent ON chat_sessions(user_id, updated_at DESC, id DESC);
 """
 
 # 对话消息表
@@ -82,6 +84,7 @@ CREATE TABLE IF NOT EXISTS chat_messages (
 
 CREATE INDEX IF NOT EXISTS idx_chat_messages_session_id ON chat_messages(session_id);
 CREATE INDEX IF NOT EXISTS idx_chat_messages_created_at ON chat_messages(created_at);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_session_page ON chat_messages(session_id, created_at, id);
 CREATE INDEX IF NOT EXISTS idx_chat_messages_is_processed ON chat_messages(is_processed);
 """
 
@@ -95,12 +98,50 @@ CREATE TABLE IF NOT EXISTS research_sessions (
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     ended_at TIMESTAMP,
+    findings_count INTEGER NOT NULL DEFAULT 0,
+    citations_count INTEGER NOT NULL DEFAULT 0,
+    stats_rolled_up BOOLEAN NOT NULL DEFAULT FALSE,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
 );
 
 CREATE INDEX IF NOT EXISTS idx_research_sessions_user_id ON research_sessions(user_id);
 CREATE INDEX IF NOT EXISTS idx_research_sessions_status ON research_sessions(status);
 CREATE INDEX IF NOT EXISTS idx_research_sessions_created_at ON research_sessions(created_at);
+CREATE INDEX IF NOT EXISTS idx_research_sessions_user_page ON research_sessions(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_research_sessions_pending_rollup ON research_sessions(id)
+    WHERE status = 'completed' AND NOT stats_rolled_up;
+"""
+
+# 已有的研究会话表补充计数列并回填（在结构验证之前执行，避免重建会话表）
+RESEARCH_SESSIONS_MIGRATION = """
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND table_name = 'research_sessions'
+          AND column_name = 'findings_count'
+    ) THEN
+        ALTER TABLE research_sessions
+            ADD COLUMN findings_count INTEGER NOT NULL DEFAULT 0,
+            ADD COLUMN citations_count INTEGER NOT NULL DEFAULT 0,
+            ADD COLUMN stats_rolled_up BOOLEAN NOT NULL DEFAULT FALSE;
+
+        IF to_regclass('research_findings') IS NOT NULL THEN
+            UPDATE research_sessions s
+            SET findings_count = f.n
+            FROM (SELECT session_id, COUNT(*) AS n FROM research_findings GROUP BY session_id) f
+            WHERE s.id = f.session_id;
+        END IF;
+
+        IF to_regclass('research_citations') IS NOT NULL THEN
+            UPDATE research_sessions s
+            SET citations_count = c.n
+            FROM (SELECT session_id, COUNT(*) AS n FROM research_citations GROUP BY session_id) c
+            WHERE s.id = c.session_id;
+        END IF;
+    END IF;
+END $$;
 """
 
 # 研究发现表
@@ -112,17 +153,75 @@ CREATE TABLE IF NOT EXISTS research_findings (
     source_url TEXT,
     content TEXT NOT NULL,
     relevance_score FLOAT DEFAULT 0.8,
+    support_count INTEGER NOT NULL DEFAULT 1,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    search_vector TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED,
     FOREIGN KEY (session_id) REFERENCES research_sessions(id) ON DELETE CASCADE
 );
 
 CREATE INDEX IF NOT EXISTS idx_research_findings_session_id ON research_findings(session_id);
 CREATE INDEX IF NOT EXISTS idx_research_findings_source_type ON research_findings(source_type);
 CREATE INDEX IF NOT EXISTS idx_research_findings_relevance_score ON research_findings(relevance_score);
+CREATE INDEX IF NOT EXISTS idx_research_findings_search ON research_findings USING gin(search_vector);
+
+-- research_sessions.findings_count 由语句级触发器维护，批量写入每条语句只更新一次会话行
+CREATE OR REPLACE FUNCTION research_findings_count() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE research_sessions s
+        SET findings_count = s.findings_count + d.n
+        FROM (SELECT session_id, COUNT(*) AS n FROM new_rows GROUP BY session_id) d
+        WHERE s.id = d.session_id;
+    ELSE
+        UPDATE research_sessions s
+        SET findings_count = GREATEST(s.findings_count - d.n, 0)
+        FROM (SELECT session_id, COUNT(*) AS n FROM old_rows GROUP BY session_id) d
+        WHERE s.id = d.session_id;
+    END IF;
+    RETURN NULL;
+END $$;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_research_findings_count_insert') THEN
+        CREATE TRIGGER trg_research_findings_count_insert
+            AFTER INSERT ON research_findings
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION research_findings_count();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_research_findings_count_delete') THEN
+        CREATE TRIGGER trg_research_findings_count_delete
+            AFTER DELETE ON research_findings
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION research_findings_count();
+    END IF;
+END $$;
+"""
+
+# 已有的研究发现表补充新增列（在结构验证之前执行，避免重建发现表丢失数据）
+RESEARCH_FINDINGS_MIGRATION = """
+ALTER TABLE research_findings ADD COLUMN IF NOT EXISTS support_count INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE research_findings ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED;
+CREATE INDEX IF NOT EXISTS idx_research_findings_search ON research_findings USING gin(search_vector);
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX IF NOT EXISTS idx_research_findings_content_trgm
+            ON research_findings USING gin(content gin_trgm_ops);
+    END IF;
+END $$;
 """
 
 # 引用表
+# array_to_string 不是 IMMUTABLE，生成列需要一个 text[] 专用的 IMMUTABLE 包装
 CITATIONS_TABLE = """
+CREATE OR REPLACE FUNCTION immutable_array_to_string(TEXT[], TEXT)
+RETURNS TEXT LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$ SELECT array_to_string($1, $2) $$;
+
 CREATE TABLE IF NOT EXISTS research_citations (
     id SERIAL PRIMARY KEY,
     session_id VARCHAR(255) NOT NULL,
@@ -133,11 +232,71 @@ CREATE TABLE IF NOT EXISTS research_citations (
     doi VARCHAR(255),
     citation_type VARCHAR(50) DEFAULT 'article',
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    search_text TEXT GENERATED ALWAYS AS (title || ' ' || immutable_array_to_string(authors, ' ')) STORED,
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        to_tsvector('simple', title || ' ' || immutable_array_to_string(authors, ' '))
+    ) STORED,
     FOREIGN KEY (session_id) REFERENCES research_sessions(id) ON DELETE CASCADE
 );
 
 CREATE INDEX IF NOT EXISTS idx_research_citations_session_id ON research_citations(session_id);
 CREATE INDEX IF NOT EXISTS idx_research_citations_citation_type ON research_citations(citation_type);
+CREATE INDEX IF NOT EXISTS idx_research_citations_search ON research_citations USING gin(search_vector);
+
+-- research_sessions.citations_count 由语句级触发器维护
+CREATE OR REPLACE FUNCTION research_citations_count() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE research_sessions s
+        SET citations_count = s.citations_count + d.n
+        FROM (SELECT session_id, COUNT(*) AS n FROM new_rows GROUP BY session_id) d
+        WHERE s.id = d.session_id;
+    ELSE
+        UPDATE research_sessions s
+        SET citations_count = GREATEST(s.citations_count - d.n, 0)
+        FROM (SELECT session_id, COUNT(*) AS n FROM old_rows GROUP BY session_id) d
+        WHERE s.id = d.session_id;
+    END IF;
+    RETURN NULL;
+END $$;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_research_citations_count_insert') THEN
+        CREATE TRIGGER trg_research_citations_count_insert
+            AFTER INSERT ON research_citations
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION research_citations_count();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_research_citations_count_delete') THEN
+        CREATE TRIGGER trg_research_citations_count_delete
+            AFTER DELETE ON research_citations
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION research_citations_count();
+    END IF;
+END $$;
+"""
+
+# 已有的引用表补充检索生成列和索引
+CITATIONS_MIGRATION = """
+CREATE OR REPLACE FUNCTION immutable_array_to_string(TEXT[], TEXT)
+RETURNS TEXT LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$ SELECT array_to_string($1, $2) $$;
+
+ALTER TABLE research_citations ADD COLUMN IF NOT EXISTS search_text TEXT
+    GENERATED ALWAYS AS (title || ' ' || immutable_array_to_string(authors, ' ')) STORED;
+ALTER TABLE research_citations ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('simple', title || ' ' || immutable_array_to_string(authors, ' '))) STORED;
+CREATE INDEX IF NOT EXISTS idx_research_citations_search ON research_citations USING gin(search_vector);
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX IF NOT EXISTS idx_research_citations_search_trgm
+            ON research_citations USING gin(search_text gin_trgm_ops);
+    END IF;
+END $$;
 """
 
 # 长期记忆表
@@ -150,11 +309,53 @@ CREATE TABLE IF NOT EXISTS research_memory (
     message_content TEXT NOT NULL,
     timestamp VARCHAR(50) NOT NULL,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    search_vector TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', message_content)) STORED,
     FOREIGN KEY (session_id) REFERENCES research_sessions(id) ON DELETE CASCADE
 );
 
 CREATE INDEX IF NOT EXISTS idx_research_memory_session_id ON research_memory(session_id);
 CREATE INDEX IF NOT EXISTS idx_research_memory_timestamp ON research_memory(timestamp);
+CREATE INDEX IF NOT EXISTS idx_research_memory_search ON research_memory USING gin(search_vector);
+"""
+
+# 已有的长期记忆表补充检索生成列和索引
+LONG_TERM_MEMORY_MIGRATION = """
+ALTER TABLE research_memory ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('simple', message_content)) STORED;
+CREATE INDEX IF NOT EXISTS idx_research_memory_search ON research_memory USING gin(search_vector);
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX IF NOT EXISTS idx_research_memory_content_trgm
+            ON research_memory USING gin(message_content gin_trgm_ops);
+    END IF;
+END $$;
+"""
+
+# 研究报告制品表（完成时生成一次，按 ETag 提供给所有读取方）
+RESEARCH_REPORTS_TABLE = """
+CREATE TABLE IF NOT EXISTS research_reports (
+    session_id VARCHAR(255) PRIMARY KEY,
+    etag VARCHAR(128) NOT NULL,
+    artifact JSONB NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (session_id) REFERENCES research_sessions(id) ON DELETE CASCADE
+);
+"""
+
+# 用户研究统计汇总表（会话完成时累加，匿名会话汇总到 user_id = ''）
+RESEARCH_USER_STATS_TABLE = """
+CREATE TABLE IF NOT EXISTS research_user_stats (
+    user_id VARCHAR(255) PRIMARY KEY,
+    completed_sessions INTEGER NOT NULL DEFAULT 0,
+    total_findings INTEGER NOT NULL DEFAULT 0,
+    total_citations INTEGER NOT NULL DEFAULT 0,
+    relevance_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    relevance_count INTEGER NOT NULL DEFAULT 0,
+    sources JSONB NOT NULL DEFAULT '{}'::jsonb,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
 """
 
 # 用户事实表 (Mem0 核心)
@@ -180,6 +381,17 @@ CREATE INDEX IF NOT EXISTS idx_user_facts_validity_score ON user_facts(validity_
 CREATE INDEX IF NOT EXISTS idx_user_facts_created_at ON user_facts(created_at DESC);
 """
 
+# 中日韩文本检索索引（需要 pg_trgm 扩展）
+# 'simple' 分词不切分连续的中文字符，中文查询改用子串匹配（ILIKE），由三元组索引加速；
+# 扩展不可用时跳过这些索引，查询仍然正确，只是退化为顺序扫描
+TRIGRAM_EXTENSION = "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+
+TRIGRAM_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_research_findings_content_trgm ON research_findings USING gin(content gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_research_citations_search_trgm ON research_citations USING gin(search_text gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_research_memory_content_trgm ON research_memory USING gin(message_content gin_trgm_ops)",
+]
+
 # 所有表的定义
 ALL_TABLES = {
     "users": USERS_TABLE,
@@ -191,6 +403,16 @@ ALL_TABLES = {
     "research_findings": RESEARCH_FINDINGS_TABLE,
     "research_citations": CITATIONS_TABLE,
     "research_memory": LONG_TERM_MEMORY_TABLE,
+    "research_reports": RESEARCH_REPORTS_TABLE,
+    "research_user_stats": RESEARCH_USER_STATS_TABLE,
+}
+
+# 结构验证前对已有表执行的增量迁移
+TABLE_MIGRATIONS = {
+    "research_sessions": RESEARCH_SESSIONS_MIGRATION,
+    "research_findings": RESEARCH_FINDINGS_MIGRATION,
+    "research_citations": CITATIONS_MIGRATION,
+    "research_memory": LONG_TERM_MEMORY_MIGRATION,
 }
 
 # 表结构验证规则
@@ -273,6 +495,9 @@ TABLE_SCHEMAS = {
             "created_at": "timestamp without time zone",
             "updated_at": "timestamp without time zone",
             "ended_at": "timestamp without time zone",
+            "findings_count": "integer",
+            "citations_count": "integer",
+            "stats_rolled_up": "boolean",
         }
     },
     "research_findings": {
@@ -283,7 +508,9 @@ TABLE_SCHEMAS = {
             "source_url": "text",
             "content": "text",
             "relevance_score": "double precision",
+            "support_count": "integer",
             "created_at": "timestamp without time zone",
+            "search_vector": "tsvector",
         }
     },
     "research_citations": {
@@ -297,6 +524,8 @@ TABLE_SCHEMAS = {
             "doi": "character varying",
             "citation_type": "character varying",
             "created_at": "timestamp without time zone",
+            "search_text": "text",
+            "search_vector": "tsvector",
         }
     },
     "research_memory": {
@@ -308,6 +537,27 @@ TABLE_SCHEMAS = {
             "message_content": "text",
             "timestamp": "character varying",
             "created_at": "timestamp without time zone",
+            "search_vector": "tsvector",
+        }
+    },
+    "research_reports": {
+        "columns": {
+            "session_id": "character varying",
+            "etag": "character varying",
+            "artifact": "jsonb",
+            "created_at": "timestamp without time zone",
+        }
+    },
+    "research_user_stats": {
+        "columns": {
+            "user_id": "character varying",
+            "completed_sessions": "integer",
+            "total_findings": "integer",
+            "total_citations": "integer",
+            "relevance_sum": "double precision",
+            "relevance_count": "integer",
+            "sources": "jsonb",
+            "updated_at": "timestamp without time zone",
         }
     },
 }
@@ -7,7 +7,7 @@
 
 import logging
 from typing import Optional, Dict, Any, List
-from datetime import datetime
+from datetime import datetime, timedelta
 import uuid
 
 from src.dao.base import BaseDAO
@@ -65,6 +65,110 @@ class MemoryDAO(BaseDAO):
             logger.error(f"创建用户事实失败: {e}")
             return None
 
+    async def create_user_facts_batch(
+        self,
+        user_id: str,
+        facts: List[Dict[str, Any]],
+        source_session_id: Optional[str] = None,
+        source_message_id: Optional[int] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        批量创建用户事实（单条多行 INSERT，在一个事务内全部成功或全部失败）
+        
+        Args:
+            user_id: 用户ID
+            facts: 事实列表，每项包含 fact_content, fact_type, validity_score, embedding_id
+            source_session_id: 来源会话ID
+            source_message_id: 来源消息ID
+            
+        Returns:
+            创建的事实列表，失败（或数据库未启用）返回None
+        """
+        if not facts:
+            return []
+        
+        if not self.is_database_enabled():
+            logger.debug("数据库未启用，跳过批量创建事实")
+            return None
+        
+        query = """
+            INSERT INTO user_facts 
+            (id, user_id, fact_content, fact_type, source_session_id, source_message_id, 
+             validity_score, embedding_id, created_at, updated_at)
+            SELECT v.id, $2, v.fact_content, v.fact_type, $5, $6,
+                   v.validity_score, v.embedding_id, $8, $8
+            FROM unnest($1::varchar[], $3::text[], $4::varchar[], $7::float8[], $9::varchar[])
+                 AS v(id, fact_content, fact_type, validity_score, embedding_id)
+            RETURNING id, user_id, fact_content, fact_type, source_session_id, 
+                      validity_score, embedding_id, created_at, updated_at
+        """
+        now = datetime.utcnow()
+        
+        if self.is_sqlite():
+            return await self._create_user_facts_batch_sqlite(
+                user_id, facts, source_session_id, source_message_id, now
+            )
+        
+        try:
+            async with self._acquire() as conn:
+                async with conn.transaction():
+                    rows = await conn.fetch(
+                        query,
+                        [str(uuid.uuid4()) for _ in facts],
+                        user_id,
+                        [f["fact_content"] for f in facts],
+                        [f.get("fact_type", "general") for f in facts],
+                        source_session_id,
+                        source_message_id,
+                        [float(f.get("validity_score", 1.0)) for f in facts],
+                        now,
+                        [f.get("embedding_id") for f in facts]
+                    )
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"批量创建用户事实失败: {e}")
+            return None
+
+    async def _create_user_facts_batch_sqlite(
+        self,
+        user_id: str,
+        facts: List[Dict[str, Any]],
+        source_session_id: Optional[str],
+        source_message_id: Optional[int],
+        now: datetime
+    ) -> Optional[List[Dict[str, Any]]]:
+        """SQLite 没有 unnest：同一事务内逐行插入"""
+        query = """
+            INSERT INTO user_facts 
+            (id, user_id, fact_content, fact_type, source_session_id, source_message_id, 
+             validity_score, embedding_id, created_at, updated_at)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $9)
+            RETURNING id, user_id, fact_content, fact_type, source_session_id, 
+                      validity_score, embedding_id, created_at, updated_at
+        """
+        try:
+            async with self._acquire() as conn:
+                async with conn.transaction():
+                    rows = [
+                        await conn.fetchrow(
+                            query,
+                            str(uuid.uuid4()),
+                            user_id,
+                            f["fact_content"],
+                            f.get("fact_type", "general"),
+                            source_session_id,
+                            source_message_id,
+                            float(f.get("validity_score", 1.0)),
+                            f.get("embedding_id"),
+                            now
+                        )
+                        for f in facts
+                    ]
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"批量创建用户事实失败: {e}")
+            return None
+
     async def get_user_facts(
         self,
         user_id: str,
@@ -162,6 +266,104 @@ class MemoryDAO(BaseDAO):
             logger.error(f"删除用户事实失败: {e}")
             return False
 
+    async def delete_duplicate_facts(self, limit: int = 500) -> List[Dict[str, Any]]:
+        """
+        合并重复事实：同一用户内容相同（忽略大小写和首尾空白）的事实只保留
+        有效性最高（其次最新）的一条，删除其余副本
+        
+        每次最多删除 limit 行，并跳过被其他事务锁定的行，由调用方循环直到返回空列表。
+        
+        Args:
+            limit: 本批次最多删除的行数
+            
+        Returns:
+            被删除的事实（id, user_id, embedding_id, row_bytes）
+        """
+        if self.is_sqlite():
+            # SQLite 写入串行，不需要 SKIP LOCKED；行大小按事实内容字节数估算
+            query = """
+                DELETE FROM user_facts
+                WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id,
+                               row_number() OVER (
+                                   PARTITION BY user_id, lower(trim(fact_content))
+                                   ORDER BY validity_score DESC, updated_at DESC
+                               ) AS rn
+                        FROM user_facts
+                    )
+                    WHERE rn > 1
+                    LIMIT $1
+                )
+                RETURNING id, user_id, embedding_id, length(CAST(fact_content AS BLOB)) AS row_bytes
+            """
+            return await self.fetch_all(query, (limit,))
+
+        query = """
+            WITH ranked AS (
+                SELECT id,
+                       row_number() OVER (
+                           PARTITION BY user_id, lower(btrim(fact_content))
+                           ORDER BY validity_score DESC, updated_at DESC
+                       ) AS rn
+                FROM user_facts
+            ), doomed AS (
+                SELECT f.id
+                FROM user_facts f
+                JOIN ranked r ON r.id = f.id
+                WHERE r.rn > 1
+                LIMIT $1
+                FOR UPDATE OF f SKIP LOCKED
+            )
+            DELETE FROM user_facts f
+            USING doomed d
+            WHERE f.id = d.id
+            RETURNING f.id, f.user_id, f.embedding_id, pg_column_size(f.*) AS row_bytes
+        """
+        return await self.fetch_all(query, (limit,))
+
+    async def expire_low_validity_facts(
+        self,
+        cutoff: datetime,
+        min_validity: float,
+        limit: int = 500
+    ) -> List[Dict[str, Any]]:
+        """
+        删除早于 cutoff 且有效性低于 min_validity 的事实（每批最多 limit 行）
+        
+        Args:
+            cutoff: 最后更新时间早于该时间的事实才会过期
+            min_validity: 有效性阈值
+            limit: 本批次最多删除的行数
+            
+        Returns:
+            被删除的事实（id, user_id, embedding_id, row_bytes）
+        """
+        if self.is_sqlite():
+            query = """
+                DELETE FROM user_facts
+                WHERE id IN (
+                    SELECT id FROM user_facts
+                    WHERE updated_at < $1 AND validity_score < $2
+                    LIMIT $3
+                )
+                RETURNING id, user_id, embedding_id, length(CAST(fact_content AS BLOB)) AS row_bytes
+            """
+            return await self.fetch_all(query, (cutoff, min_validity, limit))
+
+        query = """
+            DELETE FROM user_facts f
+            USING (
+                SELECT id FROM user_facts
+                WHERE updated_at < $1 AND validity_score < $2
+                LIMIT $3
+                FOR UPDATE SKIP LOCKED
+            ) d
+            WHERE f.id = d.id
+            RETURNING f.id, f.user_id, f.embedding_id, pg_column_size(f.*) AS row_bytes
+        """
+        return await self.fetch_all(query, (cutoff, min_validity, limit))
+
     async def mark_message_processed(self, message_id: int) -> bool:
         """
         标记消息已处理
@@ -208,6 +410,88 @@ class MemoryDAO(BaseDAO):
         """
         return await self.fetch_all(query, (session_id, limit))
 
+    async def claim_unprocessed_messages(
+        self,
+        limit: int = 50,
+        min_age_seconds: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        跨会话领取一批未处理的消息（FOR UPDATE SKIP LOCKED，多个工作进程互不阻塞）
+        
+        领取即标记为已处理；处理失败时调用 release_messages 放回。
+        
+        Args:
+            limit: 最多领取的消息数量
+            min_age_seconds: 只领取创建时间早于该秒数的消息，等待助手回复写入
+            
+        Returns:
+            领取的消息列表（含会话的 user_id），按会话和时间排序
+        """
+        query = """
+            WITH claimed AS (
+                SELECT id
+                FROM chat_messages
+                WHERE is_processed = FALSE
+                  AND created_at <= NOW() - make_interval(secs => $2)
+                ORDER BY created_at ASC
+                LIMIT $1
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE chat_messages AS m
+            SET is_processed = TRUE
+            FROM claimed, chat_sessions AS s
+            WHERE m.id = claimed.id AND s.id = m.session_id
+            RETURNING m.id, m.session_id, s.user_id, m.role, m.content, m.created_at
+        """
+        if self.is_sqlite():
+            # SQLite 写入串行，领取即原子；UPDATE ... RETURNING 不能引用其他表，user_id 用子查询取
+            query = """
+                UPDATE chat_messages
+                SET is_processed = TRUE
+                WHERE id IN (
+                    SELECT id
+                    FROM chat_messages
+                    WHERE is_processed = FALSE
+                      AND created_at <= $2
+                    ORDER BY created_at ASC
+                    LIMIT $1
+                )
+                RETURNING id, session_id,
+                          (SELECT user_id FROM chat_sessions s WHERE s.id = chat_messages.session_id) AS user_id,
+                          role, content, created_at
+            """
+            cutoff = datetime.utcnow() - timedelta(seconds=min_age_seconds)
+            rows = await self.fetch_all(query, (limit, cutoff))
+        else:
+            rows = await self.fetch_all(query, (limit, float(min_age_seconds)))
+        rows.sort(key=lambda row: (row['session_id'], row['created_at'], row['id']))
+        return rows
+
+    async def release_messages(self, message_ids: List[int]) -> bool:
+        """
+        将领取后未能处理的消息放回队列
+        
+        Args:
+            message_ids: 消息ID列表
+            
+        Returns:
+            是否成功
+        """
+        if not message_ids:
+            return True
+        
+        query = """
+            UPDATE chat_messages
+            SET is_processed = FALSE
+            WHERE id = ANY($1::int[])
+        """
+        try:
+            await self.execute_query(query, (list(message_ids),))
+            return True
+        except Exception as e:
+            logger.error(f"放回未处理消息失败: {e}")
+            return False
+
     async def get_session_user_id(self, session_id: str) -> Optional[str]:
         """
         获取会话对应的用户ID
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+游标分页
+基于 (时间列, id) 的键集分页：游标是最后一行排序键的 base64url 编码，对客户端不透明
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+# 带游标但未指定每页数量时使用的默认值
+DEFAULT_PAGE_SIZE = 50
+
+
+def encode_cursor(sort_value: datetime, row_id: Any) -> str:
+    """
+    将排序键编码为游标
+
+    Args:
+        sort_value: 最后一行排序列（created_at / updated_at）的值
+        row_id: 最后一行的ID
+
+    Returns:
+        不透明的游标字符串
+    """
+    payload = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], id_type: Type = str) -> Tuple[Optional[datetime], Any]:
+    """
+    解码游标
+
+    Args:
+        cursor: 游标字符串，None 或空字符串表示第一页
+        id_type: ID列的类型（str 或 int），游标中的ID类型不符时视为无效
+
+    Returns:
+        (排序列的值, id)，第一页为 (None, None)
+
+    Raises:
+        ValueError: 游标格式无效
+    """
+    if not cursor:
+        return None, None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        # bool 是 int 的子类，单独排除
+        if not isinstance(row_id, id_type) or isinstance(row_id, bool):
+            raise TypeError(f"cursor id is {type(row_id).__name__}")
+        return datetime.fromisoformat(sort_value), row_id
+    except Exception as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+
+
+def paginate(
+    rows: List[Dict[str, Any]],
+    limit: int,
+    sort_key: str = "created_at"
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    截取一页结果并生成下一页游标（查询时应多取一行）
+
+    Args:
+        rows: 按 (sort_key, id) 排序、最多 limit + 1 行的查询结果
+        limit: 每页行数
+        sort_key: 排序的时间列
+
+    Returns:
+        (本页行, 下一页游标；没有更多时为None)
+    """
+    if len(rows) <= limit:
+        return rows, None
+
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor(last[sort_key], last["id"])
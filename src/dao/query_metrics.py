@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库查询指标
+按 DAO 方法记录查询耗时直方图、返回行数和错误数，超过阈值的查询写入慢查询日志；
+另记录从连接池获取连接的等待时间
+"""
+
+import bisect
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 直方图桶上界（毫秒），最后一个桶收集超过 2500ms 的查询
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class StatementStats:
+    """单个语句（DAO 方法）的统计"""
+
+    __slots__ = ("statement", "count", "errors", "rows", "total_ms", "max_ms", "buckets")
+
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, elapsed_ms: float, rows: int, failed: bool) -> None:
+        self.count += 1
+        self.rows += rows
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        if failed:
+            self.errors += 1
+
+    def percentile(self, q: float) -> float:
+        """由直方图估算分位数（所在桶的上界，不超过最大耗时）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= target:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return round(min(float(LATENCY_BUCKETS_MS[index]), self.max_ms), 2)
+                return round(self.max_ms, 2)
+        return round(self.max_ms, 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "statement": self.statement,
+            "count": self.count,
+            "errors": self.errors,
+            "rows": self.rows,
+            "avg_rows": round(self.rows / self.count, 2) if self.count else 0,
+            "total_ms": round(self.total_ms, 2),
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 2),
+            "histogram": {
+                (f"<={bound}ms" if i < len(LATENCY_BUCKETS_MS) else f">{LATENCY_BUCKETS_MS[-1]}ms"): count
+                for i, (bound, count) in enumerate(zip(LATENCY_BUCKETS_MS + (None,), self.buckets))
+                if count
+            }
+        }
+
+
+class QueryMetrics:
+    """
+    查询指标收集器
+
+    - 以 DAO 方法名（如 ResearchDAO.get_research_findings）为键，记录耗时直方图和行数
+    - 耗时超过 slow_query_ms 的查询记录 WARNING 日志，附带压缩空白后的 SQL
+    """
+
+    def __init__(self, slow_query_ms: float = 200.0, max_sql_chars: int = 300):
+        """
+        初始化指标收集器
+
+        Args:
+            slow_query_ms: 慢查询阈值（毫秒），<= 0 时不记录慢查询日志
+            max_sql_chars: 慢查询日志中 SQL 的最大长度
+        """
+        self.slow_query_ms = slow_query_ms
+        self.max_sql_chars = max_sql_chars
+        self._stats: Dict[str, StatementStats] = {}
+        self.slow_queries = 0
+
+        # 从连接池获取连接的等待时间
+        self.pool_wait = StatementStats("pool.acquire")
+
+    def record_pool_wait(self, elapsed_ms: float) -> None:
+        """记录一次获取连接的等待时间（毫秒）"""
+        self.pool_wait.record(elapsed_ms, 0, False)
+
+    def record(
+        self,
+        label: str,
+        query: str,
+        elapsed_ms: float,
+        rows: int = 0,
+        failed: bool = False
+    ) -> None:
+        """
+        记录一次查询
+
+        Args:
+            label: 语句标签（DAO 方法名）
+            query: SQL
+            elapsed_ms: 耗时（毫秒）
+            rows: 返回或影响的行数
+            failed: 是否执行失败
+        """
+        stats = self._stats.get(label)
+        if stats is None:
+            stats = self._stats[label] = StatementStats(label)
+        stats.record(elapsed_ms, rows, failed)
+
+        if 0 < self.slow_query_ms <= elapsed_ms:
+            self.slow_queries += 1
+            sql = _WHITESPACE.sub(" ", query).strip()[:self.max_sql_chars]
+            logger.warning(f"慢查询 {label}: {elapsed_ms:.1f}ms, {rows} 行: {sql}")
+
+    def snapshot(self, top: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        按总耗时从高到低返回各语句的统计
+
+        Args:
+            top: 只返回前 top 条
+
+        Returns:
+            统计字典列表
+        """
+        ordered = sorted(self._stats.values(), key=lambda s: s.total_ms, reverse=True)
+        if top is not None:
+            ordered = ordered[:top]
+        return [stats.to_dict() for stats in ordered]
+
+    def reset(self) -> None:
+        """清空统计"""
+        self._stats.clear()
+        self.slow_queries = 0
+        self.pool_wait = StatementStats("pool.acquire")
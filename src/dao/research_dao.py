@@ -7,9 +7,34 @@
 
 import asyncio
 import json
+import re
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 from src.dao.base import BaseDAO
+from src.dao.chat_dao import ChatDAO
+from src.dao.pagination import decode_cursor, paginate
+
+
+# 中日韩统一表意文字、假名和韩文音节
+_CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]")
+
+
+def _ids_by_ordinal(rows: List[Any], count: int) -> List[Optional[int]]:
+    """
+    按 WITH ORDINALITY 的序号（从1开始）把返回的ID放回输入顺序
+
+    Args:
+        rows: 包含 id 和 ord 列的结果行
+        count: 输入行数
+
+    Returns:
+        与输入顺序一致的ID列表
+    """
+    ids: List[Optional[int]] = [None] * count
+    for row in rows:
+        ids[row["ord"] - 1] = row["id"]
+    return ids
 
 
 class ResearchDAO(BaseDAO):
@@ -59,7 +84,7 @@ class ResearchDAO(BaseDAO):
 
     async def get_research_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """
-        获取研究会话信息
+        获取研究会话信息（读穿缓存，会话状态或计数变化时失效）
 
         Args:
             session_id: 会话ID
@@ -72,8 +97,11 @@ class ResearchDAO(BaseDAO):
         WHERE id = $1
         """
 
-        result = await self.fetch_one(query, (session_id,))
-        return result
+        return await self._session_cache.get_row(
+            "research_session",
+            session_id,
+            lambda: self.fetch_one(query, (session_id,))
+        )
 
     async def update_session_status(
         self,
@@ -84,23 +112,369 @@ class ResearchDAO(BaseDAO):
         """
         更新会话状态
 
+        会话完成时在同一事务内累加到用户统计汇总；已汇总的会话重新激活时先扣除，
+        再次完成时重新汇总
+
         Args:
             session_id: 会话ID
             status: 新状态
             ended_at: 结束时间
         """
-        query = """
+        if not self.is_database_enabled():
+            return
+
+        started = time.perf_counter()
+        try:
+            async with self._acquire() as conn:
+                async with conn.transaction():
+                    await self._set_status(conn, session_id, status, ended_at)
+        except Exception:
+            self._record_query(self._STATUS_QUERY, started, failed=True, label="ResearchDAO.update_session_status")
+            raise
+        self._record_query(self._STATUS_QUERY, started, rows=1, label="ResearchDAO.update_session_status")
+        await self._session_cache.invalidate_row("research_session", session_id)
+
+    _STATUS_QUERY = """
+    UPDATE research_sessions
+    SET status = $2,
+        ended_at = COALESCE($3, ended_at),
+        updated_at = $4,
+        stats_rolled_up = stats_rolled_up AND $2 = 'completed'
+    WHERE id = $1
+    """
+
+    @classmethod
+    async def _set_status(
+        cls,
+        conn: Any,
+        session_id: str,
+        status: str,
+        ended_at: Optional[datetime]
+    ) -> None:
+        """在给定连接（事务）上更新会话状态并维护用户统计汇总"""
+        if status == "completed":
+            await conn.execute(cls._STATUS_QUERY, session_id, status, ended_at, datetime.now())
+            await cls._rollup(conn, session_id)
+        else:
+            await cls._unroll(conn, session_id)
+            await conn.execute(cls._STATUS_QUERY, session_id, status, ended_at, datetime.now())
+
+    async def complete_research_session(
+        self,
+        session_id: str,
+        ended_at: datetime,
+        chat_history: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """
+        研究完成：在一个事务内把会话标记为 completed、累加用户统计汇总，
+        并把本次研究的问答写入聊天历史
+
+        Args:
+            session_id: 会话ID
+            ended_at: 结束时间
+            chat_history: 聊天历史，包含 user_id、title、messages（role / content 列表），
+                可选 chat_session_id（写入已有聊天会话）；None 时只更新状态
+
+        Returns:
+            写入的聊天会话ID，未写入聊天历史或数据库未启用时返回None
+        """
+        if not self.is_database_enabled():
+            return None
+
+        chat_session = None
+        chat_session_id = None
+        messages: List[Dict[str, Any]] = []
+        message_count = None
+        now = datetime.utcnow()
+
+        started = time.perf_counter()
+        try:
+            async with self._acquire() as conn:
+                async with conn.transaction():
+                    await self._set_status(conn, session_id, "completed", ended_at)
+
+                    if chat_history:
+                        chat_session_id = chat_history.get("chat_session_id")
+                        if not chat_session_id:
+                            chat_session = await ChatDAO._insert_session(
+                                conn,
+                                user_id=chat_history["user_id"],
+                                title=chat_history["title"],
+                                llm_provider=chat_history.get("llm_provider", "agentscope"),
+                                model_name=chat_history.get("model_name", "deep-research"),
+                                now=now
+                            )
+                            chat_session_id = chat_session["id"]
+                        messages, message_count = await ChatDAO._insert_messages(
+                            conn, chat_session_id, chat_history["messages"], now
+                        )
+        except Exception:
+            self._record_query(
+                "complete_research_session", started, failed=True,
+                label="ResearchDAO.complete_research_session"
+            )
+            raise
+        self._record_query(
+            "complete_research_session", started, rows=1 + len(messages),
+            label="ResearchDAO.complete_research_session"
+        )
+
+        await self._session_cache.invalidate_row("research_session", session_id)
+        if chat_session_id:
+            await ChatDAO._cache_written(chat_session_id, chat_session, messages, message_count, now)
+        return chat_session_id
+
+    # 把已完成、尚未汇总的会话累加到 research_user_stats（$1 为 NULL 时处理所有待汇总会话）
+    _ROLLUP_QUERY = """
+    WITH rolled AS (
         UPDATE research_sessions
-        SET status = $2,
-            ended_at = COALESCE($3, ended_at),
-            updated_at = $4
-        WHERE id = $1
+        SET stats_rolled_up = TRUE
+        WHERE status = 'completed'
+          AND NOT stats_rolled_up
+          AND ($1::varchar IS NULL OR id = $1::varchar)
+        RETURNING id, COALESCE(user_id, '') AS user_id, findings_count, citations_count
+    ),
+    per_user AS (
+        SELECT user_id,
+               COUNT(*) AS sessions,
+               SUM(findings_count) AS findings,
+               SUM(citations_count) AS citations
+        FROM rolled
+        GROUP BY user_id
+    ),
+    relevance AS (
+        SELECT r.user_id,
+               SUM(f.relevance_score) AS relevance_sum,
+               COUNT(f.relevance_score) AS relevance_count
+        FROM rolled r
+        JOIN research_findings f ON f.session_id = r.id
+        GROUP BY r.user_id
+    ),
+    source_counts AS (
+        SELECT r.user_id, f.source_type, COUNT(*) AS n
+        FROM rolled r
+        JOIN research_findings f ON f.session_id = r.id
+        GROUP BY r.user_id, f.source_type
+    ),
+    sources AS (
+        SELECT user_id, jsonb_object_agg(source_type, n) AS sources
+        FROM source_counts
+        GROUP BY user_id
+    )
+    INSERT INTO research_user_stats AS s (
+        user_id, completed_sessions, total_findings, total_citations,
+        relevance_sum, relevance_count, sources, updated_at
+    )
+    SELECT u.user_id, u.sessions, u.findings, u.citations,
+           COALESCE(r.relevance_sum, 0), COALESCE(r.relevance_count, 0),
+           COALESCE(src.sources, '{}'::jsonb), CURRENT_TIMESTAMP
+    FROM per_user u
+    LEFT JOIN relevance r USING (user_id)
+    LEFT JOIN sources src USING (user_id)
+    ON CONFLICT (user_id) DO UPDATE SET
+        completed_sessions = s.completed_sessions + EXCLUDED.completed_sessions,
+        total_findings = s.total_findings + EXCLUDED.total_findings,
+        total_citations = s.total_citations + EXCLUDED.total_citations,
+        relevance_sum = s.relevance_sum + EXCLUDED.relevance_sum,
+        relevance_count = s.relevance_count + EXCLUDED.relevance_count,
+        sources = (
+            SELECT COALESCE(jsonb_object_agg(k, COALESCE((s.sources->>k)::int, 0) + COALESCE((EXCLUDED.sources->>k)::int, 0)), '{}'::jsonb)
+            FROM (
+                SELECT jsonb_object_keys(s.sources)
+                UNION
+                SELECT jsonb_object_keys(EXCLUDED.sources)
+            ) AS keys(k)
+        ),
+        updated_at = EXCLUDED.updated_at
+    """
+
+    async def rollup_session_statistics(self, session_id: Optional[str] = None) -> None:
         """
+        把已完成的会话累加到用户统计汇总
 
-        await self.execute_query(
-            query,
-            (session_id, status, ended_at, datetime.now())
+        会话完成时 update_session_status 已在同一事务内汇总，完成后才写入的发现、引用和
+        相关性评分在写入的事务内重新汇总（见 _begin_late_write）；启动时以 None 调用一次，
+        补齐汇总表上线前已完成的会话
+
+        Args:
+            session_id: 会话ID，None 表示所有待汇总的会话
+        """
+        if not self.is_sqlite():
+            await self.execute_query(self._ROLLUP_QUERY, (session_id,))
+            return
+
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                await self._rollup(conn, session_id)
+
+    @classmethod
+    async def _rollup(cls, conn: Any, session_id: Optional[str]) -> None:
+        """在给定连接上把已完成的会话累加到用户统计汇总"""
+        if cls.is_sqlite():
+            await cls._apply_rollup_sqlite(conn, session_id, unroll=False)
+        else:
+            await conn.execute(cls._ROLLUP_QUERY, session_id)
+
+    @classmethod
+    async def _unroll(cls, conn: Any, session_id: str) -> None:
+        """在给定连接上从用户统计汇总中扣除一个已汇总的会话"""
+        if cls.is_sqlite():
+            await cls._apply_rollup_sqlite(conn, session_id, unroll=True)
+        else:
+            await conn.execute(cls._UNROLL_QUERY, session_id)
+
+    @classmethod
+    async def _begin_late_write(
+        cls,
+        conn: Any,
+        session_ids: List[str],
+        finding_ids: Optional[List[int]] = None
+    ) -> List[str]:
+        """
+        写入会影响统计的数据（发现、引用、相关性评分）前调用：锁定涉及的会话行，
+        已汇总的会话先从用户统计中扣除并清除汇总标记，写入后由 _finish_late_write 重新汇总。
+        会话完成后才写入的数据因此也计入 research_user_stats
+
+        锁定会话行使写入与会话完成（同样更新会话行）串行：先写入的，完成时的汇总能看到；
+        先完成的，这里会重新汇总
+
+        Args:
+            conn: 事务内的连接
+            session_ids: 写入涉及的会话ID
+            finding_ids: 只知道发现ID时（更新已保存的发现），按发现查出所属会话
+
+        Returns:
+            需要在写入后重新汇总的会话ID
+        """
+        session_ids = list(session_ids)
+        if finding_ids:
+            rows = await conn.fetch(
+                "SELECT DISTINCT session_id FROM research_findings WHERE id = ANY($1::int[])",
+                [int(finding_id) for finding_id in finding_ids]
+            )
+            session_ids.extend(row["session_id"] for row in rows)
+        session_ids = sorted(set(session_ids))
+        if not session_ids:
+            return []
+
+        # SQLite 写事务本身是串行的，没有 FOR UPDATE
+        lock = "" if cls.is_sqlite() else " FOR UPDATE"
+        rows = await conn.fetch(
+            f"""
+            SELECT id, stats_rolled_up FROM research_sessions
+            WHERE id = ANY($1::varchar[])
+            ORDER BY id{lock}
+            """,
+            session_ids
         )
+        rolled = [row["id"] for row in rows if row["stats_rolled_up"]]
+        for session_id in rolled:
+            await cls._unroll(conn, session_id)
+            await conn.execute("UPDATE research_sessions SET stats_rolled_up = FALSE WHERE id = $1", session_id)
+        return rolled
+
+    @classmethod
+    async def _finish_late_write(cls, conn: Any, rolled: List[str]) -> None:
+        """写入后把 _begin_late_write 扣除的会话按最新数据重新汇总"""
+        for session_id in rolled:
+            await cls._rollup(conn, session_id)
+
+    @staticmethod
+    async def _apply_rollup_sqlite(conn: Any, session_id: Optional[str], unroll: bool) -> None:
+        """
+        SQLite 版本的汇总/扣除（不支持带写操作的 CTE 和 jsonb 运算）：
+        取出涉及的会话，按用户合并发现统计和来源计数后逐个写回汇总行
+        """
+        if unroll:
+            sessions = await conn.fetch(
+                """
+                SELECT id, COALESCE(user_id, '') AS user_id, findings_count, citations_count
+                FROM research_sessions
+                WHERE id = $1 AND stats_rolled_up
+                """,
+                session_id
+            )
+        else:
+            sessions = await conn.fetch(
+                """
+                UPDATE research_sessions
+                SET stats_rolled_up = TRUE
+                WHERE status = 'completed' AND NOT stats_rolled_up AND ($1 IS NULL OR id = $1)
+                RETURNING id, COALESCE(user_id, '') AS user_id, findings_count, citations_count
+                """,
+                session_id
+            )
+        if not sessions:
+            return
+
+        session_users = {row["id"]: row["user_id"] for row in sessions}
+        deltas: Dict[str, Dict[str, Any]] = {}
+        for row in sessions:
+            delta = deltas.setdefault(row["user_id"], {
+                "completed_sessions": 0, "total_findings": 0, "total_citations": 0,
+                "relevance_sum": 0.0, "relevance_count": 0, "sources": {}
+            })
+            delta["completed_sessions"] += 1
+            delta["total_findings"] += row["findings_count"]
+            delta["total_citations"] += row["citations_count"]
+
+        finding_stats = await conn.fetch(
+            """
+            SELECT session_id, source_type, COUNT(*) AS n,
+                   COALESCE(SUM(relevance_score), 0) AS relevance_sum,
+                   COUNT(relevance_score) AS relevance_count
+            FROM research_findings
+            WHERE session_id = ANY($1)
+            GROUP BY session_id, source_type
+            """,
+            list(session_users)
+        )
+        for row in finding_stats:
+            delta = deltas[session_users[row["session_id"]]]
+            delta["relevance_sum"] += row["relevance_sum"]
+            delta["relevance_count"] += row["relevance_count"]
+            delta["sources"][row["source_type"]] = delta["sources"].get(row["source_type"], 0) + row["n"]
+
+        sign = -1 if unroll else 1
+        for user_id, delta in deltas.items():
+            current = await conn.fetchrow("SELECT * FROM research_user_stats WHERE user_id = $1", user_id)
+            if current is None:
+                if unroll:
+                    continue
+                current = {
+                    "completed_sessions": 0, "total_findings": 0, "total_citations": 0,
+                    "relevance_sum": 0.0, "relevance_count": 0, "sources": {}
+                }
+
+            sources = dict(current["sources"] or {})
+            for source_type, count in delta["sources"].items():
+                sources[source_type] = sources.get(source_type, 0) + sign * count
+            sources = {source_type: count for source_type, count in sources.items() if count > 0}
+
+            await conn.execute(
+                """
+                INSERT INTO research_user_stats (
+                    user_id, completed_sessions, total_findings, total_citations,
+                    relevance_sum, relevance_count, sources, updated_at
+                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    completed_sessions = EXCLUDED.completed_sessions,
+                    total_findings = EXCLUDED.total_findings,
+                    total_citations = EXCLUDED.total_citations,
+                    relevance_sum = EXCLUDED.relevance_sum,
+                    relevance_count = EXCLUDED.relevance_count,
+                    sources = EXCLUDED.sources,
+                    updated_at = EXCLUDED.updated_at
+                """,
+                user_id,
+                max(current["completed_sessions"] + sign * delta["completed_sessions"], 0),
+                max(current["total_findings"] + sign * delta["total_findings"], 0),
+                max(current["total_citations"] + sign * delta["total_citations"], 0),
+                current["relevance_sum"] + sign * delta["relevance_sum"],
+                max(current["relevance_count"] + sign * delta["relevance_count"], 0),
+                sources,
+                datetime.now()
+            )
 
     async def add_research_finding(
         self,
@@ -145,8 +519,86 @@ class ResearchDAO(BaseDAO):
             )
         )
 
+        # findings_count 已由触发器更新
+        await self._session_cache.invalidate_row("research_session", session_id)
         return result["id"] if result else None
 
+    async def merge_research_finding(
+        self,
+        finding_id: int,
+        support_count: int,
+        source_type: Optional[str] = None,
+        source_url: Optional[str] = None,
+        content: Optional[str] = None,
+        relevance_score: Optional[float] = None
+    ) -> None:
+        """
+        合并近重复的研究发现：更新支持计数，必要时替换为相关性更高的版本
+
+        Args:
+            finding_id: 保留的发现ID
+            support_count: 新的支持计数
+            source_type: 替换后的来源类型（None 表示不替换）
+            source_url: 替换后的来源URL
+            content: 替换后的内容
+            relevance_score: 替换后的相关性评分
+        """
+        query = """
+        UPDATE research_findings
+        SET support_count = $2,
+            source_type = COALESCE($3, source_type),
+            source_url = COALESCE($4, source_url),
+            content = COALESCE($5, content),
+            relevance_score = COALESCE($6, relevance_score)
+        WHERE id = $1
+        """
+
+        await self.execute_query(
+            query,
+            (finding_id, support_count, source_type, source_url, content, relevance_score)
+        )
+
+    async def update_finding_relevance_scores(
+        self,
+        scores: List[tuple]
+    ) -> None:
+        """
+        批量更新研究发现的相关性评分
+
+        Args:
+            scores: (发现ID, 相关性评分) 列表
+        """
+        if not scores:
+            return
+
+        if not self.is_database_enabled():
+            return
+
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                rolled = await self._begin_late_write(conn, [], [fid for fid, _ in scores])
+
+                if self.is_sqlite():
+                    await conn.executemany(
+                        "UPDATE research_findings SET relevance_score = $2 WHERE id = $1",
+                        [(int(fid), float(score)) for fid, score in scores]
+                    )
+                else:
+                    await conn.execute(
+                        """
+                        UPDATE research_findings AS f
+                        SET relevance_score = v.score
+                        FROM (
+                            SELECT unnest($1::int[]) AS id, unnest($2::float8[]) AS score
+                        ) AS v
+                        WHERE f.id = v.id
+                        """,
+                        [int(fid) for fid, _ in scores],
+                        [float(score) for _, score in scores]
+                    )
+
+                await self._finish_late_write(conn, rolled)
+
     async def get_research_findings(
         self,
         session_id: str,
@@ -165,7 +617,8 @@ class ResearchDAO(BaseDAO):
             研究发现列表
         """
         query = """
-        SELECT * FROM research_findings
+        SELECT id, session_id, source_type, source_url, content, relevance_score, support_count, created_at
+        FROM research_findings
         WHERE session_id = $1
         AND relevance_score >= $2
         """
@@ -219,7 +672,7 @@ class ResearchDAO(BaseDAO):
             (
                 session_id,
                 title,
-                json.dumps(authors),
+                list(authors or []),
                 source_url,
                 publication_year,
                 doi,
@@ -228,8 +681,312 @@ class ResearchDAO(BaseDAO):
             )
         )
 
+        await self._session_cache.invalidate_row("research_session", session_id)
         return result["id"] if result else None
 
+    async def add_research_findings(
+        self,
+        session_id: str,
+        findings: List[Dict[str, Any]]
+    ) -> List[Optional[int]]:
+        """
+        批量添加研究发现（一条 INSERT ... SELECT FROM unnest）
+
+        Args:
+            session_id: 会话ID
+            findings: 发现列表，每项包含 source_type / source_url / content，
+                可选 relevance_score / support_count / created_at
+
+        Returns:
+            与输入顺序一致的发现ID列表（数据库未启用时为None）
+        """
+        result = await self.write_session_batch(session_id, findings=findings)
+        return result["finding_ids"]
+
+    async def update_research_findings(self, updates: List[Dict[str, Any]]) -> None:
+        """
+        批量更新研究发现（合并近重复发现后的支持计数和保留版本）
+
+        Args:
+            updates: 更新列表，每项包含 id / support_count / source_type /
+                source_url / content / relevance_score
+        """
+        await self.write_session_batch(None, finding_updates=updates)
+
+    async def add_citations(
+        self,
+        session_id: str,
+        citations: List[Dict[str, Any]]
+    ) -> List[Optional[int]]:
+        """
+        批量添加引用
+
+        Args:
+            session_id: 会话ID
+            citations: 引用列表，每项包含 title / authors / source_url，
+                可选 publication_year / doi / citation_type / created_at
+
+        Returns:
+            与输入顺序一致的引用ID列表（数据库未启用时为None）
+        """
+        result = await self.write_session_batch(session_id, citations=citations)
+        return result["citation_ids"]
+
+    async def write_session_batch(
+        self,
+        session_id: Optional[str],
+        findings: Optional[List[Dict[str, Any]]] = None,
+        finding_updates: Optional[List[Dict[str, Any]]] = None,
+        citations: Optional[List[Dict[str, Any]]] = None,
+        messages: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, List[Optional[int]]]:
+        """
+        在一个连接、一个事务内写入会话缓冲的所有数据
+
+        - 发现/引用：INSERT ... SELECT FROM unnest，一次往返并按输入顺序返回ID
+        - 发现更新：executemany
+        - 长期记忆消息：COPY
+
+        Args:
+            session_id: 会话ID（只有 finding_updates 时可为None）
+            findings: 新发现
+            finding_updates: 已保存发现的更新
+            citations: 新引用
+            messages: 长期记忆消息，每项包含 role / name / content / timestamp
+
+        Returns:
+            包含 finding_ids 和 citation_ids 的字典
+        """
+        findings = findings or []
+        finding_updates = finding_updates or []
+        citations = citations or []
+        messages = messages or []
+
+        if not self.is_database_enabled():
+            return {
+                "finding_ids": [None] * len(findings),
+                "citation_ids": [None] * len(citations)
+            }
+
+        if not (findings or finding_updates or citations or messages):
+            return {"finding_ids": [], "citation_ids": []}
+
+        now = datetime.now()
+        rows = len(findings) + len(finding_updates) + len(citations) + len(messages)
+        started = time.perf_counter()
+        try:
+            async with self._acquire() as conn:
+                async with conn.transaction():
+                    rolled = []
+                    if findings or finding_updates or citations:
+                        # 只有发现更新时没有会话ID，按发现查出所属会话
+                        rolled = await self._begin_late_write(
+                            conn,
+                            [session_id] if session_id else [],
+                            [] if session_id else [u["id"] for u in finding_updates]
+                        )
+                    finding_ids = await self._insert_findings(conn, session_id, findings, now)
+                    await self._update_findings(conn, finding_updates)
+                    citation_ids = await self._insert_citations(conn, session_id, citations, now)
+                    await self._copy_messages(conn, session_id, messages, now)
+                    await self._finish_late_write(conn, rolled)
+        except Exception:
+            self._record_query("write_session_batch", started, failed=True, label="ResearchDAO.write_session_batch")
+            raise
+        self._record_query("write_session_batch", started, rows=rows, label="ResearchDAO.write_session_batch")
+
+        if findings or citations:
+            await self._session_cache.invalidate_row("research_session", session_id)
+
+        return {"finding_ids": finding_ids, "citation_ids": citation_ids}
+
+    @staticmethod
+    async def _insert_findings(
+        conn: Any,
+        session_id: str,
+        findings: List[Dict[str, Any]],
+        now: datetime
+    ) -> List[int]:
+        """在给定连接上批量插入发现，返回按输入顺序排列的ID"""
+        if not findings:
+            return []
+
+        if BaseDAO.is_sqlite():
+            # SQLite 没有 unnest：同一事务内逐行插入（进程内调用，没有网络往返）
+            return [
+                await conn.fetchval(
+                    """
+                    INSERT INTO research_findings (
+                        session_id, source_type, source_url, content,
+                        relevance_score, support_count, created_at
+                    ) VALUES ($1, $2, $3, $4, $5, $6, $7)
+                    RETURNING id
+                    """,
+                    session_id,
+                    f["source_type"],
+                    f.get("source_url"),
+                    f["content"],
+                    float(f.get("relevance_score", 0.8)),
+                    int(f.get("support_count", 1)),
+                    f.get("created_at") or now
+                )
+                for f in findings
+            ]
+
+        # RETURNING 只能返回目标表的列：先为每个序号分配ID，再连同序号一起返回
+        query = """
+        WITH f AS (
+            SELECT nextval(pg_get_serial_sequence('research_findings', 'id'))::int AS id, u.*
+            FROM unnest($2::varchar[], $3::text[], $4::text[], $5::float8[], $6::int[], $7::timestamp[])
+                WITH ORDINALITY AS u(source_type, source_url, content, relevance_score, support_count, created_at, ord)
+        ), inserted AS (
+            INSERT INTO research_findings (
+                id, session_id, source_type, source_url, content,
+                relevance_score, support_count, created_at
+            )
+            SELECT id, $1, source_type, source_url, content, relevance_score, support_count, created_at
+            FROM f
+            RETURNING id
+        )
+        SELECT inserted.id, f.ord
+        FROM inserted JOIN f ON f.id = inserted.id
+        """
+
+        rows = await conn.fetch(
+            query,
+            session_id,
+            [f["source_type"] for f in findings],
+            [f.get("source_url") for f in findings],
+            [f["content"] for f in findings],
+            [float(f.get("relevance_score", 0.8)) for f in findings],
+            [int(f.get("support_count", 1)) for f in findings],
+            [f.get("created_at") or now for f in findings]
+        )
+
+        return _ids_by_ordinal(rows, len(findings))
+
+    @staticmethod
+    async def _update_findings(conn: Any, updates: List[Dict[str, Any]]) -> None:
+        """在给定连接上批量更新发现"""
+        if not updates:
+            return
+
+        query = """
+        UPDATE research_findings
+        SET support_count = $2,
+            source_type = COALESCE($3, source_type),
+            source_url = COALESCE($4, source_url),
+            content = COALESCE($5, content),
+            relevance_score = COALESCE($6, relevance_score)
+        WHERE id = $1
+        """
+
+        await conn.executemany(
+            query,
+            [
+                (
+                    int(u["id"]),
+                    int(u["support_count"]),
+                    u.get("source_type"),
+                    u.get("source_url"),
+                    u.get("content"),
+                    u.get("relevance_score")
+                )
+                for u in updates
+            ]
+        )
+
+    @staticmethod
+    async def _insert_citations(
+        conn: Any,
+        session_id: str,
+        citations: List[Dict[str, Any]],
+        now: datetime
+    ) -> List[int]:
+        """在给定连接上批量插入引用，返回按输入顺序排列的ID"""
+        if not citations:
+            return []
+
+        if BaseDAO.is_sqlite():
+            return [
+                await conn.fetchval(
+                    """
+                    INSERT INTO research_citations (
+                        session_id, title, authors, source_url,
+                        publication_year, doi, citation_type, created_at
+                    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                    RETURNING id
+                    """,
+                    session_id,
+                    c["title"],
+                    list(c.get("authors") or []),
+                    c.get("source_url") or "",
+                    c.get("publication_year"),
+                    c.get("doi"),
+                    c.get("citation_type") or "article",
+                    c.get("created_at") or now
+                )
+                for c in citations
+            ]
+
+        # unnest 会展开多维数组，作者列表以JSON文本传入后再还原为 TEXT[]；ID 与序号的对应同 _insert_findings
+        query = """
+        WITH c AS (
+            SELECT nextval(pg_get_serial_sequence('research_citations', 'id'))::int AS id, u.*
+            FROM unnest($2::text[], $3::text[], $4::text[], $5::int[], $6::varchar[], $7::varchar[], $8::timestamp[])
+                WITH ORDINALITY AS u(title, authors, source_url, publication_year, doi, citation_type, created_at, ord)
+        ), inserted AS (
+            INSERT INTO research_citations (
+                id, session_id, title, authors, source_url,
+                publication_year, doi, citation_type, created_at
+            )
+            SELECT id, $1, title,
+                   ARRAY(SELECT json_array_elements_text(authors::json)),
+                   source_url, publication_year, doi, citation_type, created_at
+            FROM c
+            RETURNING id
+        )
+        SELECT inserted.id, c.ord
+        FROM inserted JOIN c ON c.id = inserted.id
+        """
+
+        rows = await conn.fetch(
+            query,
+            session_id,
+            [c["title"] for c in citations],
+            [json.dumps(list(c.get("authors") or []), ensure_ascii=False) for c in citations],
+            [c.get("source_url") or "" for c in citations],
+            [c.get("publication_year") for c in citations],
+            [c.get("doi") for c in citations],
+            [c.get("citation_type") or "article" for c in citations],
+            [c.get("created_at") or now for c in citations]
+        )
+
+        return _ids_by_ordinal(rows, len(citations))
+
+    @staticmethod
+    async def _copy_messages(
+        conn: Any,
+        session_id: str,
+        messages: List[Dict[str, Any]],
+        now: datetime
+    ) -> None:
+        """在给定连接上用 COPY 写入长期记忆消息"""
+        if not messages:
+            return
+
+        await conn.copy_records_to_table(
+            "research_memory",
+            records=[
+                (session_id, msg["role"], msg.get("name"), msg["content"], msg["timestamp"], now)
+                for msg in messages
+            ],
+            columns=[
+                "session_id", "message_role", "message_name",
+                "message_content", "timestamp", "created_at"
+            ]
+        )
+
     async def get_session_citations(self, session_id: str) -> List[Dict[str, Any]]:
         """
         获取会话的引用列表
@@ -241,20 +998,24 @@ class ResearchDAO(BaseDAO):
             引用列表
         """
         query = """
-        SELECT * FROM research_citations
+        SELECT id, session_id, title, authors, source_url, publication_year, doi, citation_type, created_at
+        FROM research_citations
         WHERE session_id = $1
         ORDER BY publication_year DESC NULLS LAST, created_at DESC
         """
 
         results = await self.fetch_all(query, (session_id,))
 
-        # 解析作者JSON
+        # authors 为 TEXT[]，旧数据可能是JSON字符串
         for result in results:
-            if result.get("authors"):
+            authors = result.get("authors")
+            if isinstance(authors, str):
                 try:
-                    result["authors"] = json.loads(result["authors"])
+                    result["authors"] = json.loads(authors)
                 except json.JSONDecodeError:
                     result["authors"] = []
+            else:
+                result["authors"] = list(authors or [])
 
         return results
 
@@ -301,6 +1062,62 @@ class ResearchDAO(BaseDAO):
 
         return result["id"] if result else None
 
+    async def save_messages_to_long_term(
+        self,
+        session_id: str,
+        messages: List[Dict[str, Any]]
+    ) -> int:
+        """
+        批量保存消息到长期记忆（COPY）
+
+        Args:
+            session_id: 会话ID
+            messages: 消息列表，每项包含 role / name / content / timestamp
+
+        Returns:
+            保存的消息数量
+        """
+        if not messages:
+            return 0
+
+        await self.write_session_batch(session_id, messages=messages)
+
+        return len(messages)
+
+    async def get_long_term_memory_page(
+        self,
+        session_id: str,
+        before_id: Optional[int] = None,
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """
+        按ID倒序分页获取长期记忆消息（键集分页）
+
+        Args:
+            session_id: 会话ID
+            before_id: 只返回ID小于该值的消息，None 表示从最新的消息开始
+            limit: 每页消息数量
+
+        Returns:
+            包含 messages 和 next_before_id（没有更多时为None）的字典
+        """
+        query = """
+        SELECT id, session_id, message_role, message_name, message_content, timestamp, created_at
+        FROM research_memory
+        WHERE session_id = $1 AND ($2::int IS NULL OR id < $2)
+        ORDER BY id DESC
+        LIMIT $3
+        """
+
+        rows = await self.fetch_all(query, (session_id, before_id, limit + 1))
+        has_more = len(rows) > limit
+        messages = rows[:limit]
+
+        return {
+            "messages": messages,
+            "next_before_id": messages[-1]["id"] if has_more else None
+        }
+
     async def get_long_term_memory(
         self,
         session_id: str,
@@ -317,7 +1134,8 @@ class ResearchDAO(BaseDAO):
             消息列表
         """
         query = """
-        SELECT * FROM research_memory
+        SELECT id, session_id, message_role, message_name, message_content, timestamp, created_at
+        FROM research_memory
         WHERE session_id = $1
         ORDER BY created_at DESC
         LIMIT $2
@@ -325,95 +1143,263 @@ class ResearchDAO(BaseDAO):
 
         return await self.fetch_all(query, (session_id, limit))
 
+    async def expire_long_term_memory(
+        self,
+        cutoff: datetime,
+        limit: int = 500,
+        archive: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        删除早于 cutoff 的长期记忆消息（每批最多 limit 行，跳过被锁定的行）
+
+        提供 archive 时，在同一事务内先归档再提交删除，归档失败则回滚。
+
+        Args:
+            cutoff: 创建时间早于该时间的消息过期
+            limit: 本批次最多删除的行数
+            archive: 接收被删除行的异步归档函数
+
+        Returns:
+            被删除的消息（含 row_bytes）
+        """
+        if not self.is_database_enabled():
+            return []
+
+        if self.is_sqlite():
+            # SQLite 写入本身串行，不需要 SKIP LOCKED；行大小按消息内容字节数估算
+            query = """
+            DELETE FROM research_memory
+            WHERE id IN (
+                SELECT id FROM research_memory
+                WHERE created_at < $1
+                ORDER BY id
+                LIMIT $2
+            )
+            RETURNING id, session_id, message_role, message_name,
+                      message_content, timestamp, created_at,
+                      length(CAST(message_content AS BLOB)) AS row_bytes
+            """
+        else:
+            query = """
+            DELETE FROM research_memory m
+            USING (
+                SELECT id FROM research_memory
+                WHERE created_at < $1
+                ORDER BY id
+                LIMIT $2
+                FOR UPDATE SKIP LOCKED
+            ) d
+            WHERE m.id = d.id
+            RETURNING m.id, m.session_id, m.message_role, m.message_name,
+                      m.message_content, m.timestamp, m.created_at,
+                      pg_column_size(m.*) AS row_bytes
+            """
+
+        async with self._acquire() as conn:
+            async with conn.transaction():
+                rows = [dict(row) for row in await conn.fetch(query, cutoff, limit)]
+                if rows and archive is not None:
+                    await archive(rows)
+
+        return rows
+
+    @staticmethod
+    def _contains_cjk(text: str) -> bool:
+        """查询是否包含中日韩字符（'simple' 分词无法切分，需要子串匹配）"""
+        return bool(_CJK_PATTERN.search(text))
+
+    @staticmethod
+    def _like_pattern(text: str) -> str:
+        """转义 LIKE 通配符，构造子串匹配模式"""
+        escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return f"%{escaped}%"
+
     async def search_research_content(
         self,
         query: str,
         limit: int = 10,
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        session_ids: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
         """
-        搜索研究内容
+        搜索研究内容（发现、引用、长期记忆），一次查询按相关度排序
+
+        - 存储的 search_vector 生成列 + GIN 索引做全文匹配，ts_rank 排序
+        - 查询包含中文时同时做子串匹配（pg_trgm 三元组索引加速），命中加权
+        - 会话过滤为 session_id = ANY($3)，多个会话只需一次查询
 
         Args:
             query: 搜索查询
             limit: 结果数量限制
-            session_id: 限制会话ID
+            session_id: 限制单个会话ID
+            session_ids: 限制会话ID列表（None 表示不限）
 
         Returns:
-            搜索结果列表
+            搜索结果列表（含 rank）
+        """
+        if session_id:
+            session_ids = [session_id]
+
+        if self.is_sqlite():
+            return await self._search_research_content_sqlite(query, limit, session_ids)
+
+        use_substring = self._contains_cjk(query)
+
+        sql = """
+        WITH q AS (SELECT websearch_to_tsquery('simple', $1) AS tsq)
+        SELECT content_type, id, session_id, source_type, text, relevance_score, created_at, rank
+        FROM (
+            SELECT 'finding' AS content_type, f.id, f.session_id, f.source_type,
+                   f.content AS text, f.relevance_score, f.created_at,
+                   ts_rank(f.search_vector, q.tsq)
+                     + CASE WHEN $2 AND f.content ILIKE $3 THEN 0.5 ELSE 0 END AS rank
+            FROM research_findings f, q
+            WHERE (f.search_vector @@ q.tsq OR ($2 AND f.content ILIKE $3))
+              AND ($4::varchar[] IS NULL OR f.session_id = ANY($4))
+
+            UNION ALL
+
+            SELECT 'citation', c.id, c.session_id, c.title,
+                   c.search_text, 1.0, c.created_at,
+                   ts_rank(c.search_vector, q.tsq)
+                     + CASE WHEN $2 AND c.search_text ILIKE $3 THEN 0.5 ELSE 0 END
+            FROM research_citations c, q
+            WHERE (c.search_vector @@ q.tsq OR ($2 AND c.search_text ILIKE $3))
+              AND ($4::varchar[] IS NULL OR c.session_id = ANY($4))
+
+            UNION ALL
+
+            SELECT 'memory', m.id, m.session_id, m.message_role,
+                   m.message_content, 0.5, m.created_at,
+                   ts_rank(m.search_vector, q.tsq)
+                     + CASE WHEN $2 AND m.message_content ILIKE $3 THEN 0.5 ELSE 0 END
+            FROM research_memory m, q
+            WHERE (m.search_vector @@ q.tsq OR ($2 AND m.message_content ILIKE $3))
+              AND ($4::varchar[] IS NULL OR m.session_id = ANY($4))
+        ) results
+        ORDER BY rank DESC, relevance_score DESC, created_at DESC
+        LIMIT $5
         """
-        base_query = """
-        SELECT 'finding' as content_type, id, session_id, source_type,
-               content as text, relevance_score, created_at
-        FROM research_findings
-        WHERE to_tsvector('english', content) @@ to_tsquery('english', $1)
 
-        UNION ALL
+        return await self.fetch_all(
+            sql,
+            (query, use_substring, self._like_pattern(query), session_ids, limit)
+        )
 
-        SELECT 'citation' as content_type, id, session_id, title as source_type,
-               title || ' ' || COALESCE(string_agg(author, ' '), '') as text,
-               1.0 as relevance_score, created_at
-        FROM research_citations, json_array_elements_text(cast(authors as json)) as author
-        WHERE to_tsvector('english', title || ' ' || author) @@ to_tsquery('english', $1)
-        GROUP BY id, session_id, title, created_at
+    async def _search_research_content_sqlite(
+        self,
+        query: str,
+        limit: int,
+        session_ids: Optional[List[str]]
+    ) -> List[Dict[str, Any]]:
+        """
+        SQLite 版本的研究内容检索（没有全文索引）：按空白切分查询词做子串匹配，
+        rank 为命中查询词的比例
+        """
+        terms = [term.lower() for term in query.split()][:8]
+        if not terms:
+            return []
+
+        def rank(column: str) -> str:
+            hits = " + ".join(
+                f"(instr(lower({column}), ${index}) > 0)"
+                for index in range(3, len(terms) + 3)
+            )
+            return f"CAST({hits} AS REAL) / {len(terms)}"
+
+        sql = f"""
+        SELECT content_type, id, session_id, source_type, text, relevance_score, created_at, rank
+        FROM (
+            SELECT 'finding' AS content_type, id, session_id, source_type,
+                   content AS text, relevance_score, created_at, {rank("content")} AS rank
+            FROM research_findings
+            WHERE ($1::varchar[] IS NULL OR session_id = ANY($1))
+
+            UNION ALL
+
+            SELECT 'citation', id, session_id, title,
+                   search_text, 1.0, created_at, {rank("search_text")}
+            FROM research_citations
+            WHERE ($1::varchar[] IS NULL OR session_id = ANY($1))
+
+            UNION ALL
+
+            SELECT 'memory', id, session_id, message_role,
+                   message_content, 0.5, created_at, {rank("message_content")}
+            FROM research_memory
+            WHERE ($1::varchar[] IS NULL OR session_id = ANY($1))
+        ) results
+        WHERE rank > 0
+        ORDER BY rank DESC, relevance_score DESC, created_at DESC
+        LIMIT $2
+        """
 
-        UNION ALL
+        return await self.fetch_all(sql, (session_ids, limit, *terms))
 
-        SELECT 'memory' as content_type, id, session_id, message_role as source_type,
-               message_content as text, 0.5 as relevance_score, created_at
-        FROM research_memory
-        WHERE to_tsvector('english', message_content) @@ to_tsquery('english', $1)
+    async def get_user_session_ids(self, user_id: str) -> List[str]:
         """
+        获取用户所有研究会话的ID
 
-        if session_id:
-            base_query += " AND session_id = $2"
-            base_query += f" ORDER BY relevance_score DESC LIMIT $3"
-            return await self.fetch_all(base_query, (query, session_id, limit))
-        else:
-            base_query += f" ORDER BY relevance_score DESC LIMIT $2"
-            return await self.fetch_all(base_query, (query, limit))
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            会话ID列表
+        """
+        rows = await self.fetch_all(
+            "SELECT id FROM research_sessions WHERE user_id = $1",
+            (user_id,)
+        )
+        return [row["id"] for row in rows]
 
     async def get_user_research_sessions(
         self,
         user_id: str,
         status: Optional[str] = None,
-        limit: int = 20
-    ) -> List[Dict[str, Any]]:
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
-        获取用户的研究会话列表
+        分页获取用户的研究会话列表（按创建时间从新到旧）
+
+        发现和引用数量由触发器维护在 findings_count / citations_count 列中。
 
         Args:
             user_id: 用户ID
             status: 过滤状态
-            limit: 结果数量限制
+            limit: 每页数量
+            cursor: 上一页返回的游标，None 表示第一页
 
         Returns:
-            会话列表
-        """
-        query = """
-        SELECT rs.*,
-               COUNT(DISTINCT rf.id) as findings_count,
-               COUNT(DISTINCT rc.id) as citations_count
-        FROM research_sessions rs
-        LEFT JOIN research_findings rf ON rs.id = rf.session_id
-        LEFT JOIN research_citations rc ON rs.id = rc.session_id
-        WHERE rs.user_id = $1
+            包含 sessions 和 next_cursor（没有更多时为None）的字典
+
+        Raises:
+            ValueError: 游标无效
         """
+        created_at, session_id = decode_cursor(cursor)
 
-        params = [user_id]
+        conditions = ["user_id = $1"]
+        params: List[Any] = [user_id]
 
         if status:
-            query += " AND rs.status = $2"
             params.append(status)
+            conditions.append(f"status = ${len(params)}")
 
-        query += """
-        GROUP BY rs.id
-        ORDER BY rs.updated_at DESC
-        LIMIT $""" + str(len(params) + 1)
+        if created_at is not None:
+            params.extend([created_at, session_id])
+            conditions.append(f"(created_at, id) < (${len(params) - 1}, ${len(params)})")
 
-        params.append(limit)
+        params.append(limit + 1)
 
-        return await self.fetch_all(query, tuple(params))
+        query = f"""
+        SELECT * FROM research_sessions
+        WHERE {' AND '.join(conditions)}
+        ORDER BY created_at DESC, id DESC
+        LIMIT ${len(params)}
+        """
+
+        sessions, next_cursor = paginate(await self.fetch_all(query, tuple(params)), limit)
+        return {"sessions": sessions, "next_cursor": next_cursor}
 
     async def get_research_statistics(
         self,
@@ -422,67 +1408,122 @@ class ResearchDAO(BaseDAO):
         """
         获取研究统计信息
 
+        会话数实时统计；发现、引用数量来自汇总表加上未汇总会话的计数列，
+        平均相关度和来源分布只统计已完成（已汇总）的会话
+
         Args:
             user_id: 用户ID，如果为None则获取全局统计
 
         Returns:
             统计信息字典
         """
-        # 会话统计
         session_query = """
         SELECT
-            COUNT(*) as total_sessions,
-            COUNT(CASE WHEN status = 'active' THEN 1 END) as active_sessions,
-            COUNT(CASE WHEN status = 'completed' THEN 1 END) as completed_sessions
+            COUNT(*) AS total_sessions,
+            COUNT(*) FILTER (WHERE status = 'active') AS active_sessions,
+            COUNT(*) FILTER (WHERE status = 'completed') AS completed_sessions,
+            COALESCE(SUM(findings_count) FILTER (WHERE NOT stats_rolled_up), 0) AS pending_findings,
+            COALESCE(SUM(citations_count) FILTER (WHERE NOT stats_rolled_up), 0) AS pending_citations
         FROM research_sessions
         """
-        params = []
 
         if user_id:
             session_query += " WHERE user_id = $1"
-            params.append(user_id)
+            session_stats = await self.fetch_one(session_query, (user_id,))
+            rollups = await self.fetch_all(
+                "SELECT * FROM research_user_stats WHERE user_id = $1",
+                (user_id,)
+            )
+        else:
+            session_stats = await self.fetch_one(session_query)
+            rollups = await self.fetch_all("SELECT * FROM research_user_stats")
+
+        session_stats = session_stats or {}
+        pending_findings = int(session_stats.pop("pending_findings", 0) or 0)
+        pending_citations = int(session_stats.pop("pending_citations", 0) or 0)
+
+        total_findings = pending_findings
+        total_citations = pending_citations
+        relevance_sum = 0.0
+        relevance_count = 0
+        sources: Dict[str, int] = {}
+        for rollup in rollups:
+            total_findings += rollup["total_findings"]
+            total_citations += rollup["total_citations"]
+            relevance_sum += rollup["relevance_sum"]
+            relevance_count += rollup["relevance_count"]
+            for source_type, count in (rollup["sources"] or {}).items():
+                sources[source_type] = sources.get(source_type, 0) + count
 
-        session_stats = await self.fetch_one(session_query, tuple(params) if params else ())
+        return {
+            "sessions": session_stats,
+            "content": {
+                "total_findings": total_findings,
+                "total_citations": total_citations,
+                "avg_relevance_score": relevance_sum / relevance_count if relevance_count else None
+            },
+            "sources": [
+                {"source_type": source_type, "count": count}
+                for source_type, count in sorted(sources.items(), key=lambda item: item[1], reverse=True)
+            ],
+            "timestamp": datetime.now().isoformat()
+        }
 
-        # 发现和引用统计
-        stats_query = """
-        SELECT
-            COUNT(DISTINCT rf.id) as total_findings,
-            COUNT(DISTINCT rc.id) as total_citations,
-            AVG(rf.relevance_score) as avg_relevance_score
-        FROM research_sessions rs
-        LEFT JOIN research_findings rf ON rs.id = rf.session_id
-        LEFT JOIN research_citations rc ON rs.id = rc.session_id
+    async def save_report_artifact(
+        self,
+        session_id: str,
+        etag: str,
+        artifact: Dict[str, Any]
+    ) -> None:
         """
-        params = []
+        保存研究报告制品（已存在则覆盖）
 
-        if user_id:
-            stats_query += " WHERE rs.user_id = $1"
-            params.append(user_id)
+        Args:
+            session_id: 会话ID
+            etag: 报告内容的 ETag
+            artifact: 报告制品（格式化报告、全文、证据列表等）
+        """
+        query = """
+        INSERT INTO research_reports (session_id, etag, artifact, created_at)
+        VALUES ($1, $2, $3::jsonb, $4)
+        ON CONFLICT (session_id) DO UPDATE SET
+            etag = EXCLUDED.etag,
+            artifact = EXCLUDED.artifact,
+            created_at = EXCLUDED.created_at
+        """
 
-        content_stats = await self.fetch_one(stats_query, tuple(params) if params else ())
+        await self.execute_query(
+            query,
+            (
+                session_id,
+                etag,
+                artifact,
+                datetime.now()
+            )
+        )
 
-        # 来源类型统计
-        source_query = """
-        SELECT source_type, COUNT(*) as count
-        FROM research_findings rf
-        JOIN research_sessions rs ON rf.session_id = rs.id
+    async def get_report_artifact(self, session_id: str) -> Optional[Dict[str, Any]]:
         """
-        params = []
+        获取研究报告制品
 
-        if user_id:
-            source_query += " WHERE rs.user_id = $1"
-            params.append(user_id)
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            报告制品字典，如果不存在返回None
+        """
+        query = """
+        SELECT etag, artifact FROM research_reports
+        WHERE session_id = $1
+        """
 
-        source_query += " GROUP BY source_type ORDER BY count DESC"
-        source_stats = await self.fetch_all(source_query, tuple(params) if params else ())
+        result = await self.fetch_one(query, (session_id,))
+        if not result:
+            return None
 
-        return {
-            "sessions": session_stats or {},
-            "content": content_stats or {},
-            "sources": source_stats or [],
-            "timestamp": datetime.now().isoformat()
-        }
+        artifact = result["artifact"]
+        artifact["etag"] = result["etag"]
+        return artifact
 
     async def delete_research_session(self, session_id: str) -> None:
         """
@@ -491,11 +1532,139 @@ class ResearchDAO(BaseDAO):
         Args:
             session_id: 会话ID
         """
-        # 注意：参数必须作为元组传递
-        await self.execute_query("DELETE FROM research_memory WHERE session_id = $1", (session_id,))
-        await self.execute_query("DELETE FROM research_citations WHERE session_id = $1", (session_id,))
-        await self.execute_query("DELETE FROM research_findings WHERE session_id = $1", (session_id,))
-        await self.execute_query("DELETE FROM research_sessions WHERE id = $1", (session_id,))
+        if not self.is_database_enabled():
+            return
+
+        started = time.perf_counter()
+        try:
+            async with self._acquire() as conn:
+                async with conn.transaction():
+                    # 已汇总的会话先从用户统计中扣除（需要在删除发现之前）
+                    await self._unroll(conn, session_id)
+                    await conn.execute("DELETE FROM research_reports WHERE session_id = $1", session_id)
+                    await conn.execute("DELETE FROM research_memory WHERE session_id = $1", session_id)
+                    await conn.execute("DELETE FROM research_citations WHERE session_id = $1", session_id)
+                    await conn.execute("DELETE FROM research_findings WHERE session_id = $1", session_id)
+                    await conn.execute("DELETE FROM research_sessions WHERE id = $1", session_id)
+        except Exception:
+            self._record_query("delete_research_session", started, failed=True, label="ResearchDAO.delete_research_session")
+            raise
+        self._record_query("delete_research_session", started, rows=1, label="ResearchDAO.delete_research_session")
+        await self._session_cache.invalidate_row("research_session", session_id)
+
+    # 从用户统计汇总中扣除一个已汇总会话的贡献
+    _UNROLL_QUERY = """
+    WITH target AS (
+        SELECT id, COALESCE(user_id, '') AS user_id, findings_count, citations_count
+        FROM research_sessions
+        WHERE id = $1 AND stats_rolled_up
+    ),
+    relevance AS (
+        SELECT COALESCE(SUM(f.relevance_score), 0) AS relevance_sum,
+               COUNT(f.relevance_score) AS relevance_count
+        FROM target t
+        JOIN research_findings f ON f.session_id = t.id
+    ),
+    sources AS (
+        SELECT COALESCE(jsonb_object_agg(source_type, n), '{}'::jsonb) AS sources
+        FROM (
+            SELECT f.source_type, COUNT(*) AS n
+            FROM target t
+            JOIN research_findings f ON f.session_id = t.id
+            GROUP BY f.source_type
+        ) counts
+    )
+    UPDATE research_user_stats s
+    SET completed_sessions = GREATEST(s.completed_sessions - 1, 0),
+        total_findings = GREATEST(s.total_findings - t.findings_count, 0),
+        total_citations = GREATEST(s.total_citations - t.citations_count, 0),
+        relevance_sum = s.relevance_sum - r.relevance_sum,
+        relevance_count = GREATEST(s.relevance_count - r.relevance_count, 0),
+        sources = (
+            SELECT COALESCE(jsonb_object_agg(e.key, e.n), '{}'::jsonb)
+            FROM (
+                SELECT key, value::int - COALESCE((src.sources->>key)::int, 0) AS n
+                FROM jsonb_each_text(s.sources)
+            ) e
+            WHERE e.n > 0
+        ),
+        updated_at = CURRENT_TIMESTAMP
+    FROM target t, relevance r, sources src
+    WHERE s.user_id = t.user_id
+    """
+
+    # 流式导出的各部分（按主键顺序读取，游标无需先排序整个结果集）
+    _EXPORT_SECTIONS = (
+        ("finding", """
+        SELECT id, session_id, source_type, source_url, content, relevance_score, support_count, created_at
+        FROM research_findings
+        WHERE session_id = $1
+        ORDER BY id
+        """),
+        ("citation", """
+        SELECT id, session_id, title, authors, source_url, publication_year, doi, citation_type, created_at
+        FROM research_citations
+        WHERE session_id = $1
+        ORDER BY id
+        """),
+        ("memory", """
+        SELECT id, session_id, message_role, message_name, message_content, timestamp, created_at
+        FROM research_memory
+        WHERE session_id = $1
+        ORDER BY id
+        """),
+    )
+
+    async def iter_session_export(
+        self,
+        session_id: str,
+        chunk_size: int = 500
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        流式导出会话数据
+
+        在同一个只读快照（REPEATABLE READ）中用服务端游标分批读取，
+        依次产出 ("session", 会话行)、("finding", ...)、("citation", ...)、("memory", ...)；
+        会话不存在或数据库未启用时不产出任何记录。
+        迭代期间占用一个专用的连接池连接（不复用调用方工作单元的连接：生成器在 yield 处挂起，
+        调用方的工作单元可能先结束，连接也不能在流式响应期间被其他查询共用），提前关闭生成器即释放
+
+        Args:
+            session_id: 会话ID
+            chunk_size: 游标每批读取的行数
+
+        Yields:
+            (记录类型, 行字典)
+        """
+        if not self.is_database_enabled():
+            return
+
+        started = time.perf_counter()
+        rows = 0
+        failed = True
+        try:
+            async with self._acquire_from_pool() as conn:
+                async with conn.transaction(isolation="repeatable_read", readonly=True):
+                    session = await conn.fetchrow("SELECT * FROM research_sessions WHERE id = $1", session_id)
+                    if session is None:
+                        failed = False
+                        return
+                    yield "session", dict(session)
+
+                    for record_type, query in self._EXPORT_SECTIONS:
+                        async for record in conn.cursor(query, session_id, prefetch=chunk_size):
+                            rows += 1
+                            yield record_type, dict(record)
+            failed = False
+        except (GeneratorExit, asyncio.CancelledError):
+            # 调用方提前结束迭代（如客户端断开）不算失败
+            failed = False
+            raise
+        finally:
+            self._record_query(
+                "iter_session_export", started, rows=rows, failed=failed,
+                label="ResearchDAO.iter_session_export"
+            )
 
     async def export_session_data(self, session_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会话读穿缓存
+缓存对话/研究会话行和每个对话会话最近 N 条消息，DAO 写入时同步更新（write-through），
+删除时失效；进程内 LRU 挡在 Redis 前面
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.core.cache import LRUCache
+from src.core.security.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(value: Any) -> Any:
+    """datetime 编码为 {"$dt": iso}，以便经 JSON 写入 Redis 后还原"""
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, dict):
+        if len(value) == 1 and "$dt" in value:
+            return datetime.fromisoformat(value["$dt"])
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+class SessionCache:
+    """
+    会话读穿缓存
+
+    - 键：cache:{kind}:{id}（会话行）、cache:chat_recent:{session_id}（最近消息窗口）
+    - 消息窗口始终保存会话最近 min(消息总数, window_size) 条消息，
+      因此 count <= window_size 的 get_recent_messages 都可以由窗口直接返回
+    - 读未命中时从数据库加载；加载期间如有同键写入则不回填，避免旧数据覆盖新数据
+    - 局部变更（update_row / append_message）只同步修改进程内副本并删除 Redis 条目，
+      不在 Redis 上做读-改-写，多个进程并发写入时不会互相覆盖
+    - 进程内条目只保留 near_ttl 秒（跨进程写入最多延迟 near_ttl 秒可见），与 Redis 是否可用无关
+    - 返回的行和消息都是副本，调用方可以修改
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: int = 300,
+        near_ttl: float = 2.0,
+        window_size: int = 50
+    ):
+        """
+        初始化会话缓存
+
+        Args:
+            max_size: 进程内缓存条目数
+            ttl: Redis 条目过期时间（秒），<= 0 时关闭缓存
+            near_ttl: 进程内条目的有效期（秒）
+            window_size: 每个会话缓存的最近消息条数
+        """
+        self.ttl = ttl
+        self.near_ttl = near_ttl
+        self.window_size = window_size
+        self._near = LRUCache(max_size=max_size)
+
+        # 写入序号：key -> 最后一次写入的序号，用于判断加载期间是否有写入
+        self._write_seq = 0
+        self._last_write = LRUCache(max_size=max_size)
+
+        self.redis_hits = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def resize(self, max_size: int) -> None:
+        """调整进程内缓存容量"""
+        self._near.max_size = max_size
+        self._last_write.max_size = max_size
+
+    async def _get(self, key: str) -> Any:
+        value = self._near.get(key)
+        if value is not None:
+            return value
+
+        if redis_client.is_available():
+            value = await redis_client.get_json(key)
+            if value is not None:
+                self.redis_hits += 1
+                value = _decode(value)
+                self._near.set(key, value, ttl=self.near_ttl)
+        return value
+
+    async def _set(self, key: str, value: Any) -> None:
+        self._near.set(key, value, ttl=self.near_ttl)
+        if redis_client.is_available():
+            await redis_client.set_json(key, _encode(value), expire=self.ttl)
+
+    async def _patch(self, key: str, patch: Callable[[Any], Any]) -> None:
+        """
+        修改进程内副本并删除 Redis 条目，下次 Redis 读取未命中时从数据库重新加载
+
+        进程内的读取和写回之间没有 await，不会与同一进程的其他写入交错
+        """
+        self._mark_write(key)
+        value = self._near.get(key)
+        if value is not None:
+            self._near.set(key, patch(value), ttl=self.near_ttl)
+        await redis_client.delete(key)
+
+    def _mark_write(self, key: str) -> None:
+        self._write_seq += 1
+        self._last_write.set(key, self._write_seq)
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """从数据库加载并回填（加载期间有写入时不回填）"""
+        seq = self._write_seq
+        value = await loader()
+        if value is not None and self._last_write.get(key, 0) <= seq:
+            await self._set(key, value)
+        return value
+
+    @property
+    def write_seq(self) -> int:
+        """当前写入序号"""
+        return self._write_seq
+
+    async def discard_writes_since(self, seq: int) -> None:
+        """
+        删除序号 seq 之后写入过的条目（工作单元事务回滚后调用，丢弃未提交的数据）
+
+        Args:
+            seq: 事务开始时的 write_seq
+        """
+        keys = [key for key in list(self._last_write) if self._last_write.get(key, 0) > seq]
+        for key in keys:
+            await self.delete(key)
+
+    async def delete(self, key: str) -> None:
+        """删除缓存条目"""
+        self._mark_write(key)
+        self._near.delete(key)
+        await redis_client.delete(key)
+
+    # ---------------- 会话行 ----------------
+
+    @staticmethod
+    def row_key(kind: str, row_id: str) -> str:
+        return f"cache:{kind}:{row_id}"
+
+    async def get_row(
+        self,
+        kind: str,
+        row_id: str,
+        loader: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        读取会话行，未命中时调用 loader 从数据库加载
+
+        Args:
+            kind: 行类型（chat_session / research_session）
+            row_id: 会话ID
+            loader: 加载函数
+
+        Returns:
+            会话行副本，不存在返回None
+        """
+        if not self.enabled:
+            return await loader()
+
+        key = self.row_key(kind, row_id)
+        row = await self._get(key)
+        if row is None:
+            row = await self._load(key, loader)
+        return dict(row) if row is not None else None
+
+    async def set_row(self, kind: str, row_id: str, row: Dict[str, Any]) -> None:
+        """写入完整的会话行（如新建会话）"""
+        if not self.enabled:
+            return
+        key = self.row_key(kind, row_id)
+        self._mark_write(key)
+        await self._set(key, dict(row))
+
+    async def update_row(self, kind: str, row_id: str, changes: Dict[str, Any]) -> None:
+        """
+        把变更合并到进程内缓存的会话行，并使 Redis 中的会话行失效
+
+        Args:
+            kind: 行类型
+            row_id: 会话ID
+            changes: 变更的列
+        """
+        if not self.enabled:
+            return
+        await self._patch(self.row_key(kind, row_id), lambda row: {**row, **changes})
+
+    async def invalidate_row(self, kind: str, row_id: str) -> None:
+        """使会话行失效"""
+        if self.enabled:
+            await self.delete(self.row_key(kind, row_id))
+
+    # ---------------- 最近消息窗口 ----------------
+
+    @staticmethod
+    def window_key(session_id: str) -> str:
+        return f"cache:chat_recent:{session_id}"
+
+    async def get_recent_messages(
+        self,
+        session_id: str,
+        count: int,
+        loader: Callable[[int], Awaitable[List[Dict[str, Any]]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        读取会话最近 count 条消息（按时间从旧到新）
+
+        Args:
+            session_id: 会话ID
+            count: 消息条数
+            loader: 加载函数，参数为条数
+
+        Returns:
+            消息列表副本
+        """
+        if not self.enabled or count > self.window_size:
+            return await loader(count)
+        if count <= 0:
+            return []
+
+        key = self.window_key(session_id)
+        window = await self._get(key)
+        if window is None:
+            window = await self._load(key, lambda: loader(self.window_size))
+        return [dict(message) for message in window[-count:]]
+
+    async def set_recent_messages(self, session_id: str, messages: List[Dict[str, Any]]) -> None:
+        """写入完整的消息窗口（如新建或清空会话时为空列表）"""
+        if not self.enabled:
+            return
+        key = self.window_key(session_id)
+        self._mark_write(key)
+        await self._set(key, [dict(message) for message in messages[-self.window_size:]])
+
+    async def append_message(self, session_id: str, message: Dict[str, Any]) -> None:
+        """
+        把新消息追加到进程内缓存的窗口并截断，并使 Redis 中的窗口失效
+
+        Args:
+            session_id: 会话ID
+            message: 消息行
+        """
+        if not self.enabled:
+            return
+        await self._patch(
+            self.window_key(session_id),
+            lambda window: (window + [dict(message)])[-self.window_size:]
+        )
+
+    async def invalidate_messages(self, session_id: str) -> None:
+        """使消息窗口失效"""
+        if self.enabled:
+            await self.delete(self.window_key(session_id))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            统计信息字典
+        """
+        stats = self._near.get_stats()
+        stats.update({
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "window_size": self.window_size,
+            "redis_hits": self.redis_hits
+        })
+        return stats
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 嵌入式存储后端
+PostgreSQL 不可用时的单机存储：WAL 模式的 SQLite 数据库文件。
+SQLitePool / SQLiteConnection 实现 DAO 用到的 asyncpg 接口子集
+（acquire / execute / fetch / fetchrow / fetchval / executemany / copy_records_to_table / transaction），
+执行前把 PostgreSQL 写法转换为 SQLite 写法，DAO 的大部分 SQL 无需修改
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_ANY_PARAM = re.compile(r"=\s*ANY\s*\(\s*\$(\d+)(?:::[A-Za-z_]\w*(?:\[\])?)?\s*\)", re.IGNORECASE)
+_CAST = re.compile(r"::[A-Za-z_]\w*(?:\[\])?")
+_PARAM = re.compile(r"\$(\d+)")
+_ILIKE = re.compile(r"\bILIKE\b", re.IGNORECASE)
+_NOW = re.compile(r"\bNOW\(\)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=512)
+def translate_query(query: str) -> str:
+    """
+    把 PostgreSQL 写法转换为 SQLite 写法
+
+    - col = ANY($n)  ->  col IN (SELECT value FROM json_each(?n))（列表参数以JSON传入）
+    - $n -> ?n，去掉 ::type 类型转换
+    - ILIKE -> LIKE（SQLite 的 LIKE 对 ASCII 不区分大小写），NOW() -> CURRENT_TIMESTAMP
+    """
+    query = _ANY_PARAM.sub(r"IN (SELECT value FROM json_each(?\1))", query)
+    query = _CAST.sub("", query)
+    query = _PARAM.sub(r"?\1", query)
+    query = _ILIKE.sub("LIKE", query)
+    return _NOW.sub("CURRENT_TIMESTAMP", query)
+
+
+def _adapt(value: Any) -> Any:
+    """
+    列表/字典参数转为JSON文本；datetime 转为 "YYYY-MM-DD HH:MM:SS.ffffff"，
+    与 CURRENT_TIMESTAMP 写入的值可按字符串比较
+    """
+    if isinstance(value, datetime):
+        return value.isoformat(" ", "microseconds")
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+
+def _adapt_params(params: Sequence[Any]) -> List[Any]:
+    return [_adapt(value) for value in params]
+
+
+def _decode_timestamp(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _decode_json(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _decode_boolean(value: Any) -> Any:
+    return bool(value) if isinstance(value, int) else value
+
+
+# 按列的声明类型解码读出的值（只作用于本后端的连接，不注册进程级的 sqlite3 转换器）
+_DECODERS = {
+    "TIMESTAMP": _decode_timestamp,
+    "JSON": _decode_json,
+    "BOOLEAN": _decode_boolean,
+}
+
+_SCHEMA_VERBS = {"CREATE", "ALTER", "DROP"}
+
+
+class _ColumnTypes:
+    """
+    列名到声明类型的映射（连接池内所有连接共享，任一连接变更表结构后重新读取）
+
+    同名列的声明类型在各表中一致，因此按结果集的列名即可确定解码方式
+    """
+
+    def __init__(self):
+        self._types: Dict[str, str] = {}
+        self._decoders: Dict[Tuple[str, ...], List[Optional[Callable[[Any], Any]]]] = {}
+
+    def load(self, conn: sqlite3.Connection) -> None:
+        """从 PRAGMA table_info 读取所有表中需要解码的列"""
+        types = {}
+        for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+            for column in conn.execute(f'PRAGMA table_info("{table}")').fetchall():
+                declared = (column[2] or "").split("(", 1)[0].strip().upper()
+                if declared in _DECODERS:
+                    types[column[1]] = declared
+        self._types = types
+        self._decoders = {}
+
+    def decoders(self, names: Tuple[str, ...]) -> List[Optional[Callable[[Any], Any]]]:
+        decoders = self._decoders.get(names)
+        if decoders is None:
+            decoders = [_DECODERS.get(self._types.get(name, "")) for name in names]
+            self._decoders[names] = decoders
+        return decoders
+
+
+def _status(cursor: sqlite3.Cursor, query: str) -> str:
+    """仿照 asyncpg 的命令状态（如 "UPDATE 3"）"""
+    verb = query.lstrip().split(None, 1)[0].upper() if query.strip() else ""
+    return f"{verb} {max(cursor.rowcount, 0)}"
+
+
+class SQLiteConnection:
+    """
+    SQLite 连接
+
+    每个连接独占一个工作线程，sqlite3 调用在线程中执行，不阻塞事件循环；
+    连接处于自动提交模式，transaction() 显式开启 BEGIN IMMEDIATE 事务。
+    读出的行按列名对应的声明类型（TIMESTAMP / JSON / BOOLEAN）解码
+    """
+
+    def __init__(
+        self,
+        path: str,
+        busy_timeout_ms: int = 5000,
+        column_types: Optional[_ColumnTypes] = None
+    ):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._depth = 0
+        self._column_types = column_types or _ColumnTypes()
+
+    def _connect(self) -> None:
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.row_factory = self._make_row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        self._conn = conn
+        self._column_types.load(conn)
+
+    def _make_row(self, cursor: sqlite3.Cursor, values: Tuple[Any, ...]) -> sqlite3.Row:
+        decoders = self._column_types.decoders(tuple(column[0] for column in cursor.description))
+        values = tuple(
+            decode(value) if decode is not None and value is not None else value
+            for decode, value in zip(decoders, values)
+        )
+        return sqlite3.Row(cursor, values)
+
+    async def _run(self, func, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def open(self) -> None:
+        await self._run(self._connect)
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+    def _execute(self, query: str, params: Sequence[Any]) -> str:
+        cursor = self._conn.execute(translate_query(query), _adapt_params(params))
+        try:
+            cursor.fetchall()
+            status = _status(cursor, query)
+        finally:
+            cursor.close()
+
+        if status.split(None, 1)[0] in _SCHEMA_VERBS:
+            self._column_types.load(self._conn)
+        return status
+
+    def _fetch(self, query: str, params: Sequence[Any]) -> List[sqlite3.Row]:
+        cursor = self._conn.execute(translate_query(query), _adapt_params(params))
+        try:
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _executemany(self, query: str, args: Iterable[Sequence[Any]]) -> None:
+        self._conn.executemany(translate_query(query), [_adapt_params(params) for params in args])
+
+    async def execute(self, query: str, *args: Any) -> str:
+        return await self._run(self._execute, query, args)
+
+    async def fetch(self, query: str, *args: Any) -> List[sqlite3.Row]:
+        return await self._run(self._fetch, query, args)
+
+    async def fetchrow(self, query: str, *args: Any) -> Optional[sqlite3.Row]:
+        rows = await self.fetch(query, *args)
+        return rows[0] if rows else None
+
+    async def fetchval(self, query: str, *args: Any) -> Any:
+        row = await self.fetchrow(query, *args)
+        return row[0] if row is not None else None
+
+    async def executemany(self, query: str, args: Iterable[Sequence[Any]]) -> None:
+        await self._run(self._executemany, query, list(args))
+
+    def _executescript(self, script: str) -> None:
+        self._conn.executescript(script)
+        self._column_types.load(self._conn)
+
+    async def executescript(self, script: str) -> None:
+        await self._run(self._executescript, script)
+
+    async def copy_records_to_table(
+        self,
+        table_name: str,
+        records: Iterable[Sequence[Any]],
+        columns: Sequence[str]
+    ) -> None:
+        """COPY 的替代：一次 executemany 批量插入"""
+        placeholders = ", ".join("?" for _ in columns)
+        query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+        await self.executemany(query, records)
+
+    async def cursor(self, query: str, *args: Any, prefetch: int = 50) -> AsyncIterator[sqlite3.Row]:
+        """
+        游标读取：在工作线程中每次 fetchmany(prefetch) 条，不把整个结果集读入内存
+
+        Args:
+            query: SQL查询语句
+            args: 查询参数
+            prefetch: 每批读取的行数
+        """
+        cursor = await self._run(self._conn.execute, translate_query(query), _adapt_params(args))
+        try:
+            while True:
+                rows = await self._run(cursor.fetchmany, prefetch)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            await self._run(cursor.close)
+
+    @asynccontextmanager
+    async def transaction(
+        self,
+        *,
+        isolation: Optional[str] = None,
+        readonly: bool = False,
+        deferrable: bool = False
+    ) -> AsyncIterator[None]:
+        """
+        事务（嵌套时使用保存点）
+
+        参数与 asyncpg 一致；readonly 事务使用 BEGIN DEFERRED，不占写锁，
+        WAL 模式下从第一次读取起看到一致的快照。isolation / deferrable 无对应概念，忽略
+        """
+        savepoint = f"sp_{self._depth}"
+        if self._depth == 0:
+            begin = "BEGIN DEFERRED" if readonly else "BEGIN IMMEDIATE"
+        else:
+            begin = f"SAVEPOINT {savepoint}"
+        await self._run(self._conn.execute, begin)
+        self._depth += 1
+        try:
+            yield
+        except BaseException:
+            self._depth -= 1
+            if self._depth == 0:
+                await self._run(self._conn.execute, "ROLLBACK")
+            else:
+                await self._run(self._conn.execute, f"ROLLBACK TO {savepoint}")
+                await self._run(self._conn.execute, f"RELEASE {savepoint}")
+            raise
+        else:
+            self._depth -= 1
+            await self._run(self._conn.execute, "COMMIT" if self._depth == 0 else f"RELEASE {savepoint}")
+
+
+class SQLitePool:
+    """
+    SQLite 连接池
+
+    WAL 模式下读连接互不阻塞，也不阻塞写入；写入由 SQLite 文件锁串行，
+    等锁超过 busy_timeout_ms 才报错
+    """
+
+    def __init__(self, path: str, size: int = 4, busy_timeout_ms: int = 5000):
+        """
+        初始化连接池
+
+        Args:
+            path: 数据库文件路径
+            size: 连接数
+            busy_timeout_ms: 等待写锁的超时时间（毫秒）
+        """
+        self.path = path
+        self.size = max(1, size)
+        self.busy_timeout_ms = busy_timeout_ms
+        self._connections: List[SQLiteConnection] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._column_types = _ColumnTypes()
+
+    async def open(self) -> None:
+        """创建数据库目录和连接"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            conn = SQLiteConnection(self.path, self.busy_timeout_ms, self._column_types)
+            await conn.open()
+            self._connections.append(conn)
+            self._idle.put_nowait(conn)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[SQLiteConnection]:
+        conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+
+    def get_size(self) -> int:
+        return len(self._connections)
+
+    def get_idle_size(self) -> int:
+        return self._idle.qsize() if self._idle is not None else 0
+
+    async def executescript(self, script: str) -> None:
+        """执行建表等多语句脚本"""
+        async with self.acquire() as conn:
+            await conn.executescript(script)
+
+    async def close(self) -> None:
+        for conn in self._connections:
+            await conn.close()
+        self._connections.clear()
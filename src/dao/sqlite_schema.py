@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 表结构定义
+与 db_schema 中的 PostgreSQL 表结构保持同样的表和列：
+- SERIAL 改为 INTEGER PRIMARY KEY，JSONB 和 TEXT[] 以 JSON 文本保存（声明类型 JSON，读取时自动解析）
+- 不建 tsvector 列和 GIN 索引，研究内容检索使用子串匹配
+- 发现/引用计数由行级触发器维护
+"""
+
+# 用户表
+USERS_TABLE = """
+CREATE TABLE IF NOT EXISTS users (
+    id VARCHAR(255) PRIMARY KEY,
+    username VARCHAR(100) UNIQUE NOT NULL,
+    email VARCHAR(255) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    full_name VARCHAR(255),
+    avatar_url TEXT,
+    is_active BOOLEAN DEFAULT TRUE,
+    is_verified BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_login_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_users_is_active ON users(is_active);
+"""
+
+# 用户偏好设置表
+USER_PREFERENCES_TABLE = """
+CREATE TABLE IF NOT EXISTS user_preferences (
+    id INTEGER PRIMARY KEY,
+    user_id VARCHAR(255) UNIQUE NOT NULL,
+    default_llm_provider VARCHAR(50) DEFAULT 'deepseek',
+    default_model VARCHAR(100),
+    theme VARCHAR(50) DEFAULT 'light',
+    language VARCHAR(10) DEFAULT 'zh',
+    preferences JSON,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+"""
+
+# 对话会话表
+CHAT_SESSIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    id VARCHAR(255) PRIMARY KEY,
+    user_id VARCHAR(255) NOT NULL,
+    title VARCHAR(500) NOT NULL,
+    llm_provider VARCHAR(50) NOT NULL,
+    model_name VARCHAR(100) NOT NULL,
+    system_prompt TEXT,
+    status VARCHAR(50) DEFAULT 'active',
+    message_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+DROP INDEX IF EXISTS idx_chat_sessions_user_page;
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_recent ON chat_sessions(user_id, updated_at DESC, id DESC);
+"""
+
+# 对话消息表
+CHAT_MESSAGES_TABLE = """
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id INTEGER PRIMARY KEY,
+    session_id VARCHAR(255) NOT NULL,
+    role VARCHAR(50) NOT NULL,
+    content TEXT NOT NULL,
+    model_name VARCHAR(100),
+    tokens_used INTEGER,
+    metadata JSON,
+    is_processed BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (session_id) REFERENCES chat_sessions(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_messages_session_page ON chat_messages(session_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_unprocessed ON chat_messages(created_at) WHERE NOT is_processed;
+"""
+
+# 用户事实表
+USER_FACTS_TABLE = """
+CREATE TABLE IF NOT EXISTS user_facts (
+    id VARCHAR(255) PRIMARY KEY,
+    user_id VARCHAR(255) NOT NULL,
+    fact_content TEXT NOT NULL,
+    fact_type VARCHAR(50) DEFAULT 'general',
+    source_session_id VARCHAR(255),
+    source_message_id INTEGER,
+    validity_score FLOAT DEFAULT 1.0,
+    embedding_id VARCHAR(255),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (source_session_id) REFERENCES chat_sessions(id) ON DELETE SET NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_facts_user_id ON user_facts(user_id, validity_score);
+"""
+
+# 研究会话表
+RESEARCH_SESSIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS research_sessions (
+    id VARCHAR(255) PRIMARY KEY,
+    user_id VARCHAR(255),
+    title TEXT NOT NULL,
+    status VARCHAR(50) NOT NULL DEFAULT 'active',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    ended_at TIMESTAMP,
+    findings_count INTEGER NOT NULL DEFAULT 0,
+    citations_count INTEGER NOT NULL DEFAULT 0,
+    stats_rolled_up BOOLEAN NOT NULL DEFAULT FALSE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_research_sessions_user_page ON research_sessions(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_research_sessions_pending_rollup ON research_sessions(id)
+    WHERE status = 'completed' AND NOT stats_rolled_up;
+"""
+
+# 研究发现表
+RESEARCH_FINDINGS_TABLE = """
+CREATE TABLE IF NOT EXISTS research_findings (
+    id INTEGER PRIMARY KEY,
+    session_id VARCHAR(255) NOT NULL,
+    source_type VARCHAR(100) NOT NULL,
+    source_url TEXT,
+    content TEXT NOT NULL,
+    relevance_score FLOAT DEFAULT 0.8,
+    support_count INTEGER NOT NULL DEFAULT 1,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (session_id) REFERENCES research_sessions(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_research_findings_session_id ON research_findings(session_id);
+
+CREATE TRIGGER IF NOT EXISTS trg_research_findings_count_insert
+AFTER INSERT ON research_findings
+BEGIN
+    UPDATE research_sessions SET findings_count = findings_count + 1 WHERE id = NEW.session_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_research_findings_count_delete
+AFTER DELETE ON research_findings
+BEGIN
+    UPDATE research_sessions SET findings_count = MAX(findings_count - 1, 0) WHERE id = OLD.session_id;
+END;
+"""
+
+# 引用表（authors 为 JSON 数组，search_text 用于子串检索）
+CITATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS research_citations (
+    id INTEGER PRIMARY KEY,
+    session_id VARCHAR(255) NOT NULL,
+    title TEXT NOT NULL,
+    authors JSON NOT NULL,
+    source_url TEXT NOT NULL,
+    publication_year INTEGER,
+    doi VARCHAR(255),
+    citation_type VARCHAR(50) DEFAULT 'article',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    search_text TEXT GENERATED ALWAYS AS (title || ' ' || authors) VIRTUAL,
+    FOREIGN KEY (session_id) REFERENCES research_sessions(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_research_citations_session_id ON research_citations(session_id);
+
+CREATE TRIGGER IF NOT EXISTS trg_research_citations_count_insert
+AFTER INSERT ON research_citations
+BEGIN
+    UPDATE research_sessions SET citations_count = citations_count + 1 WHERE id = NEW.session_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_research_citations_count_delete
+AFTER DELETE ON research_citations
+BEGIN
+    UPDATE research_sessions SET citations_count = MAX(citations_count - 1, 0) WHERE id = OLD.session_id;
+END;
+"""
+
+# 长期记忆表
+LONG_TERM_MEMORY_TABLE = """
+CREATE TABLE IF NOT EXISTS research_memory (
+    id INTEGER PRIMARY KEY,
+    session_id VARCHAR(255) NOT NULL,
+    message_role VARCHAR(50) NOT NULL,
+    message_name VARCHAR(255),
+    message_content TEXT NOT NULL,
+    timestamp VARCHAR(50) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (session_id) REFERENCES research_sessions(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_research_memory_session_id ON research_memory(session_id, id);
+CREATE INDEX IF NOT EXISTS idx_research_memory_created_at ON research_memory(created_at);
+"""
+
+# 研究报告制品表
+RESEARCH_REPORTS_TABLE = """
+CREATE TABLE IF NOT EXISTS research_reports (
+    session_id VARCHAR(255) PRIMARY KEY,
+    etag VARCHAR(128) NOT NULL,
+    artifact JSON NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (session_id) REFERENCES research_sessions(id) ON DELETE CASCADE
+);
+"""
+
+# 用户研究统计汇总表
+RESEARCH_USER_STATS_TABLE = """
+CREATE TABLE IF NOT EXISTS research_user_stats (
+    user_id VARCHAR(255) PRIMARY KEY,
+    completed_sessions INTEGER NOT NULL DEFAULT 0,
+    total_findings INTEGER NOT NULL DEFAULT 0,
+    total_citations INTEGER NOT NULL DEFAULT 0,
+    relevance_sum REAL NOT NULL DEFAULT 0,
+    relevance_count INTEGER NOT NULL DEFAULT 0,
+    sources JSON NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# 开发和测试用户（与 PostgreSQL 初始化一致）
+TEST_USERS = """
+INSERT OR IGNORE INTO users (id, username, email, password_hash, full_name, is_active, is_verified)
+VALUES
+    ('demo_user_001', 'demo_user_001', 'demo001@example.com', 'dummy_hash_for_testing', 'Demo User 001', TRUE, TRUE),
+    ('demo_user_002', 'demo_user_002', 'demo002@example.com', 'dummy_hash_for_testing', 'Demo User 002', TRUE, TRUE),
+    ('demo_user_003', 'demo_user_003', 'demo003@example.com', 'dummy_hash_for_testing', 'Demo User 003', TRUE, TRUE),
+    ('test_user', 'test_user', 'test@example.com', 'dummy_hash_for_testing', 'Test User', TRUE, TRUE);
+"""
+
+# 所有表的创建顺序（考虑外键依赖）
+ALL_TABLES = {
+    "users": USERS_TABLE,
+    "user_preferences": USER_PREFERENCES_TABLE,
+    "chat_sessions": CHAT_SESSIONS_TABLE,
+    "chat_messages": CHAT_MESSAGES_TABLE,
+    "user_facts": USER_FACTS_TABLE,
+    "research_sessions": RESEARCH_SESSIONS_TABLE,
+    "research_findings": RESEARCH_FINDINGS_TABLE,
+    "research_citations": CITATIONS_TABLE,
+    "research_memory": LONG_TERM_MEMORY_TABLE,
+    "research_reports": RESEARCH_REPORTS_TABLE,
+    "research_user_stats": RESEARCH_USER_STATS_TABLE,
+}
@@ -42,7 +42,8 @@ class ResearchListResponse(BaseModel):
     """研究列表响应"""
     success: bool = Field(..., description="是否成功")
     sessions: List[Dict[str, Any]] = Field(..., description="会话列表")
-    total: int = Field(..., description="总数")
+    total: int = Field(..., description="本页数量")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，没有更多时为空")
     message: str = Field(..., description="消息")
 
 
@@ -6,15 +6,21 @@ AgentScope研究服务
 """
 
 import asyncio
+import hashlib
+import json
 import uuid
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncGenerator, Dict, List, Optional, Union
 from src.services.base_service import BaseService
 
 # 导入自定义组件
 from src.core.agentscope.research_agent import DeepResearchAgent
 from src.core.agentscope.memory.research_memory import ResearchMemoryManager
+from src.core.agentscope.memory.evidence_graph import build_evidence_graph
+from src.core.agentscope.memory.knowledge_index import ResearchKnowledgeIndex
+from src.config.memory_config import get_memory_config
 from src.dao.research_dao import ResearchDAO
+from src.core.cache import LRUCache
 
 # 导入LLM抽象层
 from src.core.llm.factory import LLMFactory
@@ -22,6 +28,18 @@ from src.core.llm.base_llm import BaseLLM, ConfigurationError
 from src.config.llm_config import get_config
 
 
+def _json_default(value: Any) -> Any:
+    """JSON 序列化 datetime 等非标准类型"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _ndjson_line(record: Dict[str, Any]) -> str:
+    """编码为一行 NDJSON"""
+    return json.dumps(record, ensure_ascii=False, default=_json_default) + "\n"
+
+
 class AgentScopeResearchService(BaseService):
     """
     AgentScope研究服务
@@ -47,8 +65,19 @@ class AgentScopeResearchService(BaseService):
         # 内存中的会话信息（用于数据库未启用时）
         self.session_cache: Dict[str, Dict[str, Any]] = {}
         
-        # ✅ 报告缓存 - 研究完成后缓存完整报告，避免重复生成
-        self.report_cache: Dict[str, Dict[str, Any]] = {}
+        # ✅ 报告缓存 - 研究完成后生成一次报告制品（格式化报告、全文、证据列表、ETag），
+        # 之后所有 SSE / 导出请求直接复用，容量有界
+        self.report_cache = LRUCache(max_size=256)
+        
+        # 跨会话研究知识索引 - 已完成研究的发现供相似的新研究复用
+        memory_config = get_memory_config()
+        self.knowledge_index: Optional[ResearchKnowledgeIndex] = None
+        if memory_config.research_reuse_enabled:
+            self.knowledge_index = ResearchKnowledgeIndex(
+                max_age_days=memory_config.research_reuse_max_age_days,
+                min_similarity=memory_config.research_reuse_min_similarity,
+                top_k=memory_config.research_reuse_top_k
+            )
         
         # 设置默认LLM提供商
         self.llm_provider = llm_provider
@@ -184,49 +213,25 @@ class AgentScopeResearchService(BaseService):
             async def research_with_completion():
                 """研究完成后自动生成并缓存报告"""
                 try:
+                    # 检索相似的历史研究发现，注入本次研究上下文
+                    prior_knowledge = await self._lookup_prior_knowledge(query, user_id, session_id)
+
                     result = await researcher.conduct_research(
                         query=query,
                         research_type=research_type,
                         sources=sources,
-                        include_images=include_images
+                        include_images=include_images,
+                        prior_knowledge=prior_knowledge
                     )
                     
-                    # ✅ 研究完成后，立即生成完整报告并缓存
+                    report_metrics = result.get("report_metrics", {}) if isinstance(result, dict) else {}
+                    if report_metrics.get("first_token_ms") is not None:
+                        print(f"✓ 报告首字节耗时: {report_metrics['first_token_ms']} ms, "
+                              f"总耗时: {report_metrics.get('total_ms')} ms")
+
+                    # ✅ 研究完成：状态、统计汇总和聊天历史一次提交，报告制品并行生成
                     print(f"✓ 研究完成，开始生成最终报告...")
-                    
-                    try:
-                        final_report = await self._generate_final_report(session_id, researcher)
-                        
-                        # 缓存完整报告
-                        if final_report:
-                            self.report_cache[session_id] = final_report
-                            print(f"✓ 报告已生成并缓存")
-                        else:
-                            print(f"⚠️ 报告生成返回空值")
-                    except Exception as report_error:
-                        print(f"⚠️ 生成报告时出错: {str(report_error)}")
-                        import traceback
-                        traceback.print_exc()
-                        # 即使报告生成失败，也继续更新状态
-                    
-                    # 更新会话状态为已完成（即使报告生成失败）
-                    try:
-                        await self.research_dao.update_session_status(
-                            session_id,
-                            "completed",
-                            datetime.now()
-                        )
-                        print(f"✓ 会话状态已更新为 completed")
-                    except Exception as db_error:
-                        print(f"⚠️ 更新数据库状态失败: {str(db_error)}")
-                        # 数据库更新失败不影响研究结果
-                    
-                    # ✅ 保存研究结果到聊天历史记录
-                    try:
-                        await self._save_research_to_chat_history(session_id, query, result)
-                    except Exception as save_error:
-                        print(f"⚠️ 保存到聊天历史失败: {str(save_error)}")
-                        # 保存失败不影响研究结果
+                    await self._complete_research(session_id, query, user_id, researcher, result)
                     
                     print(f"✓ 会话 {session_id} 完成")
                     return result
@@ -279,6 +284,224 @@ class AgentScopeResearchService(BaseService):
                 "session_id": session_id
             }
 
+    async def _complete_research(
+        self,
+        session_id: str,
+        query: str,
+        user_id: str,
+        researcher: DeepResearchAgent,
+        result: Any
+    ) -> None:
+        """
+        研究完成流水线
+
+        - 先写入写缓冲中剩余的发现、引用和消息，报告制品和统计汇总都读取完整数据
+        - 报告制品（最终报告数据、格式化报告、证据列表）在后台任务中生成，状态更新不等待格式化
+        - 在一个事务内把会话标记为 completed、累加用户统计并写入聊天历史；
+          报告正文直接取自内存中的研究结果
+        - 跨会话知识索引与上述步骤并行
+        - 研究结果不含报告正文时，聊天历史在报告制品生成后补写
+
+        Args:
+            session_id: 会话ID
+            query: 研究问题
+            user_id: 用户ID
+            researcher: 研究代理实例
+            result: conduct_research 的返回值
+        """
+        succeeded = isinstance(result, dict) and not result.get("error")
+        report_text = result.get("report") if isinstance(result, dict) else None
+
+        try:
+            if not await self._flush_research_writes(researcher):
+                print(f"⚠️ 部分研究数据未能写入，报告和统计可能不完整")
+        except Exception as flush_error:
+            print(f"⚠️ 写入剩余研究数据失败: {str(flush_error)}")
+
+        report_task = asyncio.create_task(self._prepare_report_artifact(session_id, researcher))
+        index_task = None
+        if succeeded:
+            index_task = asyncio.create_task(
+                self._index_research_knowledge(session_id, query, user_id, researcher)
+            )
+
+        # 更新会话状态为已完成（即使报告生成失败）
+        try:
+            chat_session_id = await self.research_dao.complete_research_session(
+                session_id,
+                datetime.now(),
+                chat_history=self._build_chat_history(session_id, query, report_text)
+            )
+            print(f"✓ 会话状态已更新为 completed")
+            if chat_session_id:
+                print(f"✓ 保存研究报告到聊天历史: {chat_session_id}")
+        except Exception as db_error:
+            print(f"⚠️ 更新数据库状态失败: {str(db_error)}")
+            # 数据库更新失败不影响研究结果
+
+        artifact = await report_task
+        if artifact:
+            await self._store_report_artifact(artifact)
+            print(f"✓ 报告已生成并缓存 (ETag: {artifact['etag']})")
+
+            if not report_text:
+                report_text = artifact["export_data"].get("report")
+                if report_text:
+                    await self._save_research_to_chat_history(session_id, query, report_text)
+
+        if index_task is not None:
+            await index_task
+
+    async def _prepare_report_artifact(
+        self,
+        session_id: str,
+        researcher: DeepResearchAgent
+    ) -> Optional[Dict[str, Any]]:
+        """
+        生成最终报告并构建报告制品（完成流水线的后台步骤）
+
+        Args:
+            session_id: 会话ID
+            researcher: 研究代理实例
+
+        Returns:
+            报告制品，生成失败时返回None
+        """
+        try:
+            final_report = await self._generate_final_report(session_id, researcher)
+            if not final_report:
+                print(f"⚠️ 报告生成返回空值")
+                return None
+            return await self._build_report_artifact(session_id, final_report)
+        except Exception as report_error:
+            print(f"⚠️ 生成报告时出错: {str(report_error)}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+    @staticmethod
+    async def _flush_research_writes(researcher: DeepResearchAgent) -> bool:
+        """写入写缓冲中剩余的发现、引用和消息，使完成时的统计汇总包含全部数据，返回是否写入成功"""
+        session_memory = getattr(researcher, "session_memory", None)
+        if session_memory is None:
+            return True
+        return await session_memory.flush_writes()
+
+    def _build_chat_history(
+        self,
+        session_id: str,
+        query: str,
+        report: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        构建写入聊天历史的问答（用户问题 + 研究报告）
+
+        Args:
+            session_id: 研究会话ID
+            query: 用户查询
+            report: 报告正文
+
+        Returns:
+            complete_research_session 的 chat_history 参数，缺少报告或用户时返回None
+        """
+        session_info = self.session_cache.get(session_id, {})
+        user_id = session_info.get("user_id")
+        if not user_id or not report:
+            return None
+
+        return {
+            "user_id": user_id,
+            "chat_session_id": session_info.get("chat_session_id"),
+            "title": f"深度研究: {query[:30]}...",
+            "llm_provider": "agentscope",
+            "model_name": "deep-research",
+            "messages": [
+                {"role": "user", "content": query},
+                {"role": "assistant", "content": report}
+            ]
+        }
+
+    async def _lookup_prior_knowledge(
+        self,
+        query: str,
+        user_id: Optional[str],
+        session_id: str,
+        timeout: float = 10.0
+    ) -> List[Dict[str, Any]]:
+        """
+        检索与查询相似的历史研究发现（失败或超时时返回空列表，不影响研究）
+
+        Args:
+            query: 研究查询
+            user_id: 用户ID
+            session_id: 当前会话ID
+            timeout: 检索超时（秒）
+
+        Returns:
+            历史发现列表
+        """
+        if self.knowledge_index is None:
+            return []
+
+        try:
+            prior_knowledge = await asyncio.wait_for(
+                self.knowledge_index.search(query, user_id=user_id, exclude_session_id=session_id),
+                timeout=timeout
+            )
+            if prior_knowledge:
+                print(f"✓ 找到 {len(prior_knowledge)} 条可复用的历史研究发现")
+            return prior_knowledge
+        except asyncio.TimeoutError:
+            print(f"⚠️ 检索历史研究发现超时 ({timeout}s)")
+        except Exception as e:
+            print(f"⚠️ 检索历史研究发现失败: {str(e)}")
+        return []
+
+    async def _index_research_knowledge(
+        self,
+        session_id: str,
+        query: str,
+        user_id: Optional[str],
+        researcher: DeepResearchAgent
+    ) -> None:
+        """
+        将已完成研究的发现和引用写入跨会话知识索引（不重复写入注入的历史发现）
+
+        Args:
+            session_id: 会话ID
+            query: 研究查询
+            user_id: 用户ID
+            researcher: 研究代理
+        """
+        if self.knowledge_index is None or researcher.session_memory is None:
+            return
+
+        try:
+            # 发现和引用的ID在写缓冲写入数据库后才分配，索引前先显式写入
+            if not await researcher.session_memory.flush_writes():
+                print(f"⚠️ 写缓冲写入失败，跳过研究知识索引")
+                return
+
+            citations = await researcher.session_memory.get_citations()
+            findings = [
+                entry for entry in researcher.session_memory.finding_index
+                if entry.content not in researcher.seeded_contents
+            ]
+
+            indexed = await self.knowledge_index.index_session(
+                session_id=session_id,
+                query=query,
+                findings=findings,
+                citations=citations,
+                user_id=user_id,
+                tool_calls=researcher.tool_call_count,
+                duration_seconds=researcher.research_duration_seconds
+            )
+            if indexed:
+                print(f"✓ 已将 {indexed} 条发现/引用写入研究知识索引")
+        except Exception as e:
+            print(f"⚠️ 写入研究知识索引失败: {str(e)}")
+
     async def get_research_status(self, session_id: str) -> Dict[str, Any]:
         """
         获取研究状态
@@ -358,6 +581,178 @@ class AgentScopeResearchService(BaseService):
                 "error": f"获取状态失败: {str(e)}"
             }
 
+    async def wait_for_report_stream(self, session_id: str, timeout: float) -> bool:
+        """
+        等待研究进入报告流式生成阶段
+
+        Args:
+            session_id: 会话ID
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            报告流是否已开始
+        """
+        researcher = self.active_researchers.get(session_id)
+        if researcher is None:
+            await asyncio.sleep(timeout)
+            return False
+
+        try:
+            await asyncio.wait_for(researcher.report_started.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def stream_report_deltas(self, session_id: str) -> AsyncGenerator[str, None]:
+        """
+        订阅正在生成的报告，按顺序产出报告增量文本
+
+        Args:
+            session_id: 会话ID
+
+        Yields:
+            报告增量文本
+        """
+        researcher = self.active_researchers.get(session_id)
+        if researcher is None or not researcher.report_started.is_set():
+            return
+
+        async for delta in researcher.iter_report_chunks():
+            yield delta
+
+    def get_report_metrics(self, session_id: str) -> Dict[str, Any]:
+        """
+        获取报告生成指标（首字节耗时、总耗时等）
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            报告指标字典
+        """
+        researcher = self.active_researchers.get(session_id)
+        if researcher is not None:
+            return researcher.get_report_metrics()
+
+        artifact = self.report_cache.get(session_id) or {}
+        return artifact.get("export_data", {}).get("report_metrics", {})
+
+    async def get_report_artifact(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取已完成研究的报告制品
+
+        依次查找进程内缓存、数据库；旧会话没有持久化制品时按导出数据构建一次并回填。
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            报告制品字典（formatted_report、report_text、evidence、etag 等），研究未完成时返回None
+        """
+        artifact = self.report_cache.get(session_id)
+        if artifact is not None:
+            return artifact
+
+        if session_id in self.active_researchers:
+            return None
+
+        try:
+            artifact = await self.research_dao.get_report_artifact(session_id)
+        except Exception as e:
+            print(f"⚠️ 读取报告制品失败: {str(e)}")
+            artifact = None
+
+        if artifact:
+            self.report_cache.set(session_id, artifact)
+            return artifact
+
+        # 只为已完成的会话构建并回填制品，失败、中断或遗留的会话不生成报告
+        session = await self.research_dao.get_research_session(session_id)
+        if not session or session.get("status") != "completed":
+            return None
+
+        export_data = await self.export_session_data(session_id)
+        if not export_data:
+            return None
+
+        artifact = await self._build_report_artifact(session_id, export_data)
+        await self._store_report_artifact(artifact)
+        return artifact
+
+    async def _build_report_artifact(
+        self,
+        session_id: str,
+        export_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        构建报告制品：格式化报告、完整文本和证据列表只计算一次
+
+        Args:
+            session_id: 会话ID
+            export_data: 导出格式的最终报告数据
+
+        Returns:
+            报告制品字典
+        """
+        formatted_report = await self.format_final_report(session_id, export_data)
+        report_text = self.generate_full_report_text(formatted_report)
+        evidence = self._build_evidence_list(export_data.get("citations", []))
+
+        digest = hashlib.sha256()
+        digest.update(report_text.encode("utf-8"))
+        digest.update(json.dumps(evidence, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+
+        return {
+            "session_id": session_id,
+            "export_data": export_data,
+            "formatted_report": formatted_report,
+            "report_text": report_text,
+            "evidence": evidence,
+            "etag": f'"{digest.hexdigest()[:32]}"',
+            "created_at": datetime.now().isoformat()
+        }
+
+    async def _store_report_artifact(self, artifact: Dict[str, Any]) -> None:
+        """
+        将报告制品写入进程内缓存并持久化
+
+        Args:
+            artifact: 报告制品
+        """
+        session_id = artifact["session_id"]
+        self.report_cache.set(session_id, artifact)
+
+        try:
+            await self.research_dao.save_report_artifact(session_id, artifact["etag"], artifact)
+        except Exception as e:
+            # 持久化失败不影响当前进程内的缓存
+            print(f"⚠️ 持久化报告制品失败: {str(e)}")
+
+    def _build_evidence_list(self, citations: List[Dict]) -> List[Dict[str, Any]]:
+        """
+        将引用转换为前端证据列表
+
+        Args:
+            citations: 引用列表
+
+        Returns:
+            证据列表
+        """
+        evidence_list = []
+        for idx, citation in enumerate(citations):
+            source_url = citation.get("source_url", "")
+            evidence_list.append({
+                "id": idx + 1,
+                "source_type": "document" if "arxiv" in source_url.lower() else "web",
+                "source_title": citation.get("title", "未知来源"),
+                "source_url": source_url,
+                "content": f"引用自: {citation.get('title', '')}",
+                "snippet": citation.get("title", ""),
+                "relevance_score": 0.95,
+                "confidence_score": 0.90
+            })
+        return evidence_list
+
     async def interrupt_research(self, session_id: str) -> Dict[str, Any]:
         """
         中断研究会话
@@ -489,29 +884,35 @@ class AgentScopeResearchService(BaseService):
         self,
         user_id: str,
         status: Optional[str] = None,
-        limit: int = 20
-    ) -> List[Dict[str, Any]]:
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
-        获取用户的研究会话列表
+        分页获取用户的研究会话列表
 
         Args:
             user_id: 用户ID
             status: 过滤状态
-            limit: 结果数量限制
+            limit: 每页数量
+            cursor: 上一页返回的游标
 
         Returns:
-            会话列表
+            包含 sessions 和 next_cursor 的字典
+
+        Raises:
+            ValueError: 游标无效
         """
         try:
             # 尝试从数据库获取
-            db_sessions = await self.research_dao.get_user_research_sessions(
+            page = await self.research_dao.get_user_research_sessions(
                 user_id=user_id,
                 status=status,
-                limit=limit
+                limit=limit,
+                cursor=cursor
             )
             
-            if db_sessions:
-                return db_sessions
+            if page["sessions"] or cursor:
+                return page
             
             # 如果数据库未启用，从缓存获取
             cached_sessions = []
@@ -530,11 +931,13 @@ class AgentScopeResearchService(BaseService):
                             "citations_count": 0
                         })
             
-            return cached_sessions[:limit]
+            return {"sessions": cached_sessions[:limit], "next_cursor": None}
             
+        except ValueError:
+            raise
         except Exception as e:
             print(f"获取用户会话失败: {str(e)}")
-            return []
+            return {"sessions": [], "next_cursor": None}
 
     async def export_session_data(self, session_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -548,9 +951,10 @@ class AgentScopeResearchService(BaseService):
         """
         try:
             # ✅ 优先从缓存获取完整报告（研究完成后）
-            if session_id in self.report_cache:
+            artifact = self.report_cache.get(session_id)
+            if artifact is not None:
                 print(f"✓ 从缓存返回报告 (会话: {session_id})")
-                return self.report_cache[session_id]
+                return artifact["export_data"]
             
             # 如果是活跃会话，从代理获取数据
             if session_id in self.active_researchers:
@@ -662,72 +1066,96 @@ class AgentScopeResearchService(BaseService):
             traceback.print_exc()
             return None
 
+    # export_session_data 的列表字段 -> 流式导出的记录类型
+    _EXPORT_RECORD_TYPES = {"findings": "finding", "citations": "citation", "memory": "memory"}
+
+    async def stream_session_export(self, session_id: str) -> AsyncGenerator[str, None]:
+        """
+        流式导出会话数据（NDJSON）
+
+        每行一条 {"type": ..., "data": ...} 记录，依次为 session、finding、citation、memory，
+        最后一行为 {"type": "end", "counts": {...}, "exported_at": ...}。
+        已持久化的会话从数据库游标分批读取，内存占用与会话大小无关；
+        有报告缓存、仍在研究中或数据库未启用时回退到 export_session_data 的结果。
+        会话不存在时不产出任何行
+
+        Args:
+            session_id: 会话ID
+
+        Yields:
+            NDJSON 行
+        """
+        counts: Dict[str, int] = {}
+
+        if self.report_cache.get(session_id) is None and session_id not in self.active_researchers:
+            async for record_type, row in self.research_dao.iter_session_export(session_id):
+                counts[record_type] = counts.get(record_type, 0) + 1
+                yield _ndjson_line({"type": record_type, "data": row})
+
+        if not counts:
+            data = await self.export_session_data(session_id)
+            if not data:
+                return
+            counts["session"] = 1
+            yield _ndjson_line({"type": "session", "data": data.get("session_info", {})})
+            for key, value in data.items():
+                if key in ("session_info", "exported_at"):
+                    continue
+                record_type = self._EXPORT_RECORD_TYPES.get(key)
+                if record_type is None:
+                    # report / tools_used 等附加字段整体作为一条记录
+                    yield _ndjson_line({"type": key, "data": value})
+                    continue
+                counts[record_type] = len(value or [])
+                for item in value or []:
+                    yield _ndjson_line({"type": record_type, "data": item})
+
+        yield _ndjson_line({"type": "end", "counts": counts, "exported_at": datetime.now().isoformat()})
+
     async def _save_research_to_chat_history(
         self,
         session_id: str,
         query: str,
-        result: Dict[str, Any]
+        report: str
     ) -> bool:
         """
-        将研究结果保存到聊天历史记录
+        将研究问答保存到聊天历史记录（完成事务中缺少报告正文时补写）
         
         Args:
             session_id: 研究会话ID
             query: 用户查询
-            result: 研究结果
+            report: 报告正文
             
         Returns:
             是否保存成功
         """
         try:
-            # 获取会话信息
-            session_info = self.session_cache.get(session_id, {})
-            user_id = session_info.get("user_id")
-            
-            if not user_id:
-                print(f"⚠️ 无法保存到聊天历史：未找到 user_id")
+            chat_history = self._build_chat_history(session_id, query, report)
+            if not chat_history:
+                print(f"⚠️ 无法保存到聊天历史：未找到 user_id 或报告内容")
                 return False
             
             # 创建或获取聊天会话
-            chat_session_id = session_info.get("chat_session_id")
+            chat_session_id = chat_history["chat_session_id"]
             
             if not chat_session_id:
-                # 创建新的聊天会话
                 chat_session = await self.chat_dao.create_session(
-                    user_id=user_id,
-                    title=f"深度研究: {query[:30]}...",
-                    llm_provider="agentscope",
-                    model_name="deep-research"  # ✅ 添加 model_name 参数
+                    user_id=chat_history["user_id"],
+                    title=chat_history["title"],
+                    llm_provider=chat_history["llm_provider"],
+                    model_name=chat_history["model_name"]
                 )
-                chat_session_id = chat_session.get("id")
+                if not chat_session:
+                    return False
+                chat_session_id = chat_session["id"]
                 print(f"✓ 创建聊天会话: {chat_session_id}")
             
-            # 保存用户消息
-            await self.chat_dao.add_message(
-                session_id=chat_session_id,
-                role="user",
-                content=query
-            )
-            print(f"✓ 保存用户消息")
-            
-            # 获取报告内容
-            report = result.get("report", "")
-            if not report:
-                # 尝试从缓存获取
-                export_data = await self.export_session_data(session_id)
-                if export_data:
-                    report = export_data.get("report", "")
-            
-            if not report:
-                print(f"⚠️ 未找到报告内容")
-                return False
-            
-            # 保存助手回复（研究报告）
-            await self.chat_dao.add_message(
-                session_id=chat_session_id,
-                role="assistant",
-                content=report
-            )
+            for message in chat_history["messages"]:
+                await self.chat_dao.add_message(
+                    session_id=chat_session_id,
+                    role=message["role"],
+                    content=message["content"]
+                )
             print(f"✓ 保存研究报告到聊天历史")
             
             return True
@@ -755,6 +1183,7 @@ class AgentScopeResearchService(BaseService):
 
             # 从数据库删除
             await self.research_dao.delete_research_session(session_id)
+            self.report_cache.delete(session_id)
 
             return {
                 "success": True,
@@ -787,34 +1216,50 @@ class AgentScopeResearchService(BaseService):
             搜索结果列表
         """
         try:
-            # 如果指定了用户ID，需要先获取用户的会话ID
+            # 如果指定了用户ID，只搜索该用户的会话（一次查询，session_id = ANY）
             session_ids = None
             if user_id:
-                user_sessions = await self.get_user_sessions(user_id)
-                session_ids = [session["id"] for session in user_sessions]
-
-            # 执行搜索
-            results = []
-            if session_ids:
-                for session_id in session_ids:
-                    session_results = await self.research_dao.search_research_content(
-                        query=query,
-                        limit=limit // len(session_ids) + 1,
-                        session_id=session_id
-                    )
-                    results.extend(session_results)
-            else:
-                results = await self.research_dao.search_research_content(
-                    query=query,
-                    limit=limit
-                )
-
-            return results[:limit]
+                session_ids = await self.research_dao.get_user_session_ids(user_id)
+                if not session_ids:
+                    return []
+
+            return await self.research_dao.search_research_content(
+                query=query,
+                limit=limit,
+                session_ids=session_ids
+            )
 
         except Exception as e:
             print(f"搜索研究内容失败: {str(e)}")
             return []
 
+    async def get_memory_page(
+        self,
+        session_id: str,
+        before_id: Optional[int] = None,
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """
+        分页获取研究会话的长期记忆消息（从新到旧）
+
+        Args:
+            session_id: 会话ID
+            before_id: 上一页返回的 next_before_id
+            limit: 每页消息数量
+
+        Returns:
+            包含 messages 和 next_before_id 的字典
+        """
+        try:
+            return await self.memory_manager.page_long_term_memory(
+                session_id,
+                before_id=before_id,
+                limit=limit
+            )
+        except Exception as e:
+            print(f"获取长期记忆失败: {str(e)}")
+            return {"messages": [], "next_before_id": None}
+
     async def get_research_statistics(self, user_id: Optional[str] = None) -> Dict[str, Any]:
         """
         获取研究统计信息
@@ -930,6 +1375,14 @@ class AgentScopeResearchService(BaseService):
                         serialized_citation['created_at'] = str(serialized_citation['created_at'])
                 serialized_citations.append(serialized_citation)
             
+            # 证据图：优先使用研究过程中已计算的发现嵌入
+            # 证据图计算量较大，放到线程中执行，不阻塞同时进行的状态提交
+            evidence_graph = await asyncio.to_thread(
+                build_evidence_graph,
+                serialized_findings,
+                embeddings=self._get_finding_embeddings(researcher, serialized_findings)
+            )
+            
             # 生成报告文本
             report = agent_data.get("report")
             if not report:
@@ -956,6 +1409,8 @@ class AgentScopeResearchService(BaseService):
                 "citations": serialized_citations,
                 "memory": agent_data.get("short_memory", []),
                 "report": report,
+                "report_metrics": agent_data.get("report_metrics", {}),
+                "evidence_graph": evidence_graph,
                 "tools_used": agent_data.get("tools_used", []),
                 "exported_at": updated_at
             }
@@ -968,6 +1423,33 @@ class AgentScopeResearchService(BaseService):
             traceback.print_exc()
             return None
 
+    def _get_finding_embeddings(
+        self,
+        researcher: DeepResearchAgent,
+        findings: List[Dict[str, Any]]
+    ) -> Optional[Any]:
+        """
+        获取研究代理在评分时缓存的发现嵌入（与 findings 逐行对应）
+
+        Args:
+            researcher: 研究代理实例
+            findings: 研究发现列表
+
+        Returns:
+            嵌入矩阵，不可用时返回None
+        """
+        session_memory = getattr(researcher, "session_memory", None)
+        if session_memory is None:
+            return None
+
+        try:
+            return session_memory.relevance_scorer.get_embeddings_for(
+                [finding.get("id") for finding in findings]
+            )
+        except Exception as e:
+            print(f"⚠️ 获取发现嵌入失败: {str(e)}")
+            return None
+
     async def _generate_report_from_data(
         self,
         findings: List[Dict[str, Any]],
@@ -1105,19 +1587,31 @@ class AgentScopeResearchService(BaseService):
             citations = export_data.get("citations", [])
             tools_used = export_data.get("tools_used", [])
             
-            # 构建证据链
-            evidence_chain = self._build_evidence_chain(findings, citations)
+            # 按相关性排序一次，后续各部分共用同一份排序结果
+            ranked_findings = sorted(
+                findings,
+                key=lambda x: x.get("relevance_score", 0),
+                reverse=True
+            )
+            quality_score = self._calculate_quality_score(findings, citations)
+            
+            # 构建证据链（研究完成时已计算的证据图直接复用）
+            evidence_chain = self._build_evidence_chain(
+                ranked_findings,
+                citations,
+                evidence_graph=export_data.get("evidence_graph")
+            )
             
             # 提取关键发现
-            key_findings = self._extract_key_findings(findings)
+            key_findings = self._extract_key_findings(ranked_findings)
             
             # 构建报告
             formatted_report = {
                 "title": session_info.get("title", "深度研究报告"),
-                "summary": self._generate_executive_summary(findings),
-                "sections": self._generate_report_sections(findings),
+                "summary": self._generate_executive_summary(ranked_findings),
+                "sections": self._generate_report_sections(ranked_findings),
                 "methodology": self._generate_methodology_section(tools_used),
-                "conclusions": self._generate_conclusions(findings),
+                "conclusions": self._generate_conclusions(ranked_findings),
                 "references": self._format_references(citations),
                 "key_findings": key_findings,
                 "evidence_chain": evidence_chain,
@@ -1125,8 +1619,8 @@ class AgentScopeResearchService(BaseService):
                     "generated_at": datetime.now().isoformat(),
                     "total_findings": len(findings),
                     "total_citations": len(citations),
-                    "quality_score": self._calculate_quality_score(findings, citations),
-                    "quality_level": self._determine_quality_level(findings, citations),
+                    "quality_score": quality_score,
+                    "quality_level": self._determine_quality_level(findings, citations, score=quality_score),
                     "tools_count": len(tools_used),
                     "evidence_strength": evidence_chain.get("overall_strength", "medium")
                 }
@@ -1159,17 +1653,13 @@ class AgentScopeResearchService(BaseService):
                 }
             }
 
-    def _generate_executive_summary(self, findings: List[Dict]) -> str:
-        """生成执行摘要"""
-        if not findings:
+    def _generate_executive_summary(self, ranked_findings: List[Dict]) -> str:
+        """生成执行摘要（ranked_findings 已按相关性降序排列）"""
+        if not ranked_findings:
             return "未找到相关发现。"
         
         # 选择相关性最高的前3个发现
-        top_findings = sorted(
-            findings,
-            key=lambda x: x.get("relevance_score", 0),
-            reverse=True
-        )[:3]
+        top_findings = ranked_findings[:3]
         
         summary = "## 执行摘要\n\n"
         for i, finding in enumerate(top_findings, 1):
@@ -1181,13 +1671,13 @@ class AgentScopeResearchService(BaseService):
         
         return summary
 
-    def _generate_report_sections(self, findings: List[Dict]) -> List[Dict]:
-        """按来源类型生成报告分段"""
+    def _generate_report_sections(self, ranked_findings: List[Dict]) -> List[Dict]:
+        """按来源类型生成报告分段（ranked_findings 已按相关性降序排列）"""
         sections = []
         
-        # 按来源分类
+        # 按来源分类（分组保持相关性顺序）
         findings_by_source = {}
-        for finding in findings:
+        for finding in ranked_findings:
             source = finding.get("source_type", "其他")
             if source not in findings_by_source:
                 findings_by_source[source] = []
@@ -1204,11 +1694,7 @@ class AgentScopeResearchService(BaseService):
         
         for source, source_findings in findings_by_source.items():
             # 取相关性最高的2个发现
-            top_findings = sorted(
-                source_findings,
-                key=lambda x: x.get("relevance_score", 0),
-                reverse=True
-            )[:2]
+            top_findings = source_findings[:2]
             
             section = {
                 "title": source_names.get(source, f"📌 {source}"),
@@ -1242,19 +1728,15 @@ class AgentScopeResearchService(BaseService):
         
         return methodology
 
-    def _generate_conclusions(self, findings: List[Dict]) -> str:
-        """生成结论部分"""
+    def _generate_conclusions(self, ranked_findings: List[Dict]) -> str:
+        """生成结论部分（ranked_findings 已按相关性降序排列）"""
         conclusions = "## 主要结论\n\n"
         
-        if not findings:
+        if not ranked_findings:
             return conclusions + "基于现有数据无法得出确定的结论。"
         
-        # 按相关性排序，取前5个
-        sorted_findings = sorted(
-            findings,
-            key=lambda x: x.get("relevance_score", 0),
-            reverse=True
-        )[:5]
+        # 取相关性最高的前5个
+        sorted_findings = ranked_findings[:5]
         
         for i, finding in enumerate(sorted_findings, 1):
             content = finding.get("content", "")
@@ -1326,9 +1808,15 @@ class AgentScopeResearchService(BaseService):
         
         return min(score, 1.0)
 
-    def _determine_quality_level(self, findings: List[Dict], citations: List[Dict]) -> str:
-        """确定证据质量等级"""
-        score = self._calculate_quality_score(findings, citations)
+    def _determine_quality_level(
+        self,
+        findings: List[Dict],
+        citations: List[Dict],
+        score: Optional[float] = None
+    ) -> str:
+        """确定证据质量等级（已计算过质量评分时可直接传入 score）"""
+        if score is None:
+            score = self._calculate_quality_score(findings, citations)
         
         if score >= 0.8:
             return "excellent"
@@ -1341,8 +1829,13 @@ class AgentScopeResearchService(BaseService):
         else:
             return "low"
 
-    def _build_evidence_chain(self, findings: List[Dict], citations: List[Dict]) -> Dict[str, Any]:
-        """构建证据链数据结构"""
+    def _build_evidence_chain(
+        self,
+        findings: List[Dict],
+        citations: List[Dict],
+        evidence_graph: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """构建证据链数据结构（findings 已按相关性降序排列）"""
         try:
             # 按来源类型分组
             findings_by_source = {}
@@ -1362,8 +1855,13 @@ class AgentScopeResearchService(BaseService):
                     "strength": "strong" if avg_relevance >= 0.7 else "medium" if avg_relevance >= 0.4 else "weak"
                 }
             
-            # 提取证据关系
-            relationships = self._extract_evidence_relationships(findings)
+            # 提取证据关系：全部发现的证据图（NumPy 不可用时退回前10个发现的两两比较）
+            if evidence_graph is None:
+                evidence_graph = build_evidence_graph(findings)
+            if evidence_graph["stats"]["vector_source"] is None and len(findings) >= 2:
+                relationships = self._extract_evidence_relationships(findings)
+            else:
+                relationships = evidence_graph["edges"]
             
             # 计算整体证据强度
             overall_avg = sum(f.get("relevance_score", 0) for f in findings) / len(findings) if findings else 0
@@ -1373,6 +1871,8 @@ class AgentScopeResearchService(BaseService):
                 "sources": findings_by_source,
                 "source_strengths": source_strengths,
                 "relationships": relationships,
+                "clusters": evidence_graph.get("clusters", []),
+                "graph_stats": evidence_graph.get("stats", {}),
                 "overall_strength": overall_strength,
                 "total_evidence_points": len(findings),
                 "citation_support": len(citations)
@@ -1384,21 +1884,21 @@ class AgentScopeResearchService(BaseService):
                 "sources": {},
                 "source_strengths": {},
                 "relationships": [],
+                "clusters": [],
+                "graph_stats": {},
                 "overall_strength": "weak",
                 "total_evidence_points": 0,
                 "citation_support": 0
             }
 
-    def _extract_evidence_relationships(self, findings: List[Dict]) -> List[Dict]:
-        """提取证据之间的关系"""
+    def _extract_evidence_relationships(self, ranked_findings: List[Dict]) -> List[Dict]:
+        """提取证据之间的关系（ranked_findings 已按相关性降序排列）"""
         relationships = []
         
         try:
             # 简单的关系提取：找出相关性高的发现对
-            sorted_findings = sorted(findings, key=lambda x: x.get("relevance_score", 0), reverse=True)
-            
             # 只处理前10个最相关的发现
-            top_findings = sorted_findings[:10]
+            top_findings = ranked_findings[:10]
             
             for i, finding1 in enumerate(top_findings):
                 for finding2 in top_findings[i+1:]:
@@ -1421,19 +1921,12 @@ class AgentScopeResearchService(BaseService):
             print(f"提取证据关系失败: {str(e)}")
             return []
 
-    def _extract_key_findings(self, findings: List[Dict]) -> List[Dict]:
-        """提取关键发现（最重要的5-10个）"""
+    def _extract_key_findings(self, ranked_findings: List[Dict]) -> List[Dict]:
+        """提取关键发现（最重要的5-10个，ranked_findings 已按相关性降序排列）"""
         try:
-            # 按相关性排序
-            sorted_findings = sorted(
-                findings,
-                key=lambda x: x.get("relevance_score", 0),
-                reverse=True
-            )
-            
             # 提取前8个最相关的发现
             key_findings = []
-            for finding in sorted_findings[:8]:
+            for finding in ranked_findings[:8]:
                 key_findings.append({
                     "content": finding.get("content", "")[:300],  # 限制长度
                     "source_type": finding.get("source_type", "unknown"),
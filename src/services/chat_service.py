@@ -6,7 +6,8 @@
 """
 
 import logging
-from typing import Optional, Dict, Any, List, AsyncGenerator
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, AsyncGenerator
 import json
 
 from src.dao.chat_dao import ChatDAO
@@ -20,6 +21,10 @@ from src.core.llm.zhipu_llm import ZhipuLLM
 from src.services.web_search_service import WebSearchService
 from src.core.memory.memory_manager import Mem0MemoryManager
 from src.core.memory.memory_agent import MemoryAgent
+from src.core.memory.extraction_worker import MemoryExtractionWorker
+from src.core.memory.compaction import MemoryCompactionJob
+from src.config.memory_config import get_memory_config
+from src.dao.base import BaseDAO
 
 logger = logging.getLogger(__name__)
 
@@ -81,6 +86,63 @@ class ChatService:
             self.memory_manager = None
             self.memory_agent = None
             self.memory_enabled = False
+        
+        # 后台记忆提取：有交互请求时让位
+        self.active_requests = 0
+        self.memory_worker: Optional[MemoryExtractionWorker] = None
+        memory_config = get_memory_config()
+        if self.memory_enabled and memory_config.worker_enabled:
+            self.memory_worker = MemoryExtractionWorker(
+                memory_agent=self.memory_agent,
+                poll_interval=memory_config.worker_poll_interval,
+                batch_size=memory_config.worker_batch_size,
+                turns_per_prompt=memory_config.worker_turns_per_prompt,
+                calls_per_minute=memory_config.worker_calls_per_minute,
+                settle_seconds=memory_config.worker_settle_seconds,
+                activity_probe=lambda: self.active_requests
+            )
+        
+        # 记忆保留与压缩：研究长期记忆、用户事实和向量索引
+        self.compaction_job = MemoryCompactionJob(
+            memory_manager=self.memory_manager,
+            max_age_days=memory_config.max_memory_age_days,
+            interval=memory_config.memory_cleanup_interval,
+            compression_enabled=memory_config.compression_enabled,
+            archive_dir=memory_config.memory_archive_dir,
+            min_validity=memory_config.min_validity_score
+        )
+    
+    def start_memory_worker(self) -> bool:
+        """启动后台记忆提取（需要数据库）"""
+        if self.memory_worker is None or not BaseDAO.is_database_enabled():
+            return False
+        self.memory_worker.start()
+        return True
+    
+    async def stop_memory_worker(self):
+        """停止后台记忆提取"""
+        if self.memory_worker is not None:
+            await self.memory_worker.stop()
+    
+    def start_memory_compaction(self) -> bool:
+        """启动记忆保留与压缩任务（需要数据库）"""
+        if not BaseDAO.is_database_enabled():
+            return False
+        self.compaction_job.start()
+        return True
+    
+    async def stop_memory_compaction(self):
+        """停止记忆保留与压缩任务"""
+        await self.compaction_job.stop()
+    
+    @contextmanager
+    def _interactive_request(self):
+        """标记交互式请求进行中，后台提取在此期间暂缓"""
+        self.active_requests += 1
+        try:
+            yield
+        finally:
+            self.active_requests -= 1
     
     def _get_llm_instance(self, provider: str, model_name: str) -> BaseLLM:
         """获取LLM实例"""
@@ -117,10 +179,10 @@ class ChatService:
         self,
         user_id: str,
         limit: int = 50,
-        offset: int = 0
-    ) -> List[Dict[str, Any]]:
-        """获取用户的对话会话列表"""
-        return await self.chat_dao.get_user_sessions(user_id, limit, offset)
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """分页获取用户的对话会话列表，返回 sessions 和 next_cursor"""
+        return await self.chat_dao.get_user_sessions(user_id, limit, cursor)
     
     async def update_session(
         self,
@@ -144,10 +206,11 @@ class ChatService:
     async def get_session_messages(
         self,
         session_id: str,
-        limit: Optional[int] = None
-    ) -> List[Dict[str, Any]]:
-        """获取会话消息"""
-        return await self.chat_dao.get_session_messages(session_id, limit)
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """获取会话消息（指定 limit 时分页），返回 messages 和 next_cursor"""
+        return await self.chat_dao.get_session_messages(session_id, limit, cursor)
     
     async def chat(
         self,
@@ -164,109 +227,115 @@ class ChatService:
         Returns:
             对话响应
         """
-        # 获取会话信息
-        session = await self.chat_dao.get_session(chat_request.session_id)
-        if not session:
-            raise ValueError("会话不存在")
-        
-        # 保存用户消息
-        user_msg_result = await self.chat_dao.add_message(
-            session_id=chat_request.session_id,
-            role="user",
-            content=chat_request.message
-        )
-        
-        # === Mem0 记忆增强：检索相关记忆 ===
-        relevant_memories = []
-        if self.memory_enabled and self.memory_manager:
-            try:
-                relevant_memories = await self.memory_manager.retrieve_memories(
-                    query=chat_request.message,
-                    user_id=session['user_id'],
-                    top_k=5,
-                    use_hyde=True
+        with self._interactive_request():
+            # 会话、用户消息和历史消息在一个事务内完成（LLM 调用前提交并释放连接）
+            async with BaseDAO.unit_of_work(transaction=True):
+                # 获取会话信息
+                session = await self.chat_dao.get_session(chat_request.session_id)
+                if not session:
+                    raise ValueError("会话不存在")
+                
+                # 保存用户消息
+                user_msg_result = await self.chat_dao.add_message(
+                    session_id=chat_request.session_id,
+                    role="user",
+                    content=chat_request.message
                 )
-                logger.debug(f"Retrieved {len(relevant_memories)} relevant memories")
-            except Exception as e:
-                logger.error(f"Failed to retrieve memories: {e}")
-        
-        # 获取历史消息
-        history_messages = await self.chat_dao.get_recent_messages(
-            chat_request.session_id,
-            count=20
-        )
-        
-        # 构建消息列表
-        messages = []
-        
-        # 系统提示词 + 记忆注入
-        system_content = session.get('system_prompt', '')
-        if relevant_memories:
-            memory_context = "\n\n## 用户背景信息（请在回答时参考）：\n"
-            for mem in relevant_memories:
-                memory_context += f"- {mem['content']}\n"
-            system_content = system_content + memory_context if system_content else memory_context.strip()
-        
-        if system_content:
-            messages.append({
-                "role": "system",
-                "content": system_content
-            })
-        
-        for msg in history_messages:
-            messages.append({
-                "role": msg['role'],
-                "content": msg['content']
-            })
-        
-        # 调用LLM
-        llm = self._get_llm_instance(
-            session['llm_provider'],
-            session['model_name']
-        )
-        
-        response = await llm.chat_completion(
-            messages=messages,
-            model=session['model_name'],
-            stream=False
-        )
-        
-        # 提取内容
-        content = response.get('choices', [{}])[0].get('message', {}).get('content', '')
-        
-        # 保存助手回复
-        assistant_msg_result = await self.chat_dao.add_message(
-            session_id=chat_request.session_id,
-            role="assistant",
-            content=content,
-            model_name=session['model_name'],
-            tokens_used=response.get('usage', {}).get('total_tokens')
-        )
-        
-        # === Mem0 记忆提取：后台异步处理 ===
-        if self.memory_enabled and self.memory_agent and background_tasks:
-            try:
-                background_tasks.add_task(
-                    self.memory_agent.process_conversation,
+                
+                # 获取历史消息
+                history_messages = await self.chat_dao.get_recent_messages(
+                    chat_request.session_id,
+                    count=20
+                )
+            
+            # === Mem0 记忆增强：检索相关记忆 ===
+            relevant_memories = []
+            if self.memory_enabled and self.memory_manager:
+                try:
+                    relevant_memories = await self.memory_manager.retrieve_memories(
+                        query=chat_request.message,
+                        user_id=session['user_id'],
+                        top_k=5,
+                        use_hyde=True
+                    )
+                    logger.debug(f"Retrieved {len(relevant_memories)} relevant memories")
+                except Exception as e:
+                    logger.error(f"Failed to retrieve memories: {e}")
+            
+            # 构建消息列表
+            messages = []
+            
+            # 系统提示词 + 记忆注入
+            system_content = session.get('system_prompt', '')
+            if relevant_memories:
+                memory_context = "\n\n## 用户背景信息（请在回答时参考）：\n"
+                for mem in relevant_memories:
+                    memory_context += f"- {mem['content']}\n"
+                system_content = system_content + memory_context if system_content else memory_context.strip()
+            
+            if system_content:
+                messages.append({
+                    "role": "system",
+                    "content": system_content
+                })
+            
+            for msg in history_messages:
+                messages.append({
+                    "role": msg['role'],
+                    "content": msg['content']
+                })
+            
+            # 调用LLM
+            llm = self._get_llm_instance(
+                session['llm_provider'],
+                session['model_name']
+            )
+            
+            response = await llm.chat_completion(
+                messages=messages,
+                model=session['model_name'],
+                stream=False
+            )
+            
+            # 提取内容
+            content = response.get('choices', [{}])[0].get('message', {}).get('content', '')
+            
+            # 保存助手回复（消息和会话计数一起提交）
+            async with BaseDAO.unit_of_work(transaction=True):
+                assistant_msg_result = await self.chat_dao.add_message(
                     session_id=chat_request.session_id,
-                    user_message=chat_request.message,
-                    assistant_message=content,
-                    message_id=assistant_msg_result
+                    role="assistant",
+                    content=content,
+                    model_name=session['model_name'],
+                    tokens_used=response.get('usage', {}).get('total_tokens')
                 )
-                logger.debug("Scheduled memory extraction task")
-            except Exception as e:
-                logger.error(f"Failed to schedule memory extraction: {e}")
-        
-        return {
-            "session_id": chat_request.session_id,
-            "message": {
-                "role": "assistant",
-                "content": content,
-                "model_name": session['model_name']
-            },
-            "usage": response.get('usage'),
-            "memories_used": len(relevant_memories) if relevant_memories else 0
-        }
+            
+            # === Mem0 记忆提取：后台异步处理 ===
+            # 后台提取任务运行时由其统一领取未处理消息
+            worker_running = self.memory_worker is not None and self.memory_worker.running
+            if self.memory_enabled and self.memory_agent and background_tasks and not worker_running:
+                try:
+                    background_tasks.add_task(
+                        self.memory_agent.process_conversation,
+                        session_id=chat_request.session_id,
+                        user_message=chat_request.message,
+                        assistant_message=content,
+                        message_id=assistant_msg_result
+                    )
+                    logger.debug("Scheduled memory extraction task")
+                except Exception as e:
+                    logger.error(f"Failed to schedule memory extraction: {e}")
+            
+            return {
+                "session_id": chat_request.session_id,
+                "message": {
+                    "role": "assistant",
+                    "content": content,
+                    "model_name": session['model_name']
+                },
+                "usage": response.get('usage'),
+                "memories_used": len(relevant_memories) if relevant_memories else 0
+            }
     
     async def chat_stream(
         self,
@@ -281,61 +350,65 @@ class ChatService:
         Yields:
             流式响应数据
         """
-        # 获取会话信息
-        session = await self.chat_dao.get_session(chat_request.session_id)
-        if not session:
-            raise ValueError("会话不存在")
-        
-        # 保存用户消息
-        await self.chat_dao.add_message(
-            session_id=chat_request.session_id,
-            role="user",
-            content=chat_request.message
-        )
-        
-        # 获取历史消息
-        history_messages = await self.chat_dao.get_recent_messages(
-            chat_request.session_id,
-            count=20
-        )
-        
-        # 构建消息列表
-        messages = []
-        if session.get('system_prompt'):
-            messages.append({
-                "role": "system",
-                "content": session['system_prompt']
-            })
-        
-        for msg in history_messages:
-            messages.append({
-                "role": msg['role'],
-                "content": msg['content']
-            })
-        
-        # 调用LLM流式接口
-        llm = self._get_llm_instance(
-            session['llm_provider'],
-            session['model_name']
-        )
-        
-        full_content = ""
-        async for chunk in llm.chat_completion_stream(
-            messages=messages,
-            model=session['model_name'],
-            temperature=1.0
-        ):
-            full_content += chunk
-            # 构造SSE格式的响应
-            yield f"data: {json.dumps({'content': chunk}, ensure_ascii=False)}\n\n"
-        
-        # 保存完整的助手回复
-        await self.chat_dao.add_message(
-            session_id=chat_request.session_id,
-            role="assistant",
-            content=full_content,
-            model_name=session['model_name']
-        )
+        with self._interactive_request():
+            # 会话、用户消息和历史消息在一个事务内完成（流式输出前提交并释放连接）
+            async with BaseDAO.unit_of_work(transaction=True):
+                # 获取会话信息
+                session = await self.chat_dao.get_session(chat_request.session_id)
+                if not session:
+                    raise ValueError("会话不存在")
+                
+                # 保存用户消息
+                await self.chat_dao.add_message(
+                    session_id=chat_request.session_id,
+                    role="user",
+                    content=chat_request.message
+                )
+                
+                # 获取历史消息
+                history_messages = await self.chat_dao.get_recent_messages(
+                    chat_request.session_id,
+                    count=20
+                )
+            
+            # 构建消息列表
+            messages = []
+            if session.get('system_prompt'):
+                messages.append({
+                    "role": "system",
+                    "content": session['system_prompt']
+                })
+            
+            for msg in history_messages:
+                messages.append({
+                    "role": msg['role'],
+                    "content": msg['content']
+                })
+            
+            # 调用LLM流式接口
+            llm = self._get_llm_instance(
+                session['llm_provider'],
+                session['model_name']
+            )
+            
+            full_content = ""
+            async for chunk in llm.chat_completion_stream(
+                messages=messages,
+                model=session['model_name'],
+                temperature=1.0
+            ):
+                full_content += chunk
+                # 构造SSE格式的响应
+                yield f"data: {json.dumps({'content': chunk}, ensure_ascii=False)}\n\n"
+            
+            # 保存完整的助手回复（消息和会话计数一起提交）
+            async with BaseDAO.unit_of_work(transaction=True):
+                await self.chat_dao.add_message(
+                    session_id=chat_request.session_id,
+                    role="assistant",
+                    content=full_content,
+                    model_name=session['model_name']
+                )
     
     def get_available_models(self) -> ModelListResponse:
         """获取可用的模型列表"""
@@ -360,8 +433,13 @@ class ChatService:
         )
     
     async def clear_session_messages(self, session_id: str) -> bool:
-        """清空会话消息"""
-        return await self.chat_dao.clear_session_messages(session_id)
+        """清空会话消息（删除消息和重置计数在一个事务内，任一步失败则都不生效）"""
+        try:
+            async with BaseDAO.unit_of_work(transaction=True):
+                return await self.chat_dao.clear_session_messages(session_id)
+        except RuntimeError as e:
+            logger.error(f"Failed to clear session messages: {e}")
+            return False
 
     async def web_search_chat(
         self,
@@ -378,17 +456,19 @@ class ChatService:
         Returns:
             对话响应
         """
-        # 获取会话信息
-        session = await self.chat_dao.get_session(chat_request.session_id)
-        if not session:
-            raise ValueError("会话不存在")
-        
-        # 保存用户消息
-        await self.chat_dao.add_message(
-            session_id=chat_request.session_id,
-            role="user",
-            content=chat_request.message
-        )
+        # 会话和用户消息在一个事务内完成（联网搜索前提交并释放连接）
+        async with BaseDAO.unit_of_work(transaction=True):
+            # 获取会话信息
+            session = await self.chat_dao.get_session(chat_request.session_id)
+            if not session:
+                raise ValueError("会话不存在")
+
+            # 保存用户消息
+            await self.chat_dao.add_message(
+                session_id=chat_request.session_id,
+                role="user",
+                content=chat_request.message
+            )
         
         # 执行联网搜索
         result = await self.web_search_service.web_search_chat(
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+研究内容检索基准测试
+在本地 PostgreSQL 的临时 schema 中生成中英文混合的研究数据，对比：
+  - 旧实现：每个会话一次查询，查询时对每行计算 to_tsvector('english', ...)
+  - 新实现：search_vector 生成列 + GIN / pg_trgm 索引，session_id = ANY($1) 一次排序查询
+
+用法:
+    DB_PASSWORD=... python test/bench_research_search.py --sessions 200 --findings 50
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+import asyncpg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.dao.db_config import db_config
+from src.dao.db_schema import ALL_TABLES, TRIGRAM_EXTENSION, TRIGRAM_INDEXES
+from src.dao.research_dao import ResearchDAO
+
+SCHEMA = "bench_research_search"
+
+EN_WORDS = [
+    "quantum", "computing", "neural", "network", "protein", "folding", "climate", "model",
+    "battery", "lithium", "transformer", "attention", "graph", "database", "index", "latency",
+    "vaccine", "genome", "robotics", "semiconductor", "fusion", "reactor", "economy", "policy",
+]
+ZH_WORDS = [
+    "量子计算", "神经网络", "蛋白质折叠", "气候模型", "锂电池", "注意力机制", "图数据库",
+    "索引优化", "疫苗研发", "基因组", "机器人", "半导体", "核聚变", "经济政策", "深度研究",
+]
+
+# 旧实现：查询时计算 to_tsvector，每个会话单独执行
+LEGACY_QUERY = """
+SELECT 'finding' as content_type, id, session_id, source_type,
+       content as text, relevance_score, created_at
+FROM research_findings
+WHERE to_tsvector('english', content) @@ plainto_tsquery('english', $1)
+  AND session_id = $2
+UNION ALL
+SELECT 'memory' as content_type, id, session_id, message_role as source_type,
+       message_content as text, 0.5 as relevance_score, created_at
+FROM research_memory
+WHERE to_tsvector('english', message_content) @@ plainto_tsquery('english', $1)
+  AND session_id = $2
+ORDER BY relevance_score DESC LIMIT $3
+"""
+
+
+def random_text(rng: random.Random, words: int = 40) -> str:
+    """生成中英文混合的研究文本"""
+    parts = []
+    for _ in range(words):
+        if rng.random() < 0.5:
+            parts.append(rng.choice(EN_WORDS))
+        else:
+            parts.append(rng.choice(ZH_WORDS))
+    return " ".join(parts)
+
+
+async def setup(conn: asyncpg.Connection, sessions: int, findings: int, messages: int, seed: int):
+    """在临时 schema 中建表并生成数据"""
+    await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await conn.execute(f"CREATE SCHEMA {SCHEMA}")
+    await conn.execute(f"SET search_path TO {SCHEMA}, public")
+
+    for create_sql in ALL_TABLES.values():
+        await conn.execute(create_sql)
+
+    trigram = True
+    try:
+        await conn.execute(TRIGRAM_EXTENSION)
+        for index_sql in TRIGRAM_INDEXES:
+            await conn.execute(index_sql)
+    except Exception as e:
+        trigram = False
+        print(f"⚠️ pg_trgm 不可用，中文查询将顺序扫描: {e}")
+
+    rng = random.Random(seed)
+    users = [f"bench_user_{i}" for i in range(max(1, sessions // 20))]
+    await conn.executemany(
+        "INSERT INTO users (id, username, email, password_hash) VALUES ($1, $1, $1 || '@bench', 'x')",
+        [(user,) for user in users]
+    )
+
+    session_rows = [(f"bench_session_{i}", users[i % len(users)]) for i in range(sessions)]
+    await conn.executemany(
+        "INSERT INTO research_sessions (id, user_id, title) VALUES ($1, $2, 'bench')",
+        session_rows
+    )
+
+    await conn.copy_records_to_table(
+        "research_findings",
+        records=[
+            (session_id, "web", "https://example.com", random_text(rng), rng.random())
+            for session_id, _ in session_rows
+            for _ in range(findings)
+        ],
+        columns=["session_id", "source_type", "source_url", "content", "relevance_score"]
+    )
+    await conn.copy_records_to_table(
+        "research_memory",
+        records=[
+            (session_id, "assistant", "agent", random_text(rng, 80), "bench")
+            for session_id, _ in session_rows
+            for _ in range(messages)
+        ],
+        columns=["session_id", "message_role", "message_name", "message_content", "timestamp"]
+    )
+    await conn.execute("ANALYZE")
+    return users, trigram
+
+
+async def time_it(func, repeat: int):
+    """重复执行并返回毫秒耗时列表"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def summarize(label: str, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{label:<28} p50 {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="研究内容检索基准测试")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--findings", type=int, default=50, help="每个会话的发现数")
+    parser.add_argument("--messages", type=int, default=100, help="每个会话的长期记忆消息数")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="保留临时 schema")
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(db_config.get_dsn())
+    try:
+        print(f"生成数据: {args.sessions} 会话 × ({args.findings} 发现 + {args.messages} 消息)")
+        users, trigram = await setup(conn, args.sessions, args.findings, args.messages, args.seed)
+
+        # 数据最多的用户
+        user_id = users[0]
+        session_ids = [r["id"] for r in await conn.fetch(
+            "SELECT id FROM research_sessions WHERE user_id = $1", user_id
+        )]
+        print(f"用户 {user_id}: {len(session_ids)} 个会话，pg_trgm: {'是' if trigram else '否'}\n")
+
+        dao = ResearchDAO()
+        for query in ("quantum computing", "神经网络"):
+            async def legacy():
+                for session_id in session_ids:
+                    await conn.fetch(LEGACY_QUERY, query, session_id, 20 // len(session_ids) + 1)
+
+            async def indexed():
+                await conn.fetch(
+                    NEW_QUERY, query, dao._contains_cjk(query), dao._like_pattern(query), session_ids, 20
+                )
+
+            print(f"查询: {query}")
+            summarize("  旧：逐会话 + 运行时分词", await time_it(legacy, args.repeat))
+            summarize("  新：生成列 + ANY 单次查询", await time_it(indexed, args.repeat))
+
+            plan = await conn.fetch(
+                "EXPLAIN " + NEW_QUERY, query, dao._contains_cjk(query), dao._like_pattern(query), session_ids, 20
+            )
+            used = sorted({
+                line for row in plan for line in row[0].split()
+                if line.startswith("idx_research_")
+            })
+            print(f"  使用的索引: {', '.join(used) or '无'}\n")
+    finally:
+        if not args.keep:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+
+def _extract_new_query() -> str:
+    """从 ResearchDAO.search_research_content 中取出实际执行的 SQL"""
+    import inspect
+    source = inspect.getsource(ResearchDAO.search_research_content)
+    start = source.index('sql = """') + len('sql = """')
+    return source[start:source.index('"""', start)]
+
+
+NEW_QUERY = _extract_new_query()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
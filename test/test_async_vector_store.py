@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步向量存储测试（NumPy 向量索引）
+检查检索前先落盘同一用户的写入（读到自己的写入），写入失败的批次放回队列重试，
+重试耗尽才丢弃，删除不会被失败后放回队列的写入复活
+
+用法:
+    python -m pytest test/test_async_vector_store.py
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+# src.core.memory 包初始化时会导入记忆管理器及其依赖
+for module in ("dotenv", "redis", "asyncpg", "aiohttp"):
+    pytest.importorskip(module)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.memory.async_vector_store import AsyncVectorStore
+from src.core.memory.numpy_vector_index import NumpyVectorIndex
+
+
+class FlakyIndex(NumpyVectorIndex):
+    """前 failures 次批量写入失败（交替返回 False 和抛出异常）"""
+
+    def __init__(self, persist_directory: str, failures: int = 0):
+        super().__init__(persist_directory=persist_directory)
+        self.failures = failures
+        self.batch_calls = 0
+
+    def batch_add_memories(self, memory_ids, contents, embeddings, metadatas):
+        self.batch_calls += 1
+        if self.failures > 0:
+            self.failures -= 1
+            if self.failures % 2:
+                raise RuntimeError("index unavailable")
+            return False
+        return super().batch_add_memories(memory_ids, contents, embeddings, metadatas)
+
+
+def vector(n: int) -> list:
+    return [1.0 if i == n else 0.0 for i in range(4)]
+
+
+async def add(store: AsyncVectorStore, n: int, user_id: str = "u1") -> None:
+    assert await store.add_memory(f"m{n}", f"fact {n}", vector(n), {"user_id": user_id})
+
+
+def test_search_reads_own_writes(tmp_path):
+    index = FlakyIndex(str(tmp_path))
+
+    async def run():
+        # 后台刷新间隔很长，检索只能靠读取前的刷新看到写入
+        store = AsyncVectorStore(index, flush_interval=60, max_batch_size=100)
+        try:
+            for n in range(3):
+                await add(store, n)
+            results = await store.search_memories(vector(1), user_id="u1", top_k=1)
+            return results, store.get_metrics()
+        finally:
+            await store.close()
+
+    results, metrics = asyncio.run(run())
+    assert results[0]["id"] == "m1"
+    assert metrics["read_flushes"] == 1
+    assert index.batch_calls == 1
+
+
+def test_failed_flush_is_requeued_and_retried(tmp_path):
+    index = FlakyIndex(str(tmp_path), failures=2)
+
+    async def run():
+        store = AsyncVectorStore(index, flush_interval=60, max_batch_size=100)
+        try:
+            await add(store, 0)
+            assert await store.flush() == 0
+            await add(store, 1)
+            # 抛出异常同样按失败处理，批次仍在队列中
+            assert await store.flush() == 0
+            assert await store.flush() == 2
+            results = await store.search_memories(vector(0), user_id="u1", top_k=2)
+            return results, store.get_metrics()
+        finally:
+            await store.close()
+
+    results, metrics = asyncio.run(run())
+    assert [r["id"] for r in results] == ["m0", "m1"]
+    assert metrics["queue_depth"] == 0
+    assert metrics["flushed_items"] == 2
+    assert metrics["dropped_items"] == 0
+
+
+def test_background_flusher_retries_after_failure(tmp_path):
+    index = FlakyIndex(str(tmp_path), failures=1)
+
+    async def run():
+        store = AsyncVectorStore(index, flush_interval=0.01, max_batch_size=1)
+        try:
+            await add(store, 0)
+            for _ in range(200):
+                if store.get_metrics()["flushed_items"]:
+                    break
+                await asyncio.sleep(0.01)
+            return store.get_metrics()
+        finally:
+            await store.close()
+
+    metrics = asyncio.run(run())
+    assert metrics["flushed_items"] == 1
+    assert metrics["failed_items"] == 1
+    assert index.batch_calls == 2
+
+
+def test_item_dropped_after_max_attempts(tmp_path):
+    index = FlakyIndex(str(tmp_path), failures=10)
+
+    async def run():
+        store = AsyncVectorStore(index, flush_interval=60, max_attempts=3)
+        try:
+            await add(store, 0)
+            for _ in range(3):
+                assert await store.flush() == 0
+            return store.get_metrics()
+        finally:
+            await store.close()
+
+    metrics = asyncio.run(run())
+    assert metrics["queue_depth"] == 0
+    assert metrics["dropped_items"] == 1
+    assert index.batch_calls == 3
+
+
+def test_delete_during_failed_flush_is_not_resurrected(tmp_path):
+    index = FlakyIndex(str(tmp_path), failures=1)
+
+    async def run():
+        store = AsyncVectorStore(index, flush_interval=60)
+        try:
+            await add(store, 0)
+            flushing = asyncio.create_task(store.flush())
+            await asyncio.sleep(0)
+            # 删除时 m0 正在写入，写入失败后放回队列，删除应将其移除
+            assert await store.delete_memory("m0")
+            assert await flushing == 0
+            await store.flush()
+            return await store.search_memories(vector(0), user_id="u1", top_k=1)
+        finally:
+            await store.close()
+
+    assert asyncio.run(run()) == []
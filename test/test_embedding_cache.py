@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+嵌入向量缓存测试
+多个进程共享同一磁盘存储时，被覆盖的槽位按未命中处理，不会返回另一段文本的向量；
+其他进程写入的条目可以命中，未 flush 的条目在重新打开后仍然可用
+
+用法:
+    python -m pytest test/test_embedding_cache.py
+"""
+
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+# src.core.memory 包初始化时会导入记忆管理器及其依赖
+for module in ("dotenv", "redis", "asyncpg", "aiohttp"):
+    pytest.importorskip(module)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.memory.embedding_cache import FCNTL_AVAILABLE, EmbeddingCache
+
+MODEL = "test-embed"
+
+
+def vector_for(text: str, dim: int = 8) -> list:
+    """每段文本对应一个可以从文本还原的向量"""
+    seed = sum(ord(ch) for ch in text)
+    return [float(seed + n) for n in range(dim)]
+
+
+def make_cache(cache_dir, capacity: int = 1000) -> EmbeddingCache:
+    # 进程内 LRU 只保留一条，使查找落到磁盘存储
+    return EmbeddingCache(cache_dir=str(cache_dir), memory_size=1, disk_capacity=capacity)
+
+
+def test_overwritten_slot_is_a_miss(tmp_path):
+    worker_a = make_cache(tmp_path, capacity=2)
+    worker_b = make_cache(tmp_path, capacity=2)
+
+    worker_a.put(MODEL, "alpha", vector_for("alpha"))
+    worker_a.put(MODEL, "beta", vector_for("beta"))
+    # 环形缓冲写满，B 的写入覆盖 alpha 所在的槽位
+    worker_b.put(MODEL, "gamma", vector_for("gamma"))
+
+    assert worker_a.get(MODEL, "alpha") is None
+    assert worker_a.get(MODEL, "beta") == vector_for("beta")
+    # A 在未命中时索引 B 写入的槽位
+    assert worker_a.get(MODEL, "gamma") == vector_for("gamma")
+
+
+def test_entries_survive_reopen_without_flush(tmp_path):
+    cache = make_cache(tmp_path)
+    for n in range(5):
+        cache.put(MODEL, f"text {n}", vector_for(f"text {n}"))
+
+    # 不调用 flush，模拟进程崩溃后重新打开
+    reopened = make_cache(tmp_path)
+    for n in range(5):
+        assert reopened.get(MODEL, f"text   {n} ") == vector_for(f"text {n}")
+
+
+def _write_texts(cache_dir: str, prefix: str, count: int) -> None:
+    cache = make_cache(cache_dir, capacity=64)
+    for n in range(count):
+        text = f"{prefix}-{n}"
+        cache.put(MODEL, text, vector_for(text))
+    cache.flush()
+
+
+@pytest.mark.skipif(not FCNTL_AVAILABLE, reason="没有文件锁时每个进程使用独立目录")
+def test_concurrent_processes_never_return_wrong_vector(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_write_texts, args=(str(tmp_path), prefix, 100))
+        for prefix in ("p0", "p1", "p2")
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    reader = make_cache(tmp_path, capacity=64)
+    hits = 0
+    for prefix in ("p0", "p1", "p2"):
+        for n in range(100):
+            text = f"{prefix}-{n}"
+            vector = reader.get(MODEL, text)
+            if vector is not None:
+                assert vector == vector_for(text)
+                hits += 1
+
+    # 容量 64 的环形缓冲保留最近写入的 64 条
+    assert hits == 64
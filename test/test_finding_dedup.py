@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+研究发现近重复检测测试
+检查 MinHash 签名识别近重复、不误合并无关发现，NumPy 与纯 Python 签名一致，
+以及合并时只比较启发式评分（嵌入评分改写 relevance_score 后不影响保留哪个版本）
+
+用法:
+    python -m pytest test/test_finding_dedup.py
+"""
+
+import os
+import sys
+
+import pytest
+
+# src.core.agentscope.memory 包初始化时会导入 agentscope
+pytest.importorskip("agentscope")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.agentscope.memory import finding_dedup
+from src.core.agentscope.memory.finding_dedup import FindingDeduplicator
+
+ORIGINAL = (
+    "Researchers at MIT demonstrated a 1,000-qubit superconducting processor in 2024, "
+    "reporting two-qubit gate fidelities above 99.5% and coherence times near 300 microseconds."
+)
+# 同一事实的转载：标点、大小写和个别措辞不同
+REPOST = (
+    "researchers at MIT demonstrated a 1000-qubit superconducting processor in 2024 — "
+    "reporting two-qubit gate fidelities above 99.5% and coherence times of about 300 microseconds!"
+)
+UNRELATED = (
+    "The European Central Bank kept interest rates unchanged in March, citing slowing "
+    "inflation in the services sector and weak manufacturing output across the euro area."
+)
+
+
+def add(index: FindingDeduplicator, content: str, score: float, source_type: str = "web"):
+    return index.add(None, source_type, f"https://example.com/{source_type}", content, score,
+                     index.signature(content))
+
+
+def test_near_duplicate_is_found_and_unrelated_is_not():
+    index = FindingDeduplicator()
+    entry = add(index, ORIGINAL, 0.8)
+
+    assert index.similarity(index.signature(ORIGINAL), index.signature(REPOST)) >= index.threshold
+    assert index.find_duplicate(index.signature(REPOST)) is entry
+    assert index.find_duplicate(index.signature(UNRELATED)) is None
+
+
+def test_numpy_and_python_signatures_match(monkeypatch):
+    pytest.importorskip("numpy")
+    index = FindingDeduplicator()
+    expected = index.signature(ORIGINAL)
+
+    monkeypatch.setattr(finding_dedup, "NUMPY_AVAILABLE", False)
+    assert index.signature(ORIGINAL) == expected
+
+
+def test_merge_keeps_higher_heuristic_version():
+    index = FindingDeduplicator()
+    entry = add(index, ORIGINAL, 0.6, source_type="web")
+
+    assert index.merge(entry, "arxiv", "https://arxiv.org/abs/1", REPOST, 0.9)
+    assert entry.content == REPOST
+    assert entry.source_type == "arxiv"
+    assert entry.support_count == 2
+    assert entry.sources == {"web", "arxiv"}
+    assert index.get_stats()["duplicates_suppressed"] == 1
+
+
+def test_merge_ignores_embedding_score_scale():
+    index = FindingDeduplicator()
+    entry = add(index, ORIGINAL, 0.9, source_type="arxiv")
+    # 评分器把 relevance_score 改写为嵌入相似度，量纲与启发式评分不同
+    entry.relevance_score = 0.55
+
+    # 启发式评分更低的转载不会替换原文
+    assert not index.merge(entry, "web", "https://example.com/web", REPOST, 0.6)
+    assert entry.content == ORIGINAL
+    assert entry.relevance_score == 0.55
+    assert entry.support_count == 2
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HyDE 延迟预算测试
+检查假设文档生成超出预算时返回原始查询的检索结果、生成在后台完成并写入缓存，
+下次相同查询直接使用 HyDE；原始检索足够好时不等待生成，原始查询嵌入失败时仍等待 HyDE
+
+用法:
+    python -m pytest test/test_hyde_budget.py
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# src.core.memory 包初始化时会导入记忆管理器及其依赖
+for module in ("dotenv", "redis", "asyncpg", "aiohttp"):
+    pytest.importorskip(module)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.cache import LRUCache
+from src.core.memory.hyde_retriever import HyDERetriever
+from src.core.memory.memory_manager import Mem0MemoryManager
+
+QUERY = "我喜欢什么编程语言"
+HYPOTHESIS = "用户喜欢 Python"
+
+
+class FakeOllama:
+    """generate_completion 在 release 被设置前阻塞；嵌入为文本对应的单元素向量"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.release = asyncio.Event()
+        self.generations = 0
+
+    async def generate_completion(self, prompt, model, temperature, max_tokens, system):
+        self.generations += 1
+        await self.release.wait()
+        return {"choices": [{"text": HYPOTHESIS}]}
+
+    async def embeddings(self, input_text, model, truncate):
+        return self.vectors.get(input_text, [])
+
+
+class FakeVectorStore:
+    """按查询向量返回结果，distance 为 ChromaDB 的 L2 平方距离"""
+
+    def __init__(self, raw_distance):
+        self.raw_distance = raw_distance
+
+    async def search_memories(self, query_embedding, user_id, top_k, filter_metadata):
+        if query_embedding == [1.0]:
+            return [{"id": "raw", "distance": self.raw_distance}]
+        return [{"id": "hyde", "distance": 0.1}]
+
+
+def make_manager(raw_distance=1.0, budget_ms=20, vectors=None):
+    """只初始化检索相关的状态，不连接 Ollama 和向量库"""
+    retriever = HyDERetriever.__new__(HyDERetriever)
+    retriever.ollama = FakeOllama(vectors if vectors is not None else {QUERY: [1.0], HYPOTHESIS: [2.0]})
+    retriever.embedding_model = "embed"
+    retriever.generation_model = "gen"
+    retriever.embedding_cache = None
+    retriever.hypothesis_cache = LRUCache(max_size=8)
+
+    manager = Mem0MemoryManager.__new__(Mem0MemoryManager)
+    manager.hyde_retriever = retriever
+    manager.hyde_budget = budget_ms / 1000
+    manager.hyde_skip_score = 0.8
+    manager.vector_store = FakeVectorStore(raw_distance)
+    manager._hyde_tasks = set()
+    manager._hyde_metrics = {"raw_only": 0, "skipped_confident": 0, "over_budget": 0, "hyde_used": 0}
+    return manager
+
+
+async def search(manager, use_hyde=True):
+    memories = await manager._search_with_budget(QUERY, "u1", 5, {}, use_hyde=use_hyde)
+    return [m["id"] for m in memories] if memories is not None else None
+
+
+def test_over_budget_returns_raw_and_caches_hypothesis():
+    manager = make_manager()
+    ollama = manager.hyde_retriever.ollama
+
+    async def run():
+        first = await asyncio.wait_for(search(manager), timeout=1)
+        pending = set(manager._hyde_tasks)
+        # 超出预算后生成在后台完成并写入假设文档缓存
+        ollama.release.set()
+        await asyncio.gather(*pending)
+        second = await search(manager)
+        return first, len(pending), second
+
+    first, pending, second = asyncio.run(run())
+    assert first == ["raw"]
+    assert pending == 1
+    assert second == ["hyde"]
+    assert ollama.generations == 1
+    assert manager._hyde_metrics["over_budget"] == 1
+    assert manager._hyde_metrics["hyde_used"] == 1
+    assert not manager._hyde_tasks
+
+
+def test_confident_raw_hit_skips_waiting():
+    # 1 - 0.2 / 2 = 0.9 >= hyde_skip_score
+    manager = make_manager(raw_distance=0.2, budget_ms=60_000)
+
+    async def run():
+        result = await asyncio.wait_for(search(manager), timeout=1)
+        for task in manager._hyde_tasks:
+            task.cancel()
+        return result
+
+    assert asyncio.run(run()) == ["raw"]
+    assert manager._hyde_metrics["skipped_confident"] == 1
+
+
+def test_generation_within_budget_uses_hyde():
+    manager = make_manager(budget_ms=60_000)
+    manager.hyde_retriever.ollama.release.set()
+
+    assert asyncio.run(search(manager)) == ["hyde"]
+    assert manager._hyde_metrics["hyde_used"] == 1
+    assert manager._hyde_metrics["over_budget"] == 0
+
+
+def test_raw_embedding_failure_waits_for_hyde():
+    manager = make_manager(vectors={HYPOTHESIS: [2.0]})
+    ollama = manager.hyde_retriever.ollama
+
+    async def run():
+        searching = asyncio.create_task(search(manager))
+        await asyncio.sleep(0.05)
+        # 预算已耗尽，但没有原始结果可返回
+        assert not searching.done()
+        ollama.release.set()
+        return await searching
+
+    assert asyncio.run(run()) == ["hyde"]
+    assert manager._hyde_metrics["over_budget"] == 1
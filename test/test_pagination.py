@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+游标分页测试（SQLite 存储）
+检查游标翻页不重不漏、会话按最近更新排序、只带游标时使用默认页大小，
+以及格式无效或ID类型不符的游标按 ValueError 处理（API 返回 400）
+
+用法:
+    python -m pytest test/test_pagination.py
+"""
+
+import asyncio
+import base64
+import json
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("redis")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.dao.base import BaseDAO
+from src.dao.chat_dao import ChatDAO
+from src.dao.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+
+
+def run_with_db(tmp_path, body):
+    """在同一个事件循环内初始化 SQLite 存储、执行测试并关闭连接池"""
+    async def run():
+        await BaseDAO.init_sqlite(str(tmp_path / "page.db"), pool_size=3)
+        try:
+            return await body()
+        finally:
+            await BaseDAO.close_pool()
+
+    return asyncio.run(run())
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+
+def test_cursor_round_trip():
+    at = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    assert decode_cursor(encode_cursor(at, "abc")) == (at, "abc")
+    assert decode_cursor(encode_cursor(at, 42), id_type=int) == (at, 42)
+    assert decode_cursor(None) == (None, None)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64 !!",
+    raw_cursor({"a": 1}),
+    raw_cursor(["yesterday", 1]),
+    raw_cursor(["2024-01-01T00:00:00", "12"]),
+    raw_cursor(["2024-01-01T00:00:00", [1]]),
+    raw_cursor(["2024-01-01T00:00:00", True]),
+])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, id_type=int)
+
+
+def test_message_pages_cover_history_once(tmp_path):
+    async def body():
+        chat_dao = ChatDAO()
+        session = await chat_dao.create_session("test_user", "t", "deepseek", "deepseek-chat")
+        for n in range(7):
+            await chat_dao.add_message(session["id"], "user", f"msg {n}")
+
+        contents, cursor = [], None
+        while True:
+            page = await chat_dao.get_session_messages(session["id"], limit=3, cursor=cursor)
+            contents.extend(message["content"] for message in page["messages"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return contents
+
+    assert run_with_db(tmp_path, body) == [f"msg {n}" for n in range(7)]
+
+
+def test_cursor_without_limit_uses_default_page_size(tmp_path):
+    async def body():
+        chat_dao = ChatDAO()
+        session = await chat_dao.create_session("test_user", "t", "deepseek", "deepseek-chat")
+        for n in range(DEFAULT_PAGE_SIZE + 5):
+            await chat_dao.add_message(session["id"], "user", f"msg {n}")
+
+        first = await chat_dao.get_session_messages(session["id"], limit=2)
+        rest = await chat_dao.get_session_messages(session["id"], cursor=first["next_cursor"])
+        everything = await chat_dao.get_session_messages(session["id"])
+        return first, rest, everything
+
+    first, rest, everything = run_with_db(tmp_path, body)
+    assert len(rest["messages"]) == DEFAULT_PAGE_SIZE
+    assert rest["messages"][0]["content"] == "msg 2"
+    assert rest["next_cursor"] is not None
+    assert len(everything["messages"]) == DEFAULT_PAGE_SIZE + 5
+    assert everything["next_cursor"] is None
+
+
+def test_message_cursor_with_string_id_is_rejected(tmp_path):
+    async def body():
+        chat_dao = ChatDAO()
+        session = await chat_dao.create_session("test_user", "t", "deepseek", "deepseek-chat")
+        cursor = encode_cursor(datetime(2024, 1, 1), "1 OR 1=1")
+        with pytest.raises(ValueError):
+            await chat_dao.get_session_messages(session["id"], cursor=cursor)
+
+    run_with_db(tmp_path, body)
+
+
+def test_sessions_ordered_by_last_update(tmp_path):
+    async def body():
+        chat_dao = ChatDAO()
+        sessions = [
+            await chat_dao.create_session("test_user", f"s{n}", "deepseek", "deepseek-chat")
+            for n in range(5)
+        ]
+        # 最早创建的会话有新消息，排到最前
+        await chat_dao.add_message(sessions[0]["id"], "user", "hi")
+
+        titles, cursor = [], None
+        while True:
+            page = await chat_dao.get_user_sessions("test_user", limit=2, cursor=cursor)
+            titles.extend(session["title"] for session in page["sessions"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return titles
+
+    assert run_with_db(tmp_path, body) == ["s0", "s4", "s3", "s2", "s1"]
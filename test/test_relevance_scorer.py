@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+研究发现相关性评分测试
+检查评分为截断的余弦相似度、嵌入矩阵倍增扩容后与逐行结果一致，
+以及查询嵌入失败后同一查询不再重复请求
+
+用法:
+    python -m pytest test/test_relevance_scorer.py
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+# src.core.agentscope.memory 包初始化时会导入 agentscope
+pytest.importorskip("agentscope")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.agentscope.memory.finding_dedup import FindingEntry
+from src.core.agentscope.memory.relevance_scorer import FindingRelevanceScorer
+
+QUERY = "query"
+
+
+class FakeEmbedder:
+    """文本以 "x,y" 形式给出二维向量；查询向量为 (1, 0)"""
+
+    def __init__(self, query_vector=(1.0, 0.0)):
+        self.query_vector = query_vector
+        self.query_calls = 0
+
+    async def embed_text(self, text):
+        self.query_calls += 1
+        return list(self.query_vector) if self.query_vector else None
+
+    async def batch_embed_texts(self, texts):
+        return [[float(v) for v in text.split(",")] for text in texts]
+
+
+class FakeDAO:
+    def __init__(self):
+        self.updates = []
+
+    async def update_finding_relevance_scores(self, updates):
+        self.updates.extend(updates)
+
+
+def entry(content: str, finding_id=None) -> FindingEntry:
+    return FindingEntry(finding_id, "web", "", content, 0.8, ())
+
+
+def test_scores_are_clipped_cosine():
+    dao = FakeDAO()
+    scorer = FindingRelevanceScorer("s", dao, embedder=FakeEmbedder())
+    entries = [entry("1,0", 1), entry("1,1", 2), entry("0,1", 3), entry("-1,0", 4)]
+
+    async def run():
+        scorer.set_query(QUERY)
+        for e in entries:
+            scorer.submit(e)
+        await scorer.flush()
+
+    asyncio.run(run())
+    assert [e.relevance_score for e in entries] == [1.0, pytest.approx(0.7071, abs=1e-4), 0.0, 0.0]
+    # 启发式评分不受嵌入评分影响
+    assert all(e.heuristic_score == 0.8 for e in entries)
+    assert sorted(dao.updates) == sorted((e.finding_id, e.relevance_score) for e in entries)
+
+
+def test_matrix_grows_beyond_initial_capacity():
+    scorer = FindingRelevanceScorer("s", FakeDAO(), embedder=FakeEmbedder(), batch_size=2)
+    entries = [entry(f"{n},1", n) for n in range(9)]
+
+    async def run():
+        scorer.set_query(QUERY)
+        for e in entries:
+            scorer.submit(e)
+        await scorer.flush()
+        # 内容被替换的发现重新提交，原行原地更新
+        entries[3].content = "0,1"
+        scorer.submit(entries[3])
+        await scorer.flush()
+
+    asyncio.run(run())
+    stored, matrix = scorer.get_embeddings()
+    assert stored == entries
+    assert matrix.shape == (9, 2)
+    for e, row in zip(entries, matrix):
+        vector = np.array([float(v) for v in e.content.split(",")], dtype=np.float32)
+        assert np.allclose(row, vector / np.linalg.norm(vector))
+    assert np.allclose(scorer.get_embeddings_for([5, 3]), matrix[[5, 3]])
+
+
+def test_failed_query_embedding_is_not_retried():
+    embedder = FakeEmbedder(query_vector=None)
+    scorer = FindingRelevanceScorer("s", FakeDAO(), embedder=embedder)
+
+    async def run():
+        scorer.set_query(QUERY)
+        for n in range(5):
+            scorer.submit(entry(f"{n},1"))
+            await scorer.flush()
+        first = embedder.query_calls
+        # 查询变化后重新尝试
+        scorer.set_query("another query")
+        scorer.submit(entry("1,1"))
+        await scorer.flush()
+        return first, embedder.query_calls
+
+    assert asyncio.run(run()) == (1, 2)
+    assert scorer.get_stats()["failed"] == 6
+    assert scorer.get_stats()["query_failed"]
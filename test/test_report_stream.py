@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报告流式输出测试
+检查报告片段经 report_condition 交给所有订阅者（含中途加入的订阅者）、首个 token 耗时指标，
+以及 LLM 流中途出错时报告以备用内容结束、SSE 的 report_delta 推送正常收尾
+
+用法:
+    python -m pytest test/test_report_stream.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("agentscope")
+# 研究代理导入 ResearchDAO（asyncpg / redis）
+pytest.importorskip("asyncpg")
+pytest.importorskip("redis")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.agentscope.research_agent import DeepResearchAgent
+
+FINDINGS = [
+    {"source_type": "web", "content": "量子纠错在 2024 年取得进展", "relevance_score": 0.9},
+    {"source_type": "arxiv", "content": "表面码的逻辑错误率低于物理错误率", "relevance_score": 0.8},
+]
+
+
+class FakeMemory:
+    async def get_research_findings(self):
+        return FINDINGS
+
+    async def get_citations(self):
+        return [{"title": "Surface code below threshold", "authors": ["A"], "publication_year": 2024}]
+
+
+class FakeLLM:
+    """按顺序产出 chunks，fail_after 不为 None 时产出该数量的片段后抛出异常"""
+
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+
+    async def chat_completion_stream(self, messages, model):
+        for n, chunk in enumerate(self.chunks):
+            if n == self.fail_after:
+                raise ConnectionError("stream reset by peer")
+            await asyncio.sleep(0)
+            yield chunk
+
+
+def make_agent(llm) -> DeepResearchAgent:
+    """只初始化报告流相关的状态，不创建模型和工具"""
+    agent = DeepResearchAgent.__new__(DeepResearchAgent)
+    agent.report_chunks = []
+    agent.report_condition = asyncio.Condition()
+    agent.report_started = asyncio.Event()
+    agent.report_finished = False
+    agent.report_metrics = {}
+    agent.findings_count = len(FINDINGS)
+    agent.current_tools_used = ["web_search", "arxiv_search"]
+    agent.session_memory = FakeMemory()
+    agent.llm_instance = llm
+    agent.llm_manager = SimpleNamespace(model_name="test-model")
+    return agent
+
+
+async def collect(agent) -> str:
+    return "".join([delta async for delta in agent.iter_report_chunks()])
+
+
+def test_subscribers_receive_the_whole_report():
+    agent = make_agent(FakeLLM(["## 执行摘要\n", "量子纠错", "进展显著。"]))
+
+    async def run():
+        early = asyncio.create_task(collect(agent))
+        generating = asyncio.create_task(agent._generate_research_report("量子计算"))
+        await agent.report_started.wait()
+        report = await generating
+        # 生成结束后才订阅，仍从头读到完整报告
+        late = await asyncio.wait_for(collect(agent), timeout=1)
+        return report, await asyncio.wait_for(early, timeout=1), late
+
+    report, early, late = asyncio.run(run())
+    assert report.startswith("# 深度研究报告")
+    assert report.endswith("## 执行摘要\n量子纠错进展显著。")
+    assert early == late == report
+
+
+def test_first_token_metric_recorded_once():
+    agent = make_agent(FakeLLM(["a", "b", "c"]))
+
+    async def run():
+        await agent._generate_research_report("q")
+        return agent.get_report_metrics()
+
+    metrics = asyncio.run(run())
+    assert metrics["first_token_ms"] >= 0
+    assert metrics["total_ms"] >= metrics["first_token_ms"]
+    # 报告头部与首个片段一起推送
+    assert metrics["chunks"] == 4
+    assert not any(key.startswith("_") for key in metrics)
+
+
+def test_stream_error_midway_ends_with_fallback():
+    agent = make_agent(FakeLLM(["## 执行摘要\n", "量子纠错", "never sent"], fail_after=2))
+
+    async def run():
+        subscriber = asyncio.create_task(collect(agent))
+        report = await agent._generate_research_report("量子计算")
+        return report, await asyncio.wait_for(subscriber, timeout=1)
+
+    report, streamed = asyncio.run(run())
+    assert agent.report_finished
+    assert streamed == report
+    # 已推送的内容保留为前缀，备用报告接在其后
+    head, fallback = report.split("\n\n---\n\n## 执行摘要\n量子纠错\n\n---\n\n", 1)
+    assert head.startswith("# 深度研究报告")
+    assert fallback.startswith("# 深度研究报告")
+    assert "never sent" not in report
+
+
+def test_sse_report_delta_ends_cleanly_when_llm_stream_errors(monkeypatch):
+    pytest.importorskip("fastapi")
+    from src.api import deep_research
+
+    agent = make_agent(FakeLLM(["## 执行摘要\n", "量子纠错", "never sent"], fail_after=2))
+    state = {}
+
+    class FakeService:
+        async def get_research_status(self, session_id):
+            return {"status": "completed" if state.get("report") else "in_progress"}
+
+        async def wait_for_report_stream(self, session_id, timeout=None):
+            state["task"] = asyncio.create_task(self._finish_report())
+            await agent.report_started.wait()
+            return True
+
+        async def _finish_report(self):
+            state["report"] = await agent._generate_research_report("量子计算")
+
+        async def stream_report_deltas(self, session_id):
+            async for delta in agent.iter_report_chunks():
+                yield delta
+
+        def get_report_metrics(self, session_id):
+            return agent.get_report_metrics()
+
+        async def get_report_artifact(self, session_id):
+            await state["task"]
+            return {"etag": "etag-1", "report_text": state["report"], "evidence": [], "export_data": {}}
+
+    monkeypatch.setattr(deep_research, "research_service", FakeService())
+    request = SimpleNamespace(headers={})
+
+    async def run():
+        response = await deep_research.stream_research_progress("s1", request, current_user=None)
+        frames = []
+        async for frame in response.body_iterator:
+            frames.append(frame)
+        return frames
+
+    frames = asyncio.run(asyncio.wait_for(run(), timeout=5))
+    events = []
+    for frame in frames:
+        assert frame.endswith("\n\n")
+        data = [line for line in frame.strip().split("\n") if line.startswith("data: ")]
+        events.append(json.loads(data[0][len("data: "):]))
+
+    types = [event["type"] for event in events]
+    assert types[0] == "connected"
+    assert "error" not in types
+    # 增量之后依次是指标和完成事件，流随完成事件结束
+    first_delta = types.index("report_delta")
+    assert types[first_delta:] == ["report_delta"] * (len(types) - first_delta - 3) + [
+        "report_metrics", "status_update", "completed"
+    ]
+    deltas = "".join(event["delta"] for event in events if event["type"] == "report_delta")
+    assert deltas == events[-1]["data"]["report_text"]
+    assert "first_token_ms" in events[types.index("report_metrics")]["metrics"]
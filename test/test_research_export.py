@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+研究会话导出测试（SQLite 存储）
+检查 /export/{id} 的 If-None-Match 命中返回 304、/export/{id}/stream 的 NDJSON 分行，
+以及流式导出占用专用连接（不复用调用方工作单元的连接）
+
+用法:
+    python -m pytest test/test_research_export.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("agentscope")
+pytest.importorskip("asyncpg")
+pytest.importorskip("redis")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException, Response
+
+from src.api import deep_research
+from src.core.cache import LRUCache
+from src.dao.base import BaseDAO
+from src.dao.research_dao import ResearchDAO
+from src.services.agentscope_research_service import AgentScopeResearchService
+
+
+def run_with_db(tmp_path, body):
+    """在同一个事件循环内初始化 SQLite 存储、执行测试并关闭连接池"""
+    async def run():
+        await BaseDAO.init_sqlite(str(tmp_path / "export.db"), pool_size=2)
+        try:
+            return await body(ResearchDAO())
+        finally:
+            await BaseDAO.close_pool()
+
+    return asyncio.run(run())
+
+
+def make_service(dao) -> AgentScopeResearchService:
+    """只初始化导出相关的状态，不创建模型和代理"""
+    service = AgentScopeResearchService.__new__(AgentScopeResearchService)
+    service.report_cache = LRUCache(max_size=8)
+    service.active_researchers = {}
+    service.session_cache = {}
+    service.research_dao = dao
+    return service
+
+
+async def seed(dao, session_id="s1"):
+    await dao.create_research_session(session_id, user_id="test_user")
+    await dao.write_session_batch(
+        session_id,
+        findings=[{"source_type": "web", "content": f"f{n}"} for n in range(3)],
+        citations=[{"title": "paper", "authors": ["a"]}]
+    )
+
+
+class ArtifactService:
+    async def get_report_artifact(self, session_id):
+        return {"etag": '"abc"', "export_data": {"session_info": {"id": session_id}}}
+
+
+@pytest.mark.parametrize("if_none_match", ['"abc"', 'W/"abc"', '"old", "abc"', "*"])
+def test_export_if_none_match_returns_304(monkeypatch, if_none_match):
+    monkeypatch.setattr(deep_research, "research_service", ArtifactService())
+    request = SimpleNamespace(headers={"if-none-match": if_none_match})
+
+    result = asyncio.run(deep_research.export_session_data("s1", request, Response(), current_user=None))
+    assert result.status_code == 304
+    assert result.headers["ETag"] == '"abc"'
+
+
+def test_export_etag_mismatch_returns_data(monkeypatch):
+    monkeypatch.setattr(deep_research, "research_service", ArtifactService())
+    request = SimpleNamespace(headers={"if-none-match": '"old"'})
+    response = Response()
+
+    result = asyncio.run(deep_research.export_session_data("s1", request, response, current_user=None))
+    assert result["data"] == {"session_info": {"id": "s1"}}
+    assert response.headers["ETag"] == '"abc"'
+
+
+def test_stream_export_is_ndjson(tmp_path, monkeypatch):
+    async def body(dao):
+        await seed(dao)
+        monkeypatch.setattr(deep_research, "research_service", make_service(dao))
+        response = await deep_research.stream_session_export("s1", current_user=None)
+        return response, [line async for line in response.body_iterator]
+
+    response, lines = run_with_db(tmp_path, body)
+    assert response.media_type == "application/x-ndjson"
+    # 每条记录独占一行
+    assert all(line.endswith("\n") and line.count("\n") == 1 for line in lines)
+    records = [json.loads(line) for line in lines]
+    assert [r["type"] for r in records] == ["session", "finding", "finding", "finding", "citation", "end"]
+    assert records[0]["data"]["id"] == "s1"
+    assert [r["data"]["content"] for r in records[1:4]] == ["f0", "f1", "f2"]
+    assert records[-1]["counts"] == {"session": 1, "finding": 3, "citation": 1}
+
+
+def test_stream_export_missing_session_is_404(tmp_path, monkeypatch):
+    async def body(dao):
+        monkeypatch.setattr(deep_research, "research_service", make_service(dao))
+        with pytest.raises(HTTPException) as exc:
+            await deep_research.stream_session_export("missing", current_user=None)
+        return exc.value.status_code
+
+    assert run_with_db(tmp_path, body) == 404
+
+
+def test_stream_export_does_not_use_caller_unit_connection(tmp_path):
+    async def body(dao):
+        await seed(dao)
+        async with BaseDAO.unit_of_work() as unit:
+            records = dao.iter_session_export("s1")
+            first = await records.__anext__()
+            # 调用方的工作单元先于导出结束
+        assert unit.closed
+        rest = [record_type async for record_type, _ in records]
+        return unit.queries, [first[0]] + rest
+
+    queries, types = run_with_db(tmp_path, body)
+    assert queries == 0
+    assert types == ["session", "finding", "finding", "finding", "citation"]
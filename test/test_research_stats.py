@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+研究统计汇总测试（SQLite 存储）
+检查会话完成后才写入的发现、引用和相关性评分也计入用户统计汇总，
+且汇总结果与按明细重新统计一致
+
+用法:
+    python -m pytest test/test_research_stats.py
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("redis")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.dao.base import BaseDAO
+from src.dao.research_dao import ResearchDAO
+
+
+def run_with_db(tmp_path, body):
+    """在同一个事件循环内初始化 SQLite 存储、执行测试并关闭连接池"""
+    async def run():
+        await BaseDAO.init_sqlite(str(tmp_path / "stats.db"), pool_size=2)
+        try:
+            return await body(ResearchDAO())
+        finally:
+            await BaseDAO.close_pool()
+
+    return asyncio.run(run())
+
+
+def findings(*scores, source_type="web"):
+    return [
+        {"source_type": source_type, "content": f"{source_type} {n}", "relevance_score": score}
+        for n, score in enumerate(scores)
+    ]
+
+
+def test_late_writes_reach_user_stats(tmp_path):
+    async def body(dao):
+        await dao.create_research_session("s1", user_id="test_user")
+        early = await dao.write_session_batch("s1", findings=findings(0.8, 0.6))
+        await dao.complete_research_session("s1", datetime.now())
+
+        # 完成后才写入的发现、引用，以及评分器的后续评分
+        await dao.write_session_batch(
+            "s1",
+            findings=findings(1.0, source_type="arxiv"),
+            citations=[{"title": "paper", "authors": ["a"]}]
+        )
+        await dao.update_finding_relevance_scores([(early["finding_ids"][0], 0.2)])
+        return await dao.get_research_statistics("test_user")
+
+    stats = run_with_db(tmp_path, body)
+    assert stats["sessions"]["completed_sessions"] == 1
+    assert stats["content"]["total_findings"] == 3
+    assert stats["content"]["total_citations"] == 1
+    assert stats["content"]["avg_relevance_score"] == pytest.approx((0.2 + 0.6 + 1.0) / 3)
+    assert {s["source_type"]: s["count"] for s in stats["sources"]} == {"web": 2, "arxiv": 1}
+
+
+def test_update_without_session_id_rerolls_owning_session(tmp_path):
+    async def body(dao):
+        await dao.create_research_session("s1", user_id="test_user")
+        ids = (await dao.write_session_batch("s1", findings=findings(0.5)))["finding_ids"]
+        await dao.complete_research_session("s1", datetime.now())
+
+        await dao.update_research_findings([{
+            "id": ids[0], "support_count": 2, "source_type": "arxiv",
+            "source_url": None, "content": None, "relevance_score": 0.9
+        }])
+        return await dao.get_research_statistics("test_user")
+
+    stats = run_with_db(tmp_path, body)
+    assert stats["content"]["total_findings"] == 1
+    assert stats["content"]["avg_relevance_score"] == pytest.approx(0.9)
+    assert [s["source_type"] for s in stats["sources"]] == ["arxiv"]
+
+
+def test_writes_to_active_session_do_not_roll_up(tmp_path):
+    async def body(dao):
+        await dao.create_research_session("s1", user_id="test_user")
+        await dao.write_session_batch("s1", findings=findings(0.8))
+        return await dao.get_research_statistics("test_user")
+
+    stats = run_with_db(tmp_path, body)
+    assert stats["sessions"]["completed_sessions"] == 0
+    # 未汇总会话的计数列照常计入总数
+    assert stats["content"]["total_findings"] == 1
+    assert stats["content"]["avg_relevance_score"] is None
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+有界短期记忆测试
+淘汰后原始任务消息始终保留，tool_use 与 tool_result 不会被拆开，容量不超过上限
+
+用法:
+    python -m pytest test/test_ring_buffer.py
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("agentscope")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agentscope.message import Msg
+
+from src.core.agentscope.memory.ring_buffer import RingBufferMemory
+
+
+def task_message() -> Msg:
+    return Msg("user", "研究量子计算的最新进展", "user")
+
+
+def tool_turn(turn: int, calls: int = 2) -> list:
+    """一个完整轮次：助手发起 calls 个工具调用、对应的工具结果、助手总结"""
+    ids = [f"call_{turn}_{n}" for n in range(calls)]
+    use = Msg("assistant", [
+        {"type": "tool_use", "id": call_id, "name": "web_search", "input": {"q": str(turn)}}
+        for call_id in ids
+    ], "assistant")
+    results = [
+        Msg("system", [
+            {"type": "tool_result", "id": call_id, "name": "web_search", "output": f"result {call_id}"}
+        ], "system")
+        for call_id in ids
+    ]
+    summary = Msg("assistant", f"第 {turn} 轮小结", "assistant")
+    return [use, *results, summary]
+
+
+def block_ids(messages, block_type: str) -> set:
+    return {
+        block["id"]
+        for msg in messages if not isinstance(msg.content, str)
+        for block in msg.get_content_blocks(block_type)
+    }
+
+
+def assert_tool_pairs_intact(messages) -> None:
+    assert block_ids(messages, "tool_result") <= block_ids(messages, "tool_use")
+
+
+def test_keeps_task_message_and_bounds_size():
+    evicted = []
+    memory = RingBufferMemory(capacity=8, evict_batch=2, on_evict=evicted.extend)
+    task = task_message()
+
+    async def run():
+        await memory.add(task)
+        for turn in range(20):
+            for msg in tool_turn(turn):
+                await memory.add(msg)
+                messages = await memory.get_memory(prepend_summary=False)
+                assert messages[0].id == task.id
+                assert len(messages) <= memory.capacity + memory.evict_batch
+        return await memory.get_memory(prepend_summary=False)
+
+    remaining = asyncio.run(run())
+    assert remaining[0].id == task.id
+    assert task.id not in {msg.id for msg in evicted}
+    assert memory.evicted_count == len(evicted) == 1 + 20 * 4 - len(remaining)
+    assert all(isinstance(msg, Msg) for msg in evicted)
+
+
+def test_never_splits_tool_use_from_tool_results():
+    evicted_batches = []
+    memory = RingBufferMemory(capacity=6, evict_batch=1, on_evict=evicted_batches.append)
+
+    async def run():
+        await memory.add(task_message())
+        for turn in range(15):
+            for msg in tool_turn(turn, calls=1 + turn % 3):
+                await memory.add(msg)
+                assert_tool_pairs_intact(await memory.get_memory(prepend_summary=False))
+
+    asyncio.run(run())
+    assert evicted_batches
+    for batch in evicted_batches:
+        # 淘汰的每个工具调用都连同其结果一起淘汰
+        assert block_ids(batch, "tool_use") == block_ids(batch, "tool_result")
+
+
+def test_long_turn_is_not_split():
+    """当前轮次的工具结果尚未全部返回时，不在轮次中间淘汰，可暂时超出容量"""
+    memory = RingBufferMemory(capacity=4, evict_batch=1)
+    use = Msg("assistant", [
+        {"type": "tool_use", "id": f"call_{n}", "name": "arxiv_search", "input": {}} for n in range(8)
+    ], "assistant")
+
+    async def run():
+        await memory.add(task_message())
+        await memory.add(use)
+        for n in range(8):
+            await memory.add(Msg("system", [
+                {"type": "tool_result", "id": f"call_{n}", "name": "arxiv_search", "output": "ok"}
+            ], "system"))
+        return await memory.get_memory(prepend_summary=False)
+
+    remaining = asyncio.run(run())
+    assert len(remaining) == 10
+    assert_tool_pairs_intact(remaining)
+    assert memory.evicted_count == 0
+
+
+def test_add_passes_marks_through():
+    memory = RingBufferMemory(capacity=4)
+
+    async def run():
+        await memory.add(task_message(), marks=["hint"])
+        return await memory.get_memory(mark="hint", prepend_summary=False)
+
+    assert len(asyncio.run(run())) == 1
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会话读穿缓存测试（SQLite 存储）
+检查研究会话在写入发现、更新状态后缓存失效，对话会话的更新和删除同步到缓存
+
+用法:
+    python -m pytest test/test_session_cache.py
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("redis")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.dao.base import BaseDAO
+from src.dao.chat_dao import ChatDAO
+from src.dao.research_dao import ResearchDAO
+
+
+def run_with_db(tmp_path, body):
+    """在同一个事件循环内初始化 SQLite 存储、执行测试并关闭连接池"""
+    async def run():
+        await BaseDAO.init_sqlite(str(tmp_path / "cache.db"), pool_size=2)
+        try:
+            return await body()
+        finally:
+            await BaseDAO.close_pool()
+
+    return asyncio.run(run())
+
+
+def test_research_session_cache_invalidated_by_writes(tmp_path):
+    async def body():
+        dao = ResearchDAO()
+        await dao.create_research_session("s1", user_id="test_user")
+        before = await dao.get_research_session("s1")
+        await dao.write_session_batch("s1", findings=[{"source_type": "web", "content": "f"}])
+        after_write = await dao.get_research_session("s1")
+        await dao.update_session_status("s1", "completed", datetime.now())
+        return before, after_write, await dao.get_research_session("s1")
+
+    before, after_write, after_status = run_with_db(tmp_path, body)
+    assert (before["status"], before["findings_count"]) == ("active", 0)
+    assert after_write["findings_count"] == 1
+    assert after_status["status"] == "completed"
+
+
+def test_chat_session_cache_follows_updates(tmp_path):
+    async def body():
+        dao = ChatDAO()
+        session = await dao.create_session("test_user", "old title", "deepseek", "model")
+        await dao.get_session(session["id"])
+        assert await dao.update_session(session["id"], title="new title")
+        updated = await dao.get_session(session["id"])
+        assert await dao.delete_session(session["id"])
+        return updated, await dao.get_session(session["id"])
+
+    updated, deleted = run_with_db(tmp_path, body)
+    assert updated["title"] == "new title"
+    assert deleted is None
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 存储后端测试
+检查 DAO 中的 PostgreSQL 写法（ANY、类型转换、ILIKE、NOW() 等）转换后的结果，
+以及转换后的语句能否在 SQLite 建表脚本上编译；读出的值按列的声明类型解码
+
+用法:
+    python -m pytest test/test_sqlite_backend.py
+"""
+
+import asyncio
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.dao.sqlite_backend import SQLitePool, translate_query
+from src.dao.sqlite_schema import ALL_TABLES
+
+
+# (DAO 中的语句, 转换后的语句)
+DAO_QUERIES = [
+    # research_dao 汇总已完成会话统计：会话列表参数
+    (
+        """
+        SELECT session_id, source_type, COUNT(*) AS n,
+               COALESCE(SUM(relevance_score), 0) AS relevance_sum,
+               COUNT(relevance_score) AS relevance_count
+        FROM research_findings
+        WHERE session_id = ANY($1)
+        GROUP BY session_id, source_type
+        """,
+        """
+        SELECT session_id, source_type, COUNT(*) AS n,
+               COALESCE(SUM(relevance_score), 0) AS relevance_sum,
+               COUNT(relevance_score) AS relevance_count
+        FROM research_findings
+        WHERE session_id IN (SELECT value FROM json_each(?1))
+        GROUP BY session_id, source_type
+        """,
+    ),
+    # research_dao._search_research_content_sqlite：可选的会话过滤
+    (
+        "SELECT id FROM research_findings WHERE ($1::varchar[] IS NULL OR session_id = ANY($1)) LIMIT $2",
+        "SELECT id FROM research_findings WHERE (?1 IS NULL OR session_id IN (SELECT value FROM json_each(?1))) LIMIT ?2",
+    ),
+    # memory_dao.release_messages：带类型转换的 ANY
+    (
+        "UPDATE chat_messages SET is_processed = FALSE WHERE id = ANY($1::int[])",
+        "UPDATE chat_messages SET is_processed = FALSE WHERE id IN (SELECT value FROM json_each(?1))",
+    ),
+    # ILIKE 子串匹配
+    (
+        "SELECT id FROM research_citations WHERE search_text ILIKE $1 OR title ilike $1",
+        "SELECT id FROM research_citations WHERE search_text LIKE ?1 OR title LIKE ?1",
+    ),
+    # NOW() 与参数类型转换
+    (
+        "UPDATE research_sessions SET status = $2::varchar, updated_at = NOW() WHERE id = $1",
+        "UPDATE research_sessions SET status = ?2, updated_at = CURRENT_TIMESTAMP WHERE id = ?1",
+    ),
+    # 两位数的参数序号
+    (
+        "INSERT INTO research_citations (session_id, title, authors) VALUES ($10, $11::text, $12::text[])",
+        "INSERT INTO research_citations (session_id, title, authors) VALUES (?10, ?11, ?12)",
+    ),
+]
+
+
+@pytest.mark.parametrize("query, expected", DAO_QUERIES)
+def test_translate_query(query, expected):
+    assert translate_query(query) == expected
+
+
+@pytest.fixture(scope="module")
+def schema_conn():
+    conn = sqlite3.connect(":memory:")
+    for script in ALL_TABLES.values() if isinstance(ALL_TABLES, dict) else ALL_TABLES:
+        conn.executescript(script)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("query", [query for query, _ in DAO_QUERIES])
+def test_translated_query_compiles(schema_conn, query):
+    """转换后的语句在 SQLite 建表脚本上能够编译（EXPLAIN 只编译不执行）"""
+    translated = translate_query(query)
+    count = max(int(n) for n in re.findall(r"\?(\d+)", translated))
+    schema_conn.execute(f"EXPLAIN {translated}", [None] * count)
+
+
+def test_values_decoded_by_declared_type(tmp_path):
+    """TIMESTAMP / JSON / BOOLEAN 列在本后端内解码，不注册进程级的转换器"""
+    async def run():
+        pool = SQLitePool(str(tmp_path / "test.db"), size=2)
+        await pool.open()
+        try:
+            await pool.executescript(
+                "CREATE TABLE t (id INTEGER PRIMARY KEY, at TIMESTAMP, data JSON, flag BOOLEAN, note TEXT)"
+            )
+            at = datetime(2024, 1, 2, 3, 4, 5, 6)
+            async with pool.acquire() as conn:
+                await conn.execute(
+                    "INSERT INTO t (at, data, flag, note) VALUES ($1, $2, $3, $4)",
+                    at, {"a": [1, 2]}, True, "[not json]"
+                )
+            # 另一个连接同样按建表后的声明类型解码
+            async with pool.acquire() as first, pool.acquire() as second:
+                rows = [await first.fetchrow("SELECT * FROM t"), await second.fetchrow("SELECT * FROM t")]
+        finally:
+            await pool.close()
+        return at, rows
+
+    at, rows = asyncio.run(run())
+    for row in rows:
+        assert dict(row) == {"id": 1, "at": at, "data": {"a": [1, 2]}, "flag": True, "note": "[not json]"}
+
+    assert "JSON" not in sqlite3.converters
+    assert "BOOLEAN" not in sqlite3.converters
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+工作单元测试（SQLite 存储）
+检查连接只对开启工作单元的任务生效、退出后不再泄漏给派生任务，
+事务内并发的 DAO 调用不会死锁，失败时整体回滚并丢弃缓存写入
+
+用法:
+    python -m pytest test/test_unit_of_work.py
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("redis")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.dao.base import BaseDAO
+from src.dao.chat_dao import ChatDAO
+
+
+def run_with_db(tmp_path, body):
+    """在同一个事件循环内初始化 SQLite 存储、执行测试并关闭连接池"""
+    async def run():
+        await BaseDAO.init_sqlite(str(tmp_path / "uow.db"), pool_size=3)
+        assert BaseDAO.is_database_enabled()
+        try:
+            return await body()
+        finally:
+            await BaseDAO.close_pool()
+
+    return asyncio.run(run())
+
+
+def test_spawned_task_does_not_reuse_closed_unit_connection(tmp_path):
+    async def body():
+        release = asyncio.Event()
+        observed = {}
+
+        async def late_query():
+            await release.wait()
+            async with BaseDAO._acquire() as conn:
+                # 连接确实是从连接池借出的，而不是工作单元已归还的连接
+                observed["idle"] = BaseDAO._pool.get_idle_size()
+                return await conn.fetchval("SELECT 1")
+
+        async with BaseDAO.unit_of_work() as unit:
+            async with BaseDAO._acquire() as conn:
+                assert unit.conn is conn
+            task = asyncio.create_task(late_query())
+
+        assert unit.closed and unit.conn is None
+        release.set()
+        assert await task == 1
+        assert observed["idle"] == BaseDAO._pool.get_size() - 1
+
+    run_with_db(tmp_path, body)
+
+
+def test_spawned_task_inside_unit_uses_its_own_connection(tmp_path):
+    async def body():
+        async with BaseDAO.unit_of_work():
+            async with BaseDAO._acquire() as conn:
+                unit_conn = conn
+
+            async def child():
+                async with BaseDAO._acquire() as conn:
+                    return conn
+
+            assert await asyncio.create_task(child()) is not unit_conn
+
+    run_with_db(tmp_path, body)
+
+
+def test_gather_inside_transaction_does_not_deadlock(tmp_path):
+    async def body():
+        chat_dao = ChatDAO()
+        async with BaseDAO.unit_of_work(transaction=True):
+            session = await chat_dao.create_session("test_user", "t", "deepseek", "deepseek-chat")
+            rows = await asyncio.wait_for(
+                asyncio.gather(*(chat_dao.fetch_one("SELECT 1 AS v") for _ in range(5))),
+                timeout=5
+            )
+        assert rows == [{"v": 1}] * 5
+        assert await chat_dao.get_session(session["id"]) is not None
+
+    run_with_db(tmp_path, body)
+
+
+def test_failed_statement_rolls_back_whole_unit(tmp_path):
+    async def body():
+        chat_dao = ChatDAO()
+        created = {}
+        with pytest.raises(RuntimeError):
+            async with BaseDAO.unit_of_work(transaction=True):
+                created.update(await chat_dao.create_session("test_user", "t", "deepseek", "deepseek-chat"))
+                # 会话不存在，外键约束失败；add_message 吞掉异常返回 None
+                assert await chat_dao.add_message("missing-session", "user", "hi") is None
+
+        # 会话的插入和缓存写入一起被丢弃
+        assert created
+        assert await chat_dao.get_session(created["id"]) is None
+
+    run_with_db(tmp_path, body)
+
+
+def test_exception_in_scope_rolls_back(tmp_path):
+    async def body():
+        chat_dao = ChatDAO()
+        session = await chat_dao.create_session("test_user", "t", "deepseek", "deepseek-chat")
+        with pytest.raises(ValueError):
+            async with BaseDAO.unit_of_work(transaction=True):
+                await chat_dao.add_message(session["id"], "user", "hi")
+                raise ValueError("abort")
+
+        assert await chat_dao.get_recent_messages(session["id"], count=10) == []
+        assert (await chat_dao.get_session(session["id"]))["message_count"] == 0
+
+    run_with_db(tmp_path, body)
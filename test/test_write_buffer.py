@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+研究会话写缓冲测试
+检查批量写入后按输入顺序回填ID、写入失败或被取消时数据按原顺序放回缓冲，
+close() 等待后台刷新任务并在自身被取消时取消它们
+
+用法:
+    python -m pytest test/test_write_buffer.py
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# src.core.agentscope.memory 包初始化时会导入 agentscope；ResearchDAO 依赖 asyncpg / redis
+pytest.importorskip("agentscope")
+pytest.importorskip("asyncpg")
+pytest.importorskip("redis")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.agentscope.memory.finding_dedup import FindingEntry
+from src.core.agentscope.memory.write_buffer import SessionWriteBuffer
+from src.dao.base import BaseDAO
+from src.dao.research_dao import ResearchDAO, _ids_by_ordinal
+
+
+class FakeDAO:
+    """记录每次批量写入；failures 次之前抛出异常，block 不为空时写入前等待"""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.batches = []
+        self.block = None
+        self.next_id = 100
+
+    async def write_session_batch(self, session_id, findings=None, finding_updates=None,
+                                  citations=None, messages=None):
+        if self.block is not None:
+            await self.block.wait()
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database unavailable")
+        self.batches.append({
+            "findings": [f["content"] for f in findings],
+            "updates": [u["id"] for u in finding_updates],
+            "citations": [c["title"] for c in citations],
+            "messages": [m["content"] for m in messages]
+        })
+        finding_ids = list(range(self.next_id, self.next_id + len(findings)))
+        self.next_id += len(findings)
+        return {"finding_ids": finding_ids, "citation_ids": [f"c{n}" for n in range(len(citations))]}
+
+
+def finding(content: str) -> FindingEntry:
+    return FindingEntry(None, "web", "", content, 0.8, ())
+
+
+def test_flush_assigns_ids_in_order():
+    dao = FakeDAO()
+    buffer = SessionWriteBuffer("s", dao, max_pending=100, flush_interval=60)
+    entries = [finding(f"f{n}") for n in range(3)]
+    citation = {"title": "paper"}
+
+    async def run():
+        for entry in entries:
+            buffer.add_finding(entry)
+        buffer.add_citation(citation)
+        assert await buffer.close()
+
+    asyncio.run(run())
+    assert [e.finding_id for e in entries] == [100, 101, 102]
+    assert citation["id"] == "c0"
+    assert dao.batches == [{"findings": ["f0", "f1", "f2"], "updates": [], "citations": ["paper"], "messages": []}]
+
+
+def test_failed_flush_requeues_in_order():
+    dao = FakeDAO(failures=1)
+    buffer = SessionWriteBuffer("s", dao, max_pending=100, flush_interval=60)
+    first, second = finding("first"), finding("second")
+
+    async def run():
+        buffer.add_finding(first)
+        buffer.add_messages([{"role": "assistant", "content": "m1", "timestamp": "t"}])
+        assert not await buffer.flush()
+        assert buffer.pending_count == 2
+        buffer.add_finding(second)
+        assert await buffer.close()
+
+    asyncio.run(run())
+    assert buffer.failed_flushes == 1
+    assert dao.batches == [{"findings": ["first", "second"], "updates": [], "citations": [], "messages": ["m1"]}]
+    assert (first.finding_id, second.finding_id) == (100, 101)
+
+
+def test_merged_during_flush_is_written_in_next_batch():
+    dao = FakeDAO()
+    dao.block = asyncio.Event()
+    buffer = SessionWriteBuffer("s", dao, max_pending=100, flush_interval=60)
+    entry = finding("f")
+
+    async def run():
+        buffer.add_finding(entry)
+        flushing = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0)
+        # 写入期间被合并
+        entry.support_count += 1
+        buffer.mark_dirty(entry)
+        dao.block.set()
+        assert await flushing
+        assert await buffer.close()
+
+    asyncio.run(run())
+    assert [batch["updates"] for batch in dao.batches] == [[], [100]]
+
+
+def test_cancelled_flush_keeps_data():
+    dao = FakeDAO()
+    dao.block = asyncio.Event()
+    buffer = SessionWriteBuffer("s", dao, max_pending=100, flush_interval=60)
+
+    async def run():
+        buffer.add_finding(finding("f"))
+        flushing = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0)
+        flushing.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flushing
+        assert buffer.pending_count == 1
+        dao.block.set()
+        assert await buffer.close()
+
+    asyncio.run(run())
+    assert [batch["findings"] for batch in dao.batches] == [["f"]]
+
+
+def test_close_awaits_background_flush():
+    dao = FakeDAO()
+    buffer = SessionWriteBuffer("s", dao, max_pending=2, flush_interval=60)
+
+    async def run():
+        for n in range(5):
+            buffer.add_finding(finding(f"f{n}"))
+            await asyncio.sleep(0)
+        assert await buffer.close()
+        assert not buffer._tasks
+
+    asyncio.run(run())
+    assert sum(len(batch["findings"]) for batch in dao.batches) == 5
+    assert buffer.pending_count == 0
+
+
+def test_cancelled_close_cancels_background_tasks():
+    dao = FakeDAO()
+    dao.block = asyncio.Event()
+    buffer = SessionWriteBuffer("s", dao, max_pending=1, flush_interval=60)
+
+    async def run():
+        buffer.add_finding(finding("f"))
+        await asyncio.sleep(0)
+        tasks = set(buffer._tasks)
+        closing = asyncio.create_task(buffer.close())
+        await asyncio.sleep(0)
+        closing.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await closing
+        await asyncio.sleep(0)
+        assert all(task.done() for task in tasks)
+        return buffer.pending_count
+
+    assert asyncio.run(run()) == 1
+
+
+def test_ids_mapped_by_ordinal():
+    rows = [{"id": 7, "ord": 3}, {"id": 5, "ord": 1}, {"id": 9, "ord": 2}]
+    assert _ids_by_ordinal(rows, 3) == [5, 9, 7]
+
+
+def test_write_session_batch_returns_ids_in_input_order(tmp_path):
+    async def run():
+        await BaseDAO.init_sqlite(str(tmp_path / "batch.db"), pool_size=2)
+        try:
+            dao = ResearchDAO()
+            await dao.create_research_session("s1", user_id="test_user")
+            result = await dao.write_session_batch(
+                "s1",
+                findings=[{"source_type": "web", "content": f"f{n}"} for n in range(3)],
+                citations=[{"title": f"c{n}", "authors": ["a"]} for n in range(2)]
+            )
+            findings = await dao.get_research_findings("s1")
+            return result, {f["id"]: f["content"] for f in findings}
+        finally:
+            await BaseDAO.close_pool()
+
+    result, contents = asyncio.run(run())
+    assert [contents[finding_id] for finding_id in result["finding_ids"]] == ["f0", "f1", "f2"]
+    assert len(result["citation_ids"]) == 2
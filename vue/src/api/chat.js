@@ -14,8 +14,8 @@ export async function createSession(sessionData) {
 /**
  * 获取会话列表
  */
-export async function getSessions(limit = 50, offset = 0) {
-  return await chatAPI.getSessions(limit, offset);
+export async function getSessions(limit = 50, cursor = null) {
+  return await chatAPI.getSessions(limit, cursor);
 }
 
 /**
@@ -89,8 +89,8 @@ export const chatAPI = {
   }),
 
   // 获取会话列表
-  getSessions: (limit = 50, offset = 0) => 
-    request(`/api/chat/sessions?limit=${limit}&offset=${offset}`),
+  getSessions: (limit = 50, cursor = null) => 
+    request(`/api/chat/sessions?limit=${limit}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`),
 
   // 获取会话详情
   getSession: (sessionId) => request(`/api/chat/sessions/${sessionId}`),